@@ -67,7 +67,8 @@ from utils.image_paths import get_image_path, normalize_profile_image_path
 from utils.image_urls import get_face_image_url, get_profile_image_url
 from utils.db.storage import get_storage
 from utils.files.utils import generate_face_filename, is_anonymized_face_filename, parse_face_id_from_filename
-from utils.db.database import get_db, Base, engine
+from utils.db.database import get_db, get_pool_stats, get_read_pool_stats, Base, engine
+from utils.blocking import offload_stats
 
 # Import models
 from models.user import User
@@ -241,6 +242,22 @@ def create_app(config_object=None):
     app.config['RATELIMIT_STRATEGY'] = "fixed-window"
     limiter.init_app(app)
     logger.info("Rate limiter configured")
+
+    # Per-request query counts and N+1 warnings
+    from utils.db.query_stats import init_query_stats
+    init_query_stats(app)
+
+    # Return connections a handler forgot to close to the pool
+    from utils.db.database import init_connection_release
+    init_connection_release(app)
+
+    # Read-only connections for the GET requests of read-heavy blueprints
+    from utils.db.read_routing import init_read_routing
+    init_read_routing(app)
+
+    # Explain every distinct statement when auditing query plans (dev/CI only)
+    from utils.db import plan_audit
+    plan_audit.install(app)
     
     # Add health check endpoint
     @app.route('/health')
@@ -250,7 +267,10 @@ def create_app(config_object=None):
             db.session.execute(text('SELECT 1'))
             return jsonify({
                 "status": "healthy",
-                "database": "connected"
+                "database": "connected",
+                "connection_pool": get_pool_stats(),
+                "read_pool": get_read_pool_stats(),
+                "blocking_offload": offload_stats()
             }), 200
         except Exception as e:
             logger.error(f"Health check failed: {str(e)}")
@@ -284,7 +304,23 @@ def create_app(config_object=None):
             logger.error(f"Error creating database tables: {e}")
             logger.error(f"Traceback: {traceback.format_exc()}")
             raise
+
+        # Like, follower and match counts are read from the counters table
+        from utils.db.migrations import migrate_counters_table
+        if not migrate_counters_table():
+            logger.error("Counters table is missing; like, follower and match counts will fail")
     
+    # In-process top match refresher, started in each worker on its first
+    # request (after gunicorn forks). With several workers prefer a single
+    # `python manage.py refresh_top_matches --loop` process instead.
+    if app.config.get("USER_TOP_MATCHES_REFRESHER", False):
+        from utils.face.top_matches import top_match_refresher
+
+        @app.before_request
+        def start_top_match_refresher():
+            if not top_match_refresher.is_running:
+                top_match_refresher.start(app)
+
     # Initialize template helpers
     logger.info("Initializing template helpers...")
     init_template_helpers(app)
@@ -76,10 +76,48 @@ class Config:
         }
     }
     
+    # Raw connection pool (utils/db/database.py)
+    DATABASE_POOL_MIN_SIZE = int(os.getenv('DATABASE_POOL_MIN_SIZE', '1'))
+    DATABASE_POOL_SIZE = int(os.getenv('DATABASE_POOL_SIZE', '10'))
+    DATABASE_POOL_TIMEOUT = int(os.getenv('DATABASE_POOL_TIMEOUT', '10'))
+    # Idle connections older than this are re-validated before reuse
+    DATABASE_POOL_VALIDATE_IDLE_SECONDS = int(os.getenv('DATABASE_POOL_VALIDATE_IDLE_SECONDS', '300'))
+    SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))
+    SQLITE_CACHE_SIZE = int(os.getenv('SQLITE_CACHE_SIZE', '-65536'))  # KiB when negative
+
+    # Read-only pool for read-routed blueprints (utils/db/read_routing.py)
+    DATABASE_READ_ROUTING_ENABLED = os.getenv('DATABASE_READ_ROUTING_ENABLED', 'true').lower() == 'true'
+    DATABASE_READ_URL = os.getenv('DATABASE_READ_URL')  # replica; default: the primary, read-only
+    DATABASE_READ_POOL_SIZE = int(os.getenv('DATABASE_READ_POOL_SIZE', os.getenv('DATABASE_POOL_SIZE', '10')))
+    DATABASE_READ_BLUEPRINTS = os.getenv('DATABASE_READ_BLUEPRINTS', 'search')  # '*', '-name' excludes
+
+    # Native thread pools for blocking C calls under gevent (utils/blocking.py)
+    BLOCKING_OFFLOAD_ENABLED = os.getenv('BLOCKING_OFFLOAD_ENABLED', 'true').lower() == 'true'
+    BLOCKING_DB_THREADS = int(os.getenv('BLOCKING_DB_THREADS', '8'))
+    BLOCKING_CPU_THREADS = int(os.getenv('BLOCKING_CPU_THREADS', '2'))
+
+    # Per-request query counts in Server-Timing (utils/db/query_stats.py)
+    QUERY_STATS_ENABLED = os.getenv('QUERY_STATS_ENABLED', 'true').lower() == 'true'
+    QUERY_STATS_DEBUG_HEADER = os.getenv('QUERY_STATS_DEBUG_HEADER', 'false').lower() == 'true'
+    QUERY_BUDGET = int(os.getenv('QUERY_BUDGET', '30'))  # queries per request before a warning
+    QUERY_REPEAT_THRESHOLD = int(os.getenv('QUERY_REPEAT_THRESHOLD', '5'))  # same statement, N+1 warning
+
+    # Query plan audit for dev/CI runs (utils/db/plan_audit.py)
+    QUERY_PLAN_AUDIT = os.getenv('QUERY_PLAN_AUDIT', 'false').lower() == 'true'
+    QUERY_PLAN_AUDIT_MIN_ROWS = int(os.getenv('QUERY_PLAN_AUDIT_MIN_ROWS', '1000'))
+    QUERY_PLAN_AUDIT_REPORT = os.getenv('QUERY_PLAN_AUDIT_REPORT', 'query_plan_audit.json')
+
     # Cache settings
     CACHE_TYPE = "SimpleCache"
     CACHE_DEFAULT_TIMEOUT = 300
     CACHE_THRESHOLD = int(os.getenv('CACHE_THRESHOLD', '1000'))
+    # Ranked face-search results (see utils/search_cache.py)
+    SEARCH_CACHE_ENABLED = os.getenv('SEARCH_CACHE_ENABLED', 'true').lower() == 'true'
+    SEARCH_CACHE_TIMEOUT = int(os.getenv('SEARCH_CACHE_TIMEOUT', '300'))
+    # Depth of the cached ranked list that search cursors page through
+    SEARCH_RANKED_DEPTH = int(os.getenv('SEARCH_RANKED_DEPTH', '500'))
+    # Largest number of faces searched from one group photo
+    GROUP_MATCH_MAX_FACES = int(os.getenv('GROUP_MATCH_MAX_FACES', '20'))
     
     # Rate limiting
     RATELIMIT_DEFAULT = "200 per day;50 per hour"
@@ -135,7 +173,49 @@ class Config:
     FACE_RECOGNITION_MODEL = "hog"  # or "cnn" for GPU
     FACE_RECOGNITION_TOLERANCE = 0.6
     FACE_RECOGNITION_NUM_JITTERS = 1
-    
+
+    # Embedding backends (see utils/face/encoders.py)
+    EMBEDDING_BACKEND = os.getenv('EMBEDDING_BACKEND', 'dlib')
+    # e.g. "arcface:10" routes 10% of users to the ArcFace index
+    EMBEDDING_BACKEND_COHORTS = os.getenv('EMBEDDING_BACKEND_COHORTS', '')
+    ARCFACE_MODEL_PATH = os.getenv('ARCFACE_MODEL_PATH', os.path.join('models', 'arcface', 'w600k_r50.onnx'))
+    ARCFACE_NUM_THREADS = int(os.getenv('ARCFACE_NUM_THREADS', '1'))
+
+    # Face quality thresholds (see utils/face/quality.py); faces below them
+    # are left out of the FAISS index
+    QUALITY_MIN_BLUR_VARIANCE = float(os.getenv('QUALITY_MIN_BLUR_VARIANCE', '50'))
+    QUALITY_MIN_WIDTH = int(os.getenv('QUALITY_MIN_WIDTH', '100'))
+    QUALITY_MIN_HEIGHT = int(os.getenv('QUALITY_MIN_HEIGHT', '100'))
+    QUALITY_MIN_BRIGHTNESS = float(os.getenv('QUALITY_MIN_BRIGHTNESS', '40'))
+    QUALITY_MAX_BRIGHTNESS = float(os.getenv('QUALITY_MAX_BRIGHTNESS', '235'))
+    QUALITY_MIN_FACE_BOX_RATIO = float(os.getenv('QUALITY_MIN_FACE_BOX_RATIO', '0.05'))
+
+    # Materialised per-user top matches (see utils/face/top_matches.py); the
+    # in-app refresher thread is off by default, run
+    # `python manage.py refresh_top_matches --loop` as its own process instead
+    USER_TOP_MATCHES_REFRESHER = os.getenv('USER_TOP_MATCHES_REFRESHER', 'false').lower() == 'true'
+    USER_TOP_MATCHES_K = int(os.getenv('USER_TOP_MATCHES_K', '50'))
+    USER_TOP_MATCHES_SWEEP_SECONDS = int(os.getenv('USER_TOP_MATCHES_SWEEP_SECONDS', '60'))
+
+    # Discover page snapshot (see utils/discover_snapshot.py)
+    DISCOVER_SNAPSHOT_SECONDS = int(os.getenv('DISCOVER_SNAPSHOT_SECONDS', '300'))
+
+    # Notification outbox (see utils/notification_outbox.py): notifications are
+    # buffered per process and flushed in batches by a background thread
+    NOTIFICATION_OUTBOX_ENABLED = os.getenv('NOTIFICATION_OUTBOX_ENABLED', 'true').lower() == 'true'
+    NOTIFICATION_OUTBOX_FLUSH_SECONDS = float(os.getenv('NOTIFICATION_OUTBOX_FLUSH_SECONDS', '5'))
+    NOTIFICATION_OUTBOX_MAX_BATCH = int(os.getenv('NOTIFICATION_OUTBOX_MAX_BATCH', '500'))
+
+    # Interaction write-behind buffer (see utils/interaction_buffer.py): face
+    # likes are buffered per process and written in one transaction per flush
+    INTERACTION_BUFFER_ENABLED = os.getenv('INTERACTION_BUFFER_ENABLED', 'true').lower() == 'true'
+    INTERACTION_BUFFER_FLUSH_MS = int(os.getenv('INTERACTION_BUFFER_FLUSH_MS', '250'))
+    INTERACTION_BUFFER_MAX_EVENTS = int(os.getenv('INTERACTION_BUFFER_MAX_EVENTS', '200'))
+
+    # Public B2 download base (https://<host>/file/<bucket>) used to build
+    # image URLs for files that only live in B2
+    B2_DOWNLOAD_URL = os.getenv('B2_DOWNLOAD_URL', '')
+
     # API configuration
     API_TITLE = 'Doppleganger API'
     OPENAPI_VERSION = '3.0.2'
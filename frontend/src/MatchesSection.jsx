@@ -28,7 +28,7 @@ const MatchesSection = ({ userId, isCurrentUser }) => {
         
         const formattedMatches = (data.matches || data || []).map(match => ({
           id: match.id,
-          image: match.image_url || match.match_image_url || (match.filename ? `${API_BASE_URL}/face/image/${match.id}` : '/static/default_profile.png'),
+          image: match.image_url || match.match_image_url || (match.filename ? `${API_BASE_URL}/face/image/${match.id}?size=192` : '/static/default_profile.png'),
           username: match.name || match.match_name || 'Match',
           label: match.type || (match.relationship === 'UNCLAIMED PROFILE' ? 'Unclaimed' : 'Match'),
           labelColor: '#fff',
@@ -46,4 +46,9 @@ def on_reload(server):
     pass
 
 def on_exit(server):
-    pass 
\ No newline at end of file
+    pass
+
+def worker_exit(server, worker):
+    # Write buffered interactions before a recycled or stopped worker goes away
+    from utils.interaction_buffer import interaction_buffer
+    interaction_buffer.flush_on_exit() 
\ No newline at end of file
@@ -1,4 +1,5 @@
 """Database management script for DoppleGänger."""
+import click
 from flask.cli import FlaskGroup
 from app import create_app
 from flask_migrate import Migrate, MigrateCommand
@@ -22,5 +23,46 @@ def migrate_db():
     upgrade()
     print("Database migrations initialized and applied.")
 
+@cli.command("refresh_top_matches")
+@click.option("--loop", is_flag=True, help="Keep running and refresh in the background.")
+def refresh_top_matches(loop):
+    """Refresh the materialised user_top_matches table."""
+    from utils.face.top_matches import top_match_refresher
+    if loop:
+        top_match_refresher.run_forever(app)
+    else:
+        print(f"Refreshed top matches for {top_match_refresher.run_once()} users.")
+
+@cli.command("build_discover_snapshot")
+def build_discover_snapshot():
+    """Rebuild the discover page snapshot and publish it to the cache."""
+    from utils.discover_snapshot import build_snapshot
+    with app.app_context():
+        snapshot = build_snapshot()
+    print(f"Discover snapshot built: {len(snapshot['popular'])} popular faces, {len(snapshot['pools'])} pools.")
+
+@cli.command("reconcile_counters")
+@click.option("--interval", type=int, default=None, help="Keep running, reconciling every N seconds.")
+def reconcile_counters(interval):
+    """Repair like, follower and match counters that drifted from their tables."""
+    from utils.db.counters import run_reconciliation
+    with app.app_context():
+        repaired = run_reconciliation(interval)
+    print(f"Repaired counters: {repaired}")
+
+@cli.command("query_plan_report")
+@click.option("--report", default=None, help="Audit report JSON (default: QUERY_PLAN_AUDIT_REPORT).")
+@click.option("--write-sql", is_flag=True, help="Append the suggested indexes to migrations/add_indexes.sql.")
+def query_plan_report(report, write_sql):
+    """Summarise a query plan audit run and its suggested indexes."""
+    import json
+    from utils.db.plan_audit import append_ddl, format_report
+    with open(report or app.config["QUERY_PLAN_AUDIT_REPORT"]) as f:
+        data = json.load(f)
+    print(format_report(data))
+    if write_sql:
+        added = append_ddl(data["findings"], "migrations/add_indexes.sql")
+        print(f"Added {len(added)} indexes to migrations/add_indexes.sql.")
+
 if __name__ == "__main__":
     cli() 
\ No newline at end of file
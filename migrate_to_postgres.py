@@ -1,26 +1,52 @@
+"""
+SQLite to PostgreSQL Migration
+==============================
+
+Copies the tables of the SQLite database into PostgreSQL.
+
+Each table is split into rowid ranges of about ``RANGE_ROWS`` rows. Worker
+processes stream their range out of SQLite, convert the rows (timestamps,
+booleans, encoding BLOBs as bytea) to COPY text format and load them with
+``COPY ... FROM STDIN``. Every loaded range is recorded in
+``sqlite_migration_ranges`` in the same transaction as its COPY, so an
+interrupted run resumes with the missing ranges only and never loads a
+range twice.
+
+Usage:
+    python migrate_to_postgres.py [--sqlite faces.db] [--workers N]
+        [--range-rows N] [--tables faces users ...] [--verify]
+
+``DATABASE_URL`` selects the PostgreSQL database.
+"""
+import argparse
 import os
 import sqlite3
 import psycopg2
-from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
 from dotenv import load_dotenv
 import time
 from tqdm import tqdm
-from datetime import datetime
-import json
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from itertools import islice
+from datetime import date, datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import multiprocessing
 
 # Load environment variables
 load_dotenv()
 
-BATCH_SIZE = 5000  # Increased batch size
+RANGE_ROWS = 20000  # Rows per COPY range (and per checkpoint)
 MAX_WORKERS = multiprocessing.cpu_count()  # Use number of CPU cores
-MIGRATION_STATE_FILE = 'migration_state.json'
+SQLITE_PATH = os.getenv('SQLITE_PATH', 'faces.db')
+CHECKPOINT_TABLE = 'sqlite_migration_ranges'
 
-def get_sqlite_connection():
+TIMESTAMP_COLUMNS = ('created_at', 'updated_at', 'last_login')
+BOOLEAN_COLUMNS = (
+    'is_claimed', 'is_admin', 'is_verified', 'is_active',
+    'share_real_name', 'share_location', 'is_private',
+    'is_deleted', 'is_blocked', 'is_muted', 'share_age'
+)
+
+def get_sqlite_connection(path=None):
     """Connect to SQLite database."""
-    return sqlite3.connect('faces.db')
+    return sqlite3.connect(path or SQLITE_PATH)
 
 def get_postgres_connection():
     """Connect to PostgreSQL database with proper error handling."""
@@ -37,18 +63,6 @@ def get_table_count(cursor, table_name):
     cursor.execute(f"SELECT COUNT(*) FROM {table_name};")
     return cursor.fetchone()[0]
 
-def load_migration_state():
-    """Load the migration state from file."""
-    if os.path.exists(MIGRATION_STATE_FILE):
-        with open(MIGRATION_STATE_FILE, 'r') as f:
-            return json.load(f)
-    return {'completed_tables': []}
-
-def save_migration_state(state):
-    """Save the migration state to file."""
-    with open(MIGRATION_STATE_FILE, 'w') as f:
-        json.dump(state, f)
-
 def get_table_schema(sqlite_cursor, table_name):
     """Get the table schema from SQLite and convert to PostgreSQL format."""
     sqlite_cursor.execute(f"PRAGMA table_info({table_name})")
@@ -206,110 +220,6 @@ def create_table(pg_conn, pg_cursor, sqlite_cursor, table_name):
         pg_conn.rollback()
         return False
 
-def process_batch(batch_data):
-    """Process a batch of rows in parallel."""
-    table_name, batch, columns, insert_sql = batch_data
-    pg_conn = get_postgres_connection()
-    pg_cursor = pg_conn.cursor()
-    
-    try:
-        processed_rows = [process_row(row, columns) for row in batch]
-        pg_cursor.executemany(insert_sql, processed_rows)
-        pg_conn.commit()
-        return len(processed_rows)
-    except Exception as e:
-        pg_conn.rollback()
-        print(f"\nError processing batch: {str(e)}")
-        return 0
-    finally:
-        pg_cursor.close()
-        pg_conn.close()
-
-def process_row(row, columns):
-    """Process a row to handle data type conversions."""
-    processed_row = list(row)
-    
-    # Find column indices
-    birthdate_idx = next((i for i, col in enumerate(columns) if col[1] == 'birthdate'), None)
-    created_at_idx = next((i for i, col in enumerate(columns) if col[1] == 'created_at'), None)
-    updated_at_idx = next((i for i, col in enumerate(columns) if col[1] == 'updated_at'), None)
-    last_login_idx = next((i for i, col in enumerate(columns) if col[1] == 'last_login'), None)
-    is_claimed_idx = next((i for i, col in enumerate(columns) if col[1] == 'is_claimed'), None)
-    is_admin_idx = next((i for i, col in enumerate(columns) if col[1] == 'is_admin'), None)
-    is_verified_idx = next((i for i, col in enumerate(columns) if col[1] == 'is_verified'), None)
-    is_active_idx = next((i for i, col in enumerate(columns) if col[1] == 'is_active'), None)
-    share_location_idx = next((i for i, col in enumerate(columns) if col[1] == 'share_location'), None)
-    is_private_idx = next((i for i, col in enumerate(columns) if col[1] == 'is_private'), None)
-    is_deleted_idx = next((i for i, col in enumerate(columns) if col[1] == 'is_deleted'), None)
-    is_blocked_idx = next((i for i, col in enumerate(columns) if col[1] == 'is_blocked'), None)
-    is_muted_idx = next((i for i, col in enumerate(columns) if col[1] == 'is_muted'), None)
-    share_real_name_idx = next((i for i, col in enumerate(columns) if col[1] == 'share_real_name'), None)
-    share_age_idx = next((i for i, col in enumerate(columns) if col[1] == 'share_age'), None)
-    
-    # Convert timestamps
-    for idx in [created_at_idx, updated_at_idx, last_login_idx]:
-        if idx is not None and row[idx] is not None:
-            try:
-                timestamp = int(row[idx])
-                if timestamp > 0:  # Only convert if timestamp is valid
-                    dt = datetime.fromtimestamp(timestamp)
-                    processed_row[idx] = dt
-                else:
-                    processed_row[idx] = None
-            except (ValueError, TypeError):
-                processed_row[idx] = None
-    
-    # Convert birthdate
-    if birthdate_idx is not None and row[birthdate_idx] is not None:
-        try:
-            timestamp = int(row[birthdate_idx])
-            if timestamp > 0:  # Only convert if timestamp is valid
-                dt = datetime.fromtimestamp(timestamp)
-                processed_row[birthdate_idx] = dt.date()
-            else:
-                processed_row[birthdate_idx] = None
-        except (ValueError, TypeError):
-            processed_row[birthdate_idx] = None
-    
-    # Convert boolean fields
-    boolean_indices = [
-        is_claimed_idx, is_admin_idx, is_verified_idx, is_active_idx, 
-        share_location_idx, is_private_idx, is_deleted_idx, 
-        is_blocked_idx, is_muted_idx, share_real_name_idx, share_age_idx
-    ]
-    
-    for idx in boolean_indices:
-        if idx is not None:
-            try:
-                value = row[idx]
-                if value is None:
-                    processed_row[idx] = None
-                elif isinstance(value, (int, float)):
-                    processed_row[idx] = bool(value)
-                elif isinstance(value, str):
-                    processed_row[idx] = value.lower() in ('true', '1', 't', 'yes')
-                else:
-                    processed_row[idx] = bool(value)
-            except (ValueError, TypeError):
-                processed_row[idx] = None
-    
-    return processed_row
-
-def reset_transaction(pg_conn):
-    """Reset an aborted transaction."""
-    try:
-        pg_conn.rollback()
-    except Exception:
-        pass
-
-def check_table_has_data(pg_cursor, table_name):
-    """Check if a table has data in PostgreSQL."""
-    try:
-        pg_cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-        return pg_cursor.fetchone()[0] > 0
-    except Exception:
-        return False
-
 def get_table_dependencies():
     """Get the order of tables based on their dependencies."""
     return [
@@ -330,160 +240,330 @@ def get_table_dependencies():
         'user_saved_matches'
     ]
 
-def migrate_table(sqlite_conn, table_name):
-    """Migrate a table from SQLite to PostgreSQL with proper type handling."""
-    sqlite_cursor = None
-    pg_conn = None
-    pg_cursor = None
-    
+# === Row conversion ===
+
+def _to_timestamp(value, as_date=False):
+    """Unix timestamps become datetimes (or dates); date strings are left for PostgreSQL to parse."""
+    if value is None:
+        return None
+    try:
+        timestamp = int(value)
+    except (ValueError, TypeError):
+        return value if isinstance(value, str) and value.strip() else None
+    if timestamp <= 0:
+        return None
+    dt = datetime.fromtimestamp(timestamp)
+    return dt.date() if as_date else dt
+
+def _to_bool(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value.lower() in ('true', '1', 't', 'yes')
+    return bool(value)
+
+def build_row_converter(columns):
+    """
+    Build the conversion for rows of one table.
+
+    Args:
+        columns: ``PRAGMA table_info`` rows of the table
+
+    Returns:
+        Callable turning a SQLite row into a list of PostgreSQL-ready values
+    """
+    conversions = []
+    for idx, col in enumerate(columns):
+        name = col[1]
+        if name in TIMESTAMP_COLUMNS:
+            conversions.append((idx, _to_timestamp))
+        elif name == 'birthdate':
+            conversions.append((idx, lambda value: _to_timestamp(value, as_date=True)))
+        elif name in BOOLEAN_COLUMNS:
+            conversions.append((idx, _to_bool))
+
+    def convert(row):
+        row = list(row)
+        for idx, conversion in conversions:
+            row[idx] = conversion(row[idx])
+        return row
+
+    return convert
+
+# === COPY text format ===
+
+_COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r', '\x00': ''})
+
+def copy_text_value(value):
+    """Encode one field in PostgreSQL's COPY text format."""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        # bytea hex input, with its backslash escaped for COPY
+        return '\\\\x' + bytes(value).hex()
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, float):
+        return repr(value)
+    return str(value).translate(_COPY_ESCAPES)
+
+def copy_text_line(values):
+    """Encode one row as a COPY text line."""
+    return ('\t'.join(copy_text_value(value) for value in values) + '\n').encode('utf-8')
+
+class CopyStream:
+    """File-like source for ``copy_expert`` that encodes rows as PostgreSQL reads them."""
+
+    def __init__(self, lines):
+        self._lines = iter(lines)
+        self._buffer = b''
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            self._buffer += line
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+# === Ranges and checkpoints ===
+
+def plan_ranges(sqlite_conn, table_name, range_rows=RANGE_ROWS):
+    """
+    Split a table into [start, end) rowid ranges of about ``range_rows`` rows.
+
+    Boundaries depend only on the rows present, so an unchanged database
+    gets the same ranges on every run and checkpoints stay valid.
+    """
+    cursor = sqlite_conn.cursor()
+    cursor.execute(f"SELECT MIN(rowid), MAX(rowid) FROM {table_name}")
+    start, last = cursor.fetchone()
+    if start is None:
+        return []
+    ranges = []
+    while True:
+        # Walks the rowid b-tree from the previous boundary, so planning stays linear
+        cursor.execute(
+            f"SELECT rowid FROM {table_name} WHERE rowid >= ? ORDER BY rowid LIMIT 1 OFFSET ?",
+            (start, range_rows)
+        )
+        row = cursor.fetchone()
+        if row is None:
+            ranges.append((start, last + 1))
+            return ranges
+        ranges.append((start, row[0]))
+        start = row[0]
+
+def ensure_checkpoint_table(pg_cursor):
+    """Create the table recording loaded ranges."""
+    pg_cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {CHECKPOINT_TABLE} (
+            table_name TEXT NOT NULL,
+            range_start BIGINT NOT NULL,
+            range_end BIGINT NOT NULL,
+            row_count INTEGER NOT NULL,
+            seconds DOUBLE PRECISION NOT NULL,
+            loaded_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (table_name, range_start)
+        )
+    """)
+
+def load_checkpoints(pg_cursor, table_name):
+    """Loaded ranges of a table: {(range_start, range_end): row_count}."""
+    pg_cursor.execute(
+        f"SELECT range_start, range_end, row_count FROM {CHECKPOINT_TABLE} WHERE table_name = %s",
+        (table_name,)
+    )
+    return {(row[0], row[1]): row[2] for row in pg_cursor.fetchall()}
+
+def copy_range(task):
+    """
+    Load one rowid range into PostgreSQL (runs in a worker process).
+
+    The COPY and the range's checkpoint row commit together.
+
+    Returns:
+        tuple: (table_name, range_start, range_end, rows, seconds)
+    """
+    table_name, columns, range_start, range_end, sqlite_path = task
+    started = time.time()
+    names = ', '.join(col[1] for col in columns)
+    convert = build_row_converter(columns)
+    sqlite_conn = get_sqlite_connection(sqlite_path)
+    pg_conn = get_postgres_connection()
+    pg_conn.autocommit = False
     try:
-        # Initialize cursors
         sqlite_cursor = sqlite_conn.cursor()
-        pg_conn = get_postgres_connection()
-        pg_cursor = pg_conn.cursor()
-        
-        # Create table if it doesn't exist
+        sqlite_cursor.execute(
+            f"SELECT {names} FROM {table_name} WHERE rowid >= ? AND rowid < ? ORDER BY rowid",
+            (range_start, range_end)
+        )
+        rows = 0
+
+        def lines():
+            nonlocal rows
+            for row in sqlite_cursor:
+                rows += 1
+                yield copy_text_line(convert(row))
+
+        with pg_conn.cursor() as pg_cursor:
+            pg_cursor.copy_expert(f"COPY {table_name} ({names}) FROM STDIN", CopyStream(lines()))
+            seconds = time.time() - started
+            pg_cursor.execute(
+                f"INSERT INTO {CHECKPOINT_TABLE} (table_name, range_start, range_end, row_count, seconds) "
+                "VALUES (%s, %s, %s, %s, %s)",
+                (table_name, range_start, range_end, rows, seconds)
+            )
+        pg_conn.commit()
+        return table_name, range_start, range_end, rows, seconds
+    except Exception:
+        pg_conn.rollback()
+        raise
+    finally:
+        sqlite_conn.close()
+        pg_conn.close()
+
+# === Migration ===
+
+def plan_tasks(sqlite_conn, pg_conn, pg_cursor, tables, sqlite_path, range_rows):
+    """
+    Create the target tables and list the ranges still to load.
+
+    Returns:
+        tuple: (tasks, {table: stats}) where stats start from the checkpointed rows
+    """
+    tasks = []
+    stats = {}
+    for table_name in tables:
+        sqlite_cursor = sqlite_conn.cursor()
         if not create_table(pg_conn, pg_cursor, sqlite_cursor, table_name):
             print(f"Failed to create table {table_name}, skipping migration")
-            return
-        
-        # Verify table exists
-        if not check_table_exists(pg_cursor, table_name):
-            print(f"Table {table_name} does not exist after creation, skipping migration")
-            return
-        
-        # Check if table has data
-        if check_table_has_data(pg_cursor, table_name):
-            print(f"Table {table_name} already has data, skipping migration")
-            return
-        
-        # Get column info for type conversion
+            continue
         sqlite_cursor.execute(f"PRAGMA table_info({table_name})")
         columns = sqlite_cursor.fetchall()
-        
-        # Build column list for SELECT
-        column_names = [col[1] for col in columns]
-        columns_str = ', '.join(column_names)
-        
-        # Get data from SQLite
-        sqlite_cursor.execute(f"SELECT {columns_str} FROM {table_name}")
-        rows = sqlite_cursor.fetchall()
-        
-        if not rows:
-            print(f"No data to migrate for table {table_name}")
-            return
-        
-        # Process rows to handle type conversions
-        processed_rows = [process_row(row, columns) for row in rows]
-        
-        # Prepare INSERT statement
-        placeholders = ', '.join(['%s'] * len(column_names))
-        insert_sql = f"INSERT INTO {table_name} ({columns_str}) VALUES ({placeholders})"
-        
-        # Insert data into PostgreSQL
-        pg_cursor.executemany(insert_sql, processed_rows)
-        pg_conn.commit()  # Explicitly commit the data insertion
-        
-        print(f"Migrated {len(rows)} rows from {table_name}")
-        
-    except Exception as e:
-        print(f"Error migrating table {table_name}: {str(e)}")
-        if pg_conn:
-            pg_conn.rollback()
-        raise
-    finally:
-        if sqlite_cursor:
-            sqlite_cursor.close()
-        if pg_cursor:
-            pg_cursor.close()
-        if pg_conn:
-            pg_conn.close()
-
-def migrate_data():
-    """Main migration function with proper error handling."""
-    sqlite_conn = None
-    
+
+        ranges = plan_ranges(sqlite_conn, table_name, range_rows)
+        done = load_checkpoints(pg_cursor, table_name)
+        if set(done) - set(ranges):
+            print(
+                f"Checkpoints of {table_name} do not match its current rows (source changed or "
+                f"--range-rows differs); truncate {table_name} and delete its {CHECKPOINT_TABLE} rows to reload it"
+            )
+            continue
+        pending = [r for r in ranges if r not in done]
+        stats[table_name] = {
+            'ranges': len(ranges),
+            'resumed_ranges': len(done),
+            'resumed_rows': sum(done.values()),
+            'rows': 0,
+            'seconds': 0.0,
+            'failed': 0,
+        }
+        tasks.extend((table_name, columns, start, end, sqlite_path) for start, end in pending)
+    return tasks, stats
+
+def print_report(stats, elapsed):
+    """Print rows loaded and throughput per table."""
+    print(f"\n{'table':<22} {'rows':>10} {'resumed':>10} {'ranges':>8} {'failed':>7} {'rows/s':>10}")
+    total = 0
+    for table_name, s in stats.items():
+        # Per-worker throughput: rows over the time the table's ranges took
+        rate = s['rows'] / s['seconds'] if s['seconds'] else 0
+        print(f"{table_name:<22} {s['rows']:>10} {s['resumed_rows']:>10} {s['ranges']:>8} {s['failed']:>7} {rate:>10.0f}")
+        total += s['rows']
+    overall = total / elapsed if elapsed else 0
+    print(f"Loaded {total} rows in {elapsed:.1f}s ({overall:.0f} rows/s overall)")
+
+def migrate_data(sqlite_path=None, tables=None, workers=MAX_WORKERS, range_rows=RANGE_ROWS):
+    """
+    Copy the tables into PostgreSQL with parallel range loads, resuming from checkpoints.
+
+    Returns:
+        dict: {table: stats} with rows loaded, worker seconds and failed ranges
+    """
+    sqlite_path = sqlite_path or SQLITE_PATH
+    started = time.time()
+    sqlite_conn = get_sqlite_connection(sqlite_path)
+    pg_conn = get_postgres_connection()
+    pg_cursor = pg_conn.cursor()
     try:
-        # Connect to SQLite database
-        sqlite_conn = get_sqlite_connection()
-        
-        # Get tables in dependency order
-        tables = [(name,) for name in get_table_dependencies()]
-        
-        # First pass: Create all tables
-        print("Creating tables...")
-        for table in tables:
-            table_name = table[0]
-            if table_name != 'sqlite_sequence':  # Skip system tables
-                try:
-                    pg_conn = get_postgres_connection()
-                    pg_cursor = pg_conn.cursor()
-                    sqlite_cursor = sqlite_conn.cursor()
-                    try:
-                        if not create_table(pg_conn, pg_cursor, sqlite_cursor, table_name):
-                            print(f"Failed to create table {table_name}, will retry during data migration")
-                    finally:
-                        sqlite_cursor.close()
-                        pg_cursor.close()
-                        pg_conn.close()
-                except Exception as e:
-                    print(f"Error creating table {table_name}: {str(e)}")
-                    continue
-        
-        # Calculate total rows to migrate
-        total_rows = 0
-        for table in tables:
-            table_name = table[0]
-            if table_name != 'sqlite_sequence':  # Skip system tables
-                sqlite_cursor = sqlite_conn.cursor()
-                pg_conn = get_postgres_connection()
-                pg_cursor = pg_conn.cursor()
-                try:
-                    # Verify table exists and check data
-                    if check_table_exists(pg_cursor, table_name) and not check_table_has_data(pg_cursor, table_name):
-                        total_rows += get_table_count(sqlite_cursor, table_name)
-                finally:
-                    sqlite_cursor.close()
-                    pg_cursor.close()
-                    pg_conn.close()
-        
-        # Second pass: Migrate data
-        print("\nMigrating data...")
-        with tqdm(total=total_rows, desc="Starting migration...") as pbar:
-            for table in tables:
-                table_name = table[0]
-                # Skip sqlite_sequence table
-                if table_name == 'sqlite_sequence':
-                    print(f"Skipping system table: {table_name}")
-                    continue
-                
-                try:
-                    migrate_table(sqlite_conn, table_name)
-                    # Update progress bar with actual migrated rows
-                    pg_conn = get_postgres_connection()
-                    pg_cursor = pg_conn.cursor()
-                    try:
-                        if check_table_has_data(pg_cursor, table_name):
-                            pg_cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-                            pg_count = pg_cursor.fetchone()[0]
-                            pbar.update(pg_count)
-                    except Exception:
-                        pass
-                    finally:
-                        pg_cursor.close()
-                        pg_conn.close()
-                except Exception as e:
-                    print(f"Error during migration: {str(e)}")
-                    continue  # Continue with next table instead of raising
-                
+        sqlite_cursor = sqlite_conn.cursor()
+        sqlite_cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        existing = {row[0] for row in sqlite_cursor.fetchall()}
+        tables = [name for name in (tables or get_table_dependencies()) if name in existing]
+
+        ensure_checkpoint_table(pg_cursor)
+        tasks, stats = plan_tasks(sqlite_conn, pg_conn, pg_cursor, tables, sqlite_path, range_rows)
+    finally:
+        pg_cursor.close()
+        pg_conn.close()
+        sqlite_conn.close()
+
+    print(f"\nLoading {len(tasks)} ranges with {workers} workers...")
+    with ProcessPoolExecutor(max_workers=workers) as executor, tqdm(total=len(tasks), desc="Ranges") as pbar:
+        futures = {executor.submit(copy_range, task): task for task in tasks}
+        for future in as_completed(futures):
+            table_name, _, range_start, range_end, _ = futures[future]
+            try:
+                _, _, _, rows, seconds = future.result()
+                stats[table_name]['rows'] += rows
+                stats[table_name]['seconds'] += seconds
+            except Exception as e:
+                stats[table_name]['failed'] += 1
+                print(f"\nError loading {table_name} rowids [{range_start}, {range_end}): {str(e)}")
+            pbar.update(1)
+
+    print_report(stats, time.time() - started)
+    failed = sum(s['failed'] for s in stats.values())
+    if failed:
+        print(f"{failed} ranges failed; run the migration again to load them")
+    else:
         print("Migration completed successfully!")
-        
-    except Exception as e:
-        print(f"Error during migration: {str(e)}")
-        raise
+    return stats
+
+def verify_counts(sqlite_path=None, tables=None):
+    """
+    Compare row counts between SQLite and PostgreSQL.
+
+    Returns:
+        dict: {table: (sqlite_rows, postgres_rows)} for the tables that differ
+    """
+    sqlite_conn = get_sqlite_connection(sqlite_path)
+    pg_conn = get_postgres_connection()
+    mismatches = {}
+    try:
+        sqlite_cursor = sqlite_conn.cursor()
+        pg_cursor = pg_conn.cursor()
+        sqlite_cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        existing = {row[0] for row in sqlite_cursor.fetchall()}
+        for table_name in tables or get_table_dependencies():
+            if table_name not in existing or not check_table_exists(pg_cursor, table_name):
+                continue
+            counts = (get_table_count(sqlite_cursor, table_name), get_table_count(pg_cursor, table_name))
+            status = "ok" if counts[0] == counts[1] else "MISMATCH"
+            print(f"{table_name:<22} sqlite={counts[0]:<10} postgres={counts[1]:<10} {status}")
+            if counts[0] != counts[1]:
+                mismatches[table_name] = counts
     finally:
-        if sqlite_conn:
-            sqlite_conn.close()
+        sqlite_conn.close()
+        pg_conn.close()
+    return mismatches
 
 if __name__ == "__main__":
-    migrate_data() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Copy the SQLite database into PostgreSQL (DATABASE_URL).")
+    parser.add_argument("--sqlite", default=SQLITE_PATH, help="SQLite database file")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="Parallel range loaders")
+    parser.add_argument("--range-rows", type=int, default=RANGE_ROWS, help="Rows per range and checkpoint")
+    parser.add_argument("--tables", nargs="*", help="Tables to copy (default: all known tables)")
+    parser.add_argument("--verify", action="store_true", help="Only compare row counts")
+    args = parser.parse_args()
+    if args.verify:
+        raise SystemExit(1 if verify_counts(args.sqlite, args.tables) else 0)
+    migrate_data(args.sqlite, args.tables, args.workers, args.range_rows)
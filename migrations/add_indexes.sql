@@ -9,4 +9,9 @@ CREATE INDEX IF NOT EXISTS idx_notifications_user_id ON notifications(user_id);
 CREATE INDEX IF NOT EXISTS idx_notifications_created_at ON notifications(created_at);
 CREATE INDEX IF NOT EXISTS idx_notifications_is_read ON notifications(is_read);
 CREATE INDEX IF NOT EXISTS idx_users_username ON users(username);
-CREATE INDEX IF NOT EXISTS idx_users_email ON users(email); 
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS idx_users_email ON users(email); 
+CREATE INDEX IF NOT EXISTS idx_faces_blur_variance ON faces(blur_variance);
+CREATE INDEX IF NOT EXISTS idx_faces_image_width ON faces(image_width);
+CREATE INDEX IF NOT EXISTS idx_faces_image_height ON faces(image_height);
+CREATE INDEX IF NOT EXISTS idx_faces_face_box_ratio ON faces(face_box_ratio);
+CREATE INDEX IF NOT EXISTS idx_faces_brightness ON faces(brightness);
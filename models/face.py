@@ -246,7 +246,13 @@ class Face(db.Model):
     def get_random_selection(cls, count=10):
         """Get a random selection of faces."""
         try:
-            return cls.query.order_by(db.func.random()).limit(count).all()
+            from utils.face.sampler import get_face_sampler
+
+            ids = get_face_sampler().sample_ids(count)
+            if not ids:
+                return []
+            faces = {face.id: face for face in cls.query.filter(cls.id.in_(ids)).all()}
+            return [faces[i] for i in ids if i in faces]
         except Exception as e:
             logging.error(f"Error getting random selection: {e}")
             return []
@@ -255,7 +261,8 @@ class Face(db.Model):
     def get_random_for_display(cls):
         """Get random face for display."""
         try:
-            return cls.query.order_by(db.func.random()).first()
+            faces = cls.get_random_selection(1)
+            return faces[0] if faces else None
         except Exception as e:
             logging.error(f"Error getting random face for display: {e}")
             return None
@@ -1,6 +1,7 @@
 import logging
 import sqlite3
 
+from utils.db import counters
 from utils.db.database import get_users_db_connection
 
 
@@ -49,6 +50,8 @@ class Follow:
                 "INSERT INTO follows (follower_id, followed_id) VALUES (?, ?)",
                 (follower_id, followed_id),
             )
+            counters.bump(cursor, counters.FOLLOWERS, followed_id)
+            counters.bump(cursor, counters.FOLLOWING, follower_id)
 
             conn.commit()
             return True
@@ -82,6 +85,9 @@ class Follow:
                 "DELETE FROM follows WHERE follower_id = ? AND followed_id = ?",
                 (follower_id, followed_id),
             )
+            removed = cursor.rowcount
+            counters.bump(cursor, counters.FOLLOWERS, followed_id, -removed)
+            counters.bump(cursor, counters.FOLLOWING, follower_id, -removed)
 
             conn.commit()
             return True
@@ -200,13 +206,7 @@ class Follow:
             return 0
 
         try:
-            cursor = conn.cursor()
-
-            cursor.execute(
-                "SELECT COUNT(*) FROM follows WHERE followed_id = ?", (user_id,)
-            )
-
-            return cursor.fetchone()[0]
+            return counters.get_count(conn.cursor(), counters.FOLLOWERS, user_id)
 
         except Exception as e:
             logging.error(f"Error getting follower count: {e}")
@@ -230,13 +230,7 @@ class Follow:
             return 0
 
         try:
-            cursor = conn.cursor()
-
-            cursor.execute(
-                "SELECT COUNT(*) FROM follows WHERE follower_id = ?", (user_id,)
-            )
-
-            return cursor.fetchone()[0]
+            return counters.get_count(conn.cursor(), counters.FOLLOWING, user_id)
 
         except Exception as e:
             logging.error(f"Error getting following count: {e}")
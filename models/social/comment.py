@@ -2,17 +2,66 @@
 ===========================
 
 This module defines the comment models and related database operations.
+
+Threads are loaded with :meth:`Comment.get_threads`: one recursive CTE for
+the comments of any number of posts plus one query for their authors, so
+post detail and feed views run a fixed number of queries however deep or
+long the threads are.
 """
 
 import logging
+from collections import defaultdict
 from datetime import datetime
 from flask import current_app
+from sqlalchemy import bindparam, text
 from extensions import db
+from utils.image_paths import normalize_profile_image_path
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Thread preview shown under each post in the feed
+FEED_THREAD_COMMENTS = 3
+FEED_THREAD_DEPTH = 1
+
+# Top-level comments (newest first, optionally the first N per post), then
+# their replies level by level down to the depth limit. reply_count lets a
+# cut-off thread show "N more replies".
+_THREAD_SQL = """
+    WITH RECURSIVE thread (id, post_id, parent_id, user_id, content, created_at, updated_at, depth) AS (
+        SELECT id, post_id, parent_id, user_id, content, created_at, updated_at, 0
+        FROM (
+            SELECT c.*, ROW_NUMBER() OVER (
+                PARTITION BY c.post_id ORDER BY c.created_at DESC, c.id DESC
+            ) AS thread_rank
+            FROM comments c
+            WHERE c.post_id IN :post_ids AND c.parent_id IS NULL
+        ) top_level
+        {limit_clause}
+        UNION ALL
+        SELECT c.id, c.post_id, c.parent_id, c.user_id, c.content, c.created_at, c.updated_at, t.depth + 1
+        FROM comments c
+        JOIN thread t ON c.parent_id = t.id
+        {depth_clause}
+    )
+    SELECT t.*, (SELECT COUNT(*) FROM comments r WHERE r.parent_id = t.id) AS reply_count
+    FROM thread t
+"""
+
+_AUTHORS_SQL = text(
+    "SELECT id, username, profile_image FROM users WHERE id IN :user_ids"
+).bindparams(bindparam("user_ids", expanding=True))
+
+
+def _isoformat(value):
+    # Raw SQLite rows hold timestamps as strings
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+def _sort_key(value):
+    return value if value is not None else ""
+
 class Comment(db.Model):
     """Comment model for storing post comments."""
     __tablename__ = 'comments'
@@ -131,4 +180,89 @@ class Comment(db.Model):
             ).all()
         except Exception as e:
             logger.error(f"Error getting comment replies: {str(e)}")
-            raise 
\ No newline at end of file
+            raise
+
+    @classmethod
+    def get_threads(cls, post_ids, limit=None, max_depth=None):
+        """
+        Load the comment trees of several posts in two queries.
+
+        Args:
+            post_ids: Posts to load
+            limit: Top-level comments per post (newest first); None for all
+            max_depth: Reply levels below the top level; None for the whole tree
+
+        Returns:
+            dict: {post_id: [comment dict with nested 'replies', ...]}; every
+            comment has 'user' and 'reply_count' (replies in the database,
+            loaded or not)
+        """
+        post_ids = list({post_id for post_id in post_ids if post_id is not None})
+        if not post_ids:
+            return {}
+        try:
+            sql = _THREAD_SQL.format(
+                limit_clause="WHERE thread_rank <= :limit" if limit is not None else "",
+                depth_clause="WHERE t.depth < :max_depth" if max_depth is not None else "",
+            )
+            params = {"post_ids": post_ids}
+            if limit is not None:
+                params["limit"] = limit
+            if max_depth is not None:
+                params["max_depth"] = max_depth
+            statement = text(sql).bindparams(bindparam("post_ids", expanding=True))
+            rows = [dict(row._mapping) for row in db.session.execute(statement, params)]
+
+            user_ids = list({row["user_id"] for row in rows})
+            authors = {}
+            if user_ids:
+                for user in db.session.execute(_AUTHORS_SQL, {"user_ids": user_ids}):
+                    authors[user.id] = {
+                        "id": user.id,
+                        "username": user.username,
+                        "profile_image_url": normalize_profile_image_path(user.profile_image),
+                    }
+        except Exception as e:
+            logger.error(f"Error loading comment threads: {str(e)}")
+            raise
+
+        comments = {}
+        children = defaultdict(list)
+        for row in rows:
+            author = authors.get(row["user_id"])
+            comment = {
+                "id": row["id"],
+                "post_id": row["post_id"],
+                "user_id": row["user_id"],
+                "content": row["content"],
+                "parent_id": row["parent_id"],
+                "created_at": _isoformat(row["created_at"]),
+                "updated_at": _isoformat(row["updated_at"]),
+                "user": author,
+                "username": author["username"] if author else None,
+                "profile_image_url": author["profile_image_url"] if author else None,
+                "depth": row["depth"],
+                "reply_count": row["reply_count"],
+                "replies": [],
+            }
+            comments[row["id"]] = comment
+            children[row["parent_id"]].append(comment)
+
+        # Replies read oldest first, like get_replies()
+        for parent_id, replies in children.items():
+            if parent_id is not None and parent_id in comments:
+                replies.sort(key=lambda c: (_sort_key(c["created_at"]), c["id"]))
+                comments[parent_id]["replies"] = replies
+
+        threads = {post_id: [] for post_id in post_ids}
+        for comment in children[None]:
+            threads[comment["post_id"]].append(comment)
+        # Top-level comments newest first, like get_by_post_id()
+        for top_level in threads.values():
+            top_level.sort(key=lambda c: (_sort_key(c["created_at"]), c["id"]), reverse=True)
+        return threads
+
+    @classmethod
+    def get_thread(cls, post_id, limit=None, max_depth=None):
+        """The comment tree of one post; see :meth:`get_threads`."""
+        return cls.get_threads([post_id], limit=limit, max_depth=max_depth).get(post_id, [])
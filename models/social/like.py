@@ -8,6 +8,7 @@ import logging
 from datetime import datetime
 from flask import current_app
 from extensions import db
+from utils.db import counters
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -50,6 +51,7 @@ class Like(db.Model):
                 user_id=user_id
             )
             db.session.add(like)
+            counters.bump_session(db.session, counters.POST_LIKES, post_id)
             db.session.commit()
             return like
         except Exception as e:
@@ -88,7 +90,7 @@ class Like(db.Model):
     def get_like_count(cls, post_id):
         """Get the number of likes for a post."""
         try:
-            return cls.query.filter_by(post_id=post_id).count()
+            return counters.get_count_session(db.session, counters.POST_LIKES, post_id)
         except Exception as e:
             logger.error(f"Error getting like count: {str(e)}")
             raise
@@ -109,6 +111,7 @@ class Like(db.Model):
         """Delete a like."""
         try:
             db.session.delete(self)
+            counters.bump_session(db.session, counters.POST_LIKES, self.post_id, -1)
             db.session.commit()
         except Exception as e:
             logger.error(f"Error deleting like: {str(e)}")
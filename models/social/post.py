@@ -8,6 +8,7 @@ import logging
 from datetime import datetime
 from flask import current_app
 from extensions import db
+from models.social.comment import Comment
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -38,8 +39,16 @@ class Post(db.Model):
         self.content = content
         self.visibility = visibility
 
-    def to_dict(self):
-        """Convert post to dictionary."""
+    def to_dict(self, comments=None):
+        """
+        Convert post to dictionary.
+
+        Args:
+            comments: Thread already loaded with ``Comment.get_threads`` (feeds
+                load every post's thread at once); loaded here when omitted
+        """
+        if comments is None:
+            comments = Comment.get_thread(self.id)
         return {
             'id': self.id,
             'user_id': self.user_id,
@@ -49,7 +58,7 @@ class Post(db.Model):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             'images': [image.to_dict() for image in self.images],
             'reactions': [reaction.to_dict() for reaction in self.reactions],
-            'comments': [comment.to_dict() for comment in self.comments]
+            'comments': comments
         }
 
     @classmethod
@@ -12,6 +12,7 @@ from flask import current_app, url_for
 from flask_login import UserMixin
 from werkzeug.security import check_password_hash, generate_password_hash
 from extensions import db
+from utils.db import counters
 import os
 
 # Configure logging
@@ -240,6 +241,8 @@ class User(UserMixin, db.Model):
             return False
             
         self.following.append(user_to_follow)
+        # The backref writes follows(follower_id=user_id, followed_id=self.id)
+        self._bump_follow_counters(user_id, 1)
         db.session.commit()
         return True
 
@@ -256,6 +259,7 @@ class User(UserMixin, db.Model):
             return False
             
         self.following.remove(user_to_unfollow)
+        self._bump_follow_counters(user_id, -1)
         db.session.commit()
         return True
 
@@ -263,9 +267,14 @@ class User(UserMixin, db.Model):
         """Check if this user is following another user."""
         return self.following.filter_by(id=user_id).first() is not None
 
+    def _bump_follow_counters(self, user_id, delta):
+        counters.bump_session(db.session, counters.FOLLOWERS, self.id, delta)
+        counters.bump_session(db.session, counters.FOLLOWING, user_id, delta)
+
     def get_follower_count(self):
         """Get the number of followers this user has."""
-        return self.followers.count()
+        # Same rows as self.followers: follows with follower_id = self.id
+        return counters.get_count_session(db.session, counters.FOLLOWING, self.id)
 
     @classmethod
     def get_friend_suggestions(cls, user_id, limit=5):
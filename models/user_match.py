@@ -13,7 +13,10 @@ from flask import current_app
 from extensions import db
 
 from models.face import Face
+from utils.db import counters
 from utils.db.database import get_users_db_connection
+from utils.db.schema import schema_registry
+from utils.interaction_buffer import FACE_LIKE, MISSING, buffering_enabled, interaction_buffer
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -98,6 +101,7 @@ class UserMatch(db.Model):
         """Delete a match record."""
         try:
             db.session.delete(self)
+            counters.bump_session(db.session, counters.USER_MATCHES, self.user_id, -1)
             db.session.commit()
         except Exception as e:
             logger.error(f"Error deleting match record: {str(e)}")
@@ -343,64 +347,20 @@ class UserMatch(db.Model):
             return existing
         try:
             cursor = conn.cursor()
-            # Check the database schema to see what columns exist
-            cursor.execute("PRAGMA table_info(user_matches)")
-            columns = [column[1] for column in cursor.fetchall()]
-            logging.debug(f"user_matches table columns: {columns}")
-            
-            # Add missing columns if needed
-            missing_columns = []
-            if 'face_id' not in columns and face_id is not None:
-                missing_columns.append(("face_id", "INTEGER"))
-            if 'privacy_level' not in columns and privacy_level is not None:
-                missing_columns.append(("privacy_level", "TEXT"))
-            if 'similarity' not in columns and similarity is not None:
-                missing_columns.append(("similarity", "REAL"))
-            if 'post_id' not in columns and post_id is not None:
-                missing_columns.append(("post_id", "INTEGER"))
-                
-            # Add missing columns
-            for col_name, col_type in missing_columns:
-                try:
-                    logging.info(f"Adding {col_name} column to user_matches table")
-                    cursor.execute(f"ALTER TABLE user_matches ADD COLUMN {col_name} {col_type}")
-                    conn.commit()
-                except Exception as alter_error:
-                    logging.error(f"Error adding {col_name} column: {alter_error}")
-            
-            # Re-check columns after potential additions
-            cursor.execute("PRAGMA table_info(user_matches)")
-            columns = [column[1] for column in cursor.fetchall()]
-            logging.debug(f"Updated user_matches table columns: {columns}")
-            
-            # Build dynamic INSERT query based on available columns
-            insert_columns = ['user_id', 'match_filename', 'is_visible', 'added_at']
-            insert_values = [user_id, match_filename, is_visible, datetime.now().strftime("%Y-%m-%d %H:%M:%S")]
-            
-            # Add optional columns if they exist in the schema
-            if 'face_id' in columns and face_id is not None:
-                insert_columns.append('face_id')
-                insert_values.append(face_id)
-            if 'privacy_level' in columns and privacy_level is not None:
-                insert_columns.append('privacy_level')
-                insert_values.append(privacy_level)
-            if 'similarity' in columns and similarity is not None:
-                insert_columns.append('similarity')
-                insert_values.append(similarity)
-            if 'post_id' in columns and post_id is not None:
-                insert_columns.append('post_id')
-                insert_values.append(post_id)
-                
-            # Construct the query
-            placeholders = ', '.join(['?' for _ in insert_values])
-            columns_str = ', '.join(insert_columns)
-            
-            # Execute the dynamic query
-            query = f"INSERT INTO user_matches ({columns_str}) VALUES ({placeholders})"
-            logging.debug(f"Executing query: {query} with values: {insert_values}")
+            # Optional columns are dropped when unset or missing from an older schema
+            values = {
+                'user_id': user_id,
+                'match_filename': match_filename,
+                'is_visible': is_visible,
+                'added_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            optional = {'face_id': face_id, 'privacy_level': privacy_level, 'similarity': similarity, 'post_id': post_id}
+            values.update((column, value) for column, value in optional.items() if value is not None)
+            query, insert_values = schema_registry.insert(cursor, 'user_matches', values)
             cursor.execute(query, insert_values)
-            conn.commit()
             match_id = cursor.lastrowid
+            counters.bump(cursor, counters.USER_MATCHES, user_id)
+            conn.commit()
             
             # Send notification if the match is claimed by another user
             try:
@@ -469,9 +429,11 @@ class UserMatch(db.Model):
             """,
                 (user_id, match_filename),
             )
+            removed = cursor.rowcount
+            counters.bump(cursor, counters.USER_MATCHES, user_id, -removed)
 
             conn.commit()
-            return cursor.rowcount > 0
+            return removed > 0
 
         except Exception as e:
             logging.error(f"Error removing match from profile: {e}")
@@ -502,38 +464,9 @@ class UserMatch(db.Model):
             
         try:
             cursor = conn.cursor()
-            
-            # First check if post_id column exists in the user_matches table
-            cursor.execute("PRAGMA table_info(user_matches)")
-            columns = [column[1] for column in cursor.fetchall()]
-            logging.debug(f"user_matches table columns: {columns}")
-            
-            if 'post_id' not in columns:
-                # Add post_id column if it doesn't exist
-                try:
-                    logging.info("Adding post_id column to user_matches table")
-                    cursor.execute("ALTER TABLE user_matches ADD COLUMN post_id INTEGER")
-                    conn.commit()
-                    # Re-check columns after addition
-                    cursor.execute("PRAGMA table_info(user_matches)")
-                    columns = [column[1] for column in cursor.fetchall()]
-                    logging.debug(f"Updated user_matches table columns: {columns}")
-                except Exception as alter_error:
-                    logging.error(f"Error adding post_id column: {alter_error}")
-                    # If we can't add the column, just return success anyway
-                    # We don't want to block post creation just because we can't link it to a match
-                    return True
-            
-            if 'post_id' in columns:
-                # Now update the post_id
-                cursor.execute(
-                    """
-                    UPDATE user_matches
-                    SET post_id = ?
-                    WHERE id = ?
-                    """,
-                    (post_id, self.id)
-                )
+            query, params = schema_registry.update(cursor, 'user_matches', {'post_id': post_id})
+            if query:
+                cursor.execute(query, params + [self.id])
                 conn.commit()
                 logging.info(f"Successfully updated post_id to {post_id} for user match {self.id}")
             else:
@@ -562,30 +495,16 @@ class UserMatch(db.Model):
         try:
             cursor = conn.cursor()
 
-            update_fields = []
-            values = []
-
-            for key, value in kwargs.items():
-                if hasattr(self, key):
-                    update_fields.append(f"{key} = ?")
-                    values.append(value)
-                    setattr(self, key, value)
-
-            if not update_fields:
+            fields = {key: value for key, value in kwargs.items() if hasattr(self, key)}
+            if not fields:
                 return True
 
-            values.append(self.id)
-
-            cursor.execute(
-                f"""
-                UPDATE user_matches
-                SET {', '.join(update_fields)}
-                WHERE id = ?
-            """,
-                values,
-            )
-
-            conn.commit()
+            query, values = schema_registry.update(cursor, 'user_matches', fields)
+            if query:
+                cursor.execute(query, values + [self.id])
+                conn.commit()
+            for key, value in fields.items():
+                setattr(self, key, value)
             return True
 
         except Exception as e:
@@ -921,6 +840,11 @@ class UserMatch(db.Model):
     @classmethod
     def toggle_like(cls, user_id, face_id):
         """Toggle like for a face by a user. Returns True if liked, False if unliked."""
+        if buffering_enabled():
+            # Written by the interaction buffer's next flush; reads below see it already
+            return interaction_buffer.toggle(
+                FACE_LIKE, user_id, face_id, lambda: cls._is_like_stored(user_id, face_id)
+            )
         conn = get_users_db_connection()
         if not conn:
             return False
@@ -938,6 +862,7 @@ class UserMatch(db.Model):
                     "DELETE FROM face_likes WHERE user_id = ? AND face_id = ?",
                     (user_id, face_id),
                 )
+                counters.bump(cursor, counters.FACE_LIKES, face_id, -cursor.rowcount)
                 conn.commit()
                 return False
             else:
@@ -946,6 +871,7 @@ class UserMatch(db.Model):
                     "INSERT INTO face_likes (user_id, face_id, liked_at) VALUES (?, ?, datetime('now'))",
                     (user_id, face_id),
                 )
+                counters.bump(cursor, counters.FACE_LIKES, face_id)
                 conn.commit()
                 return True
         except Exception as e:
@@ -957,6 +883,13 @@ class UserMatch(db.Model):
     @classmethod
     def is_liked_by_user(cls, user_id, face_id):
         """Check if a match (face_id) is liked by a user."""
+        state = interaction_buffer.pending_state(FACE_LIKE, user_id, face_id)
+        if state is not MISSING:
+            return state
+        return cls._is_like_stored(user_id, face_id)
+
+    @classmethod
+    def _is_like_stored(cls, user_id, face_id):
         conn = get_users_db_connection()
         if not conn:
             return False
@@ -980,18 +913,34 @@ class UserMatch(db.Model):
         if not conn:
             return 0
         try:
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT COUNT(*) FROM face_likes WHERE face_id = ?", (face_id,)
-            )
-            count = cursor.fetchone()[0]
-            return count
+            count = counters.get_count(conn.cursor(), counters.FACE_LIKES, face_id)
+            return count + interaction_buffer.count_deltas(FACE_LIKE, [face_id]).get(face_id, 0)
         except Exception as e:
             logging.error(f"Error counting likes for face: {e}")
             return 0
         finally:
             conn.close()
 
+    @classmethod
+    def count_likes_for_faces(cls, face_ids):
+        """Like counts for many faces from one counters lookup. Returns {face_id: count}."""
+        face_ids = [face_id for face_id in set(face_ids) if face_id is not None]
+        if not face_ids:
+            return {}
+        conn = get_users_db_connection()
+        if not conn:
+            return {}
+        try:
+            counts = counters.get_counts(conn.cursor(), counters.FACE_LIKES, face_ids)
+            for face_id, delta in interaction_buffer.count_deltas(FACE_LIKE, face_ids).items():
+                counts[face_id] = counts.get(face_id, 0) + delta
+            return counts
+        except Exception as e:
+            logging.error(f"Error counting likes for faces: {e}")
+            return {}
+        finally:
+            conn.close()
+
     @classmethod
     def get_liked_face_ids_by_user(cls, user_id):
         """Get a set of all face_ids liked by a specific user."""
@@ -1011,6 +960,11 @@ class UserMatch(db.Model):
             rows = cursor.fetchall()
             for row in rows:
                 liked_face_ids.add(row["face_id"])
+            for face_id, liked in interaction_buffer.pending_for_user(FACE_LIKE, user_id).items():
+                if liked:
+                    liked_face_ids.add(face_id)
+                else:
+                    liked_face_ids.discard(face_id)
             logging.debug(
                 f"[UserMatch] Fetched {len(liked_face_ids)} liked face_ids for user_id {user_id}."
             )
@@ -1032,12 +986,7 @@ class UserMatch(db.Model):
             return 0
 
         try:
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT COUNT(*) FROM user_matches WHERE user_id = ?", (user_id,)
-            )
-            count = cursor.fetchone()[0]
-            return count
+            return counters.get_count(conn.cursor(), counters.USER_MATCHES, user_id)
         except Exception as e:
             logging.error(f"Error counting matches for user {user_id}: {e}")
             return 0
@@ -23,11 +23,12 @@ from models.face import Face
 from models.follow import Follow
 from models.user_match import UserMatch
 from utils.image_paths import normalize_profile_image_path
-from utils.search_helpers import get_enriched_faiss_matches, resolve_profile_image_path
+from utils.search_helpers import get_enriched_faiss_page, resolve_profile_image_path
 from utils.index.faiss_manager import faiss_index_manager
 from utils.serializers import serialize_match_card
 from models.user import User
 from models.social.post import Post
+from models.social.comment import FEED_THREAD_COMMENTS, FEED_THREAD_DEPTH, Comment
 
 api = Blueprint("api", __name__)
 
@@ -211,13 +212,15 @@ def api_search():
         # Get liked faces
         liked_face_ids = UserMatch.get_liked_face_ids_by_user(current_user.id)
 
-        # Perform FAISS search
-        enriched_matches, search_error = get_enriched_faiss_matches(
+        # Perform FAISS search; later pages follow the opaque cursor
+        page_size = max(1, min(request.args.get("limit", 20, type=int), 100))
+        enriched_matches, next_cursor, search_error = get_enriched_faiss_page(
             user_profile_image_fs_path=profile_image_fs_path,
             faiss_index_manager=faiss_index_manager,
             current_user_id=current_user.id,
             liked_face_ids_for_current_user=liked_face_ids,
-            top_k=20
+            page_size=page_size,
+            cursor=request.args.get("cursor"),
         )
 
         if search_error:
@@ -230,22 +233,20 @@ def api_search():
         # Format results using the unified serializer
         frontend_results = []
         for match in enriched_matches:
-            # Get the face object
-            face = Face.get_by_id(match.get('id'))
-            if not face:
+            # Matches are already hydrated in batch; 'face_id' marks hits
+            # whose face row is missing from the database
+            if 'face_id' in match:
                 continue
-                
-            # Get user if this is a registered user's face
-            user = None
-            if match.get('claimed_by_user_id'):
-                user = User.get_by_id(match['claimed_by_user_id'])
-            
+
+            # Claimed user card loaded by the same batched enrichment
+            user = match.get('claimed_user')
+
             # Use the unified serializer
-            card_data = serialize_match_card(face, user, match.get('similarity'))
+            card_data = serialize_match_card(match, user, match.get('similarity'))
             frontend_results.append(card_data)
 
         logging.info('[api_search] Outgoing response: %s', {"results": frontend_results})
-        return jsonify({"results": frontend_results})
+        return jsonify({"results": frontend_results, "next_cursor": next_cursor})
 
     except Exception as e:
         logging.error('[api_search] Search error: %s', str(e), exc_info=True)
@@ -332,29 +333,32 @@ def api_profile_data_endpoint():
             error_response = jsonify({"success": False, "message": "Database connection error"})
             return set_cors_headers(error_response), 500
             
-        cursor = conn.cursor()
-        
-        # Get user data
         try:
-            cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
-            user_data = cursor.fetchone()
-            if not user_data:
-                current_app.logger.error(f"No user found with id {user_id}")
-                error_response = jsonify({"success": False, "message": "User not found"})
-                return set_cors_headers(error_response), 404
-        except Exception as db_error:
-            current_app.logger.error(f"Database error fetching user: {db_error}", exc_info=True)
-            error_response = jsonify({"success": False, "message": f"Database error: {str(db_error)}"})
-            return set_cors_headers(error_response), 500
+            cursor = conn.cursor()
         
-        # Get claimed faces
-        try:
-            cursor.execute("SELECT * FROM faces WHERE claimed_by_user_id = ?", (user_id,))
-            claimed_faces = cursor.fetchall()
-        except Exception as faces_error:
-            current_app.logger.error(f"Database error fetching claimed faces: {faces_error}", exc_info=True)
-            error_response = jsonify({"success": False, "message": f"Database error: {str(faces_error)}"})
-            return set_cors_headers(error_response), 500
+            # Get user data
+            try:
+                cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
+                user_data = cursor.fetchone()
+                if not user_data:
+                    current_app.logger.error(f"No user found with id {user_id}")
+                    error_response = jsonify({"success": False, "message": "User not found"})
+                    return set_cors_headers(error_response), 404
+            except Exception as db_error:
+                current_app.logger.error(f"Database error fetching user: {db_error}", exc_info=True)
+                error_response = jsonify({"success": False, "message": f"Database error: {str(db_error)}"})
+                return set_cors_headers(error_response), 500
+        
+            # Get claimed faces
+            try:
+                cursor.execute("SELECT * FROM faces WHERE claimed_by_user_id = ?", (user_id,))
+                claimed_faces = cursor.fetchall()
+            except Exception as faces_error:
+                current_app.logger.error(f"Database error fetching claimed faces: {faces_error}", exc_info=True)
+                error_response = jsonify({"success": False, "message": f"Database error: {str(faces_error)}"})
+                return set_cors_headers(error_response), 500
+        finally:
+            conn.close()
         
         # Convert sqlite3.Row objects to dictionaries
         user_dict = {}
@@ -482,7 +486,6 @@ def api_feed_create_post():
         # Create the post - only use columns that exist in the database schema
         current_app.logger.debug(f"api_feed_create_post: creating post with user_id={user_id}, content={content}, face_filename={face_filename}")
         
-        # Check the database schema to see if face_filename column exists
         conn = None
         try:
             from utils.db.database import get_users_db_connection
@@ -494,12 +497,6 @@ def api_feed_create_post():
                 current_app.logger.error("Failed to get database connection")
                 raise Exception("Database connection failed")
             
-            cursor = conn.cursor()
-            current_app.logger.debug(f"Checking posts table schema...")
-            cursor.execute("PRAGMA table_info(posts)")
-            columns = [column[1] for column in cursor.fetchall()]
-            current_app.logger.debug(f"api_feed_create_post: posts table columns: {columns}")
-            
             # Create a post with the content
             if not content and face_filename:
                 # If we only have face_filename but no content, create a default content
@@ -789,7 +786,10 @@ def get_posts():
     """Get posts."""
     try:
         posts = Post.get_all()
-        return jsonify([post.to_dict() for post in posts])
+        threads = Comment.get_threads(
+            [post.id for post in posts], limit=FEED_THREAD_COMMENTS, max_depth=FEED_THREAD_DEPTH
+        )
+        return jsonify([post.to_dict(comments=threads.get(post.id, [])) for post in posts])
     except Exception as e:
         logger.error(f"Error getting posts: {e}")
         return jsonify({"error": str(e)}), 500
@@ -54,6 +54,7 @@ from extensions import db, limiter
 from forms.auth_forms import LoginForm, RegisterForm
 from utils.csrf import csrf
 from utils.face.indexing import index_profile_face
+from utils.index.text_index import user_changed, user_removed
 from utils.exceptions import (
     AuthenticationError, ValidationError, FileUploadError
 )
@@ -369,6 +370,7 @@ def register():
             db.session.add(new_user)
             db.session.commit()
             logger.info(f'Created new user: {new_user.id} ({new_user.username})')
+            user_changed(new_user.id)
             
             try:
                 # Save profile photo using the existing function
@@ -387,8 +389,10 @@ def register():
                 logger.info(f'index_profile_face result: {face_encoding}')
                 if face_encoding is None:
                     # If face encoding fails, delete the user and return error
+                    user_id = new_user.id
                     db.session.delete(new_user)
                     db.session.commit()
+                    user_removed(user_id)
                     logger.info('Face encoding failed, user deleted')
                     return jsonify({'error': 'Could not detect a face in the uploaded image. Please try again with a clearer photo.'}), 400
                 
@@ -410,8 +414,10 @@ def register():
                 
             except Exception as e:
                 # If anything fails after user creation, delete the user
+                user_id = new_user.id
                 db.session.delete(new_user)
                 db.session.commit()
+                user_removed(user_id)
                 current_app.logger.error(f"Error processing profile photo: {str(e)}")
                 return jsonify({'error': 'Error processing profile photo. Please try again.'}), 500
             
@@ -6,36 +6,23 @@ This module provides centralized configuration for all routes,
 ensuring consistent path handling and configuration access.
 """
 
-from flask import current_app
+from flask import current_app, request, send_file
 import os
 
+from utils.files.image_manifest import get_manifest
+from utils.files.thumbnails import get_thumbnail, pick_size
+
 def get_image_paths(filename):
     """
-    Get all possible paths for an image file.
-    Returns a list of paths in order of preference.
+    Get the local path for an image file.
+    Resolved from the image manifest, so the list holds at most one path
+    and is empty when the file is not stored locally.
     """
     if not filename:
         return []
-        
-    paths = []
-    
-    # First try the configured paths from app config
-    if current_app.config.get('EXTRACTED_FACES'):
-        paths.append(os.path.join(current_app.config['EXTRACTED_FACES'], filename))
-    
-    # Then try static directories
-    static_paths = [
-        os.path.join('static', 'extracted_faces', filename),
-        os.path.join('static', 'faces', filename),
-        os.path.join('extracted_faces', filename),
-        os.path.join('faces', filename)
-    ]
-    
-    for path in static_paths:
-        full_path = os.path.join(current_app.root_path, path)
-        paths.append(full_path)
-    
-    return paths
+
+    path = get_manifest().local_path(filename)
+    return [path] if path else []
 
 def get_profile_image_path(filename):
     """Get the full path for a profile image."""
@@ -80,4 +67,26 @@ def get_map_path():
     """Get the filename mapping path from configuration."""
     if current_app.config.get('MAP_PATH'):
         return current_app.config['MAP_PATH']
-    return os.path.join(current_app.root_path, 'faces_filenames.pkl') 
\ No newline at end of file
+    return os.path.join(current_app.root_path, 'faces_filenames.pkl') 
+
+def send_face_image(image_path, mimetype='image/jpeg'):
+    """
+    Send a face crop, or its thumbnail when the request has a ``size`` parameter.
+
+    ``size`` is snapped to the nearest generated thumbnail size and the format
+    (AVIF/WebP) is negotiated from the Accept header; the original crop is
+    served when no thumbnail applies.
+    """
+    size = pick_size(request.args.get('size'))
+    if size:
+        thumb = get_thumbnail(image_path, size, request.headers.get('Accept'))
+        if thumb:
+            thumb_path, thumb_mimetype = thumb
+            response = send_file(thumb_path, mimetype=thumb_mimetype, max_age=86400)
+            response.headers['Vary'] = 'Accept'
+            return response
+        # The original is the answer for this Accept header only
+        response = send_file(image_path, mimetype=mimetype)
+        response.headers['Vary'] = 'Accept'
+        return response
+    return send_file(image_path, mimetype=mimetype)
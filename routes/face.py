@@ -19,7 +19,7 @@ from utils.db.database import get_db_connection
 from utils.files.image_handler import ImageHandler
 from utils.index.faiss_manager import FaissIndexManager 
 from utils.csrf import csrf
-from .config import get_image_paths, get_db_path, get_default_profile_image_path
+from .config import get_image_paths, get_db_path, get_default_profile_image_path, send_face_image
 from utils.files.utils import download_file, get_b2_bucket
 import tempfile
 
@@ -71,7 +71,7 @@ def serve_face_image_by_id(face_id):
                 current_app.logger.warning(f"[DIAGNOSTIC] Trying direct path: {direct_path}")
                 if os.path.exists(direct_path):
                     current_app.logger.warning(f"[DIAGNOSTIC] Found direct match: {direct_path}")
-                    return send_file(direct_path, mimetype='image/jpeg')
+                    return send_face_image(direct_path)
                 
                 # Try a case-insensitive match for yearbook files in extracted_faces
                 extracted_faces_dir = os.path.join(current_app.root_path, 'static', 'extracted_faces')
@@ -82,7 +82,7 @@ def serve_face_image_by_id(face_id):
                             file.lower().endswith(filename.lower()[-10:])):
                             match_path = os.path.join(extracted_faces_dir, file)
                             current_app.logger.warning(f"[DIAGNOSTIC] Found case-insensitive match: {match_path}")
-                            return send_file(match_path, mimetype='image/jpeg')
+                            return send_face_image(match_path)
                 
                 # Try partial match for yearbook files
                 if 'yearbook' in filename.lower() or 'foxcollege' in filename.lower():
@@ -95,28 +95,28 @@ def serve_face_image_by_id(face_id):
                         matches = glob.glob(pattern)
                         if matches:
                             current_app.logger.warning(f"[DIAGNOSTIC] Found suffix pattern match: {matches[0]}")
-                            return send_file(matches[0], mimetype='image/jpeg')
+                            return send_face_image(matches[0])
                 
                 # Try all possible image paths from config
                 possible_paths = get_image_paths(filename)
                 for image_path in possible_paths:
                     if os.path.exists(image_path):
                         current_app.logger.warning(f"[DIAGNOSTIC] Serving image from config path: {image_path}")
-                        return send_file(image_path, mimetype='image/jpeg')
+                        return send_face_image(image_path)
                 
                 # Try to find any image with the face ID at the end of filename in extracted_faces
                 pattern = os.path.join(extracted_faces_dir, f"*f{face_id % 100}.jpg")
                 matches = glob.glob(pattern)
                 if matches:
                     current_app.logger.warning(f"[DIAGNOSTIC] Found face number match: {matches[0]}")
-                    return send_file(matches[0], mimetype='image/jpeg')
+                    return send_face_image(matches[0])
                 
                 # Last resort: use a modulo-based approach to consistently serve any available image
                 all_images = glob.glob(os.path.join(extracted_faces_dir, "*.jpg"))
                 if all_images:
                     index = face_id % len(all_images)
                     current_app.logger.warning(f"[DIAGNOSTIC] Using fallback image {index+1} of {len(all_images)}: {all_images[index]}")
-                    return send_file(all_images[index], mimetype='image/jpeg')
+                    return send_face_image(all_images[index])
                 
                 # If still nothing found, check the faces folder as final fallback
                 faces_dir = os.path.join(current_app.root_path, 'static', 'faces')
@@ -124,7 +124,7 @@ def serve_face_image_by_id(face_id):
                 if all_face_images:
                     index = face_id % len(all_face_images)
                     current_app.logger.warning(f"[DIAGNOSTIC] Using faces folder fallback: {all_face_images[index]}")
-                    return send_file(all_face_images[index], mimetype='image/jpeg')
+                    return send_face_image(all_face_images[index])
                 
                 current_app.logger.error(f"[DIAGNOSTIC] Image not found in any location: {filename}")
                 return send_default_image()
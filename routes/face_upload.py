@@ -4,7 +4,10 @@ from utils.files.utils import allowed_file, generate_face_filename
 from utils.db.storage import get_storage
 from models.face import Face
 from utils.face.indexing import index_face
+from utils.files.image_manifest import record_b2, record_local
+from utils.files.thumbnails import generate_thumbnails
 import logging
+import os
 
 face_upload = Blueprint('face_upload', __name__)
 logger = logging.getLogger(__name__)
@@ -33,6 +36,13 @@ def upload_face():
         success, result = storage.save(file, filename, folder='faces')
         if not success:
             return jsonify({'error': f'Failed to save file: {result}'}), 500
+
+        # Local backends return a filesystem path; build grid thumbnails now
+        if isinstance(result, str) and os.path.exists(result):
+            generate_thumbnails(result)
+            record_local(filename, os.path.dirname(result))
+        elif os.environ.get("STORAGE_TYPE", "local").lower() == "b2":
+            record_b2(filename, result)
             
         # Create face record in database
         face = Face(
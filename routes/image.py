@@ -14,7 +14,7 @@ from flask_limiter.util import get_remote_address
 import os
 import sqlite3
 from utils.db.database import get_db_connection
-from .config import get_image_paths, get_default_profile_image_path
+from .config import get_image_paths, get_default_profile_image_path, send_face_image
 
 image = Blueprint('image', __name__)
 
@@ -45,12 +45,11 @@ def get_direct_match_image(match_id):
                 filename = result[0]
                 current_app.logger.warning(f"[DIAGNOSTIC] Found filename: {filename}")
                 
-                # Try all possible image paths
-                possible_paths = get_image_paths(filename)
-                for image_path in possible_paths:
-                    if os.path.exists(image_path):
-                        current_app.logger.warning(f"[DIAGNOSTIC] Serving image from: {image_path}")
-                        return send_file(image_path, mimetype='image/jpeg')
+                # Resolve the stored location from the image manifest
+                image_paths = get_image_paths(filename)
+                if image_paths:
+                    current_app.logger.warning(f"[DIAGNOSTIC] Serving image from: {image_paths[0]}")
+                    return send_face_image(image_paths[0])
                 
                 current_app.logger.error(f"[DIAGNOSTIC] Image not found in any location: {filename}")
                 return send_default_image()
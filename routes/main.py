@@ -31,9 +31,11 @@ from werkzeug.security import check_password_hash
 
 from models.user import User
 from models.social.post import Post
+from models.social.comment import FEED_THREAD_COMMENTS, FEED_THREAD_DEPTH, Comment
 
 # === Project Imports ===
 from routes.social import social
+from utils.discover_snapshot import discover_sections
 
 # === Blueprint Definition ===
 main = Blueprint("main", __name__)
@@ -65,29 +67,7 @@ def discover():
     user_id = session.get("user_id")
     if not user_id:
         return redirect(url_for("auth_bp.login"))
-    # Sample data for demonstration; replace with real queries later
-    sections = [
-        {
-            "title": "Popular Historical Faces",
-            "description": "Browse some of the most viewed faces in our archive.",
-            "faces": [],
-        },
-        {
-            "title": "Recently Claimed Profiles",
-            "description": "See who recently claimed their historical lookalike.",
-            "profiles": [],
-        },
-        {
-            "title": "Decades",
-            "description": "Jump into a specific decade to explore faces from that era.",
-            "decades": ["1950s", "1960s", "1970s", "1980s", "1990s", "2000s"],
-        },
-        {
-            "title": "Faces of the Day",
-            "description": "A fresh set of faces to discover every day!",
-            "faces": [],
-        },
-    ]
+    sections = discover_sections()
     return render_template("discover.html", sections=sections)
 
 
@@ -230,7 +210,10 @@ def get_posts():
     """Get posts."""
     try:
         posts = Post.get_all()
-        return jsonify([post.to_dict() for post in posts])
+        threads = Comment.get_threads(
+            [post.id for post in posts], limit=FEED_THREAD_COMMENTS, max_depth=FEED_THREAD_DEPTH
+        )
+        return jsonify([post.to_dict(comments=threads.get(post.id, [])) for post in posts])
     except Exception as e:
         logger.error(f"Error getting posts: {e}")
         return jsonify({"error": str(e)}), 500
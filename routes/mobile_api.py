@@ -27,6 +27,7 @@ from models.user import User
 from utils.db.database import get_db_connection, get_users_db_connection
 from utils.index.faiss_manager import faiss_index_manager
 from models.social.post import Post
+from models.social.comment import FEED_THREAD_COMMENTS, FEED_THREAD_DEPTH, Comment
 
 # from routes.face_matching_new import query_faces_directly  # Removed: file deleted, use canonical search logic
 
@@ -517,6 +518,48 @@ def match_face(user):
         )
 
 
+@mobile_api.route("/faces/match/group", methods=["POST"])
+@token_required
+def match_group_photo(user):
+    """Match every face in a group or yearbook-page photo in one batch."""
+    from models.user_match import UserMatch
+    from utils.search_helpers import get_enriched_group_matches
+    from utils.serializers import serialize_match_card
+
+    photo = request.files.get("photo")
+    if not photo:
+        return jsonify({"message": "No photo provided", "success": False}), 400
+
+    temp_folder = os.path.join(current_app.root_path, "temp")
+    os.makedirs(temp_folder, exist_ok=True)
+    temp_path = os.path.join(temp_folder, f"temp_{uuid.uuid4()}.jpg")
+    photo.save(temp_path)
+
+    try:
+        groups, error = get_enriched_group_matches(
+            temp_path,
+            faiss_index_manager,
+            current_user_id=user.id,
+            liked_face_ids_for_current_user=UserMatch.get_liked_face_ids_by_user(user.id),
+            top_k=max(1, min(request.form.get("top_k", 10, type=int), 50)),
+        )
+        if error:
+            return jsonify({"message": error, "success": False, "faces": []}), 400
+
+        for group in groups:
+            group["matches"] = [
+                serialize_match_card(match, user=match.get("claimed_user"), similarity=match.get("similarity"))
+                for match in group["matches"]
+            ]
+        return jsonify({"success": True, "faces": groups, "face_count": len(groups)})
+    except Exception as e:
+        current_app.logger.error(f"Error matching group photo: {e}")
+        return jsonify({"message": "Error matching group photo", "success": False}), 500
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
 @mobile_api.route("/faces/matches", methods=["GET"])
 @token_required
 def get_user_matches(user):
@@ -593,7 +636,14 @@ def get_user_matches(user):
         formatted_matches.sort(key=lambda x: x.get("added_at", ""), reverse=True)
         
         logging.info(f"Returning {len(formatted_matches)} total matches")
-        return jsonify({"success": True, "matches": formatted_matches})
+        # Pre-ranked lookalikes from the materialised user_top_matches table
+        from utils.face.top_matches import serialize_top_matches
+
+        return jsonify({
+            "success": True,
+            "matches": formatted_matches,
+            "top_matches": serialize_top_matches(user.id),
+        })
 
     except Exception as e:
         logging.error(f"Error getting user matches: {e}", exc_info=True)
@@ -638,7 +688,10 @@ def get_posts():
     """Get posts."""
     try:
         posts = Post.get_all()
-        return jsonify([post.to_dict() for post in posts])
+        threads = Comment.get_threads(
+            [post.id for post in posts], limit=FEED_THREAD_COMMENTS, max_depth=FEED_THREAD_DEPTH
+        )
+        return jsonify([post.to_dict(comments=threads.get(post.id, [])) for post in posts])
     except Exception as e:
         logger.error(f"Error getting posts: {e}")
         return jsonify({"error": str(e)}), 500
@@ -5,6 +5,8 @@ from werkzeug.utils import secure_filename
 from utils.csrf import csrf
 from models.user import User
 from routes.auth import login_required
+from utils.index.text_index import user_changed
+from utils.index.user_index import registered_user_index
 
 # Create a blueprint for profile update
 profile_update = Blueprint('profile_update', __name__)
@@ -140,6 +142,9 @@ def update_profile(user_id):
         # Update the user in the database
         if updates:
             user.update(**updates)
+            if 'profile_image' in updates:
+                registered_user_index.refresh_user(user.id)
+            user_changed(user.id)
             
             # Return the updated user data
             response = jsonify({
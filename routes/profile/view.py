@@ -3,6 +3,7 @@ from flask_login import login_required, current_user
 from models.user import User
 from models.user_match import UserMatch
 from models.social import Post
+from utils.face.top_matches import serialize_top_matches
 from utils.image_paths import normalize_profile_image_path, normalize_extracted_face_path
 from datetime import datetime
 
@@ -104,6 +105,7 @@ def view_profile():
         },
         "claimed_profiles": [profile.to_dict() if hasattr(profile, 'to_dict') else {"id": profile.id} for profile in claimed_profiles] if claimed_profiles else [],
         "matches": processed_matches,
+        "top_matches": serialize_top_matches(user.id),
         "follower_count": follower_count,
         "match_count": match_count,
         "claimed_profile_count": claimed_profile_count,
@@ -4,6 +4,7 @@ import math
 import os
 import random
 import time
+import uuid
 
 from flask import (
     Blueprint,
@@ -29,14 +30,26 @@ from models.user import User
 from models.user_match import UserMatch
 from routes.auth import login_required
 from utils.db.database import get_db_connection, get_users_db_connection
-from utils.face.metadata import enhance_face_with_metadata, get_metadata_for_face
+from utils.face.metadata import enhance_face_with_metadata
 from utils.image_paths import normalize_profile_image_path, normalize_extracted_face_path
 from utils.index.faiss_manager import faiss_index_manager
+from utils.index.text_index import CLAIM, LOCATION, SCHOOL, USER, YEAR, get_text_index
+from utils.index.user_index import get_registered_user_index, resolve_user_image_url
 from utils.search_helpers import (
+    FACE_CARD_COLUMNS,
     apply_privacy_filters,
-    get_enriched_faiss_matches,
-    perform_text_search,
+    get_enriched_faiss_page,
+    get_enriched_group_matches,
     resolve_profile_image_path,
+    search_by_face_id,
+)
+from utils.face.encoders import select_backend
+from utils.discover_snapshot import discover_sections
+from utils.blocking import CPU, run_blocking
+from utils.notification_outbox import (
+    TYPE_SEARCH_APPEARANCE,
+    enqueue_notification,
+    enqueue_notifications,
 )
 from utils.face.recognition import extract_face_encoding, find_similar_faces_faiss, calculate_similarity
 from utils.serializers import serialize_match_card
@@ -51,6 +64,15 @@ def search_page():
     return render_template("search.html")
 
 
+def _encode_first_face(image_path):
+    """Encoding of the first face detected in an image file, or None."""
+    image = face_recognition.load_image_file(image_path)
+    face_locations = face_recognition.face_locations(image)
+    if not face_locations:
+        return None
+    return face_recognition.face_encodings(image, face_locations)[0]
+
+
 @search.route("/api/search", methods=["GET"])
 def api_search():
     """API endpoint for finding lookalikes using face similarity search (FAISS and registered users)."""
@@ -69,16 +91,23 @@ def api_search():
     if not conn_users:
         return jsonify({"error": "Database connection failed", "success": False}), 500
 
-    cursor = conn_users.cursor()
-    cursor.execute("SELECT id, profile_image, face_encoding FROM users WHERE id = ?", (user_id,))
-    user_db_record = cursor.fetchone()
-        
-    if not user_db_record:
-        return jsonify({
-            "error": "User record not found in database",
-            "message": "Could not find your user record. Please try logging in again.",
-            "results": [], "total": 0, "success": False
-        }), 400
+    try:
+        cursor = conn_users.cursor()
+        cursor.execute("SELECT id, profile_image, face_encoding FROM users WHERE id = ?", (user_id,))
+        user_db_record = cursor.fetchone()
+
+        if not user_db_record:
+            return jsonify({
+                "error": "User record not found in database",
+                "message": "Could not find your user record. Please try logging in again.",
+                "results": [], "total": 0, "success": False
+            }), 400
+
+        # Also check if user has a claimed face in the faces table
+        cursor.execute("SELECT filename FROM faces WHERE claimed_by_user_id = ?", (user_id,))
+        claimed_face = cursor.fetchone()
+    finally:
+        conn_users.close()
 
     # Initialize variables for profile image path
     profile_image_fs_path = None
@@ -89,9 +118,6 @@ def api_search():
         if user_db_record and user_db_record['face_encoding']:
             has_profile_image = True
         
-        # Also check if user has a claimed face in the faces table
-        cursor.execute("SELECT filename FROM faces WHERE claimed_by_user_id = ?", (user_id,))
-        claimed_face = cursor.fetchone()
         if claimed_face:
             has_profile_image = True
             # If we have a claimed face, use it as the profile image
@@ -127,32 +153,58 @@ def api_search():
                 "success": True
             })
 
-        # Load the image and detect faces
-        image = face_recognition.load_image_file(profile_image_fs_path)
-        face_locations = face_recognition.face_locations(image)
-        if not face_locations:
+        backend_name = select_backend(request.args.get("backend"), user.id).name
+        page_size = max(1, min(request.args.get("limit", 50, type=int), 100))
+        liked_face_ids = UserMatch.get_liked_face_ids_by_user(user.id)
+
+        # Later pages only continue the cached FAISS ranking; registered users
+        # are merged into the first page
+        page_cursor = request.args.get("cursor")
+        if page_cursor:
+            faiss_page, next_cursor, faiss_error = get_enriched_faiss_page(
+                user_profile_image_fs_path=profile_image_fs_path,
+                faiss_index_manager=faiss_index_manager,
+                current_user_id=user.id,
+                liked_face_ids_for_current_user=liked_face_ids,
+                page_size=page_size,
+                cursor=page_cursor,
+                backend=backend_name,
+            )
+            if faiss_error:
+                return jsonify({"error": faiss_error, "results": [], "total": 0, "success": False}), 400
+            page_results = [
+                serialize_match_card(match, user=match.get('claimed_user'), similarity=match.get('similarity'))
+                for match in faiss_page
+            ]
+            return jsonify({
+                "results": page_results,
+                "total": len(page_results),
+                "next_cursor": next_cursor,
+                "success": True
+            })
+
+        # Load the image and encode its first face on the CPU pool, off the gevent hub
+        current_user_face_encoding = run_blocking(_encode_first_face, profile_image_fs_path, kind=CPU)
+        if current_user_face_encoding is None:
             return jsonify({
                 "error": "No face detected in profile image",
                 "message": "Could not detect a face in your profile image. Please upload a clear face photo.",
                 "results": [], "total": 0, "success": False
             }), 400
-            
-        # Get face encoding from the detected face
-        current_user_face_encoding = face_recognition.face_encodings(image, face_locations)[0]
 
         # 1. Fetch FAISS matches (historical photos)
         faiss_results_formatted = []
-        # Get liked faces for the current user
-        liked_face_ids = UserMatch.get_liked_face_ids_by_user(user.id)
-        
+        next_cursor = None
+
         try:
             # Do FAISS search with face recognition to find matches
-            faiss_matches_raw, faiss_error = get_enriched_faiss_matches(
+            faiss_matches_raw, next_cursor, faiss_error = get_enriched_faiss_page(
                 user_profile_image_fs_path=profile_image_fs_path,
                 faiss_index_manager=faiss_index_manager,
                 current_user_id=user.id,
                 liked_face_ids_for_current_user=liked_face_ids,
-                top_k=50
+                page_size=page_size,
+                backend=backend_name,
             )
             if faiss_error:
                 current_app.logger.error(f"[SEARCH] Error fetching FAISS matches: {faiss_error}")
@@ -161,128 +213,49 @@ def api_search():
                 for fm_raw in faiss_matches_raw:
                     # Get the Face model or dict
                     face = fm_raw
-                    user = None
-                    if fm_raw.get('claimed_by_user_id'):
-                        user = User.get_by_id(fm_raw['claimed_by_user_id'])
+                    # Claimed users are hydrated in one batched query by the helper
+                    claimed_user = fm_raw.get('claimed_user')
                     similarity = fm_raw.get('similarity')
                     current_app.logger.debug(f"[SEARCH] FAISS match raw data: {fm_raw}")
                     current_app.logger.debug(f"[SEARCH] FAISS match similarity: {similarity}")
-                    faiss_results_formatted.append(serialize_match_card(face, user=user, similarity=similarity))
+                    faiss_results_formatted.append(serialize_match_card(face, user=claimed_user, similarity=similarity))
             current_app.logger.info(f"[SEARCH] FAISS formatted results count: {len(faiss_results_formatted)}")
         except Exception as e_faiss:
             current_app.logger.error(f"[SEARCH] Exception during FAISS search: {str(e_faiss)}")
 
-        # 2. Fetch Registered User Matches
+        # 2. Fetch Registered User Matches (one kNN over the registered user index)
         registered_user_results_formatted = []
-        conn_users = None
         try:
-            conn_users = get_users_db_connection()
-            cursor = conn_users.cursor()
-            
-            # First try to get users with non-default images and valid face encodings
-            cursor.execute("""
-                SELECT u.id, u.username, u.profile_image, u.face_encoding, u.current_location_city, u.current_location_state
-                FROM users u WHERE u.id != ? AND u.face_encoding IS NOT NULL AND u.profile_image IS NOT NULL
-                AND u.profile_image NOT LIKE '%default%' AND u.profile_image != ''
-            """, (user.id,))
-            
-            # Additionally get users who have claimed faces (they may not have profile_image set correctly)
-            claimed_cursor = conn_users.cursor()
-            claimed_cursor.execute("""
-                SELECT u.id, u.username, f.filename as profile_image, u.face_encoding, u.current_location_city, u.current_location_state
-                FROM users u
-                JOIN faces f ON f.claimed_by_user_id = u.id
-                WHERE u.id != ? AND u.face_encoding IS NOT NULL
-            """, (user.id,))
-            
-            # Combine both result sets
-            other_users = cursor.fetchall()
-            claimed_users = claimed_cursor.fetchall()
-            
-            # Add claimed users to the results
-            if claimed_users:
-                other_users = list(other_users) + list(claimed_users)
-                current_app.logger.debug(f"[SEARCH] Found {len(other_users)} total users, including {len(claimed_users)} with claimed faces")
-            for other_user_row in other_users:
-                other_user_id, other_username, other_profile_image, other_encoding_blob, other_city, other_state = other_user_row
-                if other_encoding_blob:
-                    try:
-                        # Properly handle the face encoding comparison
-                        other_user_encoding = np.frombuffer(other_encoding_blob, dtype=np.float64)
-                        distance = np.linalg.norm(current_user_face_encoding - other_user_encoding)
-                        
-                        # Calculate actual true percentage similarity using the same method as FAISS
-                        # Using the standard face recognition threshold of 0.6
-                        similarity_score = calculate_similarity(distance) # Returns 0-100 percentage
-                        
-                        # Construct a proper image URL based on the profile_image path
-                        # Normalize the profile image path to ensure we're using the correct one from faces.db
-                        if other_profile_image.startswith('userprofile_'):
-                            image_url = f"/static/faces/{other_profile_image}"
-                        elif other_profile_image.startswith('/static/'):
-                            image_url = other_profile_image
-                        else:
-                            # Check if the file exists in profile_pics directory
-                            profile_pic_path = os.path.join(current_app.root_path, 'static', 'profile_pics', other_profile_image)
-                            if os.path.exists(profile_pic_path):
-                                image_url = f"/static/profile_pics/{other_profile_image}"
-                            else:
-                                # Try faces directory as fallback
-                                faces_path = os.path.join(current_app.root_path, 'static', 'faces', other_profile_image)
-                                if os.path.exists(faces_path):
-                                    image_url = f"/static/faces/{other_profile_image}"
-                                else:
-                                    # Check specifically in faces.db before falling back to default
-                                    # Check if the user has a userprofile_ image in the faces table
-                                    try:
-                                        face_cursor = conn_users.cursor()
-                                        face_cursor.execute(
-                                            "SELECT filename FROM faces WHERE claimed_by_user_id = ?",
-                                            (other_user_id,)
-                                        )
-                                        face_record = face_cursor.fetchone()
-                                        if face_record and face_record['filename']:
-                                            # Use the filename from faces table
-                                            image_url = f"/static/faces/{face_record['filename']}"
-                                            current_app.logger.debug(f"[SEARCH] Found user image in faces table: {image_url}")
-                                        else:
-                                            # Last resort: normalized path from the database without defaulting
-                                            image_url = normalize_profile_image_path(other_profile_image)
-                                    except Exception as e:
-                                        current_app.logger.error(f"[SEARCH] Error checking faces table: {e}")
-                                        # Last resort: normalized path from the database
-                                        image_url = normalize_profile_image_path(other_profile_image)
-
-                        # Calculate the location string for display
-                        location_display = ''
-                        if other_city and other_state:
-                            location_display = f"{other_city}, {other_state}"
-                        elif other_state:
-                            location_display = other_state
-                        # Don't filter based on similarity yet - include all and sort later
-                        # These are ALWAYS registered users since they come from the users table
-                        registered_user_results_formatted.append({
-                            "id": f"user_{other_user_id}",
-                            "username": other_username,
-                            "image": image_url,
-                            "safe_image_path": image_url,  # Add this for consistency with FAISS results
-                            "decade": "",
-                            "state": other_state or "",
-                            "similarity": float(similarity_score),  # Keep as 0-100 percentage
-                            "is_registered": True,  # Explicitly mark as registered
-                            "is_historical": False,
-                            "location": f"{other_city}, {other_state}" if other_city and other_state else (other_city or other_state or ""),
-                            "registered_user_id": other_user_id,
-                            "data_source": "users_table"  # Track data source
-                        })
-                        current_app.logger.debug(f"[SEARCH] Registered user match found: {other_username} with similarity {similarity_score} and image {image_url}")
-                    except Exception as e_encoding:
-                        current_app.logger.error(f"[SEARCH] Error processing encoding for user {other_user_id}: {str(e_encoding)}")
-                        continue
+            user_hits = get_registered_user_index().search(
+                current_user_face_encoding, top_k=50, exclude_user_id=user.id
+            )
+            for hit in user_hits:
+                other_user_id = hit['user_id']
+                other_city, other_state = hit['city'], hit['state']
+                # Yearbook hits are scored from IndexFlatL2's squared distance; score users the same way
+                distance = hit['distance'] ** 2
+                similarity_score = calculate_similarity(distance)  # Returns 0-100 percentage
+                image_url = resolve_user_image_url(hit['profile_image'], hit['claimed_filename'])
+
+                # These are ALWAYS registered users since they come from the users table
+                registered_user_results_formatted.append({
+                    "id": f"user_{other_user_id}",
+                    "username": hit['username'],
+                    "image": image_url,
+                    "safe_image_path": image_url,  # Add this for consistency with FAISS results
+                    "decade": "",
+                    "state": other_state or "",
+                    "similarity": float(similarity_score),  # Keep as 0-100 percentage
+                    "distance": distance,
+                    "is_registered": True,  # Explicitly mark as registered
+                    "is_historical": False,
+                    "location": f"{other_city}, {other_state}" if other_city and other_state else (other_city or other_state or ""),
+                    "registered_user_id": other_user_id,
+                    "data_source": "users_table"  # Track data source
+                })
+                current_app.logger.debug(f"[SEARCH] Registered user match found: {hit['username']} with similarity {similarity_score} and image {image_url}")
         except Exception as e_users_search:
             current_app.logger.error(f"[SEARCH] Exception during registered users search: {str(e_users_search)}")
-        finally:
-            if conn_users: conn_users.close()
 
         # 3. Combine and Deduplicate
         all_results_combined = faiss_results_formatted + registered_user_results_formatted
@@ -312,7 +285,10 @@ def api_search():
                     item['is_registered'] = is_registered_user
                     final_results_map[key] = item
         
-        final_results_list = list(final_results_map.values())
+        # Merge yearbook and registered-user hits nearest first
+        final_results_list = sorted(
+            final_results_map.values(), key=lambda item: item.get('similarity') or 0, reverse=True
+        )
         current_app.logger.info(f"[SEARCH] Results after deduplication: {len(final_results_list)}")
         # Limit to top 50 overall results
         top_n_results = final_results_list[:50]
@@ -376,8 +352,8 @@ def api_search():
             else:
                 current_app.logger.debug(f"Confirmed: Result {i+1} is correctly marked as unregistered")
         
-        # Log the final results and send notifications to registered users
-        from models.notification import Notification
+        # Log the final results and queue notifications for registered users
+        appeared_user_ids = []
         
         for i, result in enumerate(top_n_results):
             # Convert to string representation for certain fields to ensure they're properly serialized
@@ -385,30 +361,11 @@ def api_search():
                 # Ensure is_registered is explicitly a boolean for JSON serialization
                 result['is_registered'] = bool(result['is_registered'])
             
-            # Send notification to registered users when they appear in search results
-            try:
-                # Get the user ID of the registered user in the search results
-                target_user_id = None
-                if result.get('is_registered'):
-                    if result.get('registered_user_id'):
-                        target_user_id = result.get('registered_user_id')
-                    elif result.get('claimed_by_user_id'):
-                        target_user_id = result.get('claimed_by_user_id')
-                
-                # Only send notification if this is a registered user
-                if target_user_id and target_user_id != user_id:
-                    # Create a notification for the user who appeared in search results
-                    Notification.create(
-                        user_id=target_user_id,
-                        type=Notification.TYPE_SEARCH_APPEARANCE,
-                        content=f"You appeared in someone's search results!",
-                        entity_id=str(user_id),  # The searcher's user ID
-                        entity_type="user",
-                        sender_id=user_id  # The searcher's user ID
-                    )
-                    current_app.logger.debug(f"[SEARCH] Sent search appearance notification to user {target_user_id}")
-            except Exception as e:
-                current_app.logger.error(f"[SEARCH] Error sending notification: {e}")
+            # Registered users who appear in the results get a search appearance notification
+            if result.get('is_registered'):
+                target_user_id = result.get('registered_user_id') or result.get('claimed_by_user_id')
+                if target_user_id:
+                    appeared_user_ids.append(target_user_id)
                 
             # Log in more detail including data_source
             current_app.logger.debug(
@@ -419,10 +376,17 @@ def api_search():
                 f"claimed_by_user_id={result.get('claimed_by_user_id')}"
             )
             
+        # One buffered enqueue per search; the outbox coalesces and writes in the background
+        try:
+            enqueue_notifications(appeared_user_ids, TYPE_SEARCH_APPEARANCE, sender_id=user_id)
+        except Exception as e:
+            current_app.logger.error(f"[SEARCH] Error queueing search appearance notifications: {e}")
+            
         return jsonify({
             "results": top_n_results,
             "total": len(top_n_results), # This will now be at most 50
             "actual_total_found_before_limit": len(final_results_list), # Optional: inform client how many were found in total
+            "next_cursor": next_cursor,  # Continues the FAISS ranking past this page
             "success": True
         })
 
@@ -435,12 +399,80 @@ def api_search():
         }), 500
 
 
+@search.route("/api/search/group", methods=["POST"])
+@login_required
+def api_search_group():
+    """Find lookalikes for every face in an uploaded group photo in one batch."""
+    photo = request.files.get("photo")
+    if not photo or not photo.filename:
+        return jsonify({"error": "No photo provided", "faces": [], "success": False}), 400
+
+    temp_folder = os.path.join(current_app.root_path, "temp")
+    os.makedirs(temp_folder, exist_ok=True)
+    temp_path = os.path.join(temp_folder, f"group_{uuid.uuid4().hex}.jpg")
+    photo.save(temp_path)
+
+    try:
+        groups, error = get_enriched_group_matches(
+            temp_path,
+            faiss_index_manager,
+            current_user_id=current_user.id,
+            liked_face_ids_for_current_user=UserMatch.get_liked_face_ids_by_user(current_user.id),
+            top_k=max(1, min(request.args.get("top_k", 10, type=int), 50)),
+            backend=select_backend(request.args.get("backend"), current_user.id).name,
+        )
+        if error:
+            return jsonify({"error": error, "faces": [], "success": False}), 400
+
+        for group in groups:
+            group["matches"] = [
+                serialize_match_card(match, user=match.get('claimed_user'), similarity=match.get('similarity'))
+                for match in group["matches"]
+            ]
+        return jsonify({"faces": groups, "face_count": len(groups), "success": True})
+    except Exception as e:
+        current_app.logger.error(f"[SEARCH] Error in group photo search: {e}", exc_info=True)
+        return jsonify({"error": "Internal server error", "faces": [], "success": False}), 500
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+@search.route("/api/face/<int:face_id>/similar", methods=["GET"])
+@login_required
+def api_similar_faces(face_id):
+    """Lookalikes of an indexed face, searched from its stored vector ("more like this")."""
+    try:
+        matches, error = search_by_face_id(
+            face_id,
+            faiss_index_manager,
+            current_user_id=current_user.id,
+            liked_face_ids_for_current_user=UserMatch.get_liked_face_ids_by_user(current_user.id),
+            top_k=max(1, min(request.args.get("top_k", 20, type=int), 100)),
+            filters={key: request.args.get(key) for key in ("decade", "state", "school_name", "yearbook_year")},
+            backend=select_backend(request.args.get("backend"), current_user.id).name,
+        )
+        if error:
+            status = 404 if error == "Face not found." else 400
+            return jsonify({"error": error, "results": [], "success": False}), status
+
+        results = [
+            serialize_match_card(match, user=match.get('claimed_user'), similarity=match.get('similarity'))
+            for match in matches
+        ]
+        return jsonify({"face_id": face_id, "results": results, "total": len(results), "success": True})
+    except Exception as e:
+        current_app.logger.error(f"[SEARCH] Error in similar faces search for face {face_id}: {e}", exc_info=True)
+        return jsonify({"error": "Internal server error", "results": [], "success": False}), 500
+
+
 @search.route("/results")
 @login_required
 def search_results():
     user_image_url = None
     error_message = None
     results = []
+    next_cursor = None
 
     if not hasattr(current_user, "profile_image") or not current_user.profile_image:
         error_message = (
@@ -456,12 +488,14 @@ def search_results():
         liked_face_ids = UserMatch.get_liked_face_ids_by_user(current_user.id)
 
         if profile_image_fs_path:
-            enriched_matches, search_error = get_enriched_faiss_matches(
+            enriched_matches, next_cursor, search_error = get_enriched_faiss_page(
                 user_profile_image_fs_path=profile_image_fs_path,
                 faiss_index_manager=faiss_index_manager,
                 current_user_id=current_user.id,
                 liked_face_ids_for_current_user=liked_face_ids,
-                top_k=50,  # Or adjust as needed for this route
+                page_size=max(1, min(request.args.get("limit", 50, type=int), 100)),
+                cursor=request.args.get("cursor"),
+                backend=select_backend(request.args.get("backend"), current_user.id).name,
             )
             if search_error:
                 error_message = search_error
@@ -473,7 +507,7 @@ def search_results():
                 f"[SEARCH_RESULTS] Could not resolve profile image path for user {current_user.id}"
             )
 
-    if not results and not error_message:
+    if not results and not error_message and not request.args.get("cursor"):
         error_message = "No visually similar faces found with valid details."
 
     # This route is often called via JS/AJAX expecting JSON or a partial HTML for results
@@ -492,6 +526,7 @@ def search_results():
     # Remove any default image assignment for face matching; let frontend handle missing images
     return jsonify({
         "results": results,
+        "next_cursor": next_cursor,
         "show_results": True,
         "user_image_url": user_image_url,
         "error_message": error_message,
@@ -505,11 +540,22 @@ def search_results():
 def search_faces(query, args):
     """Search for faces based on various criteria."""
     if query:
-        # Perform text search on the `Face` model
-        faces = perform_text_search(
-            Face, ["filename", "school_name", "yearbook_info"], query, limit=50
-        )
-        return faces
+        # Resolve the query to indexed schools/years/states, then load faces by equality
+        hits = get_text_index().search(query, kinds=(SCHOOL, YEAR, LOCATION), limit=20)
+        if not hits:
+            return []
+        columns = {SCHOOL: "school_name", YEAR: "yearbook_year", LOCATION: "state"}
+        clauses = " OR ".join(f"{columns[hit['kind']]} = ?" for hit in hits)
+        conn = get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT {FACE_CARD_COLUMNS} FROM faces WHERE {clauses} LIMIT 50",
+                [hit["text"] for hit in hits],
+            )
+            return [dict(row) for row in cursor.fetchall()]
+        finally:
+            conn.close()
 
     # Advanced filtering
     state = args.get("state")
@@ -526,20 +572,10 @@ def search_faces(query, args):
 def search_users(query, args):
     """Search for users based on username or profile information."""
     if query:
-        # Perform text search on the `User` model
-        users = perform_text_search(
-            User,
-            [
-                "username",
-                "first_name",
-                "last_name",
-                "bio",
-                "hometown",
-                "current_location",
-            ],
-            query,
-            limit=20,
-        )
+        # Prefix search over usernames, names, hometowns, locations and bios
+        user_ids = get_text_index().refs(query, USER, limit=20)
+        users = User.query.filter(User.id.in_(user_ids)).all() if user_ids else []
+        users.sort(key=lambda u: user_ids.index(u.id))
 
         # Apply privacy filters
         current_user_id = session.get("user_id")
@@ -554,22 +590,26 @@ def search_claimed_profiles(query, args):
         with get_db_connection() as conn:
             cursor = conn.cursor()
 
-            # Use LIKE for partial text matching
-            search_query = f"%{query}%"
+            # Match captions/relationships and usernames through the prefix index
+            index = get_text_index()
+            claim_ids = index.refs(query, CLAIM, limit=30)
+            user_ids = index.refs(query, USER, limit=30)
+            if not claim_ids and not user_ids:
+                return []
+            claim_ids, user_ids = claim_ids or [0], user_ids or [0]
 
             cursor.execute(
-                """
+                f"""
                 SELECT cp.*, u.username as username, f.filename as face_filename
                 FROM claimed_profiles cp
                 JOIN users u ON cp.user_id = u.id
                 JOIN faces f ON cp.face_id = f.id
-                WHERE cp.relationship LIKE ?
-                OR cp.caption LIKE ?
-                OR u.username LIKE ?
+                WHERE cp.id IN ({",".join("?" * len(claim_ids))})
+                OR cp.user_id IN ({",".join("?" * len(user_ids))})
                 ORDER BY cp.claimed_at DESC
                 LIMIT 30
             """,
-                (search_query, search_query, search_query),
+                list(claim_ids) + list(user_ids),
             )
 
             claimed_profiles = []
@@ -596,29 +636,8 @@ def search_claimed_profiles(query, args):
 @login_required
 def discover():
     """Discover interesting faces and users."""
-    # Featured section types
-    featured_sections = [
-        {
-            "title": "Popular Historical Figures",
-            "description": "Historical faces that many users have claimed or added to their profiles",
-            "faces": get_popular_faces(10),
-        },
-        {
-            "title": "Recently Claimed Profiles",
-            "description": "Faces that users have claimed as their doppelgängers",
-            "profiles": get_recent_claimed_profiles(8),
-        },
-        {
-            "title": "Interesting Decades",
-            "description": "Explore matches from specific time periods",
-            "decades": Face.get_decades_list(),
-        },
-        {
-            "title": "Faces of the Day",
-            "description": "A selection of interesting historical faces",
-            "faces": get_diverse_faces(15),
-        },
-    ]
+    # Sections come from the precomputed snapshot; only "Faces of the Day" is sampled per view
+    featured_sections = discover_sections()
 
     response = make_response(
         render_template("discover.html", sections=featured_sections)
@@ -637,142 +656,6 @@ def discover():
     return response
 
 
-def get_popular_faces(limit=10):
-    """Get the most popular faces based on user matches."""
-    conn = get_db_connection()
-    if not conn:
-        return []
-
-    try:
-        cursor = conn.cursor()
-
-        # Find faces with the most matches
-        cursor.execute(
-            """
-            SELECT f.*, COUNT(um.id) as match_count 
-            FROM faces f
-            JOIN user_matches um ON f.filename = um.match_filename
-            GROUP BY f.filename
-            ORDER BY match_count DESC
-            LIMIT ?
-        """,
-            (limit,),
-        )
-
-        faces = []
-        for row in cursor.fetchall():
-            face_data = dict(row)
-            match_count = face_data.pop("match_count")
-
-            face = Face(**face_data)
-            face_dict = face.to_dict(include_private=True)
-            face_dict["match_count"] = match_count
-
-            # Ensure state and decade info is present
-            metadata = get_metadata_for_face(face)
-            face_dict["decade"] = metadata["decade"]
-            face_dict["state"] = metadata["state"]
-
-            faces.append(face_dict)
-
-        return faces
-
-    except Exception as e:
-        current_app.logger.error(f"Error getting popular faces: {e}")
-        return []
-    finally:
-        conn.close()
-
-
-def get_recent_claimed_profiles(limit=8):
-    """Get recently claimed profiles."""
-    try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                """
-                SELECT cp.*, u.username, f.filename as face_filename
-                FROM claimed_profiles cp
-                JOIN users u ON cp.user_id = u.id
-                JOIN faces f ON cp.face_id = f.id
-                ORDER BY cp.claimed_at DESC
-                LIMIT ?
-                """,
-                (limit,)
-            )
-            profiles = cursor.fetchall()
-
-            profiles_with_details = []
-            for profile in profiles:
-                profile_dict = dict(profile)
-                user = User.get_by_id(profile_dict["user_id"])
-                face = Face.get_by_id(profile_dict["face_id"])
-
-                if user and face:
-                    profiles_with_details.append(
-                        {
-                            "id": profile_dict["id"],
-                            "user": {
-                                "id": user.id,
-                                "username": user.username,
-                                "profile_image": user.profile_image,
-                            },
-                            "face": {
-                                "filename": face.filename,
-                                "yearbook_year": face.yearbook_year,
-                                "school_name": face.school_name,
-                            },
-                            "relationship": profile_dict["relationship"],
-                            "caption": profile_dict["caption"],
-                            "claimed_at": profile_dict["claimed_at"],
-                        }
-                    )
-
-            return profiles_with_details
-    except Exception as e:
-        current_app.logger.error(f"Error getting recent claimed profiles: {e}")
-        return []
-
-
-def get_diverse_faces(limit=15):
-    """Get a diverse selection of faces from different decades and locations."""
-    # Get lists of available decades and states
-    decades = Face.get_decades_list()
-    states = Face.get_states_list()
-
-    faces = []
-    faces_per_group = max(1, limit // (len(decades) + len(states)))
-
-    # Get faces from each decade
-    for decade in decades[:3]:  # Limit to 3 decades for diversity
-        decade_faces = Face.search({"decade": decade}, limit=faces_per_group)
-        faces.extend(decade_faces)
-
-    # Get faces from different states
-    for state in states[:3]:  # Limit to 3 states for diversity
-        state_faces = Face.search({"school_state": state}, limit=faces_per_group)
-        faces.extend(state_faces)
-
-    # If we didn't get enough faces, add some random ones
-    if len(faces) < limit:
-        remaining = limit - len(faces)
-        random_faces = Face.get_random_selection(remaining)
-        faces.extend(random_faces)
-
-    # Convert faces to dicts with metadata and ensure state/decade info
-    face_dicts = []
-    for face in faces[:limit]:
-        face_dict = face.to_dict(include_private=True)
-        # Enhance with metadata
-        metadata = get_metadata_for_face(face)
-        face_dict["decade"] = metadata["decade"]
-        face_dict["state"] = metadata["state"]
-        face_dicts.append(face_dict)
-
-    # Ensure we don't exceed the limit
-    return face_dicts[:limit]
-
-
 @search.route("/search", methods=["GET", "POST"])
 @login_required
 def search_page_direct():
@@ -819,81 +702,23 @@ def autocomplete():
 
 
 def get_face_autocomplete_suggestions(query):
-    """Get autocomplete suggestions for faces."""
-    conn = get_db_connection()
-    if not conn:
-        return []
-
-    suggestions = []
+    """Get autocomplete suggestions for faces (schools, years, locations)."""
     try:
-        cursor = conn.cursor()
-
-        # Search for school names
-        cursor.execute(
-            """
-            SELECT DISTINCT school_name FROM faces
-            WHERE school_name LIKE ?
-            LIMIT 5
-        """,
-            (f"%{query}%",),
-        )
-
-        for row in cursor.fetchall():
-            if row["school_name"]:
-                suggestions.append({"text": row["school_name"], "type": "school"})
-
-        # Search for years
-        cursor.execute(
-            """
-            SELECT DISTINCT yearbook_year FROM faces
-            WHERE yearbook_year LIKE ?
-            LIMIT 5
-        """,
-            (f"%{query}%",),
-        )
-
-        for row in cursor.fetchall():
-            if row["yearbook_year"]:
-                suggestions.append({"text": row["yearbook_year"], "type": "year"})
-
-        return suggestions
+        hits = get_text_index().search(query, kinds=(SCHOOL, YEAR, LOCATION), limit=10)
     except Exception as e:
         current_app.logger.error(f"Error in face autocomplete: {e}")
         return []
-    finally:
-        conn.close()
+    return [{"text": hit["text"], "type": hit["kind"]} for hit in hits]
 
 
 def get_user_autocomplete_suggestions(query):
-    """Get autocomplete suggestions for users."""
-    conn = get_db_connection(app=None)
-    if not conn:
-        return []
-
-    suggestions = []
+    """Get autocomplete suggestions for public users."""
     try:
-        cursor = conn.cursor()
-
-        # Search for usernames
-        cursor.execute(
-            """
-            SELECT username FROM users
-            WHERE username LIKE ?
-            AND profile_visibility = 'public'
-            LIMIT 5
-        """,
-            (f"%{query}%",),
-        )
-
-        for row in cursor.fetchall():
-            suggestions.append({"text": row["username"], "type": "user"})
-
-        return suggestions
+        hits = get_text_index().search(query, kinds=(USER,), limit=5, public_only=True)
     except Exception as e:
         current_app.logger.error(f"Error in user autocomplete: {e}")
         return []
-    finally:
-        conn.close()
+    return [{"text": hit["text"], "type": "user"} for hit in hits]
 
 
 @search.route("/api/face/<int:face_id>/like", methods=["POST"])
@@ -909,15 +734,12 @@ def like_face(face_id):
 
     # Notify match owner if not liking own match
     match = UserMatch.get_by_user_and_face_id(user_id=None, face_id=face_id)
-    if match and match.user_id != user_id:
-        from models.notification import Notification
-        Notification.create(
-            user_id=match.user_id,
-            type=Notification.TYPE_LIKE if hasattr(Notification, 'TYPE_LIKE') else 'like',
+    if liked and match and match.user_id != user_id:
+        enqueue_notification(
+            match.user_id,
+            "like",
             content="Your match card was liked from search!",
-            entity_id=match.id,
-            entity_type="match",
-            sender_id=user_id
+            sender_id=user_id,
         )
     return jsonify({"success": True, "liked": liked, "like_count": like_count})
 
@@ -27,10 +27,12 @@ from flask import (
 # Review these model imports - keep only what's directly used in this file's routes
 # from models.social import ClaimedProfile, Comment, Like # Not directly used here
 from models.social import Post, Like, Comment
+from models.social.comment import FEED_THREAD_COMMENTS, FEED_THREAD_DEPTH
 from models.user import User
 from routes.auth import login_required
 from models.user_match import UserMatch # Needed for share_match
 from models.social.notification import Notification # Needed for share_match
+from utils.notification_outbox import enqueue_notification
 
 feed = Blueprint('feed', __name__)
 
@@ -141,7 +143,10 @@ def feed_page():
             else:
                 current_app.logger.error("Failed to create test post")
 
-        posts = [post.to_dict(user_id=user_id) for post in posts]
+        threads = Comment.get_threads(
+            [post.id for post in posts], limit=FEED_THREAD_COMMENTS, max_depth=FEED_THREAD_DEPTH
+        )
+        posts = [post.to_dict(comments=threads.get(post.id, [])) for post in posts]
         current_app.logger.info(f"Returning {len(posts)} posts to frontend")
         current_app.logger.debug(f"Posts data: {posts}")
 
@@ -264,13 +269,11 @@ def like_post(post_id):
                 # Notify the post owner about the like
                 if post.user_id != user_id:
                     current_app.logger.info(f"Creating notification for post owner {post.user_id}")
-                    Notification.create(
-                        user_id=post.user_id,
-                        type=Notification.TYPE_POST_LIKE,
-                        content=f"Someone liked your post",
-                        entity_id=post_id,
-                        entity_type="post",
-                        sender_id=user_id
+                    enqueue_notification(
+                        post.user_id,
+                        "post_like",
+                        content="Someone liked your post",
+                        sender_id=user_id,
                     )
             else:
                 current_app.logger.error(f"Failed to create like for post {post_id}")
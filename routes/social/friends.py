@@ -11,7 +11,7 @@ import logging
 from flask import Blueprint, current_app, jsonify, request, redirect, url_for, flash, session
 from flask_login import current_user, login_required # Assuming login_required is here or needs to be imported
 from models.user import User # Assuming User model exists
-from models.social import Notification # Assuming Notification model exists
+from utils.notification_outbox import enqueue_notification
 
 friends = Blueprint('friends', __name__)
 
@@ -68,12 +68,11 @@ def follow(user_id):
     success = user.follow(user_id)
 
     if success:
-        # Create notification for the followed user
-        # Assuming Notification model has create and TYPE_NEW_FOLLOWER
-        Notification.create(
-            user_id=user_id,
-            type=Notification.TYPE_NEW_FOLLOWER if hasattr(Notification, 'TYPE_NEW_FOLLOWER') else 'new_follower',
-            content=f"{user.username} started following you", # Assuming user.username is available
+        # Queue a notification for the followed user (written by the outbox flusher)
+        enqueue_notification(
+            user_id,
+            "new_follower",
+            content=f"{user.username} started following you",
             sender_id=current_user_id,
         )
 
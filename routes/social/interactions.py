@@ -11,6 +11,7 @@ import logging
 from flask import Blueprint, current_app, jsonify, request, redirect, url_for, flash, session
 from flask_login import current_user, login_required
 from models.social import Like, Comment, Post, Notification
+from utils.notification_outbox import enqueue_notification
 
 interactions = Blueprint('interactions', __name__)
 
@@ -48,13 +49,11 @@ def like_post(post_id):
                 # Optional: Notify post owner
                 post = Post.get_by_id(post_id) # Assuming Post model has get_by_id
                 if post and post.user_id != user_id:
-                     Notification.create(
-                        user_id=post.user_id,
-                        type=Notification.TYPE_NEW_LIKE if hasattr(Notification, 'TYPE_NEW_LIKE') else 'new_like',
-                        content=f"{current_user.username} liked your post", # Assuming current_user is available from Flask-Login
-                        entity_id=post_id,
-                        entity_type="post",
-                        sender_id=user_id
+                    enqueue_notification(
+                        post.user_id,
+                        "new_like",
+                        content=f"{current_user.username} liked your post",
+                        sender_id=user_id,
                     )
             else:
                 return jsonify({"error": "Failed to like post"}), 500
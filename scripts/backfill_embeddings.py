@@ -0,0 +1,84 @@
+"""
+Encode faces that have no embedding yet for a backend, store them in
+face_embeddings and rebuild that backend's FAISS index.
+
+Usage:
+    python scripts/backfill_embeddings.py --backend arcface --workers 4
+"""
+
+import argparse
+import logging
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+# Set up path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from utils.face import embedding_store
+from utils.face.encoders import get_backend
+from utils.index.faiss_manager import get_index_manager
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+BATCH_SIZE = 500
+
+
+def backfill(backend_name, faces_dir, workers, limit=None, db_path=None):
+    backend = get_backend(backend_name)
+    if backend_name == embedding_store.LEGACY_BACKEND:
+        logging.info("dlib embeddings live in faces.encoding; nothing to backfill")
+        return 0
+    if not backend.is_available():
+        logging.error(f"Backend '{backend_name}' is not available")
+        return 0
+
+    conn = embedding_store.connect(db_path)
+    try:
+        filenames = embedding_store.missing_filenames(conn, backend_name, limit)
+        logging.info(f"{len(filenames)} faces missing {backend_name} embeddings")
+
+        def encode(filename):
+            return filename, backend.encode_file(os.path.join(faces_dir, filename))
+
+        stored = 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for start in range(0, len(filenames), BATCH_SIZE):
+                batch = filenames[start:start + BATCH_SIZE]
+                for filename, vector in executor.map(encode, batch):
+                    if vector is not None:
+                        embedding_store.save_embedding(conn, filename, backend_name, vector)
+                        stored += 1
+                conn.commit()
+                logging.info(f"Stored {stored} embeddings ({start + len(batch)}/{len(filenames)} processed)")
+        return stored
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill face embeddings for a backend")
+    parser.add_argument("--backend", default="arcface")
+    parser.add_argument("--faces-dir", default=os.path.join("static", "extracted_faces"))
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--db", default=None, help="Path to faces.db (defaults to DB_PATH)")
+    parser.add_argument("--skip-index", action="store_true", help="Do not rebuild the FAISS index")
+    args = parser.parse_args()
+
+    if args.db:
+        os.environ["DB_PATH"] = args.db
+
+    backfill(args.backend, args.faces_dir, args.workers, args.limit, args.db)
+
+    if not args.skip_index:
+        if get_index_manager(args.backend).rebuild_index():
+            logging.info(f"Rebuilt {args.backend} FAISS index")
+        else:
+            logging.error(f"Failed to rebuild {args.backend} FAISS index")
+
+
+if __name__ == "__main__":
+    main()
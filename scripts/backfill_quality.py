@@ -0,0 +1,75 @@
+"""
+Backfill face quality metrics (blur, resolution, face box ratio, brightness)
+for faces that have not been scored yet, in parallel batches.
+
+Usage:
+    python scripts/backfill_quality.py --workers 8
+    python scripts/backfill_quality.py --detect-faces --rescore
+"""
+
+import argparse
+import logging
+import os
+import sqlite3
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+# Set up path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from app_config import DB_PATH, EXTRACTED_FACES
+from utils.face.quality import compute_quality_for_file, ensure_quality_columns, save_quality_metrics
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+BATCH_SIZE = 1000
+
+
+def _score(filename, faces_dir, detect_face):
+    return filename, compute_quality_for_file(os.path.join(faces_dir, filename), detect_face)
+
+
+def backfill(db_path, faces_dir, workers, detect_face=False, rescore=False):
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    ensure_quality_columns(cursor)
+    conn.commit()
+
+    where = "" if rescore else " WHERE blur_variance IS NULL"
+    cursor.execute(f"SELECT filename FROM faces{where}")
+    filenames = [row[0] for row in cursor.fetchall()]
+    logging.info(f"Scoring {len(filenames)} faces with {workers} workers")
+
+    score = partial(_score, faces_dir=faces_dir, detect_face=detect_face)
+    scored = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for start in range(0, len(filenames), BATCH_SIZE):
+                batch = filenames[start:start + BATCH_SIZE]
+                results = [(f, m) for f, m in executor.map(score, batch, chunksize=32) if m]
+                save_quality_metrics(cursor, results)
+                conn.commit()
+                scored += len(results)
+                logging.info(f"{start + len(batch)}/{len(filenames)} processed, {scored} scored")
+    finally:
+        conn.close()
+    return scored
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill face quality metrics")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--faces-dir", default=EXTRACTED_FACES)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--detect-faces", action="store_true", help="Run HOG detection for face_box_ratio")
+    parser.add_argument("--rescore", action="store_true", help="Recompute already scored faces")
+    args = parser.parse_args()
+
+    backfill(args.db, args.faces_dir, args.workers, args.detect_faces, args.rescore)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark per-image encode latency of each embedding backend on CPU.
+
+Usage:
+    python scripts/benchmark_encoders.py --images static/extracted_faces --limit 200
+    python scripts/benchmark_encoders.py --backends dlib arcface --warmup 5
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+# Set up path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+import numpy as np
+
+from utils.face.encoders import _backends, _load_rgb, get_backend
+
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+def collect_images(folder, limit):
+    paths = []
+    for name in sorted(os.listdir(folder)):
+        if name.lower().endswith(IMAGE_EXTENSIONS):
+            paths.append(os.path.join(folder, name))
+            if len(paths) >= limit:
+                break
+    return paths
+
+
+def benchmark_backend(backend, images, warmup):
+    """Time encode_image() per image; decoding is done up front and excluded."""
+    for image in images[:warmup]:
+        backend.encode_image(image)
+
+    timings = []
+    encoded = 0
+    for image in images:
+        start = time.perf_counter()
+        vector = backend.encode_image(image)
+        timings.append((time.perf_counter() - start) * 1000)
+        if vector is not None:
+            encoded += 1
+
+    timings = np.array(timings)
+    return {
+        "backend": backend.name,
+        "dimension": backend.dimension,
+        "images": len(images),
+        "encoded": encoded,
+        "mean_ms": float(timings.mean()),
+        "p50_ms": float(np.percentile(timings, 50)),
+        "p95_ms": float(np.percentile(timings, 95)),
+        "images_per_sec": float(1000.0 / timings.mean()) if timings.mean() else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedding backends on CPU")
+    parser.add_argument("--images", default=os.path.join("static", "extracted_faces"))
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--backends", nargs="*", default=sorted(_backends))
+    args = parser.parse_args()
+
+    paths = collect_images(args.images, args.limit)
+    if not paths:
+        print(f"No images found in {args.images}")
+        return
+
+    images = [_load_rgb(path) for path in paths]
+    print(f"Benchmarking {len(images)} images from {args.images}\n")
+    print(f"{'backend':<10} {'dim':>5} {'ok':>9} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'img/s':>8}")
+
+    for name in args.backends:
+        backend = get_backend(name)
+        if not backend.is_available():
+            print(f"{name:<10} unavailable (missing dependency or model file)")
+            continue
+        r = benchmark_backend(backend, images, args.warmup)
+        print(
+            f"{r['backend']:<10} {r['dimension']:>5} {r['encoded']:>4}/{r['images']:<4} "
+            f"{r['mean_ms']:>9.1f} {r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} {r['images_per_sec']:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ import json
 import logging
 import os
 import sqlite3
+import sys
 from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
@@ -14,6 +15,10 @@ from PIL import Image, ImageFilter, ImageStat
 
 import numpy as np
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from utils.face.quality import compute_quality_metrics, ensure_quality_columns
+from utils.files.thumbnails import generate_thumbnails
+
 # === Config ===
 PDF_DIRECTORY = Path(r"C:/Users/1439/Documents/DopplegangerApp/downloads")
 FACES_FOLDER = Path(r"C:/Users/1439/Documents/DopplegangerApp/static/extracted_faces")
@@ -44,6 +49,7 @@ def create_table(conn):
             quality_flag TEXT
         )
     ''')
+    ensure_quality_columns(conn.cursor())
     conn.commit()
 
 def enhance_face_image(image):
@@ -145,23 +151,32 @@ def process_pdf(pdf_path):
             left = max(0, left - pad)
             right = min(img_array.shape[1], right + pad)
 
-            face_img = Image.fromarray(img_array[top:bottom, left:right])
+            crop = img_array[top:bottom, left:right]
+            face_box = (loc[0] - top, loc[1] - left, loc[2] - top, loc[3] - left)
+            metrics = compute_quality_metrics(crop, face_box)
+
+            face_img = Image.fromarray(crop)
             enhanced = enhance_face_image(face_img)
             score, flag = assess_image_quality(enhanced)
 
             face_filename = f"{filename}_page_{page_num}_face_{idx+1}.jpg"
             face_path = FACES_FOLDER / face_filename
             enhanced.save(face_path, 'JPEG', quality=95)
+            generate_thumbnails(str(face_path))
 
             try:
                 conn.execute('''
                     INSERT INTO faces (filename, image_path, encoding, extracted_date,
                                        page_number, school, year, location,
-                                       quality_score, quality_flag)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                                       quality_score, quality_flag,
+                                       blur_variance, image_width, image_height,
+                                       face_box_ratio, brightness)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 ''', (face_filename, str(face_path), encoding.tobytes(),
                       datetime.datetime.now().isoformat(), page_num, school, year, location,
-                      score, flag))
+                      score, flag,
+                      metrics["blur_variance"], metrics["image_width"], metrics["image_height"],
+                      metrics["face_box_ratio"], metrics["brightness"]))
                 conn.commit()
                 saved_any = True
             except Exception as e:
@@ -0,0 +1,62 @@
+"""
+Backfill WebP/AVIF thumbnails for existing face crops in parallel.
+
+Usage:
+    python scripts/generate_thumbnails.py --folder static/extracted_faces --workers 8
+    python scripts/generate_thumbnails.py --folder static/faces --force
+"""
+
+import argparse
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+# Set up path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from utils.files.thumbnails import THUMBNAIL_DIR, generate_thumbnails, supported_formats
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+CHUNK_SIZE = 64
+
+
+def _generate(args):
+    path, force = args
+    return generate_thumbnails(path, force=force)
+
+
+def iter_crops(folder):
+    for name in os.listdir(folder):
+        path = os.path.join(folder, name)
+        if name != THUMBNAIL_DIR and name.lower().endswith(IMAGE_EXTENSIONS) and os.path.isfile(path):
+            yield path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate face crop thumbnails")
+    parser.add_argument("--folder", default=os.path.join("static", "extracted_faces"))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--force", action="store_true", help="Regenerate existing thumbnails")
+    args = parser.parse_args()
+
+    crops = list(iter_crops(args.folder))
+    logging.info(f"Generating {', '.join(supported_formats())} thumbnails for {len(crops)} crops")
+
+    written = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        jobs = ((path, args.force) for path in crops)
+        for i, count in enumerate(executor.map(_generate, jobs, chunksize=CHUNK_SIZE), start=1):
+            written += count
+            if i % 1000 == 0:
+                logging.info(f"{i}/{len(crops)} crops processed, {written} thumbnails written")
+
+    logging.info(f"Done: {written} thumbnails written for {len(crops)} crops")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Test Blocking Call Offload
+=========================
+
+Tests that blocking calls run on the native pools with the caller's
+context, and inline when gevent is not patched in.
+"""
+
+import contextvars
+import threading
+
+import pytest
+from flask import Flask, current_app
+
+from utils import blocking
+
+request_tag = contextvars.ContextVar("request_tag", default=None)
+
+
+@pytest.fixture
+def offloaded(monkeypatch):
+    monkeypatch.setattr(blocking, "offload_active", lambda: blocking._native_ident() not in blocking._worker_idents)
+    monkeypatch.setattr(blocking, "_pools", {})
+    yield
+    for pool in blocking._pools.values():
+        pool.kill()
+
+
+def test_runs_inline_without_gevent_patching(monkeypatch):
+    """Outside gevent workers calls run on the calling thread."""
+    from gevent import monkey
+
+    # Importing the app patches gevent in; keep the result independent of test order
+    monkeypatch.setattr(monkey, "is_module_patched", lambda name: False)
+    assert not blocking.offload_active()
+    assert blocking.run_blocking(threading.get_ident) == threading.get_ident()
+
+
+def test_offloaded_call_keeps_context_and_errors(offloaded):
+    """Pool threads see the caller's app context; exceptions reach the caller."""
+    app = Flask("offload-test")
+    request_tag.set("search-42")
+
+    def work():
+        return current_app.name, request_tag.get(), blocking._native_ident()
+
+    with app.app_context():
+        name, tag, ident = blocking.run_blocking(work, kind=blocking.CPU)
+
+    assert (name, tag) == ("offload-test", "search-42")
+    assert ident != blocking._native_ident()
+    with pytest.raises(ZeroDivisionError):
+        blocking.run_blocking(lambda: 1 / 0)
+    assert blocking.offload_stats()[blocking.CPU]["threads"] == 2
+
+
+def test_nested_calls_run_inline_on_the_pool_thread(offloaded):
+    """A pool thread calling run_blocking again does not queue behind itself."""
+    outer = blocking.run_blocking(
+        lambda: (blocking._native_ident(), blocking.run_blocking(blocking._native_ident)), kind=blocking.CPU
+    )
+    assert outer[0] == outer[1]
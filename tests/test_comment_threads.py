@@ -0,0 +1,114 @@
+"""Test Comment Threads
+====================
+
+Tests that comment trees load with one recursive query plus one author
+query, nest replies in order and honour the per-post and depth limits, and
+that post lists load every thread at once.
+"""
+
+import os
+import tempfile
+
+import pytest
+from flask import Flask
+from sqlalchemy import text
+
+from extensions import db
+from models.social.comment import FEED_THREAD_COMMENTS, FEED_THREAD_DEPTH, Comment
+from utils.db.query_stats import capture_queries
+
+
+@pytest.fixture
+def thread_app():
+    path = os.path.join(tempfile.mkdtemp(), "threads.db")
+    app = Flask("comment-threads-test")
+    app.config.update(SQLALCHEMY_DATABASE_URI=f"sqlite:///{path}", SQLALCHEMY_TRACK_MODIFICATIONS=False)
+    db.init_app(app)
+    with app.app_context():
+        db.session.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT, profile_image TEXT)"))
+        db.session.execute(text(
+            "CREATE TABLE comments (id INTEGER PRIMARY KEY, post_id INTEGER, user_id INTEGER, content TEXT, "
+            "parent_id INTEGER, created_at TIMESTAMP, updated_at TIMESTAMP)"
+        ))
+        db.session.execute(text("INSERT INTO users VALUES (1, 'ann', NULL), (2, 'bob', NULL)"))
+        # Post 10: two top-level comments, a reply chain three levels deep
+        comments = [
+            (1, 10, 1, "first", None, "2024-01-01 10:00:00"),
+            (2, 10, 2, "second", None, "2024-01-02 10:00:00"),
+            (3, 10, 2, "reply b", 1, "2024-01-03 10:00:00"),
+            (4, 10, 1, "reply a", 1, "2024-01-01 11:00:00"),
+            (5, 10, 2, "nested", 4, "2024-01-01 12:00:00"),
+            (6, 10, 1, "deeper", 5, "2024-01-01 13:00:00"),
+            (7, 20, 1, "other post", None, "2024-01-01 10:00:00"),
+        ]
+        db.session.execute(
+            text("INSERT INTO comments VALUES (:id, :post, :user, :content, :parent, :created, :created)"),
+            [dict(zip(("id", "post", "user", "content", "parent", "created"), row)) for row in comments],
+        )
+        db.session.commit()
+        yield app
+        db.session.remove()
+
+
+def test_whole_tree_in_two_queries(thread_app):
+    """Replies nest under their parents at any depth, with authors attached."""
+    with capture_queries() as stats:
+        thread = Comment.get_thread(10)
+
+    assert stats.count == 2
+    assert [c["content"] for c in thread] == ["second", "first"]
+    first = thread[1]
+    assert [r["content"] for r in first["replies"]] == ["reply a", "reply b"]
+    assert first["reply_count"] == 2
+    nested = first["replies"][0]["replies"][0]
+    assert nested["content"] == "nested" and nested["depth"] == 2
+    assert nested["replies"][0]["content"] == "deeper"
+    assert nested["user"]["username"] == "bob" and nested["username"] == "bob"
+
+
+def test_feed_preview_limits_per_post(thread_app):
+    """Several posts load at once, with top-level and depth limits per thread."""
+    with capture_queries() as stats:
+        threads = Comment.get_threads([10, 20, 30], limit=1, max_depth=1)
+
+    assert stats.count == 2
+    assert [c["content"] for c in threads[10]] == ["second"]
+    assert [c["content"] for c in threads[20]] == ["other post"]
+    assert threads[30] == []
+
+    first = Comment.get_thread(10, max_depth=1)[1]
+    reply = first["replies"][0]
+    assert reply["content"] == "reply a"
+    assert reply["replies"] == [] and reply["reply_count"] == 1
+
+
+class _Post:
+    def __init__(self, post_id):
+        self.id = post_id
+
+    def to_dict(self, comments=None):
+        assert comments is not None, "thread was not preloaded"
+        return {"id": self.id, "comments": comments}
+
+
+@pytest.mark.parametrize("module_name", ["routes.main", "routes.api", "routes.mobile_api"])
+def test_post_lists_load_threads_once(monkeypatch, module_name):
+    """GET /posts handlers fetch every post's thread in one batched call."""
+    import importlib
+
+    module = importlib.import_module(module_name)
+    calls = []
+
+    def fake_threads(post_ids, limit=None, max_depth=None):
+        calls.append((list(post_ids), limit, max_depth))
+        return {1: [{"content": "hi"}]}
+
+    # Post.get_all is not defined on the model in this tree
+    monkeypatch.setattr(module.Post, "get_all", staticmethod(lambda: [_Post(1), _Post(2)]), raising=False)
+    monkeypatch.setattr(module.Comment, "get_threads", staticmethod(fake_threads))
+
+    with Flask("post-list-test").test_request_context("/posts"):
+        response = module.get_posts()
+
+    assert calls == [([1, 2], FEED_THREAD_COMMENTS, FEED_THREAD_DEPTH)]
+    assert response.json == [{"id": 1, "comments": [{"content": "hi"}]}, {"id": 2, "comments": []}]
@@ -0,0 +1,156 @@
+"""Test Connection Pool
+====================
+
+Tests the raw connection pool: setup hooks, lazy validation, FIFO handoff
+to waiters, checkout metrics, connection-level statements and the legacy
+connection alias.
+"""
+
+import os
+import tempfile
+import threading
+import time
+
+import pytest
+
+from utils.db.database import (
+    ConnectionPool,
+    add_statement_listener,
+    connection_pool,
+    get_users_db_connection,
+    remove_statement_listener,
+    sqlite_setup_hook,
+)
+
+
+@pytest.fixture
+def pool():
+    path = os.path.join(tempfile.mkdtemp(), "pool.db")
+    pool = ConnectionPool()
+    pool.initialize(url=f"sqlite:///{path}", min_size=1, max_size=2, timeout=2, validate_idle_seconds=60)
+    yield pool
+    pool.close_all()
+
+
+def test_setup_hooks_tune_new_sqlite_connections(pool):
+    """New SQLite connections get WAL, NORMAL sync and name-addressable rows."""
+    conn = pool.checkout()
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA journal_mode")
+    assert cursor.fetchone()[0] == "wal"
+    cursor.execute("PRAGMA synchronous")
+    assert cursor.fetchone()[0] == 1
+    cursor.execute("SELECT 1 AS one")
+    assert cursor.fetchone()["one"] == 1
+    conn.close()
+    assert pool.setup_hooks == [sqlite_setup_hook]
+
+
+def test_close_returns_connection_and_validation_is_lazy(pool):
+    """close() recycles the connection; SELECT 1 only runs after a rollback or idle age."""
+    conn = pool.checkout()
+    conn.close()
+    conn.close()  # releasing twice is harmless
+    assert pool.checkout() is conn
+    assert pool.stats()["validations"] == 0
+
+    conn.rollback()
+    conn.close()
+    assert pool.checkout() is conn
+    assert pool.stats()["validations"] == 1
+    conn.close()
+
+
+def test_broken_connection_is_replaced(pool):
+    """A connection that fails validation is discarded and reopened."""
+    conn = pool.checkout()
+    conn.close()
+    conn._raw.close()
+    conn._suspect = True
+
+    replacement = pool.checkout()
+    assert replacement is not conn
+    cursor = replacement.cursor()
+    cursor.execute("SELECT 1")
+    assert pool.stats()["discarded"] == 1
+    replacement.close()
+
+
+def test_waiters_are_served_in_arrival_order(pool):
+    """Released connections go to the longest-waiting caller first."""
+    held = [pool.checkout(), pool.checkout()]
+    order = []
+
+    def worker(name):
+        conn = pool.checkout()
+        order.append(name)
+        time.sleep(0.01)
+        conn.close()
+
+    threads = []
+    for name in ("first", "second", "third"):
+        thread = threading.Thread(target=worker, args=(name,))
+        thread.start()
+        threads.append(thread)
+        while pool.stats()["waiting"] < len(threads):
+            time.sleep(0.001)
+
+    # One connection stays held, so the other is passed down the queue serially
+    held[0].close()
+    for thread in threads:
+        thread.join()
+    held[1].close()
+
+    assert order == ["first", "second", "third"]
+    stats = pool.stats()
+    assert stats["waits"] == 3
+    assert stats["wait_seconds_max"] > 0
+    assert stats["checked_out"] == 0
+
+
+def test_exhausted_pool_times_out(pool):
+    """Checkouts beyond max_size fail after the timeout and are counted."""
+    held = [pool.checkout(), pool.checkout()]
+    with pytest.raises(TimeoutError):
+        pool.checkout(timeout=0.05)
+    assert pool.stats()["timeouts"] == 1
+    for conn in held:
+        conn.close()
+
+
+def test_legacy_users_connection_is_pooled():
+    """get_users_db_connection() hands out a pooled raw connection with a cursor."""
+    path = os.path.join(tempfile.mkdtemp(), "legacy.db")
+    previous_url = connection_pool.url
+    connection_pool.close_all()
+    connection_pool.initialize(url=f"sqlite:///{path}", min_size=0, max_size=1, timeout=2)
+    try:
+        conn = get_users_db_connection()
+        assert conn._pool is connection_pool
+        conn.cursor().execute("SELECT 1")
+        conn.close()
+        assert connection_pool.stats()["checked_out"] == 0
+    finally:
+        connection_pool.close_all()
+        connection_pool.url = previous_url
+
+
+def test_connection_shortcuts_go_through_the_pooled_cursor(pool):
+    """conn.execute/executemany reach statement listeners; the context manager commits."""
+    seen = []
+
+    def listener(raw_cursor, sql, params, elapsed):
+        seen.append(sql.split()[0])
+
+    add_statement_listener(listener)
+    try:
+        with pool.checkout() as conn:
+            conn.execute("CREATE TABLE t (n INTEGER)")
+            conn.executemany("INSERT INTO t VALUES (?)", [(1,), (2,)])
+        conn = pool.checkout()
+        assert conn.execute("SELECT COUNT(*) AS n FROM t").fetchone()["n"] == 2
+        conn.close()
+    finally:
+        remove_statement_listener(listener)
+
+    assert seen == ["CREATE", "INSERT", "SELECT"]
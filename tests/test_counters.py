@@ -0,0 +1,112 @@
+"""Test Denormalised Counters
+==========================
+
+Tests counter bumps inside the writer's transaction, batched reads,
+backfill on table creation, drift repair and creating the table on a
+database that predates it.
+"""
+
+import os
+import sqlite3
+import tempfile
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from utils.db import counters
+from utils.db.database import connection_pool
+from utils.db.migrations import migrate_counters_table
+
+
+@pytest.fixture
+def cursor():
+    conn = sqlite3.connect(":memory:")
+    cursor = conn.cursor()
+    cursor.execute("CREATE TABLE face_likes (id INTEGER PRIMARY KEY, user_id INTEGER, face_id INTEGER)")
+    cursor.execute("CREATE TABLE follows (id INTEGER PRIMARY KEY, follower_id INTEGER, followed_id INTEGER)")
+    cursor.executemany("INSERT INTO face_likes (user_id, face_id) VALUES (?, ?)", [(1, 10), (2, 10), (3, 11)])
+    cursor.executemany("INSERT INTO follows (follower_id, followed_id) VALUES (?, ?)", [(1, 2), (3, 2)])
+    yield cursor
+    conn.close()
+
+
+def test_table_is_backfilled_and_read_in_one_query(cursor):
+    """Creating the table counts existing rows; a grid of faces reads with one SELECT."""
+    assert counters.ensure_counters_table(cursor) is True
+    assert counters.ensure_counters_table(cursor) is False  # already populated
+
+    assert counters.get_counts(cursor, counters.FACE_LIKES, [10, 11, 12, None]) == {10: 2, 11: 1}
+    assert counters.get_count(cursor, counters.FOLLOWERS, 2) == 2
+    assert counters.get_count(cursor, counters.FOLLOWING, 1) == 1
+    assert counters.get_count(cursor, counters.FACE_LIKES, 12) == 0
+
+
+def test_bumps_roll_back_with_the_write(cursor):
+    """Counters follow the transaction of the row they count and never go negative."""
+    counters.ensure_counters_table(cursor)
+    cursor.connection.commit()
+
+    cursor.execute("INSERT INTO face_likes (user_id, face_id) VALUES (4, 11)")
+    counters.bump(cursor, counters.FACE_LIKES, 11)
+    cursor.connection.rollback()
+    assert counters.get_count(cursor, counters.FACE_LIKES, 11) == 1
+
+    counters.bump(cursor, counters.FACE_LIKES, 10, -1)
+    assert counters.get_count(cursor, counters.FACE_LIKES, 10) == 1
+    counters.bump(cursor, counters.FACE_LIKES, 10, -5)
+    counters.bump(cursor, counters.FACE_LIKES, 12, -1)
+    assert counters.get_counts(cursor, counters.FACE_LIKES, [10, 12]) == {10: 0}
+
+
+def test_session_helpers_share_the_orm_transaction():
+    """SQLAlchemy writers bump and read the same counters."""
+    engine = create_engine("sqlite://")
+    with Session(engine) as session:
+        counters.ensure_counters_table(session.connection().connection.cursor())
+        session.commit()
+        counters.bump_session(session, counters.POST_LIKES, 7)
+        counters.bump_session(session, counters.POST_LIKES, 7)
+        counters.bump_session(session, counters.POST_LIKES, 7, -1)
+        assert counters.get_count_session(session, counters.POST_LIKES, 7) == 1
+        session.rollback()
+        assert counters.get_count_session(session, counters.POST_LIKES, 7) == 0
+
+
+def test_reconcile_repairs_drift(cursor):
+    """Counters changed behind the helpers' back are recounted; missing tables are skipped."""
+    counters.ensure_counters_table(cursor)
+    cursor.execute("DELETE FROM face_likes WHERE face_id = 11")
+    counters.bump(cursor, counters.FACE_LIKES, 10, 5)
+
+    repaired = counters.reconcile(cursor)
+
+    assert repaired[counters.FACE_LIKES] == 2
+    assert repaired[counters.FOLLOWERS] == 0
+    assert counters.POST_LIKES not in repaired  # no likes table here
+    assert counters.get_counts(cursor, counters.FACE_LIKES, [10, 11]) == {10: 2, 11: 0}
+
+
+def test_database_without_the_table_is_upgraded():
+    """App start and reconcile_counters create and backfill a missing counters table."""
+    path = os.path.join(tempfile.mkdtemp(), "counters.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE face_likes (id INTEGER PRIMARY KEY, user_id INTEGER, face_id INTEGER)")
+    conn.executemany("INSERT INTO face_likes (user_id, face_id) VALUES (?, ?)", [(1, 10), (2, 10)])
+    conn.commit()
+    previous_url = connection_pool.url
+    connection_pool.close_all()
+    connection_pool.initialize(url=f"sqlite:///{path}", min_size=0, max_size=1, timeout=2)
+    try:
+        assert migrate_counters_table() is True
+        assert counters.get_count(conn.cursor(), counters.FACE_LIKES, 10) == 2
+
+        conn.execute("DROP TABLE counters")
+        conn.commit()
+        repaired = counters.run_reconciliation()
+        assert repaired[counters.FACE_LIKES] == 0  # backfilled before reconciling
+        assert counters.get_count(conn.cursor(), counters.FACE_LIKES, 10) == 2
+    finally:
+        conn.close()
+        connection_pool.close_all()
+        connection_pool.url = previous_url
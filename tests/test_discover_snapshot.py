@@ -0,0 +1,90 @@
+"""Test Discover Snapshot
+======================
+
+Tests the precomputed discover sections and pool sampling.
+"""
+
+import random
+import sqlite3
+
+from flask import Flask
+
+from extensions import cache
+from utils import discover_snapshot
+
+
+class _Conn:
+    """Keeps the in-memory database open across the builder's close()."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self):
+        return self._conn.cursor()
+
+    def close(self):
+        pass
+
+
+class _Manifest:
+    def web_path(self, filename, b2_base_url=None):
+        return f"/static/extracted_faces/{filename}"
+
+
+def _db():
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.executescript(
+        """
+        CREATE TABLE faces (id INTEGER PRIMARY KEY, filename TEXT, school_name TEXT, yearbook_year INTEGER,
+                            page_number INTEGER, state TEXT, decade TEXT, claimed_by_user_id INTEGER);
+        CREATE TABLE user_matches (id INTEGER PRIMARY KEY, match_filename TEXT);
+        CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT, profile_image TEXT);
+        CREATE TABLE claimed_profiles (id INTEGER PRIMARY KEY, user_id INTEGER, face_id INTEGER,
+                                       relationship TEXT, caption TEXT, claimed_at TEXT);
+        """
+    )
+    for i in range(1, 41):
+        conn.execute("INSERT INTO faces VALUES (?, ?, 'Lincoln High', 1985, 1, ?, ?, NULL)",
+                     (i, f"{i}.jpg", "TX" if i % 2 else "CA", "1980s" if i <= 20 else "1990s"))
+    conn.executemany("INSERT INTO user_matches (match_filename) VALUES (?)", [("3.jpg",)] * 3 + [("5.jpg",)])
+    conn.execute("INSERT INTO users VALUES (1, 'ann', 'ann.jpg')")
+    conn.execute("INSERT INTO claimed_profiles VALUES (1, 1, 5, 'me', 'Hi', '2024-01-01')")
+    return conn
+
+
+def test_build_snapshot_and_sections(monkeypatch):
+    """Sections come from one build; repeat views reuse the snapshot."""
+    conn = _Conn(_db())
+    builds = []
+    monkeypatch.setattr(discover_snapshot, "get_db_connection", lambda: builds.append(1) or conn)
+    monkeypatch.setattr(discover_snapshot, "get_manifest", lambda: _Manifest())
+    monkeypatch.setattr(discover_snapshot, "snapshot_store", discover_snapshot.DiscoverSnapshotStore())
+
+    app = Flask(__name__)
+    app.config.update(CACHE_TYPE="SimpleCache", DISCOVER_SNAPSHOT_SECONDS=300)
+    cache.init_app(app)
+    with app.app_context():
+        popular, claims, decades, of_the_day = discover_snapshot.discover_sections(faces_limit=6)
+        discover_snapshot.discover_sections()
+
+    assert len(builds) == 1
+    assert [(f["filename"], f["match_count"]) for f in popular["faces"]] == [("3.jpg", 3), ("5.jpg", 1)]
+    assert claims["profiles"][0]["user"]["username"] == "ann"
+    assert decades["decades"] == ["1980s", "1990s"]
+    assert len({f["filename"] for f in of_the_day["faces"]}) == 6
+
+
+def test_sample_faces_is_stratified_and_unique():
+    """Each round takes one face per pool and never repeats a face."""
+    pools = {
+        "decade:1980s": [{"filename": f"a{i}.jpg"} for i in range(5)],
+        "state:TX": [{"filename": f"b{i}.jpg"} for i in range(5)] + [{"filename": "a0.jpg"}],
+    }
+    picked = discover_snapshot.sample_faces(pools, 4, rng=random.Random(1))
+    names = [face["filename"] for face in picked]
+
+    assert len(names) == len(set(names)) == 4
+    assert sum(name.startswith("a") for name in names) >= 1
+    assert sum(name.startswith("b") for name in names) >= 1
+    assert len(discover_snapshot.sample_faces(pools, 100)) == 10
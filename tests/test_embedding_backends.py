@@ -0,0 +1,93 @@
+"""Test Embedding Backends
+=======================
+
+Tests backend selection and the per-backend embedding store.
+"""
+
+import numpy as np
+import pytest
+
+from utils.face import embedding_store, encoders
+from utils.face.encoders import (
+    EmbeddingBackend,
+    cohort_backend,
+    get_backend,
+    select_backend,
+)
+
+
+class FakeBackend(EmbeddingBackend):
+    """Always-available backend returning a constant vector."""
+
+    name = "fake"
+    dimension = 4
+
+    def is_available(self):
+        return True
+
+    def encode_image(self, image):
+        return np.ones(self.dimension, dtype=np.float32)
+
+
+@pytest.fixture
+def fake_backend(monkeypatch):
+    # Registered through monkeypatch so the fake leaves the global registry afterwards
+    backend = FakeBackend()
+    monkeypatch.setitem(encoders._backends, backend.name, backend)
+    return backend
+
+
+def test_registry_dimensions():
+    """Built-in backends expose their vector sizes."""
+    assert get_backend("dlib").dimension == 128
+    assert get_backend("arcface").dimension == 512
+    with pytest.raises(KeyError):
+        get_backend("missing")
+
+
+def test_explicit_request_wins(app, fake_backend):
+    """A requested backend overrides the cohort and the default."""
+    app.config["EMBEDDING_BACKEND_COHORTS"] = ""
+    assert select_backend("fake", user_id=1).name == "fake"
+    assert select_backend(None, user_id=1).name == "dlib"
+
+
+def test_unavailable_request_falls_back(app):
+    """An unknown backend name falls back to the default."""
+    assert select_backend("nope", user_id=1).name == "dlib"
+
+
+def test_cohort_assignment_is_stable(app, fake_backend):
+    """Cohorts bucket users deterministically by percentage."""
+    app.config["EMBEDDING_BACKEND_COHORTS"] = "fake:100"
+    assert cohort_backend(42) == "fake"
+    assert select_backend(None, user_id=42).name == "fake"
+
+    app.config["EMBEDDING_BACKEND_COHORTS"] = "fake:0"
+    assert cohort_backend(42) is None
+    app.config["EMBEDDING_BACKEND_COHORTS"] = ""
+
+
+def test_embedding_store_roundtrip(tmp_path):
+    """Embeddings are stored and loaded per backend."""
+    db_path = str(tmp_path / "faces.db")
+    conn = embedding_store.connect(db_path)
+    conn.execute("CREATE TABLE faces (id INTEGER PRIMARY KEY, filename TEXT, encoding BLOB)")
+    conn.execute(
+        "INSERT INTO faces (filename, encoding) VALUES (?, ?)",
+        ("a.jpg", np.zeros(128, dtype=np.float64).tobytes()),
+    )
+    conn.execute("INSERT INTO faces (filename, encoding) VALUES ('b.jpg', NULL)")
+    embedding_store.save_embedding(conn, "a.jpg", "fake", np.arange(4))
+    conn.commit()
+
+    assert embedding_store.missing_filenames(conn, "fake") == ["b.jpg"]
+    conn.close()
+
+    filenames, vectors = embedding_store.load_embeddings("fake", db_path)
+    assert filenames == ["a.jpg"]
+    assert vectors.shape == (1, 4)
+
+    filenames, vectors = embedding_store.load_embeddings("dlib", db_path)
+    assert filenames == ["a.jpg"]
+    assert vectors.shape == (1, 128)
@@ -0,0 +1,53 @@
+"""Test Face Sampler
+=================
+
+Tests random face sampling from the in-memory id array.
+"""
+
+import random
+import sqlite3
+
+from utils.face.sampler import FaceSampler, sample_ids
+
+
+def _sampler():
+    sampler = FaceSampler(ttl_seconds=0)
+    sampler.build([
+        (i, "1980s" if i <= 60 else "1990s", "TX" if i % 2 else "CA", i % 10 != 0)
+        for i in range(1, 101)
+    ])
+    return sampler
+
+
+def test_sample_ids_are_distinct_and_filtered():
+    """Filters select the matching stratum and never repeat ids."""
+    sampler = _sampler()
+    ids = sampler.sample_ids(20, decade="1990s", state="TX", quality=True, rng=random.Random(3))
+
+    assert len(ids) == len(set(ids)) == 20
+    assert all(i > 60 and i % 2 and i % 10 for i in ids)
+    assert len(sampler.sample_ids(500)) == 100
+    assert sample_ids([5, 6], 1, random.Random(0))[0] in (5, 6)
+
+
+def test_stratified_sampling_spreads_across_values():
+    """Each decade gets its share of the grid."""
+    ids = _sampler().sample_stratified(10, by="decade", rng=random.Random(1))
+    assert sum(i <= 60 for i in ids) == 5
+    assert sum(i > 60 for i in ids) == 5
+
+
+def test_sample_rows_tops_up_deleted_ids():
+    """Rows deleted since the build are replaced by extra draws."""
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute("CREATE TABLE faces (id INTEGER PRIMARY KEY, filename TEXT)")
+    conn.executemany("INSERT INTO faces VALUES (?, ?)", [(i, f"{i}.jpg") for i in range(1, 101)])
+    sampler = _sampler()
+    conn.execute("DELETE FROM faces WHERE id <= 30")
+
+    random.seed(7)
+    rows = sampler.sample_rows(conn.cursor(), 10, columns="id, filename")
+    assert len({row["id"] for row in rows}) == len(rows)
+    assert all(row["id"] > 30 for row in rows)
+    assert len(rows) == 10
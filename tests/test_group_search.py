@@ -0,0 +1,99 @@
+"""Test Group Photo Search
+=======================
+
+Tests batched multi-face index search, per-face grouping and the face cap.
+"""
+
+import face_recognition
+import numpy as np
+from flask import Flask
+
+from utils import search_helpers
+from utils.face.encoders import EmbeddingBackend
+
+
+class _BatchIndex:
+    backend = "dlib"
+
+    def __init__(self):
+        self.calls = 0
+
+    def search_batch(self, vectors, top_k=20):
+        self.calls += 1
+        results = []
+        for vector in vectors:
+            offset = float(vector[0])
+            filenames = ["shared.jpg", f"own_{int(offset * 10)}.jpg"][:top_k]
+            results.append((np.array([offset, offset + 0.1]), np.array([0, 1]), filenames))
+        return results
+
+
+class _Encoder:
+    name = "dlib"
+    match_threshold = 0.6
+
+    def __init__(self):
+        self.max_faces = None
+
+    def encode_faces_file(self, path, max_faces=None):
+        self.max_faces = max_faces
+        small, large = np.zeros(128), np.zeros(128)
+        small[0], large[0] = 0.2, 0.1
+        return [((0, 50, 50, 0), large), ((0, 10, 10, 0), small)][:max_faces]
+
+
+class _CropBackend(EmbeddingBackend):
+    name = "crops"
+    dimension = 1
+
+    def __init__(self):
+        self.encoded = []
+
+    def is_available(self):
+        return True
+
+    def encode_image(self, image):
+        return None
+
+    def _encode_crops(self, image, locations):
+        self.encoded = list(locations)
+        return [np.ones(1) for _ in locations]
+
+
+def test_group_search_runs_one_batch_and_groups_by_face(monkeypatch):
+    """One index call and one enrichment; groups keep their own similarities and boxes."""
+    enriched_batches = []
+
+    def fake_enrich(raw, current_user_id, liked):
+        enriched_batches.append(sorted(m["filename"] for m in raw))
+        return [dict(m, image=f"/img/{m['filename']}") for m in raw], len(raw)
+
+    encoder = _Encoder()
+    monkeypatch.setattr(search_helpers, "get_backend", lambda name=None: encoder)
+    monkeypatch.setattr(search_helpers, "enrich_faiss_matches", fake_enrich)
+    index = _BatchIndex()
+
+    with Flask(__name__).app_context():
+        groups, error = search_helpers.get_enriched_group_matches("group.jpg", index, 7, set(), top_k=2)
+
+    assert error is None
+    assert encoder.max_faces == 20
+    assert index.calls == 1
+    assert enriched_batches == [["own_1.jpg", "own_2.jpg", "shared.jpg"]]
+    # Largest face first
+    assert [g["box"]["right"] for g in groups] == [50, 10]
+    assert [m["filename"] for m in groups[0]["matches"]] == ["shared.jpg", "own_1.jpg"]
+    assert groups[0]["matches"][0]["distance"] != groups[1]["matches"][0]["distance"]
+
+
+def test_only_the_largest_faces_are_encoded(monkeypatch):
+    """Boxes are sorted by area and capped before any crop is encoded."""
+    boxes = [(0, 10, 10, 0), (0, 40, 40, 0), (0, 20, 20, 0), (0, 30, 30, 0)]
+    monkeypatch.setattr(face_recognition, "face_locations", lambda image, model="hog": list(boxes))
+    backend = _CropBackend()
+
+    faces = backend.encode_faces(np.zeros((50, 50, 3), dtype=np.uint8), max_faces=2)
+
+    assert backend.encoded == [(0, 40, 40, 0), (0, 30, 30, 0)]
+    assert [box for box, _ in faces] == backend.encoded
+    assert len(backend.encode_faces(np.zeros((50, 50, 3), dtype=np.uint8))) == 4
@@ -0,0 +1,80 @@
+"""Test Image Manifest
+===================
+
+Tests filename -> storage location resolution without filesystem probing.
+"""
+
+from utils.files import image_manifest
+from utils.files.image_manifest import B2, LOCAL, ImageManifest
+
+
+def _touch(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x")
+
+
+def test_build_resolves_by_folder_priority(tmp_path):
+    """The first folder holding a file wins; thumbnails are not indexed."""
+    extracted = tmp_path / "static" / "extracted_faces"
+    faces = tmp_path / "static" / "faces"
+    _touch(extracted / "a.jpg")
+    _touch(faces / "a.jpg")
+    _touch(faces / "b.jpg")
+    _touch(extracted / "thumbs" / "96" / "a.webp")
+
+    manifest = ImageManifest()
+    count = manifest.build(
+        [(str(extracted), "extracted_faces"), (str(faces), "faces"), (str(tmp_path / "missing"), None)],
+        b2_rows=[("b.jpg", "faces/b.jpg"), ("c.jpg", "faces/c.jpg")],
+    )
+
+    assert count == 3
+    assert manifest.web_path("a.jpg") == "/static/extracted_faces/a.jpg"
+    assert manifest.web_path("b.jpg") == "/static/faces/b.jpg"
+    assert manifest.lookup("c.jpg").storage == B2
+    assert manifest.web_path("c.jpg") is None
+    assert manifest.web_path("c.jpg", "https://f000.example/file/bucket/") == (
+        "https://f000.example/file/bucket/faces/c.jpg"
+    )
+    assert manifest.local_path("a.jpg") == str(extracted / "a.jpg")
+
+
+def test_upload_and_delete_hooks_keep_manifest_current(tmp_path):
+    """add_local/add_b2/remove update lookups in place."""
+    faces = tmp_path / "faces"
+    manifest = ImageManifest()
+    manifest.build([(str(faces), "faces")])
+
+    manifest.add_local("new.jpg", str(faces))
+    assert manifest.lookup("new.jpg").storage == LOCAL
+    assert manifest.web_path("new.jpg") == "/static/faces/new.jpg"
+
+    # A later B2 copy does not shadow the local file
+    manifest.add_b2("new.jpg", "faces/new.jpg")
+    assert manifest.lookup("new.jpg").storage == LOCAL
+
+    manifest.remove("new.jpg")
+    assert "new.jpg" not in manifest
+    assert manifest.web_path("new.jpg") is None
+
+
+def test_miss_is_resolved_once_from_disk_and_b2(tmp_path, monkeypatch):
+    """Files written by another process are found on a miss; misses are not re-probed."""
+    faces = tmp_path / "faces"
+    lookups = []
+    manifest = ImageManifest(b2_lookup=lambda name: lookups.append(name) or {"remote.jpg": "faces/remote.jpg"}.get(name))
+    manifest.build([(str(faces), "faces")])
+
+    _touch(faces / "other-worker.jpg")
+    assert manifest.web_path("other-worker.jpg") == "/static/faces/other-worker.jpg"
+    assert "other-worker.jpg" in manifest
+    assert manifest.lookup("remote.jpg").key == "faces/remote.jpg"
+
+    assert manifest.lookup("gone.jpg") is None
+    _touch(faces / "gone.jpg")
+    assert manifest.lookup("gone.jpg") is None  # remembered miss
+    assert lookups == ["remote.jpg", "gone.jpg"]
+
+    later = image_manifest.time.monotonic() + image_manifest.MISS_RECHECK_SECONDS + 1
+    monkeypatch.setattr(image_manifest.time, "monotonic", lambda: later)
+    assert manifest.lookup("gone.jpg").storage == LOCAL
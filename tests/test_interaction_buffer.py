@@ -0,0 +1,125 @@
+"""Test Interaction Buffer
+=======================
+
+Tests that buffered face likes collapse per key, are visible through the
+overlay before they are written, flush in one transaction with their
+counters and survive a failed flush or checkout.
+"""
+
+import sqlite3
+
+import pytest
+
+from utils.db import counters
+from utils.interaction_buffer import FACE_LIKE, MISSING, InteractionBuffer
+
+
+class _Connection:
+    """Shared sqlite3 connection whose close() is a no-op, counting commits."""
+
+    def __init__(self, conn):
+        self._conn = conn
+        self.commits = 0
+        self.fail = False
+
+    def cursor(self):
+        if self.fail:
+            raise sqlite3.OperationalError("database is locked")
+        return self._conn.cursor()
+
+    def commit(self):
+        self.commits += 1
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def db():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE face_likes (id INTEGER PRIMARY KEY, user_id INTEGER, face_id INTEGER, liked_at TEXT)")
+    conn.execute("INSERT INTO face_likes (user_id, face_id) VALUES (1, 20)")
+    counters.ensure_counters_table(conn.cursor())
+    conn.commit()
+    return _Connection(conn)
+
+
+def _stored(db, user_id, face_id):
+    cursor = db._conn.execute("SELECT 1 FROM face_likes WHERE user_id = ? AND face_id = ?", (user_id, face_id))
+    return cursor.fetchone() is not None
+
+
+def test_toggles_are_visible_before_the_flush(db):
+    """The overlay answers state, per-user sets and count deltas while writes are pending."""
+    buffer = InteractionBuffer(connect=lambda: db)
+
+    assert buffer.toggle(FACE_LIKE, 1, 10, lambda: _stored(db, 1, 10)) is True
+    assert buffer.toggle(FACE_LIKE, 2, 10, lambda: _stored(db, 2, 10)) is True
+    assert buffer.toggle(FACE_LIKE, 1, 20, lambda: _stored(db, 1, 20)) is False
+
+    assert buffer.pending_state(FACE_LIKE, 1, 10) is True
+    assert buffer.pending_state(FACE_LIKE, 3, 10) is MISSING
+    assert buffer.pending_for_user(FACE_LIKE, 1) == {10: True, 20: False}
+    assert buffer.count_deltas(FACE_LIKE, [10, 20, 30]) == {10: 2, 20: -1}
+    assert not _stored(db, 1, 10)
+
+
+def test_flush_writes_one_transaction_with_counters(db):
+    """Pending likes and unlikes commit together; a like undone in the window writes nothing."""
+    buffer = InteractionBuffer(connect=lambda: db)
+    buffer.toggle(FACE_LIKE, 1, 10, lambda: _stored(db, 1, 10))
+    buffer.toggle(FACE_LIKE, 2, 10, lambda: _stored(db, 2, 10))
+    buffer.toggle(FACE_LIKE, 1, 20, lambda: _stored(db, 1, 20))
+    buffer.toggle(FACE_LIKE, 3, 30, lambda: _stored(db, 3, 30))
+    buffer.toggle(FACE_LIKE, 3, 30, lambda: pytest.fail("state is already buffered"))
+
+    assert buffer.flush() == 4
+    assert db.commits == 1
+    assert len(buffer) == 0
+    assert buffer.count_deltas(FACE_LIKE) == {}
+    assert _stored(db, 1, 10) and _stored(db, 2, 10)
+    assert not _stored(db, 1, 20) and not _stored(db, 3, 30)
+    cursor = db._conn.cursor()
+    assert counters.get_counts(cursor, counters.FACE_LIKES, [10, 20, 30]) == {10: 2, 20: 0}
+
+
+def test_failed_flush_requeues_and_keeps_newer_toggles(db):
+    """A batch that cannot be written is retried, merged with toggles made since."""
+    buffer = InteractionBuffer(connect=lambda: db)
+    buffer.toggle(FACE_LIKE, 1, 10, lambda: False)
+
+    db.fail = True
+    assert buffer.flush() == 0
+    assert buffer.pending_state(FACE_LIKE, 1, 10) is True
+
+    buffer.toggle(FACE_LIKE, 1, 10, lambda: pytest.fail("state is already buffered"))
+    assert buffer.count_deltas(FACE_LIKE) == {}
+
+    db.fail = False
+    buffer.toggle(FACE_LIKE, 1, 10, lambda: pytest.fail("state is already buffered"))
+    buffer.flush_on_exit()
+    assert len(buffer) == 0
+    assert _stored(db, 1, 10)
+
+
+def test_failed_checkout_requeues(db):
+    """A connection that cannot be checked out loses nothing; the next flush writes it."""
+    attempts = []
+
+    def connect():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise TimeoutError("Timed out waiting for a database connection")
+        return db
+
+    buffer = InteractionBuffer(connect=connect)
+    buffer.toggle(FACE_LIKE, 1, 10, lambda: False)
+
+    assert buffer.flush() == 0
+    assert buffer.pending_state(FACE_LIKE, 1, 10) is True
+    assert buffer.flush() == 1
+    assert _stored(db, 1, 10)
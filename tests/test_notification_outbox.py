@@ -0,0 +1,77 @@
+"""Test Notification Outbox
+========================
+
+Tests coalescing and bulk writes of buffered notifications.
+"""
+
+import logging
+import sqlite3
+from datetime import datetime
+
+from utils import notification_outbox
+from utils.notification_outbox import (
+    TYPE_SEARCH_APPEARANCE,
+    NotificationEvent,
+    NotificationOutbox,
+    coalesce_events,
+    flush_events,
+)
+
+
+def _db():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE notifications (id INTEGER PRIMARY KEY, user_id INTEGER, sender_id INTEGER, "
+                 "notification_type TEXT, content TEXT, is_read BOOLEAN, created_at TIMESTAMP, "
+                 "updated_at TIMESTAMP)")
+    return conn
+
+
+def _appearance(user_id, sender_id):
+    return NotificationEvent(user_id, TYPE_SEARCH_APPEARANCE, None, sender_id)
+
+
+def test_coalesce_counts_digests_and_dedupes_plain_events():
+    """Search appearances are counted per user; repeated plain events collapse."""
+    follow = NotificationEvent(3, "new_follower", "a started following you", 9)
+    digests, plain = coalesce_events([_appearance(1, 8), _appearance(1, 9), _appearance(2, 8), follow, follow])
+
+    assert digests == {(TYPE_SEARCH_APPEARANCE, 1): 2, (TYPE_SEARCH_APPEARANCE, 2): 1}
+    assert plain == [follow]
+
+
+def test_flush_updates_one_digest_row_per_user_and_day():
+    """Later flushes on the same day bump the existing digest instead of inserting."""
+    conn = _db()
+    morning = datetime(2024, 5, 1, 9, 0)
+    flush_events(conn, [_appearance(1, 8), _appearance(1, 9), NotificationEvent(3, "new_follower", "hi", 9)],
+                 now=morning)
+    conn.execute("UPDATE notifications SET is_read = 1")
+
+    flush_events(conn, [_appearance(1, 7)] * 10, now=datetime(2024, 5, 1, 17, 0))
+
+    rows = conn.execute("SELECT user_id, notification_type, content, is_read FROM notifications "
+                        "ORDER BY id").fetchall()
+    assert rows == [
+        (1, TYPE_SEARCH_APPEARANCE, "You appeared in 12 searches today", 0),
+        (3, "new_follower", "hi", 1),
+    ]
+
+    flush_events(conn, [_appearance(1, 7)], now=datetime(2024, 5, 2, 8, 0))
+    assert conn.execute("SELECT content FROM notifications ORDER BY id DESC").fetchone()[0] == \
+        "You appeared in 1 search today"
+
+
+def test_flush_survives_a_failed_checkout(monkeypatch, caplog):
+    """A pool timeout drops the drained batch with a log instead of raising."""
+    def no_connection():
+        raise TimeoutError("No database connection available within 10s")
+
+    monkeypatch.setattr(notification_outbox, "get_db_connection", no_connection)
+    outbox = NotificationOutbox()
+    outbox.enqueue([_appearance(1, 2)])
+
+    with caplog.at_level(logging.ERROR, logger="utils.notification_outbox"):
+        assert outbox.flush() == 0
+
+    assert len(outbox) == 0
+    assert "dropping 1 events" in caplog.text
@@ -0,0 +1,99 @@
+"""Test Query Plan Audit
+=====================
+
+Tests statement capture from pooled cursors, scan detection in SQLite
+plans, index suggestions and the add_indexes.sql append.
+"""
+
+import os
+import tempfile
+
+import pytest
+
+from utils.db.database import ConnectionPool
+from utils.db.plan_audit import (
+    QueryPlanAuditor,
+    append_ddl,
+    candidate_columns,
+    format_report,
+    normalize_sql,
+    parse_postgres_plan,
+)
+
+
+@pytest.fixture
+def conn():
+    path = os.path.join(tempfile.mkdtemp(), "audit.db")
+    pool = ConnectionPool()
+    pool.initialize(url=f"sqlite:///{path}", min_size=1, max_size=1, timeout=2)
+    conn = pool.checkout()
+    cursor = conn.cursor()
+    cursor.execute("CREATE TABLE faces (id INTEGER PRIMARY KEY, filename TEXT, decade TEXT, state TEXT)")
+    cursor.execute("CREATE TABLE face_likes (id INTEGER PRIMARY KEY, face_id INTEGER, user_id INTEGER)")
+    cursor.executemany(
+        "INSERT INTO faces (filename, decade, state) VALUES (?, ?, ?)",
+        [(f"{i}.jpg", "1980s", "OH") for i in range(50)],
+    )
+    cursor.execute("CREATE INDEX idx_faces_decade ON faces(decade)")
+    conn.commit()
+    yield conn
+    conn.close()
+    pool.close_all()
+
+
+def test_scans_over_large_tables_are_flagged_with_ddl(conn):
+    """A filename lookup scans faces; the decade lookup uses its index."""
+    auditor = QueryPlanAuditor(min_rows=10)
+    auditor.start()
+    try:
+        cursor = conn.cursor()
+        for i in range(3):
+            cursor.execute("SELECT id FROM faces WHERE filename = ?", (f"{i}.jpg",))
+            cursor.fetchall()
+        cursor.execute("SELECT id FROM faces WHERE decade = ?", ("1980s",))
+        cursor.execute(
+            "SELECT f.id, COUNT(l.id) FROM faces f LEFT JOIN face_likes l ON l.face_id = f.id "
+            "WHERE f.id IN (?, ?) GROUP BY f.id",
+            (1, 2),
+        )
+    finally:
+        auditor.stop()
+
+    findings = auditor.findings()
+    assert [f["table"] for f in findings] == ["faces"]
+    assert findings[0]["count"] == 3
+    assert findings[0]["rows"] == 50
+    assert findings[0]["ddl"] == "CREATE INDEX IF NOT EXISTS idx_faces_filename ON faces(filename);"
+    # face_likes is scanned too, but it is empty
+    assert auditor.report()["row_counts"]["face_likes"] == 0
+    assert "idx_faces_filename" in format_report(auditor.report())
+
+
+def test_statement_normalization_and_column_attribution():
+    """IN lists collapse to one key; aliased and unqualified columns map to the right table."""
+    assert normalize_sql("SELECT *  FROM faces\n WHERE id IN (?, ?, ?);") == "SELECT * FROM faces WHERE id IN (?...)"
+    sql = (
+        "SELECT f.id FROM faces f JOIN face_likes l ON l.face_id = f.id "
+        "WHERE l.user_id = ? AND decade > ? GROUP BY state"
+    )
+    known = {"faces": {"id", "decade", "state"}, "face_likes": {"id", "face_id", "user_id"}}
+    assert candidate_columns(sql, "l", "face_likes", known["face_likes"], known) == ["face_id", "user_id"]
+    assert candidate_columns(sql, "f", "faces", known["faces"], known) == ["id", "decade", "state"]
+    assert parse_postgres_plan([("  ->  Seq Scan on faces f  (cost=0.00..1.50 rows=50 width=4)",)]) == [
+        ("f", "->  Seq Scan on faces f  (cost=0.00..1.50 rows=50 width=4)")
+    ]
+
+
+def test_append_ddl_skips_existing_indexes(tmp_path):
+    """Only indexes missing from the SQL file are appended."""
+    sql_path = tmp_path / "add_indexes.sql"
+    sql_path.write_text("CREATE INDEX IF NOT EXISTS idx_faces_decade ON faces(decade);")
+    findings = [
+        {"ddl": "CREATE INDEX IF NOT EXISTS idx_faces_decade ON faces(decade);"},
+        {"ddl": "CREATE INDEX IF NOT EXISTS idx_faces_filename ON faces(filename);"},
+        {"ddl": None},
+    ]
+
+    assert append_ddl(findings, str(sql_path)) == ["CREATE INDEX IF NOT EXISTS idx_faces_filename ON faces(filename);"]
+    assert append_ddl(findings, str(sql_path)) == []
+    assert sql_path.read_text().count("idx_faces_filename") == 1
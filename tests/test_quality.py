@@ -0,0 +1,77 @@
+"""Test Face Quality
+=================
+
+Tests quality metric computation and the indexed quality filters.
+"""
+
+import sqlite3
+
+import numpy as np
+
+from utils.face.quality import (
+    DEFAULT_THRESHOLDS,
+    compute_quality_metrics,
+    delete_faces_where,
+    ensure_quality_columns,
+    indexed_any,
+    is_low_quality,
+    low_quality_clause,
+    quality_filter_clause,
+    save_quality_metrics,
+)
+
+
+def _faces_db():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE faces (id INTEGER PRIMARY KEY, filename TEXT)")
+    conn.executemany(
+        "INSERT INTO faces (filename) VALUES (?)", [("sharp.jpg",), ("blurry.jpg",), ("new.jpg",)]
+    )
+    ensure_quality_columns(conn.cursor())
+    return conn
+
+
+def test_blur_metric_separates_sharp_and_flat():
+    """A checkerboard has high Laplacian variance; a flat image has none."""
+    checker = (np.indices((120, 120)).sum(axis=0) % 2 * 255).astype(np.uint8)
+    flat = np.full((120, 120), 128, dtype=np.uint8)
+
+    sharp = compute_quality_metrics(checker, face_box=(10, 110, 110, 10))
+    dull = compute_quality_metrics(flat)
+
+    assert sharp["blur_variance"] > DEFAULT_THRESHOLDS["min_blur_variance"]
+    assert dull["blur_variance"] == 0.0
+    assert sharp["image_width"] == 120
+    assert abs(sharp["face_box_ratio"] - (100 * 100) / (120 * 120)) < 1e-6
+    assert dull["face_box_ratio"] is None
+    assert is_low_quality(dull, DEFAULT_THRESHOLDS)
+
+
+def test_quality_clauses_use_stored_columns():
+    """Low-quality faces are selected by SQL; unscored faces are kept."""
+    conn = _faces_db()
+    cursor = conn.cursor()
+    good = {"blur_variance": 400.0, "image_width": 200, "image_height": 200,
+            "face_box_ratio": 0.4, "brightness": 120.0}
+    bad = dict(good, blur_variance=5.0)
+    save_quality_metrics(cursor, [("sharp.jpg", good), ("blurry.jpg", bad)])
+
+    sql, params = low_quality_clause(thresholds=DEFAULT_THRESHOLDS)
+    low = [r[0] for r in cursor.execute(f"SELECT filename FROM faces WHERE {sql}", params)]
+    assert low == ["blurry.jpg"]
+
+    sql, params = quality_filter_clause(thresholds=DEFAULT_THRESHOLDS)
+    kept = sorted(r[0] for r in cursor.execute(f"SELECT filename FROM faces WHERE {sql}", params))
+    assert kept == ["new.jpg", "sharp.jpg"]
+
+
+def test_delete_faces_where():
+    """Deletion is a single predicate over the indexed columns."""
+    conn = _faces_db()
+    save_quality_metrics(conn.cursor(), [("blurry.jpg", {
+        "blur_variance": 1.0, "image_width": 50, "image_height": 50,
+        "face_box_ratio": None, "brightness": 100.0,
+    })])
+
+    assert delete_faces_where(conn, indexed_any(["image_width < ?", "image_height < ?"]), (100, 100)) == 1
+    assert conn.execute("SELECT COUNT(*) FROM faces").fetchone()[0] == 2
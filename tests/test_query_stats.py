@@ -0,0 +1,88 @@
+"""Test Query Stats
+================
+
+Tests per-request query counting, the Server-Timing and debug headers,
+N+1 warnings and the assert_max_queries helper.
+"""
+
+import logging
+import os
+import tempfile
+
+import pytest
+from flask import Flask, jsonify
+from sqlalchemy import create_engine, text
+
+from utils.db.database import ConnectionPool
+from utils.db.query_stats import assert_max_queries, init_query_stats
+
+
+@pytest.fixture
+def client():
+    path = os.path.join(tempfile.mkdtemp(), "stats.db")
+    pool = ConnectionPool()
+    pool.initialize(url=f"sqlite:///{path}", min_size=1, max_size=2, timeout=2)
+    engine = create_engine(f"sqlite:///{path}")
+
+    conn = pool.checkout()
+    cursor = conn.cursor()
+    cursor.execute("CREATE TABLE faces (id INTEGER PRIMARY KEY, filename TEXT)")
+    cursor.executemany("INSERT INTO faces (filename) VALUES (?)", [(f"{i}.jpg",) for i in range(6)])
+    conn.commit()
+    conn.close()
+
+    app = Flask("query-stats-test")
+    app.config.update(QUERY_BUDGET=4, QUERY_REPEAT_THRESHOLD=3, QUERY_STATS_DEBUG_HEADER=True)
+    init_query_stats(app)
+
+    @app.route("/n-plus-one")
+    def n_plus_one():
+        conn = pool.checkout()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT id FROM faces")
+            names = []
+            for row in cursor.fetchall():
+                cursor.execute("SELECT filename FROM faces WHERE id = ?", (row["id"],))
+                names.append(cursor.fetchone()["filename"])
+        finally:
+            conn.close()
+        return jsonify(names)
+
+    @app.route("/orm")
+    def orm():
+        with engine.connect() as connection:
+            count = connection.execute(text("SELECT COUNT(*) FROM faces")).scalar()
+        return jsonify(count)
+
+    yield app.test_client()
+    engine.dispose()
+    pool.close_all()
+
+
+def test_headers_and_n_plus_one_warning(client, caplog):
+    """Each request reports its own count; repeated statements are logged."""
+    with caplog.at_level(logging.WARNING, logger="utils.db.query_stats"):
+        response = client.get("/n-plus-one")
+
+    assert response.headers["Server-Timing"].startswith("db;dur=")
+    assert response.headers["Server-Timing"].endswith('desc="7 queries"')
+    assert response.headers["X-DB-Queries"].startswith("count=7;")
+    assert response.headers["X-DB-Queries"].endswith("repeated=1")
+    messages = [record.getMessage() for record in caplog.records]
+    assert any("exceeded the query budget of 4" in m for m in messages)
+    assert any("6x (N+1?): SELECT filename FROM faces WHERE id = ?" in m for m in messages)
+
+    orm = client.get("/orm")
+    assert orm.headers["X-DB-Queries"].startswith("count=1;")
+
+
+def test_assert_max_queries(client):
+    """The helper counts the statements of requests made inside the block."""
+    with assert_max_queries(1) as stats:
+        client.get("/orm")
+    assert stats.count == 1
+
+    with pytest.raises(AssertionError, match="ran 7 queries"):
+        with assert_max_queries(3):
+            client.get("/n-plus-one")
@@ -0,0 +1,179 @@
+"""Test Read Routing
+=================
+
+Tests the read-only pool, the per-blueprint routing policy, forcing the
+primary for a write inside a read-routed request, releasing connections
+into the pool that owns them and releasing what a request forgot to close.
+"""
+
+import os
+import sqlite3
+import tempfile
+
+import pytest
+from flask import Blueprint, Flask, jsonify, request
+
+from utils.db import database
+from utils.db.database import (
+    close_db_connection,
+    connection_pool,
+    current_db_route,
+    get_db_connection,
+    get_read_connection,
+    init_connection_release,
+    read_pool,
+    reading,
+    use_primary,
+)
+from utils.db.read_routing import init_read_routing, parse_policy, routes_reads
+
+
+@pytest.fixture
+def pools():
+    path = os.path.join(tempfile.mkdtemp(), "routing.db")
+    previous_url = connection_pool.url
+    connection_pool.close_all()
+    read_pool.close_all()
+    connection_pool.initialize(url=f"sqlite:///{path}", min_size=0, max_size=2, timeout=2)
+
+    conn = get_db_connection()
+    conn.cursor().execute("CREATE TABLE faces (id INTEGER PRIMARY KEY, filename TEXT)")
+    conn.commit()
+    conn.close()
+    yield path
+
+    connection_pool.close_all()
+    read_pool.close_all()
+    connection_pool.url = previous_url
+
+
+def _write(conn, filename):
+    try:
+        conn.cursor().execute("INSERT INTO faces (filename) VALUES (?)", (filename,))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def test_read_pool_follows_the_primary_and_refuses_writes(pools):
+    """Read connections see committed rows from the same database but cannot write."""
+    _write(get_db_connection(), "a.jpg")
+
+    conn = get_read_connection()
+    try:
+        assert conn._pool is read_pool
+        assert read_pool.url == connection_pool.url
+        cursor = conn.cursor()
+        cursor.execute("SELECT filename FROM faces")
+        assert [row["filename"] for row in cursor.fetchall()] == ["a.jpg"]
+        with pytest.raises(sqlite3.OperationalError, match="readonly"):
+            cursor.execute("INSERT INTO faces (filename) VALUES ('b.jpg')")
+    finally:
+        conn.close()
+
+    with reading():
+        conn = get_db_connection()
+        assert conn._pool is read_pool
+        conn.close()
+        with use_primary():
+            conn = get_db_connection()
+            assert conn._pool is connection_pool
+            conn.close()
+
+
+def test_close_db_connection_releases_into_the_owning_pool(pools):
+    """Explicit and implicit closes return read connections to the read pool."""
+    primary = get_db_connection()
+    read = get_read_connection()
+
+    close_db_connection()  # latest checkout: the read connection
+    assert read_pool.stats()["checked_out"] == 0
+    assert connection_pool.stats()["checked_out"] == 1
+
+    read = get_read_connection()
+    close_db_connection(read)
+    assert read_pool.stats()["checked_out"] == 0
+    close_db_connection()
+    assert connection_pool.stats()["checked_out"] == 0
+    assert not primary._checked_out
+    close_db_connection()  # nothing left to release
+
+
+def test_in_memory_database_is_never_split(monkeypatch):
+    """A second connection to :memory: would be empty, so reads stay on the primary."""
+    monkeypatch.setattr(database, "_read_database_url", lambda: "sqlite:///:memory:")
+    assert not database.read_routing_available()
+
+
+def test_policy_parsing():
+    """Names, '*' and '-name' exclusions make up the per-blueprint policy."""
+    policy = parse_policy(" *, -admin ,")
+    assert routes_reads(policy, "search")
+    assert not routes_reads(policy, "admin")
+    assert not routes_reads(policy, None)
+
+    policy = parse_policy("search")
+    assert routes_reads(policy, "search")
+    assert not routes_reads(policy, "social")
+    assert parse_policy("") == (False, set(), set())
+
+
+def test_get_requests_of_listed_blueprints_are_read_routed(pools):
+    """GETs of read blueprints get read-only connections; writes go through use_primary()."""
+    app = Flask("read-routing-test")
+    app.config.update(DATABASE_READ_BLUEPRINTS="*,-admin")
+    init_read_routing(app)
+
+    def view():
+        conn = get_db_connection()
+        try:
+            conn.cursor().execute("INSERT INTO faces (filename) VALUES (?)", (request.method,))
+            conn.commit()
+            written = True
+        except sqlite3.OperationalError:
+            written = False
+        finally:
+            conn.close()
+        if not written:
+            with use_primary():
+                _write(get_db_connection(), "primary")
+        return jsonify(route=current_db_route(), written=written)
+
+    for name in ("search", "admin"):
+        blueprint = Blueprint(name, __name__)
+        blueprint.add_url_rule("/x", "view", view, methods=["GET", "POST"])
+        app.register_blueprint(blueprint, url_prefix=f"/{name}")
+    app.add_url_rule("/plain", "plain", view)
+    client = app.test_client()
+
+    assert client.get("/search/x").json == {"route": "read", "written": False}
+    assert client.post("/search/x").json == {"route": "primary", "written": True}
+    assert client.get("/admin/x").json == {"route": "primary", "written": True}
+    assert client.get("/plain").json == {"route": "primary", "written": True}
+    assert current_db_route() == "primary"
+
+    conn = sqlite3.connect(pools)
+    rows = [row[0] for row in conn.execute("SELECT filename FROM faces ORDER BY id")]
+    conn.close()
+    assert rows == ["primary", "POST", "GET", "GET"]
+
+
+def test_connections_a_request_leaks_are_released(pools):
+    """Teardown returns unclosed connections; ones held before the request stay checked out."""
+    app = Flask("connection-release-test")
+    init_connection_release(app)
+
+    @app.route("/leak")
+    def leak():
+        get_db_connection().cursor().execute("SELECT 1")
+        get_read_connection()
+        return "early return"
+
+    held = get_db_connection()
+    for _ in range(3):  # more than the pool's max_size of 2
+        assert app.test_client().get("/leak").status_code == 200
+
+    assert connection_pool.stats()["checked_out"] == 1
+    assert read_pool.stats()["checked_out"] == 0
+    assert held._checked_out
+    held.close()
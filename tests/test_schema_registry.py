@@ -0,0 +1,72 @@
+"""Test Schema Registry
+====================
+
+Tests one-time table introspection, optional-column migration and the
+cached INSERT/UPDATE statements.
+"""
+
+import sqlite3
+
+from utils.db.schema import SchemaRegistry
+
+
+class _CountingCursor:
+    """sqlite3 cursor that counts introspection queries."""
+
+    def __init__(self, conn):
+        self._cursor = conn.cursor()
+        self.introspections = 0
+
+    def execute(self, sql, params=()):
+        if sql.startswith("SELECT * FROM"):
+            self.introspections += 1
+        return self._cursor.execute(sql, params)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def _db():
+    conn = sqlite3.connect(":memory:")
+    conn.execute(
+        "CREATE TABLE user_matches (id INTEGER PRIMARY KEY, user_id INTEGER, match_filename TEXT, "
+        "is_visible INTEGER, added_at TEXT)"
+    )
+    return conn
+
+
+def test_columns_are_migrated_and_introspected_once():
+    """The first lookup adds the optional columns; later writes skip introspection."""
+    conn = _db()
+    cursor = _CountingCursor(conn)
+    registry = SchemaRegistry()
+
+    for i in range(3):
+        sql, params = registry.insert(
+            cursor, "user_matches", {"user_id": i, "match_filename": f"{i}.jpg", "face_id": 7, "unknown": 1}
+        )
+        cursor.execute(sql, params)
+
+    assert cursor.introspections == 1
+    assert sql == "INSERT INTO user_matches (user_id, match_filename, face_id) VALUES (?, ?, ?)"
+    assert conn.execute("SELECT COUNT(*) FROM user_matches WHERE face_id = 7").fetchone()[0] == 3
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(user_matches)")]
+    assert {"face_id", "privacy_level", "similarity", "post_id"} <= set(columns)
+
+
+def test_update_statement_is_cached_and_invalidated():
+    """UPDATE SQL is reused per column set and rebuilt after invalidate()."""
+    conn = _db()
+    cursor = conn.cursor()
+    registry = SchemaRegistry()
+
+    first, params = registry.update(cursor, "user_matches", {"post_id": 5})
+    again, _ = registry.update(cursor, "user_matches", {"post_id": 6})
+    assert first == "UPDATE user_matches SET post_id = ? WHERE id = ?"
+    assert again is first
+    assert params == [5]
+    assert registry.update(cursor, "user_matches", {"missing": 1}) == (None, [])
+
+    registry.invalidate("user_matches")
+    rebuilt, _ = registry.update(cursor, "user_matches", {"post_id": 7})
+    assert rebuilt == first and rebuilt is not first
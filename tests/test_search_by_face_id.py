@@ -0,0 +1,149 @@
+"""Test Search By Face Id
+======================
+
+Tests "more like this" searches from stored vectors and lock-free index
+searches.
+"""
+
+import pickle
+import sqlite3
+
+import faiss
+import numpy as np
+from flask import Flask
+
+from utils import search_helpers
+from utils.index.faiss_manager import FaissIndexManager
+
+
+class _Conn:
+    """Keeps the in-memory database open across the helper's close()."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self):
+        return self._conn.cursor()
+
+    def close(self):
+        pass
+
+
+class _Encoder:
+    name = "test-similar"
+    match_threshold = 0.6
+
+
+def _vectors():
+    rng = np.random.default_rng(3)
+    return rng.random((5, 8)).astype(np.float32)
+
+
+def _manager(backend, vectors, filenames):
+    manager = FaissIndexManager(backend)
+    manager._index = faiss.IndexFlatL2(vectors.shape[1])
+    manager._index.add(vectors)
+    manager._filenames = filenames
+    manager._loaded = True
+    manager.version = None
+    return manager
+
+
+def _db(vectors):
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute("CREATE TABLE faces (id INTEGER PRIMARY KEY, filename TEXT, encoding BLOB)")
+    for i, vector in enumerate(vectors):
+        conn.execute("INSERT INTO faces VALUES (?, ?, ?)", (i + 1, f"{i}.jpg", pickle.dumps(vector)))
+    return _Conn(conn)
+
+
+def test_reconstruct_by_filename_returns_indexed_vector():
+    """Indexed filenames reconstruct their vector; unknown ones return None."""
+    vectors = _vectors()
+    manager = _manager("test-reconstruct", vectors, [f"{i}.jpg" for i in range(5)])
+
+    assert np.allclose(manager.reconstruct_by_filename("3.jpg"), vectors[3])
+    assert manager.reconstruct_by_filename("missing.jpg") is None
+
+
+def test_search_by_face_id_excludes_the_face_and_skips_encoding(monkeypatch):
+    """The stored vector is searched directly and the face itself is left out."""
+    vectors = _vectors()
+    manager = _manager("test-similar", vectors, [f"{i}.jpg" for i in range(5)])
+    monkeypatch.setattr(search_helpers, "get_backend", lambda name=None: _Encoder())
+    monkeypatch.setattr(search_helpers, "get_db_connection", lambda: _db(vectors))
+    monkeypatch.setattr(
+        search_helpers, "enrich_faiss_matches", lambda raw, user_id, liked: ([dict(m) for m in raw], len(raw))
+    )
+
+    with Flask(__name__).app_context():
+        matches, error = search_helpers.search_by_face_id(3, manager, top_k=3)
+
+    assert error is None
+    assert len(matches) == 3
+    assert "2.jpg" not in [m["filename"] for m in matches]
+    distances = [m["distance"] for m in matches]
+    assert distances == sorted(distances)
+
+
+def test_filters_run_before_enrichment(monkeypatch):
+    """Filtered-out hits are dropped by a filename query; only top_k matches are enriched."""
+    vectors = _vectors()
+    manager = _manager("test-filtered", vectors, [f"{i}.jpg" for i in range(5)])
+    db = _db(vectors)
+    db.cursor().execute("ALTER TABLE faces ADD COLUMN state TEXT")
+    db.cursor().execute("UPDATE faces SET state = CASE WHEN id % 2 = 0 THEN 'TX' ELSE 'OH' END")
+    enriched = []
+
+    def fake_enrich(raw, user_id, liked):
+        enriched.extend(m["filename"] for m in raw)
+        return [dict(m) for m in raw], len(raw)
+
+    monkeypatch.setattr(search_helpers, "get_backend", lambda name=None: _Encoder())
+    monkeypatch.setattr(search_helpers, "get_db_connection", lambda: db)
+    monkeypatch.setattr(search_helpers, "get_read_connection", lambda: db)
+    monkeypatch.setattr(search_helpers, "enrich_faiss_matches", fake_enrich)
+
+    with Flask(__name__).app_context():
+        matches, error = search_helpers.search_by_face_id(1, manager, top_k=1, filters={"state": "TX", "x": "y"})
+
+    assert error is None
+    assert enriched == [m["filename"] for m in matches]
+    assert len(matches) == 1 and matches[0]["filename"] in ("1.jpg", "3.jpg")
+
+
+def test_load_face_vector_falls_back_to_stored_encoding(monkeypatch):
+    """Faces missing from the index use their stored encoding instead."""
+    vectors = _vectors()
+    manager = _manager("test-fallback", vectors[:2], ["0.jpg", "1.jpg"])
+    monkeypatch.setattr(search_helpers, "get_db_connection", lambda: _db(vectors))
+
+    with Flask(__name__).app_context():
+        filename, vector = search_helpers.load_face_vector(5, manager, "dlib")
+        missing = search_helpers.load_face_vector(99, manager, "dlib")
+
+    assert filename == "4.jpg"
+    assert np.allclose(vector, vectors[4])
+    assert missing == (None, None)
+
+
+def test_index_searches_run_outside_the_lock():
+    """Searches use a snapshot, so the manager lock is free while FAISS runs."""
+    vectors = _vectors()
+    manager = _manager("test-snapshot", vectors, [f"{i}.jpg" for i in range(5)])
+    real_index = manager._index
+    held = []
+
+    class _Probe:
+        def search(self, queries, top_k):
+            held.append(manager._lock.locked())
+            return real_index.search(queries, top_k)
+
+    manager._index = _Probe()
+    distances, indices, filenames = manager.search(vectors[2], top_k=1)
+    batch = manager.search_batch(vectors[:2], top_k=1)
+
+    assert filenames == ["2.jpg"]
+    assert [result[2] for result in batch] == [["0.jpg"], ["1.jpg"]]
+    assert held == [False, False]
@@ -0,0 +1,45 @@
+"""Test Search Cache
+=================
+
+Tests the ranked search result cache and its invalidation keys.
+"""
+
+import numpy as np
+from flask import Flask
+
+from extensions import cache
+from utils import search_cache
+
+
+def _app():
+    app = Flask(__name__)
+    app.config.update(CACHE_TYPE="SimpleCache", SEARCH_CACHE_ENABLED=True)
+    cache.init_app(app)
+    return app
+
+
+def test_results_key_changes_with_index_version_and_filters():
+    """Index rebuilds, filters and top_k each produce a new key."""
+    encoding = np.ones(128)
+    key = search_cache.results_key(encoding, "dlib:1:10", 50)
+
+    assert key == search_cache.results_key(encoding.copy(), "dlib:1:10", 50)
+    assert key != search_cache.results_key(encoding, "dlib:2:11", 50)
+    assert key != search_cache.results_key(encoding, "dlib:1:10", 20)
+    assert key != search_cache.results_key(encoding, "dlib:1:10", 50, {"state": "TX"})
+    assert key != search_cache.results_key(encoding * 2, "dlib:1:10", 50)
+
+
+def test_encoding_cache_follows_photo_fingerprint(tmp_path):
+    """Re-uploading the photo changes the fingerprint and misses the cache."""
+    photo = tmp_path / "me.jpg"
+    photo.write_bytes(b"one")
+    with _app().app_context():
+        fingerprint = search_cache.photo_fingerprint(str(photo))
+        search_cache.store_encoding("dlib", fingerprint, np.arange(128, dtype=np.float64))
+
+        assert search_cache.get_cached_encoding("dlib", fingerprint)[5] == 5.0
+        assert search_cache.get_cached_encoding("arcface", fingerprint) is None
+
+        photo.write_bytes(b"a new photo")
+        assert search_cache.get_cached_encoding("dlib", search_cache.photo_fingerprint(str(photo))) is None
@@ -0,0 +1,71 @@
+"""Test Search Pagination
+======================
+
+Tests cursor-based paging over the cached ranked search list.
+"""
+
+import numpy as np
+from flask import Flask
+
+from extensions import cache
+from utils import search_cache, search_helpers
+
+
+def _app():
+    app = Flask(__name__)
+    app.secret_key = "test-secret"
+    app.config.update(CACHE_TYPE="SimpleCache", SEARCH_CACHE_ENABLED=True, SEARCH_RANKED_DEPTH=5)
+    cache.init_app(app)
+    return app
+
+
+def test_cursor_round_trip_and_tampering():
+    """Cursors decode only for the viewer they were issued to and reject edits."""
+    with _app().app_context():
+        key = search_cache.results_key(np.zeros(128), "v1", 500)
+        cursor = search_cache.encode_cursor(key, 50, current_user_id=7)
+
+        assert search_cache.decode_cursor(cursor, current_user_id=7) == (key, 50)
+        assert search_cache.decode_cursor(cursor, current_user_id=8) is None
+        assert search_cache.decode_cursor(cursor[:-2] + "xx", current_user_id=7) is None
+        assert search_cache.decode_cursor("not-a-cursor", current_user_id=7) is None
+
+
+def test_pages_follow_cached_ranking(monkeypatch):
+    """Only the first page ranks; later pages enrich their own slice."""
+    ranked = [{"id": i, "filename": f"{i}.jpg", "similarity": 100 - i} for i in range(5)]
+    calls = {"rank": 0, "enriched": []}
+
+    def fake_rank(path, manager, depth=None, backend=None, filters=None):
+        calls["rank"] += 1
+        key = search_cache.results_key(np.zeros(128), "v1", depth, filters)
+        search_cache.store_ranked(key, ranked)
+        return key, ranked, None
+
+    def fake_enrich(raw, current_user_id, liked):
+        calls["enriched"].append([m["id"] for m in raw])
+        return [dict(m) for m in raw], len(raw)
+
+    monkeypatch.setattr(search_helpers, "get_ranked_faiss_matches", fake_rank)
+    monkeypatch.setattr(search_helpers, "enrich_faiss_matches", fake_enrich)
+
+    with _app().app_context():
+        first, cursor, error = search_helpers.get_enriched_faiss_page("me.jpg", None, 7, set(), page_size=2)
+        assert error is None and [m["id"] for m in first] == [0, 1]
+
+        second, cursor, _ = search_helpers.get_enriched_faiss_page("me.jpg", None, 7, set(), page_size=2, cursor=cursor)
+        third, last_cursor, _ = search_helpers.get_enriched_faiss_page("me.jpg", None, 7, set(), page_size=2, cursor=cursor)
+
+        assert [m["id"] for m in second] == [2, 3]
+        assert [m["id"] for m in third] == [4]
+        assert last_cursor is None
+        assert calls["rank"] == 1
+        assert calls["enriched"] == [[0, 1], [2, 3], [4]]
+
+        _, _, error = search_helpers.get_enriched_faiss_page("me.jpg", None, 8, set(), page_size=2, cursor=cursor)
+        assert error == "Invalid or expired cursor."
+
+        # Repeating a search re-enriches its page, so like counts are never stale
+        search_helpers.get_enriched_faiss_page("me.jpg", None, 7, set(), page_size=2)
+        assert calls["enriched"][-1] == [0, 1]
+        assert calls["rank"] == 2
@@ -0,0 +1,99 @@
+"""Test Text Prefix Index
+======================
+
+Tests ranked prefix queries and user refreshes in the text index.
+"""
+
+import time
+
+from utils.index.text_index import (
+    CLAIM, LOCATION, SCHOOL, USER, YEAR, TextPrefixIndex, text_index, user_changed, user_removed,
+)
+
+
+def _user(user_id, username, first="", last="", visibility="public"):
+    return (user_id, username, first, last, None, "Austin", "TX", None, visibility)
+
+
+def _index():
+    index = TextPrefixIndex(ttl_seconds=0)
+    index.build(
+        face_terms={
+            SCHOOL: [("Lincoln High School", 40), ("Lincoln Middle School", 5), ("Abraham Lincoln Academy", 90)],
+            YEAR: [("1985", 12), ("1998", 3)],
+            LOCATION: [("TX", 30)],
+        },
+        user_rows=[_user(1, "linc0ln", "Abe"), _user(2, "hidden", "Lincoln", visibility="private")],
+        claim_rows=[(7, "Grandfather", "My grandpa in Lincoln High")],
+    )
+    return index
+
+
+def test_prefix_search_ranks_leading_matches_then_weight():
+    """Labels starting with the query rank first, then by row count."""
+    hits = _index().search("linc", kinds=(SCHOOL,))
+    assert [hit["text"] for hit in hits] == [
+        "Lincoln High School", "Lincoln Middle School", "Abraham Lincoln Academy",
+    ]
+    assert [hit["text"] for hit in _index().search("lincoln hi", kinds=(SCHOOL,))] == ["Lincoln High School"]
+    assert [hit["text"] for hit in _index().search("19", kinds=(YEAR,))] == ["1985", "1998"]
+
+
+def test_user_refs_respect_visibility_and_extra_terms():
+    """Users match on names as well as usernames; autocomplete hides private users."""
+    index = _index()
+    assert index.refs("lincoln", USER) == [2]
+    assert index.refs("abe", USER) == [1]
+    assert [hit["text"] for hit in index.search("lin", kinds=(USER,), public_only=True)] == ["linc0ln"]
+    assert index.refs("grandfather", CLAIM) == [7]
+
+
+def test_remove_user_and_query_latency():
+    """Removed users disappear; prefix queries stay fast on a large index."""
+    index = _index()
+    index.remove_user(1)
+    assert index.refs("abe", USER) == []
+
+    big = TextPrefixIndex(ttl_seconds=0)
+    big.build(
+        face_terms={SCHOOL: [(f"School {n} of Springfield", n) for n in range(50000)]},
+        user_rows=[], claim_rows=[],
+    )
+    start = time.perf_counter()
+    hits = big.search("school 4999", limit=10)
+    assert (time.perf_counter() - start) < 0.05
+    assert hits[0]["text"] == "School 4999 of Springfield"
+
+
+def test_removed_user_takes_only_their_own_locations():
+    """A user's city goes with them unless another user or yearbook faces also have it."""
+    index = TextPrefixIndex(ttl_seconds=0)
+    index.build(
+        face_terms={LOCATION: [("TX", 30)]},
+        user_rows=[
+            (1, "ann", "", "", None, "Austin", "TX", None, "public"),
+            (2, "bob", "", "", None, "Boise", "ID", None, "public"),
+            (3, "cat", "", "", None, "Boise", "ID", None, "public"),
+        ],
+        claim_rows=[],
+    )
+    index.remove_user(1)
+    assert index.search("austin", kinds=(LOCATION,)) == []
+    assert [hit["text"] for hit in index.search("tx", kinds=(LOCATION,))] == ["TX"]
+
+    index.remove_user(2)
+    assert [hit["text"] for hit in index.search("boise", kinds=(LOCATION,))] == ["Boise"]
+    index.remove_user(3)
+    assert index.search("boise", kinds=(LOCATION,)) == []
+    assert index.search("id", kinds=(LOCATION,)) == []
+
+
+def test_hooks_never_raise(monkeypatch):
+    """A failing refresh is logged instead of failing the request that saved the user."""
+    def broken(user_id):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(text_index, "refresh_user", broken)
+    monkeypatch.setattr(text_index, "remove_user", broken)
+    user_changed(1)
+    user_removed(1)
@@ -0,0 +1,65 @@
+"""Test Thumbnails
+===============
+
+Tests thumbnail size selection, format negotiation and generation.
+"""
+
+import os
+
+from PIL import Image
+
+from utils.files.thumbnails import (
+    THUMBNAIL_SIZES,
+    generate_thumbnails,
+    get_thumbnail,
+    negotiate_format,
+    pick_size,
+    supported_formats,
+    thumbnail_path,
+)
+
+
+def test_pick_size_snaps_up():
+    """Requested sizes snap to the smallest thumbnail that covers them."""
+    assert pick_size("96") == 96
+    assert pick_size(100) == 192
+    assert pick_size("10000") is None
+    assert pick_size("abc") is None
+    assert pick_size(None) is None
+
+
+def test_negotiate_format():
+    """A format is only chosen when the client advertises it."""
+    if "avif" in supported_formats():
+        assert negotiate_format("image/avif,image/webp,*/*") == "avif"
+    if "webp" in supported_formats():
+        assert negotiate_format("image/webp,*/*") == "webp"
+    assert negotiate_format("*/*") is None
+    assert negotiate_format(None) is None
+
+
+def test_generate_thumbnails(tmp_path):
+    """Every size/format pair is written once and reused when up to date."""
+    source = str(tmp_path / "face.jpg")
+    Image.new("RGB", (400, 300), (120, 80, 60)).save(source)
+
+    expected = len(THUMBNAIL_SIZES) * len(supported_formats())
+    assert generate_thumbnails(source) == expected
+    assert generate_thumbnails(source) == 0
+
+    path = thumbnail_path(source, 96, "webp")
+    with Image.open(path) as thumb:
+        assert thumb.size == (96, 96)
+
+
+def test_get_thumbnail_generates_on_miss(tmp_path):
+    """A missing thumbnail is created lazily when served."""
+    source = str(tmp_path / "face.jpg")
+    Image.new("RGB", (200, 200)).save(source)
+
+    path, mimetype = get_thumbnail(source, 192, "image/webp")
+    assert os.path.exists(path)
+    assert mimetype == "image/webp"
+    assert get_thumbnail(source, 150, "image/webp") is None
+    assert get_thumbnail(source, 192, "image/jpeg,*/*") is None
+    assert not [name for name in os.listdir(os.path.dirname(path)) if name.endswith(".tmp")]
@@ -0,0 +1,147 @@
+"""Test Top Matches
+================
+
+Tests the materialised user_top_matches refresh and staleness detection.
+"""
+
+import os
+import pickle
+import sqlite3
+
+import faiss
+import numpy as np
+from flask import Flask
+
+from utils.face.top_matches import (
+    TopMatchRefresher,
+    ensure_top_matches_tables,
+    refresh_user_top_matches,
+    users_displaced_by_faces,
+    users_missing_top_matches,
+)
+from utils.index.faiss_manager import FaissIndexManager
+from utils.index.user_index import RegisteredUserIndex
+
+
+class _FakeIndex:
+    version = "dlib:1:4"
+
+    def search(self, query, top_k=20):
+        filenames = ["own.jpg", "a.jpg", "b.jpg", "c.jpg"][:top_k]
+        distances = [0.1, 0.2, 0.3, 0.4][:top_k]
+        return distances, list(range(len(filenames))), filenames
+
+
+def _db():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, face_encoding BLOB, profile_image TEXT, "
+                 "username TEXT, current_location_city TEXT, current_location_state TEXT)")
+    conn.execute("CREATE TABLE faces (id INTEGER PRIMARY KEY, filename TEXT, claimed_by_user_id INTEGER)")
+    conn.executemany("INSERT INTO faces (id, filename, claimed_by_user_id) VALUES (?, ?, ?)",
+                     [(1, "own.jpg", 7), (2, "a.jpg", None), (3, "b.jpg", None), (4, "c.jpg", None)])
+    conn.execute("INSERT INTO users (id, face_encoding) VALUES (7, ?)", (np.zeros(128).tobytes(),))
+    ensure_top_matches_tables(conn.cursor())
+    return conn
+
+
+def test_refresh_stores_ranked_rows_without_own_faces():
+    """Rows are ranked by distance and skip the user's claimed face."""
+    conn = _db()
+    assert users_missing_top_matches(conn.cursor()) == [7]
+
+    assert refresh_user_top_matches(conn, 7, _FakeIndex(), top_k=2) == 2
+    rows = conn.execute("SELECT rank, face_id, distance FROM user_top_matches WHERE user_id = 7 "
+                        "ORDER BY rank").fetchall()
+    assert rows == [(1, 2, 0.2), (2, 3, 0.3)]
+    assert conn.execute("SELECT kth_distance FROM user_top_match_state").fetchone()[0] == 0.3
+    assert users_missing_top_matches(conn.cursor()) == []
+
+    # A new photo changes the encoding hash and marks the user stale again
+    conn.execute("UPDATE users SET face_encoding = ? WHERE id = 7", (np.ones(128).tobytes(),))
+    assert users_missing_top_matches(conn.cursor()) == [7]
+
+
+def test_new_faces_displace_only_nearby_users():
+    """A new face only triggers users whose K-th match it beats."""
+    conn = _db()
+    # K-th distances are squared L2, as stored from the face index
+    conn.execute("INSERT INTO user_top_match_state (user_id, encoding_hash, kth_distance) VALUES "
+                 "(1, 'x', 0.25), (2, 'y', 0.01)")
+    user_index = RegisteredUserIndex()
+    user_index.build([
+        (1, "near", "a.jpg", np.zeros(128).tobytes(), None, None, None),
+        (2, "tight", "b.jpg", np.zeros(128).tobytes(), None, None, None),
+    ])
+
+    new_face = np.zeros(128, dtype=np.float32)
+    new_face[0] = 0.3
+    assert users_displaced_by_faces(conn.cursor(), [new_face], user_index) == {1}
+
+
+def test_displacement_compares_real_index_distances():
+    """A face closer than the stored K-th match displaces it, with both indexes' real distances."""
+    conn = _db()
+    faces = np.zeros((3, 128), dtype=np.float32)
+    faces[1, 0], faces[2, 0] = 0.5, 0.7  # a.jpg, b.jpg
+    manager = FaissIndexManager("displacetest")
+    manager._index = faiss.IndexFlatL2(128)
+    manager._index.add(faces)
+    manager._filenames = ["own.jpg", "a.jpg", "b.jpg"]
+    manager._loaded = True
+    manager.version = None
+    assert refresh_user_top_matches(conn, 7, manager, top_k=1) == 1
+
+    user_index = RegisteredUserIndex()
+    user_index.build([(7, "me", "me.jpg", np.zeros(128).tobytes(), None, None, None)])
+    closer, farther = np.zeros(128, dtype=np.float32), np.zeros(128, dtype=np.float32)
+    closer[0], farther[0] = 0.45, 0.55
+    assert users_displaced_by_faces(conn.cursor(), [closer], user_index) == {7}
+    assert users_displaced_by_faces(conn.cursor(), [farther], user_index) == set()
+
+
+def test_new_face_vectors_come_from_one_index_snapshot():
+    """Faces added since the last sweep are read from the index version that listed them."""
+    def install(manager, count, version):
+        index = faiss.IndexFlatL2(4)
+        index.add(np.arange(count * 4, dtype=np.float32).reshape(count, 4))
+        manager._index, manager._filenames, manager.version = index, [f"{i}.jpg" for i in range(count)], version
+
+    manager = FaissIndexManager("snapshottest")
+    refresher = TopMatchRefresher()
+    install(manager, 2, "v1")
+    assert refresher._new_face_vectors(manager) == []
+
+    install(manager, 4, "v2")
+    vectors = refresher._new_face_vectors(manager)
+    assert [list(v) for v in vectors] == [[8, 9, 10, 11], [12, 13, 14, 15]]
+    assert refresher._new_face_vectors(manager) == []
+
+
+def test_long_running_process_sees_rebuilt_index(tmp_path):
+    """reload_if_changed re-reads an index file rewritten by another process."""
+    index_path = str(tmp_path / "faces.index")
+    map_path = str(tmp_path / "faces_filenames.pkl")
+
+    def write(count, mtime):
+        index = faiss.IndexFlatL2(4)
+        index.add(np.zeros((count, 4), dtype=np.float32))
+        faiss.write_index(index, index_path.replace(".index", ".reloadtest.index"))
+        with open(map_path.replace(".pkl", ".reloadtest.pkl"), "wb") as f:
+            pickle.dump([f"{i}.jpg" for i in range(count)], f)
+        os.utime(index_path.replace(".index", ".reloadtest.index"), ns=(mtime, mtime))
+
+    # Paths come from the app config, also when another fixture's app context is active
+    app = Flask(__name__)
+    app.config.update(INDEX_PATH=index_path, MAP_PATH=map_path)
+    with app.app_context():
+        manager = FaissIndexManager("reloadtest")
+        write(2, 10 ** 18)
+        assert manager.reload_if_changed()
+        assert manager._index.ntotal == 2
+        assert not manager.file_changed()
+
+        write(3, 2 * 10 ** 18)
+        assert manager.load_index() and manager._index.ntotal == 2  # plain load keeps the stale copy
+        assert manager.file_changed()
+        assert manager.reload_if_changed()
+        assert manager._index.ntotal == 3
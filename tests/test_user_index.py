@@ -0,0 +1,85 @@
+"""Test Registered User Index
+=========================
+
+Tests the FAISS index over registered users' face encodings and searching
+it outside the lock.
+"""
+
+import numpy as np
+
+from utils.index import user_index
+from utils.index.user_index import RegisteredUserIndex
+
+
+def _row(user_id, vector, profile_image="me.jpg", claimed=None):
+    blob = np.asarray(vector, dtype=np.float64).tobytes()
+    return (user_id, f"user{user_id}", profile_image, blob, "Austin", "TX", claimed)
+
+
+def test_search_returns_nearest_users_excluding_searcher():
+    """kNN over user vectors, nearest first, with true L2 distances."""
+    base = np.zeros(128)
+    near = base.copy()
+    near[0] = 0.3
+    far = base.copy()
+    far[0] = 0.9
+
+    index = RegisteredUserIndex()
+    count = index.build([
+        _row(1, base),
+        _row(2, far),
+        _row(3, near),
+        _row(4, near, profile_image="default.png"),  # no usable image, skipped
+        _row(5, near, profile_image="default.png", claimed="userprofile_5.jpg"),
+        _row(6, np.zeros(64)),  # wrong dimension, skipped
+    ])
+
+    assert count == 4
+    hits = index.search(base, top_k=2, exclude_user_id=1)
+    assert [hit["user_id"] for hit in hits] == [3, 5]
+    assert abs(hits[0]["distance"] - 0.3) < 1e-5
+    assert hits[1]["claimed_filename"] == "userprofile_5.jpg"
+
+
+def test_remove_user_drops_vector():
+    """Removed users no longer appear in results."""
+    index = RegisteredUserIndex()
+    index.build([_row(1, np.zeros(128)), _row(2, np.ones(128))])
+
+    index.remove_user(1)
+
+    assert [hit["user_id"] for hit in index.search(np.zeros(128))] == [2]
+    assert len(index) == 1
+
+
+def test_index_is_rebuilt_after_ttl(monkeypatch):
+    """Users added on other workers show up once the TTL has passed."""
+    index = RegisteredUserIndex(ttl_seconds=60)
+    index.build([_row(1, np.zeros(128))])
+    monkeypatch.setattr(index, "build", lambda rows=None: RegisteredUserIndex.build(
+        index, [_row(1, np.zeros(128)), _row(2, np.zeros(128))]
+    ))
+
+    assert len(index.ensure_loaded()) == 1
+    later = user_index.time.monotonic() + 61
+    monkeypatch.setattr(user_index.time, "monotonic", lambda: later)
+    assert len(index.ensure_loaded()) == 2
+
+
+def test_search_runs_outside_the_lock_on_a_snapshot(monkeypatch):
+    """The lock is free while FAISS runs; a removal mid-search does not touch the searched copy."""
+    index = RegisteredUserIndex()
+    index.build([_row(1, np.zeros(128)), _row(2, np.ones(128))])
+    held = []
+
+    def run_blocking(fn, *args, **kwargs):
+        held.append(index._lock.locked())
+        index.remove_user(2)  # another greenlet changing the index meanwhile
+        return fn(*args)
+
+    monkeypatch.setattr(user_index, "run_blocking", run_blocking)
+    hits = index.search(np.zeros(128))
+
+    assert held == [False]
+    assert [hit["user_id"] for hit in hits] == [1, 2]
+    assert [hit["user_id"] for hit in index.search(np.zeros(128))] == [1]
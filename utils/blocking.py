@@ -0,0 +1,143 @@
+"""
+Blocking Call Offload
+=====================
+
+Gunicorn runs gevent workers, but sqlite3 queries, FAISS searches and
+dlib/ONNX encoders are C calls that never yield to the hub: one slow search
+would stall every other connection on the worker. :func:`run_blocking`
+runs such calls on a bounded native thread pool and parks only the calling
+greenlet until the result is ready.
+
+Two pools keep the kinds of work apart:
+
+- ``DB``: database round trips (many, short; ``BLOCKING_DB_THREADS``)
+- ``CPU``: index searches and face encoding (few, long; ``BLOCKING_CPU_THREADS``),
+  so heavy searches cannot take every thread from the database calls
+
+When gevent has not patched ``threading`` (tests, scripts, the Flask dev
+server), or the caller is already a pool thread, calls run inline.
+The caller's context variables (Flask app and request context) are copied
+into the pool thread.
+"""
+
+import contextvars
+import functools
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+DB = "db"
+CPU = "cpu"
+
+_DEFAULT_THREADS = {DB: 8, CPU: 2}
+_SETTING_NAMES = {DB: "BLOCKING_DB_THREADS", CPU: "BLOCKING_CPU_THREADS"}
+
+_pools = {}
+_worker_idents = set()
+_stats = {kind: {"calls": 0, "inline": 0, "busy_seconds": 0.0} for kind in _DEFAULT_THREADS}
+
+
+def _setting(name, default):
+    try:
+        from flask import current_app
+
+        return current_app.config.get(name, default)
+    except RuntimeError:
+        # Not in Flask context
+        from config import get_config
+
+        return getattr(get_config(), name, default)
+
+
+def _native_ident():
+    from gevent import monkey
+
+    return monkey.get_original("_thread", "get_ident")()
+
+
+def offload_active():
+    """True when calls are sent to the native thread pools."""
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    if not monkey.is_module_patched("threading"):
+        return False
+    if _native_ident() in _worker_idents:
+        # Already on a pool thread; nesting would only add a hop (or deadlock a full pool)
+        return False
+    return bool(_setting("BLOCKING_OFFLOAD_ENABLED", True))
+
+
+def _get_pool(kind):
+    pool = _pools.get(kind)
+    if pool is None:
+        from gevent.threadpool import ThreadPool
+
+        size = int(_setting(_SETTING_NAMES[kind], _DEFAULT_THREADS[kind]))
+        pool = _pools.setdefault(kind, ThreadPool(size))
+        logger.info(f"Blocking offload pool '{kind}' started with {size} threads")
+    return pool
+
+
+def _run_in_worker(context, fn, args, kwargs):
+    ident = _native_ident()
+    _worker_idents.add(ident)
+    try:
+        return context.run(fn, *args, **kwargs)
+    finally:
+        _worker_idents.discard(ident)
+
+
+def run_blocking(fn, *args, kind=DB, **kwargs):
+    """
+    Call ``fn(*args, **kwargs)`` without blocking the gevent hub.
+
+    Args:
+        fn: Callable that may block in C code
+        kind: ``DB`` or ``CPU`` pool
+
+    Returns:
+        Whatever ``fn`` returns; its exceptions propagate to the caller.
+    """
+    stats = _stats[kind]
+    stats["calls"] += 1
+    if not offload_active():
+        stats["inline"] += 1
+        return fn(*args, **kwargs)
+
+    started = time.monotonic()
+    try:
+        # spawn() waits cooperatively while every thread is busy, bounding concurrency
+        return _get_pool(kind).spawn(
+            _run_in_worker, contextvars.copy_context(), fn, args, kwargs
+        ).get()
+    finally:
+        stats["busy_seconds"] += time.monotonic() - started
+
+
+def blocking(kind=DB):
+    """Decorator form of :func:`run_blocking`."""
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            return run_blocking(fn, *args, kind=kind, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def offload_stats():
+    """Per-pool call counts, inline runs and time spent waiting on pool threads."""
+    stats = {}
+    for kind, counters in _stats.items():
+        pool = _pools.get(kind)
+        stats[kind] = dict(
+            counters,
+            threads=pool.maxsize if pool is not None else 0,
+            queued=pool.task_queue.qsize() if pool is not None else 0,
+        )
+    return stats
@@ -173,7 +173,7 @@ def create_match_card_context(
         # Fallback to direct match image endpoint if we have an ID
         match_id = match.get("match_id") or match.get("id")
         if match_id:
-            image_url = f"/direct-match-image/{match_id}"
+            image_url = f"/direct-match-image/{match_id}?size=192"
         else:
             image_url = "/static/default_profile.png"
 
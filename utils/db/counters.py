@@ -0,0 +1,193 @@
+"""
+Denormalised Counters
+=====================
+
+Like, follower and match counts kept in one ``counters`` table
+(name, entity_id, value) instead of ``COUNT(*)`` on every read.
+
+Write paths bump the counter in the same transaction as the row they
+insert or delete (:func:`bump` for raw cursors, :func:`bump_session` for
+SQLAlchemy sessions), so a count never commits without its row. Reads are
+primary-key lookups: one query for a single count or a whole grid of cards
+(:func:`get_counts`).
+
+Anything written around these helpers (imports, manual SQL, old code paths)
+is repaired by :func:`reconcile`, which recounts each source table; run it
+with ``python manage.py reconcile_counters``. Counters with no row read as
+0. The table is created and backfilled (:func:`ensure_counters_table`) by
+``create_app``, by ``run_migrations`` and before each reconciliation, so a
+database that predates it is upgraded on the next deploy.
+"""
+
+import logging
+import time
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+FACE_LIKES = "face_likes"
+POST_LIKES = "post_likes"
+FOLLOWERS = "followers"
+FOLLOWING = "following"
+USER_MATCHES = "user_matches"
+
+# Counter name: (source table, column holding the counted entity id)
+SOURCES = {
+    FACE_LIKES: ("face_likes", "face_id"),
+    POST_LIKES: ("likes", "post_id"),
+    FOLLOWERS: ("follows", "followed_id"),
+    FOLLOWING: ("follows", "follower_id"),
+    USER_MATCHES: ("user_matches", "user_id"),
+}
+
+_CREATE_SQL = """
+    CREATE TABLE IF NOT EXISTS counters (
+        name TEXT NOT NULL,
+        entity_id INTEGER NOT NULL,
+        value INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (name, entity_id)
+    )
+"""
+# Increments upsert; decrements never create a row or go below zero
+_INCREMENT_TEMPLATE = """
+    INSERT INTO counters (name, entity_id, value) VALUES ({name}, {entity_id}, {delta})
+    ON CONFLICT (name, entity_id) DO UPDATE SET value = counters.value + excluded.value
+"""
+_DECREMENT_TEMPLATE = """
+    UPDATE counters SET value = CASE WHEN value + {delta} < 0 THEN 0 ELSE value + {delta} END
+    WHERE name = {name} AND entity_id = {entity_id}
+"""
+_INCREMENT_SQL = _INCREMENT_TEMPLATE.format(name="?", entity_id="?", delta="?")
+_DECREMENT_SQL = _DECREMENT_TEMPLATE.format(name="?", entity_id="?", delta="?")
+_SESSION_PARAMS = {"name": ":name", "entity_id": ":entity_id", "delta": ":delta"}
+_INCREMENT_SESSION_SQL = text(_INCREMENT_TEMPLATE.format(**_SESSION_PARAMS))
+_DECREMENT_SESSION_SQL = text(_DECREMENT_TEMPLATE.format(**_SESSION_PARAMS))
+_GET_SESSION_SQL = text("SELECT value FROM counters WHERE name = :name AND entity_id = :entity_id")
+_SET_SQL = """
+    INSERT INTO counters (name, entity_id, value) VALUES (?, ?, ?)
+    ON CONFLICT (name, entity_id) DO UPDATE SET value = excluded.value
+"""
+
+def ensure_counters_table(cursor):
+    """
+    Create the ``counters`` table if missing and backfill it while it is empty.
+
+    Returns:
+        bool: True if the counters were backfilled
+    """
+    cursor.execute(_CREATE_SQL)
+    cursor.execute("SELECT 1 FROM counters LIMIT 1")
+    if cursor.fetchone():
+        return False
+    reconcile(cursor)
+    logger.info("Backfilled the counters table")
+    return True
+
+
+def bump(cursor, name, entity_id, delta=1):
+    """Add ``delta`` to a counter inside the caller's transaction."""
+    if entity_id is None or not delta:
+        return
+    if delta > 0:
+        cursor.execute(_INCREMENT_SQL, (name, entity_id, delta))
+    else:
+        cursor.execute(_DECREMENT_SQL, (delta, delta, name, entity_id))
+
+
+def bump_session(session, name, entity_id, delta=1):
+    """:func:`bump` for a SQLAlchemy session; committed with the session."""
+    if entity_id is None or not delta:
+        return
+    sql = _INCREMENT_SESSION_SQL if delta > 0 else _DECREMENT_SESSION_SQL
+    session.execute(sql, {"name": name, "entity_id": entity_id, "delta": delta})
+
+
+def get_counts(cursor, name, entity_ids):
+    """
+    Counter values for many entities in one query.
+
+    Returns:
+        dict: {entity_id: value}; entities without a counter are left out (count 0)
+    """
+    entity_ids = [entity_id for entity_id in set(entity_ids) if entity_id is not None]
+    if not entity_ids:
+        return {}
+    placeholders = ",".join("?" * len(entity_ids))
+    cursor.execute(
+        f"SELECT entity_id, value FROM counters WHERE name = ? AND entity_id IN ({placeholders})",
+        [name] + entity_ids,
+    )
+    return {row[0]: row[1] for row in cursor.fetchall()}
+
+
+def get_count(cursor, name, entity_id):
+    return get_counts(cursor, name, [entity_id]).get(entity_id, 0)
+
+
+def get_count_session(session, name, entity_id):
+    """:func:`get_count` for a SQLAlchemy session."""
+    value = session.execute(_GET_SESSION_SQL, {"name": name, "entity_id": entity_id}).scalar()
+    return value or 0
+
+
+def reconcile(cursor, names=None):
+    """
+    Recount the source tables and repair counters that drifted.
+
+    Args:
+        names: Counters to check (default: all of ``SOURCES``)
+
+    Returns:
+        dict: {name: number of counters repaired}; counters whose source
+        table does not exist are skipped
+    """
+    repaired = {}
+    for name in names or SOURCES:
+        table, column = SOURCES[name]
+        try:
+            cursor.execute(
+                f"SELECT {column}, COUNT(*) FROM {table} WHERE {column} IS NOT NULL GROUP BY {column}"
+            )
+        except Exception as e:
+            logger.warning(f"Skipping counter {name}: {e}")
+            continue
+        actual = {row[0]: row[1] for row in cursor.fetchall()}
+        cursor.execute("SELECT entity_id, value FROM counters WHERE name = ?", (name,))
+        stored = {row[0]: row[1] for row in cursor.fetchall()}
+
+        fixes = [(name, entity_id, n) for entity_id, n in actual.items() if stored.get(entity_id) != n]
+        fixes += [(name, entity_id, 0) for entity_id, value in stored.items() if entity_id not in actual and value]
+        if fixes:
+            cursor.executemany(_SET_SQL, fixes)
+            logger.info(f"Repaired {len(fixes)} '{name}' counters")
+        repaired[name] = len(fixes)
+    return repaired
+
+
+def run_reconciliation(interval=None):
+    """
+    Reconcile every counter once, or every ``interval`` seconds, creating
+    the table first if it is missing.
+
+    Returns:
+        dict: The repairs of the last pass
+    """
+    from utils.db.database import get_db_connection
+
+    while True:
+        conn = get_db_connection()
+        try:
+            cursor = conn.cursor()
+            ensure_counters_table(cursor)
+            repaired = reconcile(cursor)
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Counter reconciliation failed: {e}")
+            conn.rollback()
+            repaired = {}
+        finally:
+            conn.close()
+        if not interval:
+            return repaired
+        time.sleep(interval)
@@ -1,5 +1,9 @@
+import collections
+import contextvars
+import itertools
 import logging
-from flask import current_app
+import sqlite3
+from flask import current_app, g, request
 from extensions import db
 from contextlib import contextmanager
 import atexit
@@ -11,12 +15,13 @@ from threading import Lock
 import os
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.ext.declarative import declarative_base
 from config import get_config
-from sqlalchemy.pool import QueuePool
+from utils.blocking import run_blocking
+from sqlalchemy.pool import NullPool, QueuePool
 import urllib.parse
-from sqlalchemy.exc import SQLAlchemyError
 
 """
 Database Utilities
@@ -25,12 +30,9 @@ Database Utilities
 Provides helper functions for database access, queries, and migrations.
 """
 
-# Global connection pool with thread safety
-_connection_pool = {}
-_connection_lock = threading.Lock()
-_connection_last_used = {}
+logger = logging.getLogger(__name__)
 
-# Add these constants at the top of the file
+# Retry settings for opening new connections
 MAX_RETRIES = 3
 RETRY_DELAY = 1  # seconds
 CONNECTION_TIMEOUT = 30  # seconds
@@ -58,161 +60,721 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # Create base class for models
 Base = declarative_base()
 
-def _cleanup_connections():
-    """Clean up all database connections when the application exits."""
-    with _connection_lock:
-        for conn in _connection_pool.values():
-            try:
-                conn.close()
-            except Exception as e:
-                logging.error(f"Error closing database connection during cleanup: {e}")
-        _connection_pool.clear()
-        _connection_last_used.clear()
 
-atexit.register(_cleanup_connections)
+# --- Connection pool ---
+
+try:
+    from greenlet import getcurrent as _current_task
+except ImportError:  # pragma: no cover - greenlet ships with gevent/SQLAlchemy
+    _current_task = threading.current_thread
+
 
-def _validate_connection(conn):
-    """Validate if a connection is still alive and usable."""
+def sqlite_pragmas(raw_conn):
+    """Per-connection SQLite tuning: WAL, mmap and a larger page cache."""
+    cursor = raw_conn.cursor()
     try:
-        # Try a simple query
-        conn.execute("SELECT 1")
-        return True
-    except Exception as e:
-        logging.error(f"Connection validation failed: {e}")
-        return False
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute(f"PRAGMA mmap_size={int(getattr(config, 'SQLITE_MMAP_SIZE', 268435456))}")
+        cursor.execute(f"PRAGMA cache_size={int(getattr(config, 'SQLITE_CACHE_SIZE', -65536))}")
+    finally:
+        cursor.close()
+
+
+def sqlite_setup_hook(raw_conn):
+    """Setup for pooled SQLite connections: name-addressable rows plus :func:`sqlite_pragmas`."""
+    raw_conn.row_factory = sqlite3.Row
+    sqlite_pragmas(raw_conn)
+
+
+def sqlite_query_only_hook(raw_conn):
+    """Refuse writes on read-pool SQLite connections (after WAL is set up)."""
+    raw_conn.execute("PRAGMA query_only=ON")
+
+
+def read_only_session_hook(raw_conn):
+    """Make every transaction on a read-pool server connection READ ONLY."""
+    cursor = raw_conn.cursor()
+    try:
+        cursor.execute("SET SESSION CHARACTERISTICS AS TRANSACTION READ ONLY")
+    finally:
+        cursor.close()
+    raw_conn.commit()
+
+
+def _default_setup_hooks(url, readonly):
+    if url.startswith("sqlite"):
+        return [sqlite_setup_hook, sqlite_query_only_hook] if readonly else [sqlite_setup_hook]
+    return [read_only_session_hook] if readonly else []
+
+
+class PooledConnection:
+    """
+    Pool-owned wrapper around a DB-API connection.
+
+    Statements (``cursor()``, ``execute()``, ``executemany()``) and commits
+    go through the offloaded cursor and ``run_blocking``; everything else is
+    delegated to the raw connection except ``close()``, which returns the
+    connection to the pool, so the repo's usual
+    ``conn = get_db_connection() ... finally: conn.close()`` idiom recycles
+    connections. As a context manager it commits or rolls back and releases.
+    """
+
+    def __init__(self, pool, raw_conn):
+        self._pool = pool
+        self._raw = raw_conn
+        self._checked_out = False
+        self._checkout_seq = 0
+        self._suspect = False
+        self.last_used = time.monotonic()
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def cursor(self, *args, **kwargs):
+        return OffloadedCursor(self._raw.cursor(*args, **kwargs))
+
+    def execute(self, sql, *args, **kwargs):
+        """sqlite3's ``conn.execute`` shortcut, run on a pooled cursor; returns the cursor."""
+        cursor = self.cursor()
+        cursor.execute(sql, *args, **kwargs)
+        return cursor
+
+    def executemany(self, sql, seq_of_params, *args, **kwargs):
+        """:meth:`execute` for ``executemany``."""
+        cursor = self.cursor()
+        cursor.executemany(sql, seq_of_params, *args, **kwargs)
+        return cursor
+
+    def commit(self):
+        return run_blocking(self._raw.commit)
 
-def _get_connection_from_pool():
-    """Get a connection from the pool with retries."""
-    with _connection_lock:
-        # Try to get an existing connection from the pool
-        if 'default' in _connection_pool:
-            conn = _connection_pool['default']
-            if _validate_connection(conn):
-                # Remove from pool since we're using it
-                del _connection_pool['default']
-                return conn
+    def rollback(self):
+        # Rollbacks usually follow an error; validate before the next checkout
+        self._suspect = True
+        return self._raw.rollback()
+
+    def close(self):
+        self._pool.release(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.commit()
             else:
-                # Connection is invalid, remove it
-                try:
-                    conn.close()
-                except Exception as e:
-                    logging.error(f"Error closing invalid connection: {e}")
-                del _connection_pool['default']
-
-    # If we get here, we need to create a new connection
-    for attempt in range(MAX_RETRIES):
+                self.rollback()
+        finally:
+            self.close()
+        return False
+
+
+# Callables notified of every statement run through a pooled cursor:
+# listener(raw_cursor, sql, params, elapsed) once the statement has run.
+# Used by the per-request query stats and the query-plan auditor; with no
+# listeners, statements run without any bookkeeping.
+statement_listeners = []
+
+
+def add_statement_listener(listener):
+    """Register ``listener(raw_cursor, sql, params, elapsed)`` for pooled-cursor statements."""
+    if listener not in statement_listeners:
+        statement_listeners.append(listener)
+
+
+def remove_statement_listener(listener):
+    if listener in statement_listeners:
+        statement_listeners.remove(listener)
+
+
+def _notify_statement(raw_cursor, sql, params, elapsed):
+    for listener in statement_listeners:
         try:
-            # Get the database URL from the app config
-            db_url = current_app.config['SQLALCHEMY_DATABASE_URI']
-            logging.info(f"Attempting to connect to database with URL: {db_url}")
-            
-            # Create a new connection
-            conn = db.engine.connect()
-            logging.info("Successfully connected to database")
-            return conn
+            listener(raw_cursor, sql, params, elapsed)
         except Exception as e:
-            if attempt < MAX_RETRIES - 1:
-                logging.warning(f"Database connection attempt {attempt + 1} failed: {e}. Retrying in {RETRY_DELAY} seconds...")
-                time.sleep(RETRY_DELAY)
+            logger.debug(f"Statement listener failed: {e}")
+
+
+class OffloadedCursor:
+    """
+    DB-API cursor whose statement execution and bulk fetches run through
+    :func:`utils.blocking.run_blocking`, so gevent workers keep serving
+    other requests while SQLite or the network is busy.
+    """
+
+    def __init__(self, raw_cursor):
+        self._raw = raw_cursor
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __iter__(self):
+        return iter(self._raw)
+
+    def _chain(self, result):
+        # sqlite3 returns the cursor from execute(); keep callers on the wrapper
+        return self if result is self._raw else result
+
+    def execute(self, sql, *args, **kwargs):
+        if not statement_listeners:
+            return self._chain(run_blocking(self._raw.execute, sql, *args, **kwargs))
+        started = time.perf_counter()
+        try:
+            return self._chain(run_blocking(self._raw.execute, sql, *args, **kwargs))
+        finally:
+            _notify_statement(self._raw, sql, args[0] if args else (), time.perf_counter() - started)
+
+    def executemany(self, sql, seq_of_params, *args, **kwargs):
+        if not statement_listeners:
+            return self._chain(run_blocking(self._raw.executemany, sql, seq_of_params, *args, **kwargs))
+        seq_of_params = list(seq_of_params)
+        started = time.perf_counter()
+        try:
+            return self._chain(run_blocking(self._raw.executemany, sql, seq_of_params, *args, **kwargs))
+        finally:
+            first = seq_of_params[0] if seq_of_params else ()
+            _notify_statement(self._raw, sql, first, time.perf_counter() - started)
+
+    def executescript(self, *args, **kwargs):
+        return self._chain(run_blocking(self._raw.executescript, *args, **kwargs))
+
+    def fetchall(self):
+        return run_blocking(self._raw.fetchall)
+
+    def fetchmany(self, *args, **kwargs):
+        return run_blocking(self._raw.fetchmany, *args, **kwargs)
+
+
+class _Waiter:
+    __slots__ = ("event", "conn")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.conn = None
+
+
+# Handed to a waiter when a slot frees up without a reusable connection
+_OPEN_NEW = object()
+# Orders checkouts across the primary and read pools for close_db_connection()
+_checkout_sequence = itertools.count(1)
+
+
+class ConnectionPool:
+    """
+    Bounded, greenlet-aware pool of raw DB-API connections.
+
+    - ``min_size`` connections are opened up front, up to ``max_size`` on demand
+    - idle connections are reused LIFO; validation (``SELECT 1``) only runs
+      after an error/rollback or once a connection has been idle for
+      ``validate_idle_seconds``
+    - callers that find the pool exhausted queue FIFO and are handed
+      connections directly on release, so no greenlet can barge ahead
+    - ``setup_hooks`` run once on every new raw connection
+
+    Under gevent the threading primitives are monkey-patched, so waiting
+    yields to other greenlets instead of blocking the worker.
+
+    A ``readonly`` pool connects to ``DATABASE_READ_URL`` (default: the
+    primary's database), is sized by ``DATABASE_READ_POOL_SIZE`` and refuses
+    writes on every connection.
+    """
+
+    def __init__(self, readonly=False):
+        self.readonly = readonly
+        self._lock = threading.Lock()
+        self._idle = []
+        self._waiters = collections.deque()
+        self._owned = {}
+        self._open = 0
+        self._closed = False
+        self.initialized = False
+        self.url = None
+        self.min_size = 0
+        self.max_size = 0
+        self.timeout = 0
+        self.validate_idle_seconds = 0
+        self.setup_hooks = []
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "timeouts": 0,
+            "opened": 0,
+            "discarded": 0,
+            "validations": 0,
+        }
+
+    def initialize(self, url=None, min_size=None, max_size=None, timeout=None,
+                   validate_idle_seconds=None, setup_hooks=None):
+        """(Re)configure the pool; settings default to the app config."""
+        with self._lock:
+            if self.readonly:
+                # Follow the primary (or the replica setting) on every re-initialization
+                self.url = url or _read_database_url()
             else:
-                logging.error(f"Failed to connect to database after {MAX_RETRIES} attempts: {e}")
+                self.url = url or self.url or _pool_database_url()
+            self.min_size = min_size if min_size is not None else _pool_setting("DATABASE_POOL_MIN_SIZE", 1)
+            self.max_size = max_size or (
+                _pool_setting("DATABASE_READ_POOL_SIZE", None) if self.readonly else None
+            ) or _pool_setting("DATABASE_POOL_SIZE", 10)
+            self.min_size = min(self.min_size, self.max_size)
+            self.timeout = timeout if timeout is not None else _pool_setting("DATABASE_POOL_TIMEOUT", 10)
+            self.validate_idle_seconds = (
+                validate_idle_seconds if validate_idle_seconds is not None
+                else _pool_setting("DATABASE_POOL_VALIDATE_IDLE_SECONDS", 300)
+            )
+            if setup_hooks is not None:
+                self.setup_hooks = list(setup_hooks)
+            elif not self.setup_hooks:
+                self.setup_hooks = _default_setup_hooks(self.url, self.readonly)
+            self._closed = False
+            self.initialized = True
+            missing = self.min_size - self._open
+            self._open += max(missing, 0)
+        for _ in range(max(missing, 0)):
+            try:
+                conn = self._open_connection()
+            except Exception:
+                with self._lock:
+                    self._open -= 1
                 raise
+            with self._lock:
+                self._idle.append(conn)
+        logger.debug(f"Connection pool ready (min={self.min_size}, max={self.max_size})")
+
+    # --- Size and metrics ---
+
+    def size(self):
+        """Configured maximum number of connections."""
+        return self.max_size
+
+    def checkedout(self):
+        with self._lock:
+            return self._open - len(self._idle)
+
+    def checkedin(self):
+        with self._lock:
+            return len(self._idle)
+
+    def stats(self):
+        """Checkout/wait counters plus the current pool occupancy."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update(
+                size=self.max_size,
+                open=self._open,
+                idle=len(self._idle),
+                checked_out=self._open - len(self._idle),
+                waiting=len(self._waiters),
+            )
+        checkouts = stats["checkouts"] or 1
+        stats["wait_seconds_avg"] = stats["wait_seconds_total"] / checkouts
+        return stats
+
+    # --- Checkout / release ---
+
+    def _open_connection(self):
+        for attempt in range(MAX_RETRIES):
+            try:
+                if self.url.startswith("sqlite"):
+                    raw = sqlite3.connect(
+                        make_url(self.url).database or ":memory:",
+                        timeout=CONNECTION_TIMEOUT,
+                        check_same_thread=False,
+                    )
+                else:
+                    raw = _raw_engine(self.url).raw_connection()
+                for hook in self.setup_hooks:
+                    hook(raw)
+                with self._lock:
+                    self._stats["opened"] += 1
+                return PooledConnection(self, raw)
+            except Exception as e:
+                if attempt < MAX_RETRIES - 1:
+                    logger.warning(f"Database connection attempt {attempt + 1} failed: {e}. Retrying in {RETRY_DELAY} seconds...")
+                    time.sleep(RETRY_DELAY)
+                else:
+                    logger.error(f"Failed to connect to database after {MAX_RETRIES} attempts: {e}")
+                    raise
+
+    def _validate_connection(self, conn):
+        """Return True if the connection answers ``SELECT 1``."""
+        with self._lock:
+            self._stats["validations"] += 1
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            return True
+        except Exception as e:
+            logger.warning(f"Connection validation failed: {e}")
+            return False
+
+    def _needs_validation(self, conn):
+        return conn._suspect or (
+            self.validate_idle_seconds and time.monotonic() - conn.last_used > self.validate_idle_seconds
+        )
+
+    def _discard(self, conn):
+        try:
+            conn._raw.close()
+        except Exception as e:
+            logger.debug(f"Error closing discarded connection: {e}")
+        with self._lock:
+            self._stats["discarded"] += 1
+
+    def checkout(self, timeout=None):
+        """
+        Check out a connection, waiting up to ``timeout`` seconds.
+
+        Raises:
+            RuntimeError: If the pool has been closed
+            TimeoutError: If no connection became free in time
+        """
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+        if not self.initialized:
+            self.initialize()
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        waiter = None
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Connection pool is closed")
+            if self._idle and not self._waiters:
+                conn = self._idle.pop()
+            elif self._open < self.max_size and not self._waiters:
+                self._open += 1
+                conn = _OPEN_NEW
+            else:
+                waiter = _Waiter()
+                self._waiters.append(waiter)
+                self._stats["waits"] += 1
+
+        if waiter is not None:
+            waiter.event.wait(timeout)
+            with self._lock:
+                if waiter.conn is None:
+                    if self._closed:
+                        raise RuntimeError("Connection pool is closed")
+                    self._waiters.remove(waiter)
+                    self._stats["timeouts"] += 1
+                    raise TimeoutError(f"No database connection available within {timeout}s")
+                conn = waiter.conn
+
+        try:
+            if conn is not _OPEN_NEW and self._needs_validation(conn):
+                if self._validate_connection(conn):
+                    conn._suspect = False
+                else:
+                    self._discard(conn)
+                    conn = _OPEN_NEW
+            if conn is _OPEN_NEW:
+                conn = self._open_connection()
+        except Exception:
+            self._free_slot()
+            raise
+
+        waited = time.monotonic() - started
+        with self._lock:
+            conn._checked_out = True
+            conn._checkout_seq = next(_checkout_sequence)
+            self._owned.setdefault(_current_task(), []).append(conn)
+            self._stats["checkouts"] += 1
+            self._stats["wait_seconds_total"] += waited
+            self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], waited)
+        return conn
+
+    def _free_slot(self):
+        """Give a lost connection's slot to the next waiter, or shrink the pool."""
+        with self._lock:
+            if self._waiters and not self._closed:
+                waiter = self._waiters.popleft()
+                waiter.conn = _OPEN_NEW
+                waiter.event.set()
+            else:
+                self._open -= 1
+
+    def release(self, conn):
+        """Return a connection to the pool (idempotent)."""
+        with self._lock:
+            if not conn._checked_out:
+                return
+            conn._checked_out = False
+            conn.last_used = time.monotonic()
+            owned = self._owned.get(_current_task())
+            if owned and conn in owned:
+                owned.remove(conn)
+                if not owned:
+                    del self._owned[_current_task()]
+            else:
+                # Released by a different greenlet than the one that checked it out
+                for task, conns in list(self._owned.items()):
+                    if conn in conns:
+                        conns.remove(conn)
+                        if not conns:
+                            del self._owned[task]
+                        break
+            closed = self._closed
+
+        if closed:
+            self._discard(conn)
+            with self._lock:
+                self._open -= 1
+            return
+        try:
+            # Never hand out a connection with an open transaction
+            conn._raw.rollback()
+        except Exception:
+            conn._suspect = True
+        with self._lock:
+            if self._waiters:
+                waiter = self._waiters.popleft()
+                waiter.conn = conn
+                waiter.event.set()
+            else:
+                self._idle.append(conn)
+
+    def current_checkout(self):
+        """The connection most recently checked out by this greenlet, or None."""
+        with self._lock:
+            owned = self._owned.get(_current_task())
+            return owned[-1] if owned else None
+
+    def current_checkouts(self):
+        """Connections this greenlet has checked out and not released, oldest first."""
+        with self._lock:
+            return list(self._owned.get(_current_task(), ()))
+
+    def release_current(self):
+        """Release the connection most recently checked out by this greenlet."""
+        conn = self.current_checkout()
+        if conn is not None:
+            self.release(conn)
+
+    def close_all(self):
+        """Close idle connections and refuse checkouts until re-initialized."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._closed = True
+            self.initialized = False
+            waiters, self._waiters = self._waiters, collections.deque()
+        for conn in idle:
+            self._discard(conn)
+        for waiter in waiters:
+            waiter.event.set()
+        logger.debug("Connection pool closed")
+
+
+def _pool_setting(name, default):
+    try:
+        if current_app:
+            return current_app.config.get(name, getattr(config, name, default))
+    except RuntimeError:
+        pass
+    return getattr(config, name, default)
+
+
+def _pool_database_url():
+    try:
+        if current_app and current_app.config.get("SQLALCHEMY_DATABASE_URI"):
+            return current_app.config["SQLALCHEMY_DATABASE_URI"]
+    except RuntimeError:
+        pass
+    return get_database_url()
+
+
+_raw_engines = {}
+
+
+def _raw_engine(url):
+    """Unpooled engine used only to open raw connections for the pool."""
+    if url not in _raw_engines:
+        _raw_engines[url] = create_engine(
+            url,
+            poolclass=NullPool,
+            connect_args=config.SQLALCHEMY_ENGINE_OPTIONS.get("connect_args", {}),
+        )
+    return _raw_engines[url]
+
+
+def _read_database_url():
+    """Replica URL if configured, otherwise the primary pool's database."""
+    return _pool_setting("DATABASE_READ_URL", None) or connection_pool.url or _pool_database_url()
+
+
+connection_pool = ConnectionPool()
+atexit.register(connection_pool.close_all)
+
+# Read-only connections for GET handlers and enrichment reads (see utils/db/read_routing.py)
+read_pool = ConnectionPool(readonly=True)
+atexit.register(read_pool.close_all)
+
+PRIMARY = "primary"
+READ = "read"
+
+# Where get_db_connection() sends this request/greenlet: PRIMARY or READ
+_db_route = contextvars.ContextVar("db_route", default=PRIMARY)
+
+
+def current_db_route():
+    return _db_route.get()
+
+
+def set_db_route(route):
+    """Route this context's ``get_db_connection()`` calls; returns a token for :func:`reset_db_route`."""
+    return _db_route.set(route)
+
+
+def reset_db_route(token):
+    _db_route.reset(token)
+
 
 @contextmanager
-def get_db_connection():
+def reading():
+    """Serve ``get_db_connection()`` from the read-only pool inside the block."""
+    token = _db_route.set(READ)
+    try:
+        yield
+    finally:
+        _db_route.reset(token)
+
+
+@contextmanager
+def use_primary():
+    """Force the primary inside a read-routed request, e.g. for a write on a GET."""
+    token = _db_route.set(PRIMARY)
+    try:
+        yield
+    finally:
+        _db_route.reset(token)
+
+
+def read_routing_available():
+    """True when reads can go to a separate read-only pool."""
+    if not _pool_setting("DATABASE_READ_ROUTING_ENABLED", True):
+        return False
+    url = read_pool.url if read_pool.initialized else _read_database_url()
+    # A second connection to :memory: would be an empty database
+    return not (url.startswith("sqlite") and (make_url(url).database or ":memory:") == ":memory:")
+
+
+def get_read_connection():
     """
-    Get a database connection using SQLAlchemy.
-    This function serves as the primary way to get a connection.
+    Check out a read-only connection, falling back to the primary.
+
+    Writes on it fail (``query_only`` on SQLite, READ ONLY transactions on
+    PostgreSQL), so only use it for reads.
 
     Returns:
-        A SQLAlchemy connection object or None if connection fails.
+        PooledConnection: A DB-API connection from the read pool
     """
-    conn = None
+    if not read_routing_available():
+        return connection_pool.checkout()
     try:
-        conn = _get_connection_from_pool()
-        try:
-            yield conn
-            # If no exception occurred, commit the transaction
-            conn.commit()
-        except Exception as e:
-            # If an exception occurred, rollback the transaction
-            conn.rollback()
-            raise
-    except Exception as e:
-        logging.error(f"Database connection failed: {e}")
+        if not read_pool.initialized and not connection_pool._closed:
+            # Opened lazily, and again after close_all_connections() once the primary is back
+            read_pool.initialize()
+        return read_pool.checkout()
+    except TimeoutError:
         raise
-    finally:
-        if conn:
-            try:
-                # Ensure any remaining transaction is rolled back
-                try:
-                    conn.rollback()
-                except Exception:
-                    pass  # Ignore errors during rollback
-                conn.close()
-            except Exception as e:
-                logging.error(f"Error closing database connection: {e}")
+    except Exception as e:
+        logger.warning(f"Read pool unavailable, reading from the primary: {e}")
+        return connection_pool.checkout()
+
+
+def get_db_connection():
+    """
+    Check out a pooled connection; ``conn.close()`` returns it to the pool.
+
+    Inside a read-routed request (or :func:`reading`) this is a read-only
+    connection from :func:`get_read_connection`.
+
+    Returns:
+        PooledConnection: A DB-API connection (``cursor()``, ``commit()``, ...)
+    """
+    if _db_route.get() == READ:
+        return get_read_connection()
+    return connection_pool.checkout()
+
+
+def close_db_connection(conn=None):
+    """
+    Return ``conn`` to the pool that handed it out.
+
+    Without ``conn``, releases this greenlet's latest checkout from either
+    the primary or the read-only pool.
+    """
+    if conn is None:
+        owned = [c for c in (connection_pool.current_checkout(), read_pool.current_checkout()) if c is not None]
+        if not owned:
+            return
+        conn = max(owned, key=lambda c: c._checkout_seq)
+    conn._pool.release(conn)
+
+
+def get_pool_stats():
+    """Checkout and wait-time metrics of the shared connection pool."""
+    return connection_pool.stats()
+
+
+def get_read_pool_stats():
+    """:func:`get_pool_stats` for the read-only pool."""
+    return read_pool.stats()
 
 def get_users_db_connection(db_path=None, app=None):
     """
-    Compatibility function for legacy code that expects get_users_db_connection.
-    This function now uses SQLAlchemy to maintain compatibility with the new database system.
-    
+    Legacy name for :func:`get_db_connection`; users and faces share one database.
+
     Args:
-        db_path: Ignored in new system, kept for compatibility
-        app: Optional Flask app instance. If not provided, tries to use current_app.
-    
+        db_path: Ignored, kept for old callers
+        app: Ignored, kept for old callers
+
     Returns:
-        A SQLAlchemy session object that can be used like the old connection.
+        A pooled connection; ``close()`` returns it to the pool.
     """
-    try:
-        if current_app:
-            return current_app.db.session
-        else:
-            # Create a new engine and session if not in app context
-            db_url = get_database_url()
-            if not db_url:
-                raise ValueError("DATABASE_URL environment variable is not set")
-            
-            # Configure the engine with Supabase-specific settings
-            engine = create_engine(
-                db_url,
-                poolclass=QueuePool,
-                pool_size=5,
-                max_overflow=10,
-                pool_timeout=30,
-                pool_recycle=1800,
-                connect_args={
-                    'connect_timeout': 10,
-                    'application_name': 'dopple_app',
-                    'options': '-c statement_timeout=30000'  # 30 second timeout
-                }
-            )
-            
-            # Test the connection
-            try:
-                with engine.connect() as conn:
-                    conn.execute("SELECT 1")
-            except SQLAlchemyError as e:
-                logging.error(f"Failed to connect to database: {e}")
-                raise
-            
-            Session = sessionmaker(bind=engine)
-            return Session()
-    except Exception as e:
-        logging.error(f"Error getting database connection: {str(e)}")
-        raise
+    return get_db_connection()
+
 
 def close_all_connections():
-    """Close all database connections in the pool."""
-    with _connection_lock:
-        for conn in _connection_pool.values():
-            try:
-                conn.close()
-            except Exception as e:
-                logging.error(f"Error closing database connection: {e}")
-        _connection_pool.clear()
-        _connection_last_used.clear()
+    """Close all database connections in the pools."""
+    connection_pool.close_all()
+    read_pool.close_all()
+
+def init_connection_release(app):
+    """
+    Release pooled connections a request left checked out when it ends.
+
+    A handler that returns or raises before ``conn.close()`` would otherwise
+    hold its pool slot for the life of the worker. Connections the greenlet
+    already held when the request started are left alone.
+    """
+
+    def remember_checkouts():
+        g._pooled_before = {id(conn) for pool in (connection_pool, read_pool) for conn in pool.current_checkouts()}
+
+    # Run first, so a before_request that answers early cannot skip it
+    app.before_request_funcs.setdefault(None, []).insert(0, remember_checkouts)
+
+    @app.teardown_request
+    def release_leaked_connections(exc=None):
+        before = g.pop("_pooled_before", set())
+        for pool in (connection_pool, read_pool):
+            for conn in pool.current_checkouts():
+                if id(conn) in before:
+                    continue
+                logger.warning(f"Releasing a database connection {request.endpoint} did not close")
+                pool.release(conn)
+
 
 def close_db(e=None):
     """Close the database connection stored in g object."""
@@ -239,27 +801,6 @@ def init_app(app):
     
     return app
 
-def get_db_connection():
-    """Get a database connection using SQLAlchemy."""
-    try:
-        if current_app:
-            return current_app.db.session
-        else:
-            # Create a new engine and session if not in app context
-            engine = create_engine(
-                os.getenv('DATABASE_URL'),
-                poolclass=QueuePool,
-                pool_size=5,
-                max_overflow=10,
-                pool_timeout=30,
-                pool_recycle=1800
-            )
-            Session = sessionmaker(bind=engine)
-            return Session()
-    except Exception as e:
-        logger.error(f"Error getting database connection: {str(e)}")
-        raise
-
 def get_db_engine():
     """Get the SQLAlchemy engine instance."""
     try:
@@ -334,14 +875,6 @@ def get_db() -> Session:
     finally:
         db.close()
 
-# For backward compatibility
-def get_users_db_connection():
-    """
-    Legacy function for backward compatibility.
-    Returns a database session.
-    """
-    return SessionLocal()
-
 def setup_users_db():
     """
     Initialize the users database and create necessary tables.
@@ -6,7 +6,12 @@ Handles database schema updates and migrations.
 """
 
 import logging
+from utils.db.counters import ensure_counters_table
 from utils.db.database import get_db_connection
+from utils.db.schema import ensure_columns, schema_registry
+from utils.face.quality import ensure_quality_columns
+from utils.face.top_matches import ensure_top_matches_tables
+from utils.notification_outbox import ensure_outbox_tables
 
 logger = logging.getLogger(__name__)
 
@@ -134,6 +139,115 @@ def migrate_claimed_profiles_add_claimed_at():
     finally:
         conn.close()
 
+def migrate_face_quality_columns():
+    """Add indexed image quality columns to the faces table if they don't exist."""
+    conn = get_db_connection()
+    if not conn:
+        logger.error("Failed to connect to database for face quality migration")
+        return False
+
+    cursor = conn.cursor()
+    try:
+        added = ensure_quality_columns(cursor)
+        if added:
+            logger.info(f"Added face quality columns: {', '.join(added)}")
+
+        conn.commit()
+        logger.info("Face quality migration completed successfully")
+        return True
+
+    except Exception as e:
+        logger.error(f"Error during face quality migration: {str(e)}")
+        conn.rollback()
+        return False
+    finally:
+        conn.close()
+
+def migrate_user_top_matches_tables():
+    """Create the materialised user_top_matches tables if they don't exist."""
+    conn = get_db_connection()
+    if not conn:
+        logger.error("Failed to connect to database for user_top_matches migration")
+        return False
+
+    cursor = conn.cursor()
+    try:
+        ensure_top_matches_tables(cursor)
+        conn.commit()
+        logger.info("user_top_matches migration completed successfully")
+        return True
+
+    except Exception as e:
+        logger.error(f"Error during user_top_matches migration: {str(e)}")
+        conn.rollback()
+        return False
+    finally:
+        conn.close()
+
+def migrate_notification_digests_table():
+    """Create the notification_digests table used by the notification outbox."""
+    conn = get_db_connection()
+    if not conn:
+        logger.error("Failed to connect to database for notification_digests migration")
+        return False
+
+    cursor = conn.cursor()
+    try:
+        ensure_outbox_tables(cursor)
+        conn.commit()
+        logger.info("notification_digests migration completed successfully")
+        return True
+
+    except Exception as e:
+        logger.error(f"Error during notification_digests migration: {str(e)}")
+        conn.rollback()
+        return False
+    finally:
+        conn.close()
+
+def migrate_user_matches_columns():
+    """Add the optional user_matches columns (face_id, privacy_level, ...) if missing."""
+    conn = get_db_connection()
+    if not conn:
+        logger.error("Failed to connect to database for user_matches migration")
+        return False
+
+    cursor = conn.cursor()
+    try:
+        ensure_columns(cursor, "user_matches")
+        conn.commit()
+        schema_registry.invalidate("user_matches")
+        logger.info("user_matches columns migration completed successfully")
+        return True
+
+    except Exception as e:
+        logger.error(f"Error during user_matches columns migration: {str(e)}")
+        conn.rollback()
+        return False
+    finally:
+        conn.close()
+
+def migrate_counters_table():
+    """Create the denormalised counters table, backfilled from the source tables."""
+    conn = get_db_connection()
+    if not conn:
+        logger.error("Failed to connect to database for counters migration")
+        return False
+
+    cursor = conn.cursor()
+    try:
+        ensure_counters_table(cursor)
+        conn.commit()
+        logger.info("counters migration completed successfully")
+        return True
+
+    except Exception as e:
+        logger.error(f"Error during counters migration: {str(e)}")
+        conn.rollback()
+        return False
+    finally:
+        conn.close()
+
 def run_migrations():
     """Run all pending migrations."""
     try:
@@ -160,6 +274,36 @@ def run_migrations():
             logger.info("Database migration for claimed_profiles.claimed_at applied successfully (or already up-to-date).")
         else:
             logger.error("Failed to apply claimed_profiles.claimed_at migration.")
+
+        # Run faces quality columns migration
+        if migrate_face_quality_columns():
+            logger.info("Database migration for face quality columns applied successfully (or already up-to-date).")
+        else:
+            logger.error("Failed to apply face quality columns migration.")
+
+        # Run user_top_matches tables migration
+        if migrate_user_top_matches_tables():
+            logger.info("Database migration for user_top_matches applied successfully (or already up-to-date).")
+        else:
+            logger.error("Failed to apply user_top_matches migration.")
+
+        # Run user_matches optional columns migration
+        if migrate_user_matches_columns():
+            logger.info("Database migration for user_matches columns applied successfully (or already up-to-date).")
+        else:
+            logger.error("Failed to apply user_matches columns migration.")
+
+        # Run notification_digests table migration
+        if migrate_notification_digests_table():
+            logger.info("Database migration for notification_digests applied successfully (or already up-to-date).")
+        else:
+            logger.error("Failed to apply notification_digests migration.")
+
+        # Run counters table migration
+        if migrate_counters_table():
+            logger.info("Database migration for counters applied successfully (or already up-to-date).")
+        else:
+            logger.error("Failed to apply counters migration.")
             
     except Exception as e:
         logger.error(f"Error running migrations: {str(e)}") 
\ No newline at end of file
@@ -0,0 +1,380 @@
+"""
+Query Plan Audit
+================
+
+Dev/CI tool that records every distinct statement the app runs, explains it
+once, and flags full scans of large tables with a suggested index.
+
+Statements are captured from both database layers:
+
+- raw pooled cursors (:func:`utils.db.database.add_statement_listener`)
+- every SQLAlchemy engine (``before_cursor_execute``)
+
+SQLite statements are explained with ``EXPLAIN QUERY PLAN`` ("SCAN faces"),
+Postgres ones with ``EXPLAIN`` ("Seq Scan on faces"). A scan is flagged when
+the table has at least ``QUERY_PLAN_AUDIT_MIN_ROWS`` rows; when the statement
+filters, joins or groups that table on known columns, the finding carries a
+``CREATE INDEX IF NOT EXISTS`` suggestion in the style of
+``migrations/add_indexes.sql``.
+
+Enable with ``QUERY_PLAN_AUDIT=true`` (the report is written to
+``QUERY_PLAN_AUDIT_REPORT`` at exit), exercise the app or run the test suite,
+then ``python manage.py query_plan_report --write-sql``.
+"""
+
+import atexit
+import json
+import logging
+import re
+import threading
+import time
+from datetime import datetime
+
+from utils.db.schema import read_columns
+
+logger = logging.getLogger(__name__)
+
+EXPLAINABLE = ("SELECT", "UPDATE", "DELETE", "WITH")
+
+_WHITESPACE = re.compile(r"\s+")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:\?|%s)(?:\s*,\s*(?:\?|%s))*\s*\)")
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_SQLITE_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS (\w+))?(.*)$")
+_POSTGRES_SCAN = re.compile(r"Seq Scan on (\w+)(?: (\w+))?")
+_TABLE_REF = re.compile(r"\b(?:FROM|JOIN|UPDATE)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE)
+_PREDICATE = re.compile(
+    r"\b(?:ON|WHERE)\b(.*?)(?=\b(?:JOIN|LEFT|INNER|CROSS|WHERE|GROUP|ORDER|LIMIT|HAVING|UNION|RETURNING)\b|\)|$)",
+    re.IGNORECASE | re.DOTALL,
+)
+_GROUP_BY = re.compile(r"\bGROUP\s+BY\b(.*?)(?=\b(?:HAVING|ORDER|LIMIT|UNION)\b|\)|$)", re.IGNORECASE | re.DOTALL)
+_COMPARED_LEFT = re.compile(
+    r"(?:\b(\w+)\.)?\b([A-Za-z_]\w*)\s*(=|==|<>|!=|<=|>=|<|>|\bIN\b|\bLIKE\b|\bIS\b|\bBETWEEN\b)",
+    re.IGNORECASE,
+)
+# Right-hand side of a join condition (``l.face_id = f.id``)
+_COMPARED_RIGHT = re.compile(r"(?:=|<=|>=|<|>)\s*(?:\b(\w+)\.)?\b([A-Za-z_]\w*)\b(?!\s*[.(])")
+_GROUPED = re.compile(r"(?:\b(\w+)\.)?\b([A-Za-z_]\w*)\b")
+_KEYWORDS = {
+    "where", "on", "join", "left", "right", "inner", "outer", "cross", "group", "order",
+    "limit", "having", "union", "set", "values", "select", "as", "and", "or", "not", "null",
+    "in", "is", "like", "between", "returning", "using", "natural", "offset",
+}
+_RANGE_OPERATORS = {"<", ">", "<=", ">=", "BETWEEN", "LIKE"}
+
+
+def normalize_sql(sql):
+    """Collapse whitespace and variable-length ``IN (?, ?, ...)`` lists into one statement key."""
+    sql = _WHITESPACE.sub(" ", sql).strip().rstrip(";")
+    return _PLACEHOLDER_LIST.sub("(?...)", sql)
+
+
+def table_aliases(sql):
+    """{alias or table name: table} for the tables named after FROM, JOIN and UPDATE."""
+    aliases = {}
+    for table, alias in _TABLE_REF.findall(sql):
+        if table.lower() in _KEYWORDS:
+            continue
+        aliases[table] = table
+        if alias and alias.lower() not in _KEYWORDS:
+            aliases[alias] = table
+    return aliases
+
+
+def parse_sqlite_plan(rows):
+    """
+    Full scans in an ``EXPLAIN QUERY PLAN`` result.
+
+    Returns:
+        list: (alias or table, detail) for each ``SCAN`` without a search key;
+        covering-index scans are reported too since they still read every row
+    """
+    scans = []
+    for row in rows:
+        detail = row[-1] if not hasattr(row, "keys") else row["detail"]
+        match = _SQLITE_SCAN.match(detail)
+        if match and not match.group(1).startswith("CONSTANT"):
+            scans.append((match.group(2) or match.group(1), detail))
+    return scans
+
+
+def parse_postgres_plan(rows):
+    """``Seq Scan on <table> [<alias>]`` nodes of a Postgres ``EXPLAIN`` result."""
+    scans = []
+    for row in rows:
+        line = row[0]
+        match = _POSTGRES_SCAN.search(line)
+        if match:
+            scans.append((match.group(2) or match.group(1), line.strip()))
+    return scans
+
+
+def candidate_columns(sql, alias, table, columns, known_columns=None):
+    """
+    Columns of ``table`` that the statement filters, joins or groups on.
+
+    Equality columns come first, then range/LIKE columns, then GROUP BY
+    columns, which is also the order a composite index wants them in.
+
+    Args:
+        alias: Name the plan used for the table (alias or table name)
+        columns: Columns of ``table``
+        known_columns: {table: columns} of the other tables, so unqualified
+            columns they also have are not attributed to ``table``
+    """
+    statement = _STRING_LITERAL.sub("''", sql)
+    aliases = table_aliases(statement)
+    others = set(aliases.values()) - {table}
+    known_columns = known_columns or {}
+    qualifiers = {alias, table}
+
+    def belongs(qualifier, column):
+        if column not in columns:
+            return False
+        if qualifier:
+            return qualifier in qualifiers
+        return not any(column in known_columns.get(other, ()) for other in others)
+
+    equality, ranged, grouped = [], [], []
+    for clause in _PREDICATE.findall(statement):
+        for qualifier, column, operator in _COMPARED_LEFT.findall(clause):
+            if column.lower() not in _KEYWORDS and belongs(qualifier, column):
+                target = ranged if operator.upper() in _RANGE_OPERATORS else equality
+                target.append(column)
+        for qualifier, column in _COMPARED_RIGHT.findall(clause):
+            if column.lower() not in _KEYWORDS and belongs(qualifier, column):
+                equality.append(column)
+    for clause in _GROUP_BY.findall(statement):
+        for qualifier, column in _GROUPED.findall(clause):
+            if belongs(qualifier, column):
+                grouped.append(column)
+
+    ordered = []
+    for column in equality + ranged + grouped:
+        if column not in ordered:
+            ordered.append(column)
+    return ordered[:3]
+
+
+def index_ddl(table, columns):
+    """``CREATE INDEX IF NOT EXISTS idx_<table>_<cols> ON <table>(<cols>);``"""
+    return f"CREATE INDEX IF NOT EXISTS idx_{table}_{'_'.join(columns)} ON {table}({', '.join(columns)});"
+
+
+class QueryPlanAuditor:
+    """Collects distinct statements and the full scans in their plans."""
+
+    def __init__(self, min_rows=1000):
+        self.min_rows = min_rows
+        self._lock = threading.Lock()
+        self._statements = {}
+        self._row_counts = {}
+        self._columns = {}
+        self._installed_engine_listener = False
+
+    # Capture
+
+    def capture(self, raw_cursor, sql, params=(), elapsed=0.0, dialect="sqlite"):
+        """Record one execution; the first time a statement is seen it is explained."""
+        if not isinstance(sql, str):
+            return
+        key = normalize_sql(sql)
+        with self._lock:
+            entry = self._statements.get(key)
+            if entry is not None:
+                entry["count"] += 1
+                entry["seconds"] += elapsed
+                return
+            entry = self._statements[key] = {
+                "statement": key, "count": 1, "seconds": elapsed, "scans": [], "error": None,
+            }
+
+        if not key.upper().startswith(EXPLAINABLE):
+            return
+        try:
+            entry["scans"] = self._explain(raw_cursor, sql, params, dialect)
+        except Exception as e:
+            # Temp tables, half-built schemas: keep the statement, note why it has no plan
+            entry["error"] = str(e)
+
+    def _explain(self, raw_cursor, sql, params, dialect):
+        connection = raw_cursor.connection
+        cursor = connection.cursor()
+        if dialect != "sqlite":
+            # A failed EXPLAIN must not abort the application's transaction
+            cursor.execute("SAVEPOINT query_plan_audit")
+        try:
+            if dialect == "sqlite":
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params or ())
+                scans = parse_sqlite_plan(cursor.fetchall())
+            else:
+                cursor.execute(f"EXPLAIN {sql}", params or None)
+                scans = parse_postgres_plan(cursor.fetchall())
+
+            aliases = table_aliases(sql)
+            findings = []
+            for alias, detail in scans:
+                table = aliases.get(alias, alias)
+                for name in set(aliases.values()) | {table}:
+                    if name not in self._columns:
+                        self._columns[name] = self._read_columns(cursor, name)
+                rows = self._row_count(cursor, table)
+                columns = candidate_columns(sql, alias, table, self._columns[table], self._columns)
+                findings.append({
+                    "table": table,
+                    "rows": rows,
+                    "detail": detail,
+                    "columns": columns,
+                    "ddl": index_ddl(table, columns) if columns else None,
+                })
+            return findings
+        finally:
+            if dialect != "sqlite":
+                cursor.execute("ROLLBACK TO SAVEPOINT query_plan_audit")
+                cursor.execute("RELEASE SAVEPOINT query_plan_audit")
+            cursor.close()
+
+    def _read_columns(self, cursor, table):
+        try:
+            return frozenset(read_columns(cursor, table))
+        except Exception:
+            # CTE or subquery name rather than a table
+            return frozenset()
+
+    def _row_count(self, cursor, table):
+        if table not in self._row_counts:
+            cursor.execute(f"SELECT COUNT(*) FROM {table}")
+            self._row_counts[table] = cursor.fetchone()[0]
+        return self._row_counts[table]
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("plan_audit_started", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get("plan_audit_started")
+        elapsed = time.perf_counter() - started.pop() if started else 0.0
+        if executemany:
+            parameters = parameters[0] if parameters else ()
+        dialect = "sqlite" if conn.dialect.name == "sqlite" else "postgres"
+        self.capture(cursor, statement, parameters, elapsed, dialect=dialect)
+
+    def start(self):
+        """Listen on pooled cursors and every SQLAlchemy engine."""
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+
+        from utils.db.database import add_statement_listener
+
+        add_statement_listener(self.capture)
+        if not self._installed_engine_listener:
+            event.listen(Engine, "before_cursor_execute", self._before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", self._after_cursor_execute)
+            self._installed_engine_listener = True
+
+    def stop(self):
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+
+        from utils.db.database import remove_statement_listener
+
+        remove_statement_listener(self.capture)
+        if self._installed_engine_listener:
+            event.remove(Engine, "before_cursor_execute", self._before_cursor_execute)
+            event.remove(Engine, "after_cursor_execute", self._after_cursor_execute)
+            self._installed_engine_listener = False
+
+    # Report
+
+    def findings(self):
+        """Flagged scans over tables with at least ``min_rows`` rows, busiest statements first."""
+        flagged = []
+        for entry in sorted(self._statements.values(), key=lambda e: -e["count"]):
+            for scan in entry["scans"]:
+                if scan["rows"] >= self.min_rows:
+                    flagged.append(dict(
+                        scan, statement=entry["statement"], count=entry["count"], seconds=round(entry["seconds"], 4)
+                    ))
+        return flagged
+
+    def report(self):
+        return {
+            "generated_at": datetime.utcnow().isoformat(),
+            "min_rows": self.min_rows,
+            "statements": len(self._statements),
+            "row_counts": dict(self._row_counts),
+            "findings": self.findings(),
+            "errors": [
+                {"statement": e["statement"], "error": e["error"]}
+                for e in self._statements.values() if e["error"]
+            ],
+        }
+
+    def write_report(self, path):
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+        logger.info(f"Query plan audit written to {path}")
+
+
+def suggested_ddl(findings):
+    """Distinct index suggestions from a report's findings, in finding order."""
+    ddl = []
+    for finding in findings:
+        if finding.get("ddl") and finding["ddl"] not in ddl:
+            ddl.append(finding["ddl"])
+    return ddl
+
+
+def format_report(report):
+    """Human-readable summary of a report dict."""
+    lines = [
+        f"Query plan audit: {report['statements']} distinct statements, "
+        f"{len(report['findings'])} full scans over tables with >= {report['min_rows']} rows",
+    ]
+    for finding in report["findings"]:
+        lines.append("")
+        lines.append(
+            f"[{finding['table']}: {finding['rows']} rows, {finding['count']}x, "
+            f"{finding.get('seconds', 0):.3f}s] {finding['detail']}"
+        )
+        lines.append(f"    {finding['statement']}")
+        if finding.get("ddl"):
+            lines.append(f"    suggest: {finding['ddl']}")
+    if report.get("errors"):
+        lines.append("")
+        lines.append(f"{len(report['errors'])} statements could not be explained")
+    return "\n".join(lines)
+
+
+def append_ddl(findings, sql_path):
+    """
+    Append the suggested indexes that ``sql_path`` does not create yet.
+
+    Returns:
+        list: The statements that were appended
+    """
+    with open(sql_path) as f:
+        existing = f.read()
+    existing_names = set(re.findall(r"CREATE INDEX IF NOT EXISTS (\w+)", existing))
+    new = [ddl for ddl in suggested_ddl(findings) if ddl.split()[5] not in existing_names]
+    if new:
+        with open(sql_path, "a") as f:
+            if not existing.endswith("\n"):
+                f.write("\n")
+            f.write(f"\n-- From the query plan audit ({datetime.utcnow().date().isoformat()})\n")
+            f.write("\n".join(new) + "\n")
+    return new
+
+
+auditor = None
+
+
+def install(app):
+    """Start auditing when ``QUERY_PLAN_AUDIT`` is enabled; the report is written at exit."""
+    global auditor
+    if not app.config.get("QUERY_PLAN_AUDIT"):
+        return None
+    if auditor is None:
+        auditor = QueryPlanAuditor(min_rows=app.config.get("QUERY_PLAN_AUDIT_MIN_ROWS", 1000))
+        atexit.register(auditor.write_report, app.config.get("QUERY_PLAN_AUDIT_REPORT", "query_plan_audit.json"))
+    auditor.start()
+    logger.warning("Query plan audit enabled: every new statement is explained (dev/CI only)")
+    return auditor
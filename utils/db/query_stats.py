@@ -0,0 +1,169 @@
+"""
+Per-request Query Stats
+=======================
+
+Counts the SQL statements each request runs, their total time and the
+statements repeated within the request (the usual N+1 pattern: one query per
+row of a previous result).
+
+Statements are seen from the pooled raw cursors and from every SQLAlchemy
+engine. Each response carries::
+
+    Server-Timing: db;dur=12.4;desc="14 queries"
+
+and, with ``QUERY_STATS_DEBUG_HEADER``, ``X-DB-Queries`` with the count,
+time and number of repeated statements. Requests over ``QUERY_BUDGET``
+queries, or repeating a statement ``QUERY_REPEAT_THRESHOLD`` times, are
+logged as warnings.
+
+Tests can bound an endpoint with :func:`assert_max_queries`::
+
+    with assert_max_queries(5):
+        client.get("/api/feed")
+"""
+
+import collections
+import contextvars
+import logging
+import time
+from contextlib import contextmanager
+
+from flask import g, request
+
+from utils.db.plan_audit import normalize_sql
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar("query_stats", default=None)
+_listening = False
+
+
+class QueryStats:
+    """Statements run in one request (or one :func:`capture_queries` block)."""
+
+    def __init__(self, parent=None):
+        self.parent = parent
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = collections.Counter()
+
+    def record(self, sql, elapsed):
+        stats = self
+        while stats is not None:
+            stats.count += 1
+            stats.seconds += elapsed
+            stats.statements[normalize_sql(sql)] += 1
+            stats = stats.parent
+
+    def repeated(self, threshold=2):
+        """[(statement, times)] run at least ``threshold`` times, most repeated first."""
+        return [(sql, n) for sql, n in self.statements.most_common() if n >= threshold]
+
+    def summary(self, limit=5):
+        lines = [f"{self.count} queries in {self.seconds * 1000:.1f} ms"]
+        for sql, n in self.statements.most_common(limit):
+            lines.append(f"  {n}x {sql}")
+        return "\n".join(lines)
+
+
+def _record(sql, elapsed):
+    stats = _current.get()
+    if stats is not None and isinstance(sql, str):
+        stats.record(sql, elapsed)
+
+
+def _on_pooled_statement(raw_cursor, sql, params, elapsed):
+    _record(sql, elapsed)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_stats_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("query_stats_started")
+    if started:
+        _record(statement, time.perf_counter() - started.pop())
+
+
+def start_listening():
+    """Hook the pooled cursors and SQLAlchemy engines (once per process)."""
+    global _listening
+    if _listening:
+        return
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    from utils.db.database import add_statement_listener
+
+    add_statement_listener(_on_pooled_statement)
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    _listening = True
+
+
+def current_stats():
+    """Stats of the running request, or None outside one."""
+    return _current.get()
+
+
+@contextmanager
+def capture_queries():
+    """Count the statements run inside the block, including nested requests."""
+    start_listening()
+    stats = QueryStats(parent=_current.get())
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def assert_max_queries(limit):
+    """Fail with the busiest statements if the block runs more than ``limit`` queries."""
+    with capture_queries() as stats:
+        yield stats
+    if stats.count > limit:
+        raise AssertionError(f"Expected at most {limit} queries, ran {stats.summary()}")
+
+
+def init_query_stats(app):
+    """Count queries per request and report them in the response headers."""
+    if not app.config.get("QUERY_STATS_ENABLED", True):
+        return
+    start_listening()
+    budget = app.config.get("QUERY_BUDGET", 30)
+    repeat_threshold = app.config.get("QUERY_REPEAT_THRESHOLD", 5)
+    debug_header = app.config.get("QUERY_STATS_DEBUG_HEADER", False)
+
+    @app.before_request
+    def start_query_stats():
+        g._query_stats_token = _current.set(QueryStats(parent=_current.get()))
+
+    @app.after_request
+    def report_query_stats(response):
+        stats = _current.get()
+        if stats is None or "_query_stats_token" not in g:
+            return response
+
+        timing = f'db;dur={stats.seconds * 1000:.1f};desc="{stats.count} queries"'
+        existing = response.headers.get("Server-Timing")
+        response.headers["Server-Timing"] = f"{existing}, {timing}" if existing else timing
+
+        repeated = stats.repeated(repeat_threshold)
+        if debug_header:
+            response.headers["X-DB-Queries"] = (
+                f"count={stats.count}; time_ms={stats.seconds * 1000:.1f}; repeated={len(repeated)}"
+            )
+        if stats.count > budget:
+            logger.warning(f"{request.method} {request.path} exceeded the query budget of {budget}: {stats.summary()}")
+        for sql, times in repeated:
+            logger.warning(f"{request.method} {request.path} ran the same statement {times}x (N+1?): {sql}")
+        return response
+
+    @app.teardown_request
+    def end_query_stats(exc=None):
+        token = g.pop("_query_stats_token", None)
+        if token is not None:
+            _current.reset(token)
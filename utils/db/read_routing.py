@@ -0,0 +1,75 @@
+"""
+Read/Write Connection Routing
+=============================
+
+Sends the raw-connection reads of selected blueprints to the read-only pool
+so heavy GET handlers (search, browsing) never queue behind the writer's
+connections or its transactions.
+
+``DATABASE_READ_BLUEPRINTS`` is the per-blueprint policy: a comma-separated
+list of blueprint names whose GET and HEAD requests are read-routed, ``*``
+for every blueprint, and ``-name`` to keep a blueprint on the primary::
+
+    DATABASE_READ_BLUEPRINTS=search,api
+    DATABASE_READ_BLUEPRINTS=*,-admin,-auth
+
+Inside a read-routed request ``get_db_connection()`` hands out read-only
+connections (``PRAGMA query_only`` on SQLite, ``DATABASE_READ_URL`` or READ
+ONLY transactions on PostgreSQL); a handler that must write wraps the write
+in ``use_primary()``. Other methods, and blueprints not listed, always use
+the primary. Enrichment helpers that only read call ``get_read_connection()``
+directly.
+"""
+
+import logging
+
+from flask import g, request
+
+from utils.db.database import READ, reset_db_route, set_db_route
+
+logger = logging.getLogger(__name__)
+
+READ_METHODS = ("GET", "HEAD")
+
+
+def parse_policy(value):
+    """
+    Parse ``DATABASE_READ_BLUEPRINTS``.
+
+    Returns:
+        tuple: (read_all, included blueprint names, excluded blueprint names)
+    """
+    names = [name.strip() for name in (value or "").split(",") if name.strip()]
+    excluded = {name[1:] for name in names if name.startswith("-")}
+    included = {name for name in names if not name.startswith("-")}
+    return "*" in included, included - {"*"}, excluded
+
+
+def routes_reads(policy, blueprint):
+    """True if GET requests of ``blueprint`` are read-routed under ``policy``."""
+    read_all, included, excluded = policy
+    if blueprint is None or blueprint in excluded:
+        return False
+    return read_all or blueprint in included
+
+
+def init_read_routing(app):
+    """Read-route the GET requests of the blueprints named in the config."""
+    if not app.config.get("DATABASE_READ_ROUTING_ENABLED", True):
+        return
+    policy = parse_policy(app.config.get("DATABASE_READ_BLUEPRINTS", ""))
+    if not (policy[0] or policy[1]):
+        return
+
+    @app.before_request
+    def route_reads():
+        if request.method in READ_METHODS and routes_reads(policy, request.blueprint):
+            g._db_route_token = set_db_route(READ)
+
+    @app.teardown_request
+    def end_read_route(exc=None):
+        token = g.pop("_db_route_token", None)
+        if token is not None:
+            reset_db_route(token)
+
+    logger.info(f"Read routing enabled for blueprints: {app.config.get('DATABASE_READ_BLUEPRINTS')}")
@@ -0,0 +1,138 @@
+"""
+Schema Registry
+===============
+
+Process-wide cache of table columns for the write paths that adapt to older
+databases (optional ``user_matches`` columns and the like).
+
+Each table is introspected once per process. Tables listed in
+``OPTIONAL_COLUMNS`` get their missing columns added by that first
+introspection (and by ``run_migrations`` at startup), so request handlers
+never run ``PRAGMA table_info`` or ``ALTER TABLE``. Prepared INSERT and
+UPDATE statements are cached per column set.
+"""
+
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Columns added after the first release of a table: {table: {column: type}}
+OPTIONAL_COLUMNS = {
+    "user_matches": {
+        "face_id": "INTEGER",
+        "privacy_level": "TEXT",
+        "similarity": "REAL",
+        "post_id": "INTEGER",
+    },
+}
+
+
+def read_columns(cursor, table):
+    """Column names of ``table`` from a zero-row SELECT (works on SQLite and Postgres)."""
+    cursor.execute(f"SELECT * FROM {table} LIMIT 0")
+    columns = [description[0] for description in cursor.description]
+    # Drain the empty result so the cursor can be reused
+    cursor.fetchall()
+    return columns
+
+
+def ensure_columns(cursor, table, spec=None, existing=None):
+    """
+    Add the missing columns of ``spec`` (default: ``OPTIONAL_COLUMNS[table]``).
+
+    Returns:
+        list: Names of the columns that were added
+    """
+    spec = OPTIONAL_COLUMNS.get(table, {}) if spec is None else spec
+    existing = set(read_columns(cursor, table) if existing is None else existing)
+    added = []
+    for column, column_type in spec.items():
+        if column not in existing:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+            added.append(column)
+    if added:
+        logger.info(f"Added columns to {table}: {', '.join(added)}")
+    return added
+
+
+class SchemaRegistry:
+    """Per-process table columns and prepared statements."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._columns = {}
+        self._statements = {}
+
+    def columns(self, cursor, table):
+        """Columns of ``table``, introspecting (and migrating) it on first use only."""
+        columns = self._columns.get(table)
+        if columns is not None:
+            return columns
+
+        existing = read_columns(cursor, table)
+        if table in OPTIONAL_COLUMNS:
+            try:
+                # Committed with the caller's write
+                existing += ensure_columns(cursor, table, existing=existing)
+            except Exception as e:
+                # Read-only replica or a concurrent migration: write only what exists
+                logger.warning(f"Could not add optional columns to {table}: {e}")
+        columns = frozenset(existing)
+        with self._lock:
+            self._columns[table] = columns
+        return columns
+
+    def insert(self, cursor, table, values):
+        """
+        Prepared INSERT for the ``values`` whose columns exist in ``table``.
+
+        Args:
+            values: {column: value}; unknown columns are dropped
+
+        Returns:
+            tuple: (sql, params)
+        """
+        available = self.columns(cursor, table)
+        names = tuple(column for column in values if column in available)
+        key = ("insert", table, names)
+        sql = self._statements.get(key)
+        if sql is None:
+            sql = (
+                f"INSERT INTO {table} ({', '.join(names)}) "
+                f"VALUES ({', '.join('?' for _ in names)})"
+            )
+            self._statements[key] = sql
+        return sql, [values[column] for column in names]
+
+    def update(self, cursor, table, values, key_column="id"):
+        """
+        Prepared ``UPDATE ... WHERE key_column = ?`` for the existing columns of ``values``.
+
+        Returns:
+            tuple: (sql, params without the key value), or (None, []) if no column exists
+        """
+        available = self.columns(cursor, table)
+        names = tuple(column for column in values if column in available)
+        if not names:
+            return None, []
+        key = ("update", table, names, key_column)
+        sql = self._statements.get(key)
+        if sql is None:
+            assignments = ", ".join(f"{column} = ?" for column in names)
+            sql = f"UPDATE {table} SET {assignments} WHERE {key_column} = ?"
+            self._statements[key] = sql
+        return sql, [values[column] for column in names]
+
+    def invalidate(self, table=None):
+        """Forget cached columns and statements (after a migration)."""
+        with self._lock:
+            if table is None:
+                self._columns.clear()
+                self._statements.clear()
+            else:
+                self._columns.pop(table, None)
+                self._statements = {k: v for k, v in self._statements.items() if k[1] != table}
+
+
+schema_registry = SchemaRegistry()
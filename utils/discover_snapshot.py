@@ -0,0 +1,256 @@
+"""
+Discover Snapshot
+=================
+
+Precomputes the discover page sections so page views never touch the faces
+table:
+
+- ``popular``: the most matched faces, from one GROUP BY over user_matches
+- ``recent_claims``: the latest claimed profiles with user and face details
+- ``pools``: small per-decade and per-state face pools, filled by id-range
+  sampling from a random pivot instead of ``ORDER BY RANDOM()``
+
+A snapshot is rebuilt at most every ``DISCOVER_SNAPSHOT_SECONDS`` and shared
+between workers through the app cache. ``python manage.py
+build_discover_snapshot`` rebuilds it from cron. Requests assemble their
+sections from the snapshot, rotating "Faces of the Day" by sampling the
+pools.
+"""
+
+import logging
+import random
+import threading
+import time
+
+from flask import current_app
+
+from extensions import cache
+from utils.db.database import get_db_connection
+from utils.files.image_manifest import get_manifest
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_KEY = "discover:snapshot"
+DEFAULT_REFRESH_SECONDS = 300
+POPULAR_SIZE = 50
+RECENT_CLAIMS_SIZE = 24
+POOL_SIZE = 30
+MAX_STATE_POOLS = 12
+
+DECADES = ["1940s", "1950s", "1960s", "1970s", "1980s", "1990s", "2000s", "2010s", "2020s"]
+
+_FACE_COLUMNS = "id, filename, school_name, yearbook_year, page_number, state, decade, claimed_by_user_id"
+
+
+def _refresh_seconds():
+    return current_app.config.get("DISCOVER_SNAPSHOT_SECONDS", DEFAULT_REFRESH_SECONDS)
+
+
+def _face_card(row, **extra):
+    face = {key: row[key] for key in _FACE_COLUMNS.split(", ")}
+    face["image"] = get_manifest().web_path(face["filename"], current_app.config.get("B2_DOWNLOAD_URL"))
+    face.update(extra)
+    return face
+
+
+def _popular_faces(cursor, size):
+    cursor.execute(
+        f"""
+        SELECT {", ".join("f." + c for c in _FACE_COLUMNS.split(", "))}, counts.match_count
+        FROM (
+            SELECT match_filename, COUNT(*) AS match_count
+            FROM user_matches
+            GROUP BY match_filename
+            ORDER BY match_count DESC
+            LIMIT ?
+        ) counts
+        JOIN faces f ON f.filename = counts.match_filename
+        ORDER BY counts.match_count DESC
+        """,
+        (size,),
+    )
+    return [_face_card(row, match_count=row["match_count"]) for row in cursor.fetchall()]
+
+
+def _recent_claims(cursor, size):
+    cursor.execute(
+        """
+        SELECT cp.id, cp.relationship, cp.caption, cp.claimed_at,
+               u.id AS user_id, u.username, u.profile_image,
+               f.filename, f.yearbook_year, f.school_name
+        FROM claimed_profiles cp
+        JOIN users u ON cp.user_id = u.id
+        JOIN faces f ON cp.face_id = f.id
+        ORDER BY cp.claimed_at DESC
+        LIMIT ?
+        """,
+        (size,),
+    )
+    return [
+        {
+            "id": row["id"],
+            "user": {"id": row["user_id"], "username": row["username"], "profile_image": row["profile_image"]},
+            "face": {
+                "filename": row["filename"],
+                "yearbook_year": row["yearbook_year"],
+                "school_name": row["school_name"],
+            },
+            "relationship": row["relationship"],
+            "caption": row["caption"],
+            "claimed_at": str(row["claimed_at"]) if row["claimed_at"] is not None else None,
+        }
+        for row in cursor.fetchall()
+    ]
+
+
+def _sample_pool(cursor, column, value, pivot, size):
+    """Up to ``size`` faces with ``column = value``, read forward from a random id pivot."""
+    cursor.execute(
+        f"SELECT {_FACE_COLUMNS} FROM faces WHERE {column} = ? AND id >= ? ORDER BY id LIMIT ?",
+        (value, pivot, size),
+    )
+    rows = cursor.fetchall()
+    if len(rows) < size:
+        # Wrap around to the start of the id range
+        cursor.execute(
+            f"SELECT {_FACE_COLUMNS} FROM faces WHERE {column} = ? AND id < ? ORDER BY id LIMIT ?",
+            (value, pivot, size - len(rows)),
+        )
+        rows += cursor.fetchall()
+    return [_face_card(row) for row in rows]
+
+
+def _face_pools(cursor, size):
+    cursor.execute("SELECT MIN(id), MAX(id) FROM faces")
+    low, high = cursor.fetchone()
+    if low is None:
+        return {}
+    cursor.execute(
+        "SELECT state, COUNT(*) AS n FROM faces WHERE state IS NOT NULL GROUP BY state ORDER BY n DESC LIMIT ?",
+        (MAX_STATE_POOLS,),
+    )
+    states = [row[0] for row in cursor.fetchall()]
+
+    pools = {}
+    for column, values in (("decade", DECADES), ("state", states)):
+        for value in values:
+            faces = _sample_pool(cursor, column, value, random.randint(low, high), size)
+            if faces:
+                pools[f"{column}:{value}"] = faces
+    return pools
+
+
+def build_snapshot():
+    """Compute a fresh snapshot and publish it to the app cache. Must run in an app context."""
+    started = time.monotonic()
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        snapshot = {"built_at": time.time()}
+        for name, build, size in (
+            ("popular", _popular_faces, POPULAR_SIZE),
+            ("recent_claims", _recent_claims, RECENT_CLAIMS_SIZE),
+            ("pools", _face_pools, POOL_SIZE),
+        ):
+            try:
+                snapshot[name] = build(cursor, size)
+            except Exception as e:
+                # One failing section should not blank the whole page
+                logger.error(f"Discover snapshot: failed to build {name}: {e}")
+                snapshot[name] = {} if name == "pools" else []
+    finally:
+        conn.close()
+
+    try:
+        # Kept a little longer than the refresh interval so workers never see a gap
+        cache.set(SNAPSHOT_KEY, snapshot, timeout=_refresh_seconds() * 4)
+    except Exception as e:
+        logger.debug(f"Discover snapshot not shared through the cache: {e}")
+    logger.info(f"Discover snapshot built in {time.monotonic() - started:.2f}s")
+    return snapshot
+
+
+class DiscoverSnapshotStore:
+    """Per-process copy of the snapshot, refreshed from the cache or rebuilt when stale."""
+
+    def __init__(self):
+        self._snapshot = None
+        self._build_lock = threading.Lock()
+
+    def _fresh(self, snapshot):
+        return snapshot is not None and time.time() - snapshot.get("built_at", 0) < _refresh_seconds()
+
+    def get(self):
+        """Return a snapshot, serving the stale copy while another thread rebuilds."""
+        if self._fresh(self._snapshot):
+            return self._snapshot
+        try:
+            shared = cache.get(SNAPSHOT_KEY)
+        except Exception:
+            shared = None
+        if self._fresh(shared):
+            self._snapshot = shared
+            return shared
+
+        if not self._build_lock.acquire(blocking=self._snapshot is None):
+            return self._snapshot
+        try:
+            if not self._fresh(self._snapshot):
+                self._snapshot = build_snapshot()
+        finally:
+            self._build_lock.release()
+        return self._snapshot
+
+
+snapshot_store = DiscoverSnapshotStore()
+
+
+def sample_faces(pools, limit, rng=random):
+    """
+    Stratified random faces: one face per shuffled pool per round until ``limit``.
+
+    Costs O(limit) regardless of the size of the faces table.
+    """
+    remaining = {name: list(faces) for name, faces in pools.items() if faces}
+    names = list(remaining)
+    rng.shuffle(names)
+    picked, seen = [], set()
+    while names and len(picked) < limit:
+        for name in list(names):
+            pool = remaining[name]
+            face = pool.pop(rng.randrange(len(pool)))
+            if not pool:
+                names.remove(name)
+            if face["filename"] not in seen:
+                seen.add(face["filename"])
+                picked.append(face)
+                if len(picked) >= limit:
+                    break
+    return picked
+
+
+def discover_sections(popular_limit=10, claims_limit=8, faces_limit=15):
+    """Assemble the discover page sections from the current snapshot."""
+    snapshot = snapshot_store.get()
+    return [
+        {
+            "title": "Popular Historical Figures",
+            "description": "Historical faces that many users have claimed or added to their profiles",
+            "faces": snapshot.get("popular", [])[:popular_limit],
+        },
+        {
+            "title": "Recently Claimed Profiles",
+            "description": "Faces that users have claimed as their doppelgängers",
+            "profiles": snapshot.get("recent_claims", [])[:claims_limit],
+        },
+        {
+            "title": "Interesting Decades",
+            "description": "Explore matches from specific time periods",
+            "decades": [d for d in DECADES if f"decade:{d}" in snapshot.get("pools", {})] or DECADES,
+        },
+        {
+            "title": "Faces of the Day",
+            "description": "A selection of interesting historical faces",
+            "faces": sample_faces(snapshot.get("pools", {}), faces_limit),
+        },
+    ]
@@ -0,0 +1,168 @@
+"""
+Face Embedding Store
+====================
+
+Per-backend storage of face embeddings. dlib vectors keep living in
+``faces.encoding``; every other backend stores float32 vectors in the
+``face_embeddings`` table keyed by (filename, backend).
+"""
+
+import logging
+import os
+import pickle
+import sqlite3
+
+import numpy as np
+
+from utils.face.quality import low_quality_clause, quality_filter_clause
+
+logger = logging.getLogger(__name__)
+
+LEGACY_BACKEND = "dlib"
+
+CREATE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS face_embeddings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        filename TEXT NOT NULL,
+        backend TEXT NOT NULL,
+        dimension INTEGER NOT NULL,
+        embedding BLOB NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE (filename, backend)
+    )
+"""
+
+
+def get_store_db_path():
+    """Resolve the faces database path (Flask config, then environment)."""
+    try:
+        from flask import current_app
+
+        if current_app.config.get("DB_PATH"):
+            return current_app.config["DB_PATH"]
+    except RuntimeError:
+        # Not in Flask context
+        pass
+    return os.environ.get("DB_PATH", "faces.db")
+
+
+def connect(db_path=None):
+    """Open the faces database and make sure the embeddings table exists."""
+    conn = sqlite3.connect(db_path or get_store_db_path(), timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute(CREATE_TABLE_SQL)
+    return conn
+
+
+def decode_legacy_encoding(blob):
+    """Decode a ``faces.encoding`` blob (pickled array or raw float64 bytes)."""
+    if not blob:
+        return None
+    try:
+        return np.asarray(pickle.loads(blob), dtype=np.float32)
+    except Exception:
+        pass
+    try:
+        return np.frombuffer(blob, dtype=np.float64).astype(np.float32)
+    except ValueError:
+        return None
+
+
+def save_embedding(conn, filename, backend, vector):
+    """
+    Insert or replace one embedding. The caller commits.
+
+    Args:
+        conn: Connection returned by ``connect()``
+        filename: Face image filename
+        backend: Backend name
+        vector: 1-d array-like embedding
+    """
+    vector = np.asarray(vector, dtype=np.float32)
+    conn.execute(
+        "INSERT OR REPLACE INTO face_embeddings (filename, backend, dimension, embedding) "
+        "VALUES (?, ?, ?, ?)",
+        (filename, backend, int(vector.shape[0]), vector.tobytes()),
+    )
+
+
+def get_embedding(conn, filename, backend):
+    """Return the stored embedding for a filename, or None."""
+    if backend == LEGACY_BACKEND:
+        row = conn.execute(
+            "SELECT encoding FROM faces WHERE filename = ?", (filename,)
+        ).fetchone()
+        return decode_legacy_encoding(row["encoding"]) if row else None
+
+    row = conn.execute(
+        "SELECT embedding FROM face_embeddings WHERE filename = ? AND backend = ?",
+        (filename, backend),
+    ).fetchone()
+    return np.frombuffer(row["embedding"], dtype=np.float32) if row else None
+
+
+def _has_quality_columns(conn):
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(faces)")]
+    return "blur_variance" in columns
+
+
+def load_embeddings(backend, db_path=None, limit=None, quality_filter=True):
+    """
+    Load all embeddings for a backend.
+
+    Faces failing the quality thresholds (utils.face.quality) are skipped
+    unless ``quality_filter`` is False.
+
+    Returns:
+        tuple: (filenames, float32 matrix of shape (n, dimension))
+    """
+    conn = connect(db_path)
+    try:
+        if backend == LEGACY_BACKEND:
+            sql = "SELECT filename, encoding AS blob FROM faces WHERE encoding IS NOT NULL"
+            params = ()
+        else:
+            sql = "SELECT filename, embedding AS blob FROM face_embeddings WHERE backend = ?"
+            params = (backend,)
+        if quality_filter and _has_quality_columns(conn):
+            if backend == LEGACY_BACKEND:
+                quality_sql, quality_params = quality_filter_clause()
+                sql += f" AND {quality_sql}"
+            else:
+                quality_sql, quality_params = low_quality_clause()
+                sql += f" AND filename NOT IN (SELECT filename FROM faces WHERE {quality_sql})"
+            params += tuple(quality_params)
+        if limit:
+            sql += " LIMIT ?"
+            params += (int(limit),)
+
+        filenames, vectors = [], []
+        for row in conn.execute(sql, params):
+            if backend == LEGACY_BACKEND:
+                vector = decode_legacy_encoding(row["blob"])
+            else:
+                vector = np.frombuffer(row["blob"], dtype=np.float32)
+            if vector is None or vector.size == 0:
+                continue
+            filenames.append(row["filename"])
+            vectors.append(vector)
+
+        if not vectors:
+            return [], np.empty((0, 0), dtype=np.float32)
+        return filenames, np.vstack(vectors).astype(np.float32)
+    finally:
+        conn.close()
+
+
+def missing_filenames(conn, backend, limit=None):
+    """Return filenames from ``faces`` that have no embedding for ``backend`` yet."""
+    sql = (
+        "SELECT f.filename FROM faces f "
+        "LEFT JOIN face_embeddings e ON e.filename = f.filename AND e.backend = ? "
+        "WHERE e.id IS NULL"
+    )
+    params = (backend,)
+    if limit:
+        sql += " LIMIT ?"
+        params += (int(limit),)
+    return [row["filename"] for row in conn.execute(sql, params)]
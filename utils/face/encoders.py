@@ -0,0 +1,366 @@
+"""
+Face Embedding Backends
+=======================
+
+Registry of CPU face-embedding backends. Each backend produces vectors of a
+fixed dimension and owns its own embedding store rows and FAISS index, so
+dlib (128-d) and ArcFace (512-d) vectors are never mixed in one index.
+
+The active backend is chosen per request (``?backend=arcface``), per user
+cohort (``EMBEDDING_BACKEND_COHORTS``) or by the ``EMBEDDING_BACKEND`` default.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+try:
+    import onnxruntime
+except ImportError:
+    onnxruntime = None
+
+DEFAULT_BACKEND = "dlib"
+
+
+def _get_setting(key, default=None):
+    """Read a setting from the Flask config, falling back to the environment."""
+    try:
+        from flask import current_app
+
+        value = current_app.config.get(key)
+        if value is not None:
+            return value
+    except RuntimeError:
+        # Not in Flask context
+        pass
+    return os.environ.get(key, default)
+
+
+def _load_rgb(path):
+    """Load an image file as an RGB uint8 array."""
+    with Image.open(path) as img:
+        return np.array(img.convert("RGB"))
+
+
+def _box_area(box):
+    """Area of a (top, right, bottom, left) face box."""
+    top, right, bottom, left = box
+    return (bottom - top) * (right - left)
+
+
+class EmbeddingBackend(ABC):
+    """Abstract base class for face embedding backends."""
+
+    name = None
+    dimension = None
+    # FAISS L2 distance treated as 0% similarity by calculate_similarity()
+    match_threshold = 0.6
+
+    @abstractmethod
+    def is_available(self):
+        """Return True if the backend's runtime dependencies are usable."""
+
+    @abstractmethod
+    def encode_image(self, image):
+        """
+        Encode the most prominent face in an RGB image.
+
+        Args:
+            image: RGB uint8 numpy array
+
+        Returns:
+            np.ndarray: float32 vector of length ``dimension``, or None
+        """
+
+    def encode_file(self, path):
+        """Encode the most prominent face in an image file."""
+        try:
+            return self.encode_image(_load_rgb(path))
+        except Exception as e:
+            logger.error(f"[{self.name}] Error encoding {path}: {e}")
+            return None
+
+    def encode_faces(self, image, max_faces=None):
+        """
+        Detect and encode every face in an RGB image (group or yearbook-page photos).
+
+        Args:
+            image: RGB image array
+            max_faces: Optional cap; only the largest boxes are encoded
+
+        Returns:
+            list: (box, vector) pairs, box as (top, right, bottom, left), largest first
+        """
+        import face_recognition
+
+        locations = face_recognition.face_locations(image, model="hog")
+        locations.sort(key=_box_area, reverse=True)
+        if max_faces:
+            locations = locations[:max_faces]
+        return [(box, vector) for box, vector in zip(locations, self._encode_crops(image, locations))
+                if vector is not None]
+
+    def _encode_crops(self, image, locations):
+        """Encode each detected face box; backends override this to batch the work."""
+        vectors = []
+        for top, right, bottom, left in locations:
+            vectors.append(self.encode_image(image[top:bottom, left:right]))
+        return vectors
+
+    def encode_faces_file(self, path, max_faces=None):
+        """Detect and encode every face in an image file; see :meth:`encode_faces`."""
+        try:
+            return self.encode_faces(_load_rgb(path), max_faces=max_faces)
+        except Exception as e:
+            logger.error(f"[{self.name}] Error encoding faces in {path}: {e}")
+            return []
+
+
+class DlibBackend(EmbeddingBackend):
+    """128-d dlib ResNet embeddings via ``face_recognition``."""
+
+    name = "dlib"
+    dimension = 128
+
+    def is_available(self):
+        try:
+            import face_recognition  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def encode_image(self, image):
+        import face_recognition
+
+        locations = face_recognition.face_locations(image, model="hog")
+        if not locations:
+            return None
+        encodings = face_recognition.face_encodings(image, locations[:1])
+        if not encodings:
+            return None
+        return np.asarray(encodings[0], dtype=np.float32)
+
+    def _encode_crops(self, image, locations):
+        import face_recognition
+
+        # One call encodes every box against the full image
+        if not locations:
+            return []
+        return [np.asarray(e, dtype=np.float32) for e in face_recognition.face_encodings(image, locations)]
+
+    def encode_file(self, path):
+        # Reuse the existing multi-pass extractor so dlib vectors stay
+        # identical to the ones already stored in faces.encoding.
+        from utils.face.recognition import extract_face_encoding
+
+        encoding = extract_face_encoding(path)
+        if encoding is None:
+            return None
+        return np.asarray(encoding, dtype=np.float32)
+
+
+class OnnxArcFaceBackend(EmbeddingBackend):
+    """
+    512-d ArcFace embeddings run on CPU through ONNX Runtime.
+
+    Uses any ArcFace recognition model with a 1x3x112x112 input, e.g. the
+    ``w600k_r50.onnx`` file shipped in insightface's ``buffalo_l`` pack.
+    """
+
+    name = "arcface"
+    dimension = 512
+    # Squared L2 between unit vectors; 1.4 corresponds to cosine similarity 0.3
+    match_threshold = 1.4
+    input_size = 112
+
+    def __init__(self, model_path=None, num_threads=None):
+        self._model_path = model_path
+        self._num_threads = num_threads
+        self._session = None
+        self._input_name = None
+        self._lock = threading.Lock()
+
+    def _get_model_path(self):
+        return self._model_path or _get_setting(
+            "ARCFACE_MODEL_PATH", os.path.join("models", "arcface", "w600k_r50.onnx")
+        )
+
+    def is_available(self):
+        return onnxruntime is not None and os.path.exists(self._get_model_path())
+
+    def _get_session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    if onnxruntime is None:
+                        raise RuntimeError("onnxruntime is not installed")
+                    options = onnxruntime.SessionOptions()
+                    options.intra_op_num_threads = int(
+                        self._num_threads or _get_setting("ARCFACE_NUM_THREADS", 1)
+                    )
+                    self._session = onnxruntime.InferenceSession(
+                        self._get_model_path(),
+                        sess_options=options,
+                        providers=["CPUExecutionProvider"],
+                    )
+                    self._input_name = self._session.get_inputs()[0].name
+                    logger.info(f"[arcface] Loaded ONNX model {self._get_model_path()}")
+        return self._session
+
+    def _crop_face(self, image):
+        """Crop the largest detected face, or use the whole frame for pre-cropped faces."""
+        try:
+            import face_recognition
+
+            locations = face_recognition.face_locations(image, model="hog")
+        except ImportError:
+            locations = []
+
+        if not locations:
+            return image
+
+        top, right, bottom, left = max(
+            locations, key=lambda loc: (loc[2] - loc[0]) * (loc[1] - loc[3])
+        )
+        pad = int(0.15 * max(bottom - top, right - left))
+        height, width = image.shape[:2]
+        return image[
+            max(0, top - pad) : min(height, bottom + pad),
+            max(0, left - pad) : min(width, right + pad),
+        ]
+
+    def _preprocess(self, face):
+        face = Image.fromarray(face).resize(
+            (self.input_size, self.input_size), Image.BILINEAR
+        )
+        blob = (np.asarray(face, dtype=np.float32) - 127.5) / 127.5
+        return blob.transpose(2, 0, 1)[np.newaxis, ...]
+
+    @staticmethod
+    def _normalise(embedding):
+        norm = np.linalg.norm(embedding)
+        if norm == 0:
+            return None
+        return (embedding / norm).astype(np.float32)
+
+    def encode_image(self, image):
+        session = self._get_session()
+        blob = self._preprocess(self._crop_face(image))
+        return self._normalise(session.run(None, {self._input_name: blob})[0][0])
+
+    def _encode_crops(self, image, locations):
+        if not locations:
+            return []
+        session = self._get_session()
+        height, width = image.shape[:2]
+        blobs = []
+        for top, right, bottom, left in locations:
+            pad = int(0.15 * max(bottom - top, right - left))
+            face = image[max(0, top - pad) : min(height, bottom + pad), max(0, left - pad) : min(width, right + pad)]
+            blobs.append(self._preprocess(face))
+        try:
+            # One inference call for every face when the model has a dynamic batch axis
+            embeddings = session.run(None, {self._input_name: np.concatenate(blobs)})[0]
+        except Exception:
+            embeddings = [session.run(None, {self._input_name: blob})[0][0] for blob in blobs]
+        return [self._normalise(embedding) for embedding in embeddings]
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def register_backend(backend):
+    """Register an embedding backend instance under its ``name``."""
+    with _backends_lock:
+        _backends[backend.name] = backend
+    return backend
+
+
+def get_backend(name=None):
+    """
+    Get a registered backend by name.
+
+    Args:
+        name: Backend name; defaults to the configured ``EMBEDDING_BACKEND``
+
+    Returns:
+        EmbeddingBackend
+
+    Raises:
+        KeyError: If no backend is registered under ``name``
+    """
+    name = name or _get_setting("EMBEDDING_BACKEND", DEFAULT_BACKEND)
+    try:
+        return _backends[name]
+    except KeyError:
+        raise KeyError(f"Unknown embedding backend: {name}")
+
+
+def available_backends():
+    """Return the names of registered backends that can currently run."""
+    return [name for name, backend in _backends.items() if backend.is_available()]
+
+
+def _parse_cohorts(value):
+    """Parse ``"arcface:10,other:5"`` (or a dict) into ``{name: percent}``."""
+    if not value:
+        return {}
+    if isinstance(value, dict):
+        return {k: int(v) for k, v in value.items()}
+    cohorts = {}
+    for part in str(value).split(","):
+        if ":" in part:
+            name, pct = part.split(":", 1)
+            cohorts[name.strip()] = int(pct)
+    return cohorts
+
+
+def cohort_backend(user_id):
+    """
+    Return the backend name assigned to a user's cohort, or None.
+
+    Users are bucketed into 0-99 by a stable hash of their id and cohorts take
+    consecutive bucket ranges in the order they are configured.
+    """
+    if user_id is None:
+        return None
+    cohorts = _parse_cohorts(_get_setting("EMBEDDING_BACKEND_COHORTS"))
+    if not cohorts:
+        return None
+    bucket = int(hashlib.md5(str(user_id).encode("utf-8")).hexdigest(), 16) % 100
+    upper = 0
+    for name, pct in cohorts.items():
+        upper += pct
+        if bucket < upper:
+            return name
+    return None
+
+
+def select_backend(requested=None, user_id=None):
+    """
+    Pick the embedding backend for a request.
+
+    An explicit ``requested`` name wins, then the user's cohort, then the
+    configured default. Unknown or unavailable choices fall back to the default.
+    """
+    default = get_backend()
+    for name in (requested, cohort_backend(user_id)):
+        if not name:
+            continue
+        backend = _backends.get(name)
+        if backend is not None and backend.is_available():
+            return backend
+        logger.warning(f"Embedding backend '{name}' unavailable, using '{default.name}'")
+    return default
+
+
+register_backend(DlibBackend())
+register_backend(OnnxArcFaceBackend())
@@ -19,6 +19,9 @@ from utils.face.recognition import rebuild_faiss_index, extract_face_encoding
 from utils.db.database import get_db_connection # Added import
 from utils.face.detection import detect_faces
 from utils.db.storage import get_storage
+from utils.files.image_manifest import forget, record_local
+from utils.face.top_matches import enqueue_user
+from utils.index.user_index import registered_user_index
 
 logger = logging.getLogger(__name__)
 
@@ -140,6 +143,7 @@ def index_profile_face(filename, user_id, username):
         faces_save_path = os.path.join(faces_folder, faces_filename)
 
         Image.fromarray(face_crop_array).save(faces_save_path)
+        record_local(faces_filename, faces_folder)
         current_app.logger.info(f"Saved cropped profile face to: {faces_save_path}")
 
         # Add to Face DB
@@ -168,6 +172,27 @@ def index_profile_face(filename, user_id, username):
                 )
                 # Continue, as the main face record and ClaimedProfile will still be created
 
+            # Store the profile encoding and refresh the registered user index
+            try:
+                profile_encodings = face_recognition.face_encodings(image, [face_locations[0]])
+                if profile_encodings:
+                    conn = get_db_connection()
+                    try:
+                        cursor = conn.cursor()
+                        cursor.execute(
+                            "UPDATE users SET face_encoding = ? WHERE id = ?",
+                            (profile_encodings[0].tobytes(), user_id),
+                        )
+                        conn.commit()
+                    finally:
+                        conn.close()
+                registered_user_index.refresh_user(user_id)
+                enqueue_user(user_id)
+            except Exception as e_user_index:
+                current_app.logger.error(
+                    f"Error updating registered user index for user_id {user_id}: {e_user_index}"
+                )
+
             # Rebuild FAISS index
             rebuild_faiss_index(app=current_app)
             return faces_filename
@@ -179,6 +204,7 @@ def index_profile_face(filename, user_id, username):
             if os.path.exists(faces_save_path):
                 try:
                     os.remove(faces_save_path)
+                    forget(faces_filename)
                     current_app.logger.info(
                         f"Cleaned up orphaned face crop: {faces_save_path}"
                     )
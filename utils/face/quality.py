@@ -0,0 +1,301 @@
+"""
+Face Image Quality
+==================
+
+Quality metrics for face crops, computed once (at extraction time or by
+``scripts/backfill_quality.py``) and stored in indexed columns on ``faces``:
+
+- ``blur_variance``: variance of the 3x3 Laplacian of the grayscale crop
+  (same kernel as ``cv2.Laplacian``; lower is blurrier)
+- ``image_width`` / ``image_height``: crop resolution in pixels
+- ``face_box_ratio``: detected face box area / crop area
+- ``brightness``: mean grayscale intensity (0-255)
+
+Queries then filter on those columns instead of re-opening every image.
+"""
+
+import logging
+import os
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+QUALITY_COLUMNS = {
+    "blur_variance": "REAL",
+    "image_width": "INTEGER",
+    "image_height": "INTEGER",
+    "face_box_ratio": "REAL",
+    "brightness": "REAL",
+}
+
+DEFAULT_THRESHOLDS = {
+    "min_blur_variance": 50.0,
+    "min_width": 100,
+    "min_height": 100,
+    "min_brightness": 40.0,
+    "max_brightness": 235.0,
+    "min_face_box_ratio": 0.05,
+}
+
+_THRESHOLD_ENV = {
+    "min_blur_variance": "QUALITY_MIN_BLUR_VARIANCE",
+    "min_width": "QUALITY_MIN_WIDTH",
+    "min_height": "QUALITY_MIN_HEIGHT",
+    "min_brightness": "QUALITY_MIN_BRIGHTNESS",
+    "max_brightness": "QUALITY_MAX_BRIGHTNESS",
+    "min_face_box_ratio": "QUALITY_MIN_FACE_BOX_RATIO",
+}
+
+# (column, operator, threshold key): a face is low quality if any holds
+_LOW_QUALITY_RULES = (
+    ("blur_variance", "<", "min_blur_variance"),
+    ("image_width", "<", "min_width"),
+    ("image_height", "<", "min_height"),
+    ("brightness", "<", "min_brightness"),
+    ("brightness", ">", "max_brightness"),
+    ("face_box_ratio", "<", "min_face_box_ratio"),
+)
+
+
+def get_thresholds():
+    """Return quality thresholds from the Flask config or environment."""
+    thresholds = dict(DEFAULT_THRESHOLDS)
+    try:
+        from flask import current_app
+
+        config = current_app.config
+    except RuntimeError:
+        # Not in Flask context
+        config = {}
+    for key, env_key in _THRESHOLD_ENV.items():
+        value = config.get(env_key, os.environ.get(env_key))
+        if value is not None:
+            thresholds[key] = float(value)
+    return thresholds
+
+
+def laplacian_variance(gray):
+    """Variance of the 4-neighbour Laplacian of a 2-d grayscale array."""
+    gray = np.asarray(gray, dtype=np.float32)
+    if gray.shape[0] < 3 or gray.shape[1] < 3:
+        return 0.0
+    lap = (
+        gray[:-2, 1:-1]
+        + gray[2:, 1:-1]
+        + gray[1:-1, :-2]
+        + gray[1:-1, 2:]
+        - 4.0 * gray[1:-1, 1:-1]
+    )
+    return float(lap.var())
+
+
+def compute_quality_metrics(image, face_box=None):
+    """
+    Compute quality metrics for one face crop.
+
+    Args:
+        image: PIL image or RGB/grayscale numpy array
+        face_box: Optional (top, right, bottom, left) face location inside
+            the crop; ``face_box_ratio`` is None when it is not known
+
+    Returns:
+        dict: Values keyed by the ``QUALITY_COLUMNS`` names
+    """
+    if isinstance(image, Image.Image):
+        gray = np.asarray(image.convert("L"), dtype=np.float32)
+    else:
+        array = np.asarray(image, dtype=np.float32)
+        if array.ndim == 3:
+            # ITU-R 601 luma, matching PIL's convert("L")
+            array = array[..., 0] * 0.299 + array[..., 1] * 0.587 + array[..., 2] * 0.114
+        gray = array
+
+    height, width = gray.shape[:2]
+    face_box_ratio = None
+    if face_box is not None and width and height:
+        top, right, bottom, left = face_box
+        face_box_ratio = max(0, bottom - top) * max(0, right - left) / float(width * height)
+
+    return {
+        "blur_variance": laplacian_variance(gray),
+        "image_width": int(width),
+        "image_height": int(height),
+        "face_box_ratio": face_box_ratio,
+        "brightness": float(gray.mean()) if gray.size else 0.0,
+    }
+
+
+def compute_quality_for_file(path, detect_face=False):
+    """
+    Compute quality metrics for an image file.
+
+    Args:
+        path: Path to the face crop
+        detect_face: Run a HOG face detection to fill ``face_box_ratio``
+
+    Returns:
+        dict or None if the image cannot be read
+    """
+    try:
+        with Image.open(path) as img:
+            rgb = np.asarray(img.convert("RGB"))
+    except Exception as e:
+        logger.error(f"Error reading {path} for quality metrics: {e}")
+        return None
+
+    face_box = None
+    if detect_face:
+        try:
+            import face_recognition
+
+            locations = face_recognition.face_locations(rgb, model="hog")
+            if locations:
+                face_box = max(
+                    locations, key=lambda loc: (loc[2] - loc[0]) * (loc[1] - loc[3])
+                )
+        except ImportError:
+            pass
+    return compute_quality_metrics(rgb, face_box)
+
+
+def is_low_quality(metrics, thresholds=None):
+    """Return True if any known metric falls outside the thresholds."""
+    thresholds = thresholds or get_thresholds()
+    for column, op, key in _LOW_QUALITY_RULES:
+        value = metrics.get(column)
+        if value is None:
+            continue
+        if (op == "<" and value < thresholds[key]) or (op == ">" and value > thresholds[key]):
+            return True
+    return False
+
+
+def indexed_any(terms, alias=""):
+    """
+    Build an ``id IN (... UNION ALL ...)`` predicate from single-column terms.
+
+    SQLite rarely picks its multi-index OR plan for range terms with bound
+    parameters, so each term gets its own indexed subquery instead.
+
+    Args:
+        terms: Conditions on one indexed column each, e.g. ``["image_width < ?"]``
+        alias: Optional table alias for the outer ``id`` reference
+    """
+    prefix = f"{alias}." if alias else ""
+    union = " UNION ALL ".join(f"SELECT id FROM faces WHERE {term}" for term in terms)
+    return f"{prefix}id IN ({union})"
+
+
+def low_quality_clause(alias="", thresholds=None):
+    """
+    SQL predicate matching low-quality faces, for indexed deletes/reports.
+
+    Returns:
+        tuple: (sql, params)
+    """
+    thresholds = thresholds or get_thresholds()
+    terms = [f"{column} {op} ?" for column, op, _ in _LOW_QUALITY_RULES]
+    params = [thresholds[key] for _, _, key in _LOW_QUALITY_RULES]
+    return indexed_any(terms, alias), params
+
+
+def quality_filter_clause(alias="", thresholds=None):
+    """
+    SQL predicate keeping faces that pass every threshold.
+
+    Faces that have not been scored yet (NULL metrics) are kept. Meant for
+    full passes such as index builds, so it is a plain row filter.
+
+    Returns:
+        tuple: (sql, params)
+    """
+    thresholds = thresholds or get_thresholds()
+    prefix = f"{alias}." if alias else ""
+    terms = [f"{prefix}{column} {op} ?" for column, op, _ in _LOW_QUALITY_RULES]
+    params = [thresholds[key] for _, _, key in _LOW_QUALITY_RULES]
+    return "NOT COALESCE(" + " OR ".join(terms) + ", 0)", params
+
+
+def ensure_quality_columns(cursor):
+    """Add the quality columns and their indexes to ``faces`` if missing."""
+    cursor.execute("PRAGMA table_info(faces)")
+    columns = [col[1] for col in cursor.fetchall()]
+    added = []
+    for column, column_type in QUALITY_COLUMNS.items():
+        if column not in columns:
+            cursor.execute(f"ALTER TABLE faces ADD COLUMN {column} {column_type}")
+            added.append(column)
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_faces_{column} ON faces({column})")
+    return added
+
+
+def save_quality_metrics(cursor, rows):
+    """
+    Store metrics for many faces in one batch.
+
+    Args:
+        cursor: DB-API cursor on the faces database
+        rows: Iterable of (filename, metrics dict)
+    """
+    cursor.executemany(
+        "UPDATE faces SET blur_variance = ?, image_width = ?, image_height = ?, "
+        "face_box_ratio = ?, brightness = ? WHERE filename = ?",
+        [
+            (
+                m["blur_variance"],
+                m["image_width"],
+                m["image_height"],
+                m["face_box_ratio"],
+                m["brightness"],
+                filename,
+            )
+            for filename, m in rows
+        ],
+    )
+
+
+def delete_faces_where(conn, predicate, params, faces_dir=None):
+    """
+    Delete faces matching an indexed quality predicate in one query.
+
+    The matching filenames are read first (same predicate) so their image
+    files and thumbnails can be removed from ``faces_dir``.
+
+    Args:
+        conn: sqlite3 connection to the faces database
+        predicate: SQL condition on the quality columns, e.g. ``"blur_variance < ?"``
+        params: Parameters for ``predicate``
+        faces_dir: Folder holding the crops (files are kept when None)
+
+    Returns:
+        int: Number of deleted rows
+    """
+    from utils.files.image_manifest import forget
+    from utils.files.thumbnails import THUMBNAIL_SIZES, supported_formats, thumbnail_path
+
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT filename FROM faces WHERE {predicate}", tuple(params))
+    filenames = [row[0] for row in cursor.fetchall()]
+
+    if faces_dir:
+        for filename in filenames:
+            forget(filename)
+            path = os.path.join(faces_dir, filename)
+            targets = [path] + [
+                thumbnail_path(path, size, fmt)
+                for size in THUMBNAIL_SIZES
+                for fmt in supported_formats()
+            ]
+            for target in targets:
+                try:
+                    os.remove(target)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.error(f"Error deleting {target}: {e}")
+
+    cursor.execute(f"DELETE FROM faces WHERE {predicate}", tuple(params))
+    conn.commit()
+    return cursor.rowcount
@@ -0,0 +1,210 @@
+"""
+Random Face Sampling
+====================
+
+Random grids without ``ORDER BY RANDOM()``. The sampler keeps every face id
+in a dense in-memory array (plus per-decade and per-state strata and a
+quality mask), draws positions with :func:`random.sample` over a
+``range`` (O(k) for k picks) and loads only the picked rows by primary key.
+
+The id array is rebuilt after a TTL (10 minutes; new yearbook faces are
+ingested offline); ids deleted in between are simply missing from
+the row fetch and topped up with a few extra draws.
+"""
+
+import logging
+import random
+import threading
+import time
+
+import numpy as np
+
+from utils.db.database import get_db_connection
+from utils.face.quality import quality_filter_clause
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 600
+# Extra draws when sampled ids were deleted since the last build
+TOP_UP_ROUNDS = 3
+
+
+def sample_positions(size, k, rng=random):
+    """``k`` distinct positions in ``range(size)`` in O(k)."""
+    return rng.sample(range(size), min(k, size))
+
+
+def sample_ids(ids, k, rng=random):
+    """``k`` distinct ids from a sequence or array of ids."""
+    return [int(ids[i]) for i in sample_positions(len(ids), k, rng)]
+
+
+class FaceSampler:
+    """
+    Dense id array over ``faces`` with memoised strata.
+
+    Filtered pools (decade, state, quality) are computed once per build with
+    a vectorised mask, so only the first draw from a new combination costs
+    O(n); later draws cost O(k).
+    """
+
+    def __init__(self, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._ids = None
+        self._decades = None
+        self._states = None
+        self._quality = None
+        self._pools = {}
+        self._built_at = None
+
+    @property
+    def is_loaded(self):
+        return self._ids is not None
+
+    def __len__(self):
+        return 0 if self._ids is None else len(self._ids)
+
+    def _fetch_rows(self):
+        conn = get_db_connection()
+        try:
+            cursor = conn.cursor()
+            quality_sql, quality_params = quality_filter_clause()
+            try:
+                cursor.execute(
+                    f"SELECT id, decade, state, CASE WHEN {quality_sql} THEN 1 ELSE 0 END FROM faces",
+                    quality_params,
+                )
+            except Exception as e:
+                # Quality columns not migrated yet: every face counts as good
+                logger.debug(f"Face sampler loading without quality flags: {e}")
+                conn.rollback()
+                cursor = conn.cursor()
+                cursor.execute("SELECT id, decade, state, 1 FROM faces")
+            return cursor.fetchall()
+        finally:
+            conn.close()
+
+    def build(self, rows=None):
+        """
+        (Re)load the id array in one query.
+
+        Args:
+            rows: Optional (id, decade, state, passes_quality) rows
+
+        Returns:
+            int: Number of faces
+        """
+        if rows is None:
+            rows = self._fetch_rows()
+        rows = [tuple(row) for row in rows]
+        ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        decades = np.array([row[1] or "" for row in rows], dtype=object)
+        states = np.array([row[2] or "" for row in rows], dtype=object)
+        quality = np.fromiter((bool(row[3]) for row in rows), dtype=bool, count=len(rows))
+
+        with self._lock:
+            self._ids, self._decades, self._states, self._quality = ids, decades, states, quality
+            self._pools = {}
+            self._built_at = time.monotonic()
+        logger.info(f"Face sampler loaded {len(ids)} ids")
+        return len(ids)
+
+    def ensure_loaded(self):
+        """Build on first use and again once the TTL has passed."""
+        built_at = self._built_at
+        if built_at is None or (self.ttl_seconds and time.monotonic() - built_at > self.ttl_seconds):
+            self.build()
+        return self
+
+    def _pool(self, decade=None, state=None, quality=False):
+        key = (decade, state, bool(quality))
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                if key == (None, None, False):
+                    pool = self._ids
+                else:
+                    mask = np.ones(len(self._ids), dtype=bool)
+                    if decade is not None:
+                        mask &= self._decades == decade
+                    if state is not None:
+                        mask &= self._states == state
+                    if quality:
+                        mask &= self._quality
+                    pool = self._ids[mask]
+                self._pools[key] = pool
+        return pool
+
+    def sample_ids(self, k, decade=None, state=None, quality=False, rng=random):
+        """
+        ``k`` random face ids, optionally from one decade and/or state.
+
+        Args:
+            k: Number of ids
+            decade: Restrict to ``faces.decade``
+            state: Restrict to ``faces.state``
+            quality: Only faces passing the quality thresholds
+        """
+        self.ensure_loaded()
+        return sample_ids(self._pool(decade, state, quality), k, rng)
+
+    def sample_stratified(self, k, by="decade", quality=False, rng=random):
+        """``k`` ids spread evenly over the distinct values of ``decade`` or ``state``."""
+        self.ensure_loaded()
+        values = [v for v in np.unique(self._decades if by == "decade" else self._states) if v]
+        if not values:
+            return self.sample_ids(k, quality=quality, rng=rng)
+        rng.shuffle(values)
+        per_value, extra = divmod(k, len(values))
+        picked = []
+        for i, value in enumerate(values):
+            want = per_value + (1 if i < extra else 0)
+            if want:
+                picked.extend(self.sample_ids(want, quality=quality, rng=rng, **{by: value}))
+        return picked
+
+    def sample_rows(self, cursor, k, columns="*", **filters):
+        """
+        Load ``k`` random face rows by primary key.
+
+        Args:
+            cursor: Open database cursor
+            k: Number of rows
+            columns: Column list for the SELECT (must include ``id``)
+            **filters: Passed to :meth:`sample_ids`
+
+        Returns:
+            list: Rows in random order (may be short if the table shrank)
+        """
+        ids = self.sample_ids(k, **filters)
+        rows = self._fetch_by_ids(cursor, ids, columns)
+        tried = set(ids)
+        for _ in range(TOP_UP_ROUNDS):
+            if len(rows) >= len(ids):
+                break
+            # Some ids were deleted since the last build; over-draw to replace them
+            missing = len(ids) - len(rows)
+            extra = [i for i in self.sample_ids(missing * 2, **filters) if i not in tried]
+            tried.update(extra)
+            rows += self._fetch_by_ids(cursor, extra, columns)[:missing]
+        return rows
+
+    @staticmethod
+    def _fetch_by_ids(cursor, ids, columns):
+        if not ids:
+            return []
+        cursor.execute(
+            f"SELECT {columns} FROM faces WHERE id IN ({','.join('?' * len(ids))})",
+            ids,
+        )
+        by_id = {row["id"]: row for row in cursor.fetchall()}
+        return [by_id[i] for i in ids if i in by_id]
+
+
+face_sampler = FaceSampler()
+
+
+def get_face_sampler():
+    """Return the shared face sampler, loading it on first use."""
+    return face_sampler.ensure_loaded()
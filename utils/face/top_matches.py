@@ -0,0 +1,398 @@
+"""
+Materialised User Top Matches
+=============================
+
+Keeps a compact ``user_top_matches`` table (user_id, rank, face_id,
+distance) with every registered user's best yearbook lookalikes, so
+profile and mobile views read pre-ranked matches with one indexed query
+instead of running a FAISS search per visit.
+
+Rows are refreshed in the background by :class:`TopMatchRefresher` when
+
+- a user has an encoding but no rows yet,
+- the user's encoding changes (:func:`enqueue_user` from the upload path),
+- the face index gains faces closer to a user than that user's current
+  K-th match (found with one kNN per new face over the registered user
+  index, see ``utils/index/user_index.py``).
+"""
+
+import hashlib
+import logging
+import queue
+import threading
+import time
+
+import numpy as np
+
+from utils.db.database import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOP_K = 50
+DEFAULT_SWEEP_SECONDS = 60
+# How many users to consider per new face when looking for displaced top-K lists
+NEAR_USERS_PER_FACE = 50
+
+
+def ensure_top_matches_tables(cursor):
+    """Create ``user_top_matches`` and its refresh-state table if missing."""
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS user_top_matches (
+            user_id INTEGER NOT NULL,
+            rank INTEGER NOT NULL,
+            face_id INTEGER NOT NULL,
+            distance REAL NOT NULL,
+            PRIMARY KEY (user_id, rank)
+        )
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS user_top_match_state (
+            user_id INTEGER PRIMARY KEY,
+            encoding_hash TEXT NOT NULL,
+            index_version TEXT,
+            kth_distance REAL,
+            refreshed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+
+
+def encoding_hash(blob):
+    """Hash of a users.face_encoding BLOB, used to detect photo changes."""
+    return hashlib.sha1(blob).hexdigest()
+
+
+def rank_matches(encoding, index_manager, face_ids_by_filename, top_k, exclude_face_ids=()):
+    """
+    Search the face index and return ranked (face_id, distance) pairs.
+
+    Args:
+        encoding: 128-d user encoding
+        index_manager: FaissIndexManager to search
+        face_ids_by_filename: Callable mapping a list of filenames to {filename: face_id}
+        top_k: Number of matches to keep
+        exclude_face_ids: Faces to leave out (the user's own claimed faces)
+    """
+    query = np.asarray(encoding, dtype=np.float32)
+    # Over-fetch a little so excluded faces do not shorten the list
+    distances, _, filenames = index_manager.search(query, top_k=top_k + len(exclude_face_ids) + 1)
+    hits = [(f, float(d)) for f, d in zip(filenames, distances) if f is not None]
+    ids = face_ids_by_filename([f for f, _ in hits])
+
+    ranked = []
+    for filename, distance in hits:
+        face_id = ids.get(filename)
+        if face_id is None or face_id in exclude_face_ids:
+            continue
+        ranked.append((face_id, distance))
+        if len(ranked) == top_k:
+            break
+    return ranked
+
+
+def _face_ids_by_filename(cursor):
+    def lookup(filenames):
+        if not filenames:
+            return {}
+        placeholders = ",".join("?" * len(filenames))
+        cursor.execute(
+            f"SELECT id, filename FROM faces WHERE filename IN ({placeholders})", filenames
+        )
+        return {row[1]: row[0] for row in cursor.fetchall()}
+
+    return lookup
+
+
+def refresh_user_top_matches(conn, user_id, index_manager, top_k=DEFAULT_TOP_K):
+    """
+    Recompute and store one user's top matches.
+
+    Returns:
+        int: Number of stored matches (0 when the user has no encoding)
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT face_encoding FROM users WHERE id = ?", (user_id,))
+    row = cursor.fetchone()
+    cursor.execute("DELETE FROM user_top_matches WHERE user_id = ?", (user_id,))
+    if not row or not row[0]:
+        cursor.execute("DELETE FROM user_top_match_state WHERE user_id = ?", (user_id,))
+        conn.commit()
+        return 0
+
+    blob = row[0]
+    encoding = np.frombuffer(blob, dtype=np.float64)
+    cursor.execute("SELECT id FROM faces WHERE claimed_by_user_id = ?", (user_id,))
+    own_faces = {r[0] for r in cursor.fetchall()}
+
+    ranked = rank_matches(encoding, index_manager, _face_ids_by_filename(cursor), top_k, own_faces)
+    cursor.executemany(
+        "INSERT INTO user_top_matches (user_id, rank, face_id, distance) VALUES (?, ?, ?, ?)",
+        [(user_id, rank, face_id, distance) for rank, (face_id, distance) in enumerate(ranked, 1)],
+    )
+    kth_distance = ranked[-1][1] if len(ranked) == top_k else None
+    cursor.execute(
+        "INSERT OR REPLACE INTO user_top_match_state "
+        "(user_id, encoding_hash, index_version, kth_distance, refreshed_at) "
+        "VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)",
+        (user_id, encoding_hash(blob), getattr(index_manager, "version", None), kth_distance),
+    )
+    conn.commit()
+    return len(ranked)
+
+
+def users_missing_top_matches(cursor):
+    """Users with an encoding but no (or outdated) materialised matches."""
+    cursor.execute(
+        """
+        SELECT u.id, u.face_encoding, s.encoding_hash
+        FROM users u
+        LEFT JOIN user_top_match_state s ON s.user_id = u.id
+        WHERE u.face_encoding IS NOT NULL
+        """
+    )
+    return [
+        row[0]
+        for row in cursor.fetchall()
+        if row[2] is None or row[2] != encoding_hash(row[1])
+    ]
+
+
+def users_displaced_by_faces(cursor, face_vectors, user_index, per_face=NEAR_USERS_PER_FACE):
+    """
+    Users whose top-K list a set of new faces would enter.
+
+    Each new face runs one kNN over the registered user index; a user is
+    affected when the face is closer than their stored K-th distance (or
+    their list is not full yet). Stored distances are the face index's
+    squared L2, so the user index's L2 distances are squared to compare.
+    """
+    if len(face_vectors) == 0:
+        return set()
+    candidates = {}
+    for vector in face_vectors:
+        for hit in user_index.search(vector, top_k=per_face):
+            user_id = hit["user_id"]
+            candidates[user_id] = min(hit["distance"] ** 2, candidates.get(user_id, float("inf")))
+    if not candidates:
+        return set()
+
+    ids = list(candidates)
+    placeholders = ",".join("?" * len(ids))
+    cursor.execute(
+        f"SELECT user_id, kth_distance FROM user_top_match_state WHERE user_id IN ({placeholders})",
+        ids,
+    )
+    kth = {row[0]: row[1] for row in cursor.fetchall()}
+    return {
+        user_id
+        for user_id, distance in candidates.items()
+        if user_id in kth and (kth[user_id] is None or distance < kth[user_id])
+    }
+
+
+def get_top_matches(user_id, limit=DEFAULT_TOP_K):
+    """
+    Read a user's pre-ranked matches with face details (one indexed query).
+
+    Returns:
+        list: Dicts with rank, distance and face columns, best first
+    """
+    conn = get_db_connection()
+    if not conn:
+        return []
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT t.rank, t.distance, f.id, f.filename, f.school_name,
+                   f.yearbook_year, f.page_number, f.state, f.decade, f.claimed_by_user_id
+            FROM user_top_matches t
+            JOIN faces f ON f.id = t.face_id
+            WHERE t.user_id = ?
+            ORDER BY t.rank
+            LIMIT ?
+            """,
+            (user_id, limit),
+        )
+        return [dict(row) for row in cursor.fetchall()]
+    except Exception as e:
+        logger.error(f"Error reading top matches for user {user_id}: {e}")
+        return []
+    finally:
+        conn.close()
+
+
+def serialize_top_matches(user_id, limit=DEFAULT_TOP_K):
+    """Top matches as match cards (see utils.serializers.serialize_match_card)."""
+    from utils.face.recognition import calculate_similarity
+    from utils.serializers import serialize_match_card
+
+    cards = []
+    for row in get_top_matches(user_id, limit):
+        card = serialize_match_card(row, None, calculate_similarity(row["distance"]))
+        card["rank"] = row["rank"]
+        card["distance"] = row["distance"]
+        cards.append(card)
+    return cards
+
+
+class TopMatchRefresher:
+    """
+    Background worker keeping ``user_top_matches`` current.
+
+    A single worker drains a queue of user ids and, every sweep interval,
+    enqueues users without rows and users displaced by faces added to the
+    index since the last sweep. It runs either as a daemon thread inside
+    the app (``USER_TOP_MATCHES_REFRESHER``, started by ``create_app`` on
+    each worker's first request) or as its own process with
+    ``python manage.py refresh_top_matches --loop``, which is preferable
+    with several gunicorn workers. Each sweep reloads the FAISS index when
+    its file was rebuilt, so a long-running refresher never works against
+    a stale index.
+    """
+
+    def __init__(self, top_k=DEFAULT_TOP_K, sweep_seconds=DEFAULT_SWEEP_SECONDS):
+        self.top_k = top_k
+        self.sweep_seconds = sweep_seconds
+        self._queue = queue.Queue()
+        self._pending = set()
+        self._pending_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._app = None
+        self._seen_version = None
+        self._seen_filenames = None
+
+    def enqueue(self, user_ids):
+        """Schedule users for a refresh (duplicates are coalesced)."""
+        if isinstance(user_ids, int):
+            user_ids = [user_ids]
+        with self._pending_lock:
+            for user_id in user_ids:
+                if user_id not in self._pending:
+                    self._pending.add(user_id)
+                    self._queue.put(user_id)
+
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _configure(self, app):
+        self._app = app
+        self.top_k = app.config.get("USER_TOP_MATCHES_K", self.top_k)
+        self.sweep_seconds = app.config.get("USER_TOP_MATCHES_SWEEP_SECONDS", self.sweep_seconds)
+
+    def start(self, app):
+        """Start the worker thread for ``app`` (idempotent)."""
+        with self._start_lock:
+            if self.is_running:
+                return
+            self._configure(app)
+            self._thread = threading.Thread(target=self._run, name="top-match-refresher", daemon=True)
+            self._thread.start()
+        logger.info("Top match refresher started")
+
+    def run_forever(self, app):
+        """Run the worker loop in the calling thread (separate process mode)."""
+        self._configure(app)
+        self._run()
+
+    def run_once(self):
+        """One sweep plus a synchronous refresh of every stale user. Must run in an app context."""
+        self.sweep()
+        refreshed = 0
+        while True:
+            try:
+                user_id = self._queue.get_nowait()
+            except queue.Empty:
+                return refreshed
+            with self._pending_lock:
+                self._pending.discard(user_id)
+            self.refresh(user_id)
+            refreshed += 1
+
+    def _new_face_vectors(self, index_manager):
+        """Vectors of faces added to the index since the previous sweep."""
+        # Positions and vectors must come from the same loaded index
+        version, index, filenames = index_manager.snapshot()
+        filenames = list(filenames or [])
+        if self._seen_filenames is None or version == self._seen_version:
+            # First sweep only records the baseline
+            self._seen_version, self._seen_filenames = version, set(filenames)
+            return []
+        positions = [i for i, f in enumerate(filenames) if f not in self._seen_filenames]
+        self._seen_version, self._seen_filenames = version, set(filenames)
+        return [index.reconstruct(i) for i in positions]
+
+    def sweep(self):
+        """Find stale users and enqueue them. Must run in an app context."""
+        from utils.index.faiss_manager import faiss_index_manager
+        from utils.index.user_index import get_registered_user_index
+
+        conn = get_db_connection()
+        try:
+            cursor = conn.cursor()
+            ensure_top_matches_tables(cursor)
+            conn.commit()
+            stale = set(users_missing_top_matches(cursor))
+            # Pick up rebuilds done by ingestion or other processes
+            if faiss_index_manager.reload_if_changed():
+                new_vectors = self._new_face_vectors(faiss_index_manager)
+                if new_vectors:
+                    stale |= users_displaced_by_faces(cursor, new_vectors, get_registered_user_index())
+        finally:
+            conn.close()
+        if stale:
+            logger.info(f"Top match refresher: {len(stale)} users to refresh")
+            self.enqueue(sorted(stale))
+
+    def refresh(self, user_id):
+        """Refresh one user now. Must run in an app context."""
+        from utils.index.faiss_manager import faiss_index_manager
+
+        if not faiss_index_manager.load_index():
+            return 0
+        conn = get_db_connection()
+        try:
+            return refresh_user_top_matches(conn, user_id, faiss_index_manager, self.top_k)
+        finally:
+            conn.close()
+
+    def _run(self):
+        next_sweep = 0.0
+        while True:
+            timeout = max(0.0, next_sweep - time.monotonic())
+            try:
+                user_id = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                user_id = None
+
+            with self._app.app_context():
+                try:
+                    if user_id is not None:
+                        with self._pending_lock:
+                            self._pending.discard(user_id)
+                        self.refresh(user_id)
+                    if time.monotonic() >= next_sweep:
+                        self.sweep()
+                        next_sweep = time.monotonic() + self.sweep_seconds
+                except Exception as e:
+                    logger.error(f"Top match refresher error: {e}")
+                    next_sweep = time.monotonic() + self.sweep_seconds
+
+
+top_match_refresher = TopMatchRefresher()
+
+
+def enqueue_user(user_id):
+    """
+    Hook for encoding changes: refresh this user's top matches soon.
+
+    Without an in-process worker this is a no-op; a separate refresher
+    process notices the changed encoding hash on its next sweep.
+    """
+    if top_match_refresher.is_running:
+        top_match_refresher.enqueue(user_id)
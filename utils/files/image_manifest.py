@@ -0,0 +1,298 @@
+"""
+Image Location Manifest
+=======================
+
+In-memory map of image filename -> storage location (a local folder or a
+B2 key), so request handlers resolve image paths with a dict lookup instead
+of probing several directories with ``os.path.exists``.
+
+The manifest is built once at startup from a scan of the local image
+folders plus the ``image_locations`` table (B2 uploads), and is kept
+current by the upload and delete paths through :func:`record_local`,
+:func:`record_b2` and :func:`forget`.
+
+Each gunicorn worker has its own manifest and those hooks only update the
+worker that ran them, so files written by another worker or an ingestion
+script are resolved on a miss: one ``os.path.exists`` per folder plus one
+``image_locations`` lookup, recorded on success. Misses are remembered for
+``MISS_RECHECK_SECONDS`` so unknown filenames are not re-probed per request.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+
+from utils.files.thumbnails import THUMBNAIL_DIR
+
+logger = logging.getLogger(__name__)
+
+LOCAL = "local"
+B2 = "b2"
+
+# Static sub-folders scanned at startup, in lookup priority order
+STATIC_IMAGE_FOLDERS = ("extracted_faces", "faces", "profile_pics")
+
+MISS_RECHECK_SECONDS = 60
+MAX_REMEMBERED_MISSES = 10000
+
+ImageLocation = namedtuple("ImageLocation", ["storage", "folder", "web_prefix", "key"])
+ImageLocation.__doc__ = """Where an image lives.
+
+``folder``/``web_prefix`` are set for local files (``web_prefix`` is the
+path under ``/static`` or None when the folder is not served), ``key`` for
+B2 objects.
+"""
+
+
+class ImageManifest:
+    """Thread-safe filename -> :class:`ImageLocation` map."""
+
+    def __init__(self, b2_lookup=None):
+        self._entries = {}
+        self._roots = []
+        # filename -> monotonic time of the last probe that found nothing
+        self._misses = {}
+        self._lock = threading.Lock()
+        # Optional callable(filename) -> B2 key or None, used on misses
+        self.b2_lookup = b2_lookup
+        self.ready = False
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, filename):
+        return filename in self._entries
+
+    def build(self, roots, b2_rows=()):
+        """
+        Replace the manifest with a fresh scan.
+
+        Args:
+            roots: Iterable of (directory, web_prefix) in priority order; the
+                first folder holding a filename wins
+            b2_rows: Iterable of (filename, key) for objects stored in B2;
+                local copies take precedence
+
+        Returns:
+            int: Number of indexed filenames
+        """
+        roots = [(os.path.abspath(folder), prefix) for folder, prefix in roots]
+        entries = {}
+        for folder, prefix in roots:
+            try:
+                with os.scandir(folder) as it:
+                    for entry in it:
+                        if entry.name == THUMBNAIL_DIR or not entry.is_file():
+                            continue
+                        entries.setdefault(entry.name, ImageLocation(LOCAL, folder, prefix, None))
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                logger.error(f"Error scanning {folder} for image manifest: {e}")
+        for filename, key in b2_rows:
+            entries.setdefault(filename, ImageLocation(B2, None, None, key))
+
+        with self._lock:
+            self._entries = entries
+            self._roots = roots
+            self._misses = {}
+            self.ready = True
+        logger.info(f"Image manifest built with {len(entries)} files from {len(roots)} folders")
+        return len(entries)
+
+    def lookup(self, filename):
+        """Return the :class:`ImageLocation` for ``filename`` or None."""
+        if not filename:
+            return None
+        name = os.path.basename(filename)
+        location = self._entries.get(name)
+        if location is None and self.ready:
+            location = self._probe(name)
+        return location
+
+    def _probe(self, name):
+        """Resolve a file this worker has not seen, e.g. uploaded through another worker."""
+        checked = self._misses.get(name)
+        if checked is not None and time.monotonic() - checked < MISS_RECHECK_SECONDS:
+            return None
+        location = None
+        for folder, prefix in self._roots:
+            if os.path.exists(os.path.join(folder, name)):
+                location = ImageLocation(LOCAL, folder, prefix, None)
+                break
+        if location is None and self.b2_lookup is not None:
+            key = self.b2_lookup(name)
+            if key:
+                location = ImageLocation(B2, None, None, key)
+        with self._lock:
+            if location is None:
+                if len(self._misses) >= MAX_REMEMBERED_MISSES:
+                    self._misses.clear()
+                self._misses[name] = time.monotonic()
+            else:
+                self._misses.pop(name, None)
+                location = self._entries.setdefault(name, location)
+        return location
+
+    def add_local(self, filename, folder):
+        """Record a file saved to a local folder."""
+        folder = os.path.abspath(folder)
+        prefix = next((p for root, p in self._roots if root == folder), None)
+        with self._lock:
+            self._entries[filename] = ImageLocation(LOCAL, folder, prefix, None)
+            self._misses.pop(filename, None)
+
+    def add_b2(self, filename, key):
+        """Record an object uploaded to B2 (a local copy still wins)."""
+        with self._lock:
+            current = self._entries.get(filename)
+            if current is None or current.storage != LOCAL:
+                self._entries[filename] = ImageLocation(B2, None, None, key)
+            self._misses.pop(filename, None)
+
+    def remove(self, filename):
+        """Drop a deleted file from the manifest."""
+        with self._lock:
+            self._entries.pop(filename, None)
+
+    def local_path(self, filename):
+        """Absolute filesystem path for a local image, or None."""
+        location = self.lookup(filename)
+        if location is None or location.storage != LOCAL:
+            return None
+        return os.path.join(location.folder, os.path.basename(filename))
+
+    def web_path(self, filename, b2_base_url=None):
+        """
+        URL path for an image, or None when it is unknown or not served.
+
+        Local files map to ``/static/<prefix>/<filename>``; B2 objects map
+        to ``<b2_base_url>/<key>`` when a public download URL is configured.
+        """
+        location = self.lookup(filename)
+        if location is None:
+            return None
+        if location.storage == LOCAL:
+            if location.web_prefix is None:
+                return None
+            return f"/static/{location.web_prefix}/{os.path.basename(filename)}"
+        if b2_base_url:
+            return f"{b2_base_url.rstrip('/')}/{location.key}"
+        return None
+
+
+manifest = ImageManifest()
+
+
+def manifest_roots(app):
+    """Return the (directory, web_prefix) folders to scan for ``app``."""
+    static_folder = app.static_folder or os.path.join(app.root_path, "static")
+    roots = []
+    extracted = app.config.get("EXTRACTED_FACES")
+    if extracted:
+        extracted = os.path.abspath(extracted)
+        prefix = None
+        if extracted.startswith(os.path.abspath(static_folder) + os.sep):
+            prefix = os.path.relpath(extracted, static_folder).replace("\\", "/")
+        roots.append((extracted, prefix))
+    for folder in STATIC_IMAGE_FOLDERS:
+        roots.append((os.path.join(static_folder, folder), folder))
+    return roots
+
+
+def ensure_locations_table(cursor):
+    """Create the ``image_locations`` table (filename -> B2 key) if missing."""
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS image_locations (
+            filename TEXT PRIMARY KEY,
+            storage TEXT NOT NULL,
+            location TEXT NOT NULL
+        )
+        """
+    )
+
+
+def _load_b2_rows():
+    from utils.db.database import get_db_connection
+
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        ensure_locations_table(cursor)
+        conn.commit()
+        cursor.execute("SELECT filename, location FROM image_locations WHERE storage = ?", (B2,))
+        return [(row[0], row[1]) for row in cursor.fetchall()]
+    except Exception as e:
+        logger.error(f"Error loading image_locations: {e}")
+        return []
+    finally:
+        conn.close()
+
+
+def _lookup_b2_key(filename):
+    """B2 key recorded for ``filename`` by any process, or None."""
+    from utils.db.database import get_db_connection
+
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT location FROM image_locations WHERE filename = ? AND storage = ?",
+            (filename, B2),
+        )
+        row = cursor.fetchone()
+        return row[0] if row else None
+    except Exception as e:
+        logger.error(f"Error looking up image location for {filename}: {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def build_manifest(app):
+    """Build the global manifest for ``app`` (called from startup)."""
+    with app.app_context():
+        manifest.b2_lookup = _lookup_b2_key
+        return manifest.build(manifest_roots(app), _load_b2_rows())
+
+
+def get_manifest():
+    """Return the global manifest, building it on first use if startup did not."""
+    if not manifest.ready:
+        from flask import current_app
+
+        build_manifest(current_app._get_current_object())
+    return manifest
+
+
+def record_local(filename, folder):
+    """Upload hook: a file was written to a local folder."""
+    manifest.add_local(filename, folder)
+
+
+def record_b2(filename, key):
+    """Upload hook: a file was stored in B2; persisted so restarts keep it."""
+    from utils.db.database import get_db_connection
+
+    manifest.add_b2(filename, key)
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        ensure_locations_table(cursor)
+        cursor.execute(
+            "INSERT OR REPLACE INTO image_locations (filename, storage, location) VALUES (?, ?, ?)",
+            (filename, B2, key),
+        )
+        conn.commit()
+    except Exception as e:
+        logger.error(f"Error recording B2 location for {filename}: {e}")
+    finally:
+        conn.close()
+
+
+def forget(filename):
+    """Delete hook: a file was removed from storage."""
+    manifest.remove(os.path.basename(filename))
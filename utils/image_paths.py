@@ -142,14 +142,14 @@ def normalize_extracted_face_path(filename):
     decoded_filename = urllib.parse.unquote(urllib.parse.unquote(filename))
     basename = os.path.basename(decoded_filename)
     encoded_filename = urllib.parse.quote(basename, safe='')
-    extracted_faces_path = os.path.join(current_app.root_path, 'static', 'extracted_faces', basename)
-    if os.path.exists(extracted_faces_path):
-        return url_for('static', filename=f'extracted_faces/{encoded_filename}')
-    faces_path = os.path.join(current_app.root_path, 'static', 'faces', basename)
-    if os.path.exists(faces_path):
-        return url_for('static', filename=f'faces/{encoded_filename}')
-    static_path = os.path.join(current_app.root_path, 'static', basename)
-    if os.path.exists(static_path):
-        return url_for('static', filename=encoded_filename)
+    from utils.files.image_manifest import LOCAL, get_manifest
+
+    location = get_manifest().lookup(basename)
+    if location is not None and location.storage == LOCAL and location.web_prefix:
+        return url_for('static', filename=f'{location.web_prefix}/{encoded_filename}')
+    if location is not None:
+        web_path = get_manifest().web_path(basename, current_app.config.get('B2_DOWNLOAD_URL'))
+        if web_path:
+            return web_path
     current_app.logger.warning(f"Face image not found: {basename}")
     return url_for('static', filename='default_profile.png')
@@ -1,6 +1,6 @@
 """
 FAISS index manager for efficient similarity search.
-This module provides a lazy-loading singleton for the FAISS index.
+This module provides a lazy-loading singleton FAISS index per embedding backend.
 """
 
 import logging
@@ -13,51 +13,75 @@ from flask import current_app
 
 import numpy as np
 
+from utils.blocking import CPU, run_blocking
+from utils.face.embedding_store import load_embeddings
+from utils.face.quality import quality_filter_clause
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
+DEFAULT_BACKEND = "dlib"
+
 
 class FaissIndexManager:
     """
-    Singleton class for managing the FAISS index.
+    Per-backend singleton class for managing a FAISS index.
     Provides lazy loading and thread-safe access to the index.
+
+    There is one instance per embedding backend (see utils.face.encoders);
+    ``FaissIndexManager()`` returns the default dlib index.
     """
 
-    _instance = None
+    _instances = {}
     _lock = threading.Lock()
 
-    def __new__(cls):
-        """Ensure singleton instance."""
+    def __new__(cls, backend=DEFAULT_BACKEND):
+        """Ensure one instance per backend."""
         with cls._lock:
-            if cls._instance is None:
-                cls._instance = super(FaissIndexManager, cls).__new__(cls)
-                cls._instance._initialized = False
-            return cls._instance
+            if backend not in cls._instances:
+                instance = super(FaissIndexManager, cls).__new__(cls)
+                instance._initialized = False
+                cls._instances[backend] = instance
+            return cls._instances[backend]
 
-    def __init__(self):
+    def __init__(self, backend=DEFAULT_BACKEND):
         """Initialize the FAISS index manager."""
         if not self._initialized:
+            self.backend = backend
+            self._lock = threading.Lock()
             self._index = None
             self._filenames = None
+            self._positions = None
             self._initialized = True
             self._loaded = False
             self._loading = False
+            self.version = None
+            self._file_mtime = None
+
+    def _backend_path(self, path):
+        """Suffix a path with the backend name for non-default backends."""
+        if self.backend == DEFAULT_BACKEND:
+            return path
+        root, ext = os.path.splitext(path)
+        return f"{root}.{self.backend}{ext}"
 
     def _get_index_path(self):
         """Get the path to the FAISS index file."""
         try:
-            return current_app.config["INDEX_PATH"]
+            path = current_app.config["INDEX_PATH"]
         except RuntimeError:
             # Not in Flask context
-            return os.environ.get("INDEX_PATH", "faces.index")
+            path = os.environ.get("INDEX_PATH", "faces.index")
+        return self._backend_path(path)
 
     def _get_map_path(self):
         """Get the path to the filenames mapping file."""
         try:
-            return current_app.config["MAP_PATH"]
+            path = current_app.config["MAP_PATH"]
         except RuntimeError:
             # Not in Flask context
-            return os.environ.get("MAP_PATH", "faces_filenames.pkl")
+            path = os.environ.get("MAP_PATH", "faces_filenames.pkl")
+        return self._backend_path(path)
 
     def is_loaded(self):
         """Check if the index is loaded."""
@@ -67,6 +91,43 @@ class FaissIndexManager:
         """Check if the index is currently being loaded."""
         return self._loading
 
+    def _set_version(self, index_path):
+        """
+        Record a version for the index that is now in memory.
+
+        Built from the index file's mtime and vector count, so every worker
+        serving the same file agrees on it; search caches key on it.
+        """
+        try:
+            mtime = os.stat(index_path).st_mtime_ns
+        except OSError:
+            mtime = 0
+        self._file_mtime = mtime
+        self.version = f"{self.backend}:{mtime}:{self._index.ntotal}"
+
+    def file_changed(self):
+        """True when the index file on disk is not the one in memory (rebuilt elsewhere)."""
+        try:
+            mtime = os.stat(self._get_index_path()).st_mtime_ns
+        except OSError:
+            return False
+        return self._loaded and mtime != self._file_mtime
+
+    def reload_if_changed(self):
+        """
+        Load the index, re-reading it if the file was rebuilt since it was loaded.
+
+        Long-running processes (the top match refresher) call this instead of
+        :meth:`load_index`, which returns early once anything is loaded.
+
+        Returns:
+            bool: True if an index is loaded
+        """
+        if self.file_changed():
+            logger.info("FAISS index file changed on disk, reloading")
+            return self.load_index(force=True)
+        return self.load_index()
+
     def load_index(self, force=False):
         """
         Load the FAISS index and filenames mapping.
@@ -111,6 +172,7 @@ class FaissIndexManager:
                 logger.info(
                     f"FAISS index loaded successfully with {self._index.ntotal} vectors"
                 )
+                self._set_version(index_path)
                 self._loaded = True
                 self._loading = False
                 return True
@@ -120,6 +182,27 @@ class FaissIndexManager:
                 self._loading = False
                 return False
 
+    def _snapshot(self):
+        """
+        Return the current (index, filenames) pair.
+
+        Loads and rebuilds swap in new objects under the lock instead of
+        changing the current ones, so searches run on a snapshot outside the
+        lock and concurrent searches do not queue behind each other.
+        """
+        with self._lock:
+            return self._index, self._filenames
+
+    def snapshot(self):
+        """
+        Return a consistent (version, index, filenames) triple.
+
+        For callers that walk the index outside the manager (positions and
+        vectors must come from the same load).
+        """
+        with self._lock:
+            return self.version, self._index, self._filenames
+
     def search(self, query_vector, top_k=20):
         """
         Search the FAISS index for similar vectors.
@@ -135,48 +218,126 @@ class FaissIndexManager:
             if not self.load_index():
                 return [], [], []
 
-        with self._lock:
-            try:
-                # Ensure query vector is in the right shape
-                if isinstance(query_vector, list):
-                    query_vector = np.array(query_vector, dtype=np.float32)
+        index, filenames = self._snapshot()
+        try:
+            # Ensure query vector is in the right shape
+            if isinstance(query_vector, list):
+                query_vector = np.array(query_vector, dtype=np.float32)
 
-                if len(query_vector.shape) == 1:
-                    query_vector = query_vector.reshape(1, -1)
+            if len(query_vector.shape) == 1:
+                query_vector = query_vector.reshape(1, -1)
 
-                # Ensure the vector is float32
-                query_vector = query_vector.astype(np.float32)
+            # Ensure the vector is float32
+            query_vector = query_vector.astype(np.float32)
 
-                # Search the index
-                distances, indices = self._index.search(query_vector, top_k)
+            # Search the index
+            distances, indices = run_blocking(index.search, query_vector, top_k, kind=CPU)
 
-                # Get the filenames for the results
-                result_filenames = []
-                for idx in indices[0]:
-                    if idx >= 0 and idx < len(self._filenames):
-                        result_filenames.append(self._filenames[idx])
-                    else:
-                        result_filenames.append(None)
+            # Get the filenames for the results
+            result_filenames = []
+            for idx in indices[0]:
+                if idx >= 0 and idx < len(filenames):
+                    result_filenames.append(filenames[idx])
+                else:
+                    result_filenames.append(None)
+
+            return distances[0], indices[0], result_filenames
+        except Exception as e:
+            logger.error(f"Error searching FAISS index: {e}")
+            return [], [], []
+
+    def search_batch(self, query_vectors, top_k=20):
+        """
+        Search the FAISS index for several query vectors in one call.
+
+        Args:
+            query_vectors: (n, d) array or list of vectors
+            top_k: The number of results per query
+
+        Returns:
+            list: One (distances, indices, filenames) tuple per query
+        """
+        if not self._loaded:
+            if not self.load_index():
+                return []
+
+        queries = np.asarray(query_vectors, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries.reshape(1, -1)
+        if len(queries) == 0:
+            return []
+
+        index, filenames = self._snapshot()
+        try:
+            distances, indices = run_blocking(index.search, queries, top_k, kind=CPU)
+            results = []
+            for row_distances, row_indices in zip(distances, indices):
+                row_filenames = [
+                    filenames[idx] if 0 <= idx < len(filenames) else None
+                    for idx in row_indices
+                ]
+                results.append((row_distances, row_indices, row_filenames))
+            return results
+        except Exception as e:
+            logger.error(f"Error batch searching FAISS index: {e}")
+            return []
+
+    def reconstruct_by_filename(self, filename):
+        """
+        Return the stored vector for an indexed filename, or None.
+
+        The filename -> position map is built on first use per loaded index.
+        Index types that cannot reconstruct vectors return None, so callers
+        can fall back to the embedding store.
+        """
+        if not self._loaded:
+            if not self.load_index():
+                return None
 
-                return distances[0], indices[0], result_filenames
+        with self._lock:
+            try:
+                if self._positions is None or self._positions[0] is not self._filenames:
+                    self._positions = (
+                        self._filenames,
+                        {name: position for position, name in enumerate(self._filenames)},
+                    )
+                position = self._positions[1].get(filename)
+                if position is None or position >= self._index.ntotal:
+                    return None
+                return np.asarray(self._index.reconstruct(position), dtype=np.float32)
             except Exception as e:
-                logger.error(f"Error searching FAISS index: {e}")
-                return [], [], []
+                logger.debug(f"Could not reconstruct vector for {filename}: {e}")
+                return None
 
-    def rebuild_index(self, face_encodings=None, filenames=None, dimension=128):
+    def rebuild_index(self, face_encodings=None, filenames=None, dimension=None):
         """
         Rebuild the FAISS index from scratch.
 
         Args:
             face_encodings: The face encodings to index
             filenames: The filenames corresponding to the encodings
-            dimension: The dimension of the face encodings
+            dimension: The dimension of the face encodings (defaults to the
+                backend's dimension)
 
         Returns:
             bool: True if rebuilt successfully, False otherwise
         """
         import sqlite3
 
+        from utils.face.encoders import get_backend
+
+        if dimension is None:
+            dimension = get_backend(self.backend).dimension
+
+        if self.backend != DEFAULT_BACKEND and (
+            face_encodings is None or filenames is None
+        ):
+            # Non-dlib vectors live in the face_embeddings store
+            filenames, face_encodings = load_embeddings(self.backend)
+            if len(filenames) == 0:
+                logger.error(f"No {self.backend} embeddings found to build index")
+                return False
+
         with self._lock:
             try:
                 # If no face encodings provided, load from database
@@ -613,12 +774,35 @@ class FaissIndexManager:
                             f"Fetching up to {max_encodings} encodings in batches of {batch_size}"
                         )
 
-                        # Use a single query with LIMIT and OFFSET for batching
-                        cursor.execute(
-                            "SELECT filename, encoding FROM faces WHERE encoding IS NOT NULL ORDER BY RANDOM() LIMIT ?",
-                            (max_encodings,),
-                        )
-                        rows = cursor.fetchall()
+                        # Keep low-quality crops out of the index entirely
+                        quality_sql, quality_params = "", []
+                        if "blur_variance" in columns:
+                            quality_sql, quality_params = quality_filter_clause()
+                            quality_sql = f" AND {quality_sql}"
+
+                        if count <= max_encodings:
+                            cursor.execute(
+                                f"SELECT filename, encoding FROM faces WHERE encoding IS NOT NULL{quality_sql}",
+                                quality_params,
+                            )
+                            rows = cursor.fetchall()
+                        else:
+                            # Sample ids in memory instead of sorting every encoding by RANDOM()
+                            from utils.face.sampler import sample_ids
+
+                            cursor.execute(
+                                f"SELECT id FROM faces WHERE encoding IS NOT NULL{quality_sql}",
+                                quality_params,
+                            )
+                            sampled = sample_ids([row[0] for row in cursor.fetchall()], max_encodings)
+                            rows = []
+                            for start in range(0, len(sampled), batch_size):
+                                chunk = sampled[start:start + batch_size]
+                                cursor.execute(
+                                    f"SELECT filename, encoding FROM faces WHERE id IN ({','.join('?' * len(chunk))})",
+                                    chunk,
+                                )
+                                rows.extend(cursor.fetchall())
 
                         logger.info(f"Fetched {len(rows)} rows for processing")
 
@@ -737,8 +921,8 @@ class FaissIndexManager:
                 )
 
                 try:
-                    # Create a new FAISS index
-                    self._index = faiss.IndexFlatL2(dimension)
+                    # Build into a new object; searches keep using the old one until the swap
+                    index = faiss.IndexFlatL2(dimension)
 
                     # Convert to numpy array with appropriate type
                     logger.info("Converting encodings to numpy array")
@@ -751,16 +935,17 @@ class FaissIndexManager:
 
                     # Add the face encodings to the index
                     logger.info("Adding vectors to FAISS index")
-                    self._index.add(face_encodings_array)
+                    index.add(face_encodings_array)
 
                     logger.info(
-                        f"Successfully added {self._index.ntotal} vectors to the index"
+                        f"Successfully added {index.ntotal} vectors to the index"
                     )
                 except Exception as e:
                     logger.error(f"Error creating FAISS index: {e}")
                     return False
 
-                # Save the filenames mapping
+                # Swap in the index and its filenames mapping together
+                self._index = index
                 self._filenames = filenames
 
                 # Save the index and mapping to disk
@@ -770,6 +955,7 @@ class FaissIndexManager:
                 faiss.write_index(self._index, index_path)
                 with open(map_path, "wb") as f:
                     pickle.dump(filenames, f)
+                self._set_version(index_path)
 
                 logger.info(
                     f"FAISS index rebuilt and saved successfully with {self._index.ntotal} vectors"
@@ -782,5 +968,10 @@ class FaissIndexManager:
                 return False
 
 
+def get_index_manager(backend=None):
+    """Get the FAISS index manager for an embedding backend (default: dlib)."""
+    return FaissIndexManager(backend or DEFAULT_BACKEND)
+
+
 # Create a global instance of the FAISS index manager
 faiss_index_manager = FaissIndexManager()
@@ -0,0 +1,345 @@
+"""
+Text prefix index.
+This module keeps school names, yearbook years, locations, usernames and
+claimed-profile captions in an in-memory prefix index, so autocomplete and
+text search answer ranked prefix queries without LIKE scans.
+
+Each worker holds its own copy. ``user_changed`` and ``user_removed`` update
+the copy of the worker that handled the registration, edit or delete; the
+other workers pick the change up on their next rebuild, so they can serve a
+stale or deleted user for up to ``DEFAULT_TTL_SECONDS`` (10 minutes).
+"""
+
+import bisect
+import logging
+import re
+import threading
+import time
+
+from utils.db.database import get_db_connection
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+SCHOOL = "school"
+YEAR = "year"
+LOCATION = "location"
+USER = "user"
+CLAIM = "claim"
+
+DEFAULT_TTL_SECONDS = 600
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Distinct face values with their row counts; counts rank the suggestions
+_FACE_TERM_SQL = {
+    SCHOOL: "SELECT school_name, COUNT(*) FROM faces WHERE school_name IS NOT NULL GROUP BY school_name",
+    YEAR: "SELECT yearbook_year, COUNT(*) FROM faces WHERE yearbook_year IS NOT NULL GROUP BY yearbook_year",
+    LOCATION: "SELECT state, COUNT(*) FROM faces WHERE state IS NOT NULL GROUP BY state",
+}
+
+_USER_ROWS_SQL = """
+    SELECT id, username, first_name, last_name, hometown,
+           current_location_city, current_location_state, bio, profile_visibility
+    FROM users
+"""
+
+_CLAIM_ROWS_SQL = "SELECT id, relationship, caption FROM claimed_profiles"
+
+
+def tokenize(text):
+    """Lower-cased word tokens of ``text``."""
+    return _TOKEN_RE.findall(str(text).lower()) if text else []
+
+
+class _Entry:
+    __slots__ = ("kind", "label", "weight", "refs", "public", "tokens")
+
+    def __init__(self, kind, label, weight=1, public=True):
+        self.kind = kind
+        self.label = label
+        self.weight = weight
+        self.refs = set()
+        self.public = public
+        self.tokens = set()
+
+
+class TextPrefixIndex:
+    """
+    Thread-safe prefix index over labelled entries.
+
+    Entries are keyed by (kind, lower-cased label). Each entry's tokens live
+    in one sorted list of (token, key) pairs, so a prefix query is a bisect
+    plus a scan of the matching range. Rows with an id (users, claimed
+    profiles) keep that id in ``refs`` so callers can load them by primary
+    key.
+    """
+
+    def __init__(self, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._postings = []
+        self._user_keys = {}
+        self._user_places = {}
+        self._place_users = {}
+        self._built_at = None
+
+    @property
+    def is_loaded(self):
+        return self._built_at is not None
+
+    def __len__(self):
+        return len(self._entries)
+
+    # --- Mutation (callers hold the lock) ---
+
+    def _add(self, kind, label, ref=None, weight=1, extra_text=(), public=True, defer=False):
+        if label is None or str(label).strip() == "":
+            return None
+        label = str(label).strip()
+        key = (kind, label.lower())
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = _Entry(kind, label, weight, public)
+        else:
+            entry.weight += weight
+        if ref is not None:
+            entry.refs.add(ref)
+        tokens = set(tokenize(label))
+        for text in extra_text:
+            tokens.update(tokenize(text))
+        for token in tokens - entry.tokens:
+            if defer:
+                # Bulk loads append and sort once at the end
+                self._postings.append((token, key))
+            else:
+                bisect.insort(self._postings, (token, key))
+        entry.tokens |= tokens
+        return key
+
+    def _discard_ref(self, key, ref):
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        entry.refs.discard(ref)
+        if not entry.refs:
+            self._drop_entry(key, entry)
+
+    def _drop_entry(self, key, entry):
+        for token in entry.tokens:
+            position = bisect.bisect_left(self._postings, (token, key))
+            if position < len(self._postings) and self._postings[position] == (token, key):
+                del self._postings[position]
+        del self._entries[key]
+
+    def _add_user_row(self, row, defer=False):
+        user_id, username, first_name, last_name, hometown, city, state, bio, visibility = tuple(row)
+        key = self._add(
+            USER,
+            username,
+            ref=user_id,
+            extra_text=(first_name, last_name, hometown, city, state, bio),
+            public=(visibility or "public") == "public",
+            defer=defer,
+        )
+        if key is not None:
+            self._user_keys[user_id] = key
+        # Users' locations are suggested alongside yearbook states
+        for place in (city, state):
+            place_key = self._add(LOCATION, place, weight=0, defer=defer)
+            if place_key is not None:
+                self._user_places.setdefault(user_id, set()).add(place_key)
+                self._place_users.setdefault(place_key, set()).add(user_id)
+
+    def _remove_user_row(self, user_id):
+        old_key = self._user_keys.pop(user_id, None)
+        if old_key is not None:
+            self._discard_ref(old_key, user_id)
+        for place_key in self._user_places.pop(user_id, ()):
+            users = self._place_users.get(place_key)
+            if users is None:
+                continue
+            users.discard(user_id)
+            if users:
+                continue
+            del self._place_users[place_key]
+            entry = self._entries.get(place_key)
+            # Places that yearbook faces also have carry their row count
+            if entry is not None and entry.weight == 0:
+                self._drop_entry(place_key, entry)
+
+    # --- Loading ---
+
+    def build(self, face_terms=None, user_rows=None, claim_rows=None):
+        """
+        (Re)build the index from faces, users and claimed_profiles.
+
+        Args:
+            face_terms: Optional {kind: [(label, count), ...]} for SCHOOL/YEAR/LOCATION
+            user_rows: Optional rows in ``_USER_ROWS_SQL`` column order
+            claim_rows: Optional (id, relationship, caption) rows
+
+        Returns:
+            int: Number of indexed entries
+        """
+        if face_terms is None or user_rows is None or claim_rows is None:
+            conn = get_db_connection()
+            try:
+                cursor = conn.cursor()
+                if face_terms is None:
+                    face_terms = {}
+                    for kind, sql in _FACE_TERM_SQL.items():
+                        cursor.execute(sql)
+                        face_terms[kind] = [tuple(row) for row in cursor.fetchall()]
+                if user_rows is None:
+                    cursor.execute(_USER_ROWS_SQL)
+                    user_rows = cursor.fetchall()
+                if claim_rows is None:
+                    try:
+                        cursor.execute(_CLAIM_ROWS_SQL)
+                        claim_rows = cursor.fetchall()
+                    except Exception as e:
+                        logger.warning(f"Could not read claimed_profiles for the text index: {e}")
+                        claim_rows = []
+            finally:
+                conn.close()
+
+        fresh = TextPrefixIndex(self.ttl_seconds)
+        for kind, terms in face_terms.items():
+            for label, count in terms:
+                fresh._add(kind, label, weight=count or 1, defer=True)
+        for row in user_rows:
+            fresh._add_user_row(row, defer=True)
+        for claim_id, relationship, caption in (tuple(row) for row in claim_rows):
+            fresh._add(CLAIM, caption or relationship, ref=claim_id, extra_text=(relationship,), defer=True)
+        fresh._postings.sort()
+
+        with self._lock:
+            self._entries = fresh._entries
+            self._postings = fresh._postings
+            self._user_keys = fresh._user_keys
+            self._user_places = fresh._user_places
+            self._place_users = fresh._place_users
+            self._built_at = time.monotonic()
+        logger.info(f"Text prefix index built with {len(self._entries)} entries")
+        return len(self._entries)
+
+    def ensure_loaded(self):
+        """Build on first use and again once the TTL has passed (new yearbook faces)."""
+        built_at = self._built_at
+        if built_at is None or (self.ttl_seconds and time.monotonic() - built_at > self.ttl_seconds):
+            self.build()
+        return self
+
+    def refresh_user(self, user_id):
+        """Re-read one user after a registration or profile edit."""
+        if not self.is_loaded:
+            return
+        conn = get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(_USER_ROWS_SQL + " WHERE id = ?", (user_id,))
+            row = cursor.fetchone()
+        finally:
+            conn.close()
+        with self._lock:
+            self._remove_user_row(user_id)
+            if row:
+                self._add_user_row(row)
+
+    def remove_user(self, user_id):
+        """Drop a deleted user and the locations only that user added."""
+        with self._lock:
+            self._remove_user_row(user_id)
+
+    # --- Queries ---
+
+    def _prefix_keys(self, prefix):
+        keys = set()
+        position = bisect.bisect_left(self._postings, (prefix,))
+        while position < len(self._postings):
+            token, key = self._postings[position]
+            if not token.startswith(prefix):
+                break
+            keys.add(key)
+            position += 1
+        return keys
+
+    def search(self, query, kinds=None, limit=10, public_only=False):
+        """
+        Ranked prefix search; every query word must prefix a word of the entry.
+
+        Exact labels rank first, then labels starting with the query, then
+        entries where every query word is a whole word, then by weight (row
+        count) and alphabetically.
+
+        Returns:
+            list: Dicts with ``kind``, ``text``, ``weight`` and ``refs``
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        self.ensure_loaded()
+        needle = " ".join(tokens)
+        with self._lock:
+            keys = None
+            for token in tokens:
+                matched = self._prefix_keys(token)
+                keys = matched if keys is None else keys & matched
+                if not keys:
+                    return []
+            entries = [self._entries[key] for key in keys]
+
+        if kinds is not None:
+            entries = [entry for entry in entries if entry.kind in kinds]
+        if public_only:
+            entries = [entry for entry in entries if entry.public]
+        query_tokens = set(tokens)
+
+        def rank(entry):
+            label = " ".join(tokenize(entry.label))
+            return (
+                label != needle,
+                not label.startswith(needle),
+                not query_tokens <= entry.tokens,
+                -entry.weight,
+                entry.label.lower(),
+            )
+
+        entries.sort(key=rank)
+        return [
+            {"kind": entry.kind, "text": entry.label, "weight": entry.weight, "refs": sorted(entry.refs)}
+            for entry in entries[:limit]
+        ]
+
+    def refs(self, query, kind, limit=None):
+        """Ids stored on entries of ``kind`` matching ``query``, best match first."""
+        ids = []
+        for hit in self.search(query, kinds=(kind,), limit=limit or len(self._entries) or 1):
+            ids.extend(ref for ref in hit["refs"] if ref not in ids)
+        return ids
+
+
+text_index = TextPrefixIndex()
+
+
+def get_text_index():
+    """Return the shared text prefix index, building it on first use."""
+    return text_index.ensure_loaded()
+
+
+def user_changed(user_id):
+    """Refresh a registered or edited user; never fails the request that saved it."""
+    try:
+        text_index.refresh_user(user_id)
+    except Exception as e:
+        logger.error(f"Could not refresh user {user_id} in the text index: {e}")
+
+
+def user_removed(user_id):
+    """Drop a deleted user; never fails the request that deleted it."""
+    try:
+        text_index.remove_user(user_id)
+    except Exception as e:
+        logger.error(f"Could not remove user {user_id} from the text index: {e}")
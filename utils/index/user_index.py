@@ -0,0 +1,249 @@
+"""
+Registered user vector index.
+This module keeps the face encodings of registered users in a small
+in-memory FAISS index so search runs one kNN instead of a Python loop.
+
+Each worker holds its own index. Profile-photo changes are applied at once
+on the worker that handled them (refresh_user); other workers pick up new
+registrations, photo changes and deletions when the index is rebuilt after
+DEFAULT_TTL_SECONDS.
+"""
+
+import logging
+import threading
+import time
+
+import faiss
+import numpy as np
+
+from utils.blocking import CPU, run_blocking
+from utils.db.database import get_db_connection
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+USER_ENCODING_DIMENSION = 128
+DEFAULT_TTL_SECONDS = 300
+
+# Users with a face encoding and either a real profile image or a claimed face
+_USER_ROWS_SQL = """
+    SELECT u.id, u.username, u.profile_image, u.face_encoding,
+           u.current_location_city, u.current_location_state,
+           (SELECT f.filename FROM faces f WHERE f.claimed_by_user_id = u.id LIMIT 1) AS claimed_filename
+    FROM users u
+    WHERE u.face_encoding IS NOT NULL
+"""
+
+
+def _has_profile_image(profile_image):
+    return bool(profile_image) and "default" not in profile_image
+
+
+def _decode_user_encoding(blob):
+    """Decode a users.face_encoding BLOB (float64) to a float32 vector, or None."""
+    if not blob:
+        return None
+    vector = np.frombuffer(blob, dtype=np.float64)
+    if vector.shape[0] != USER_ENCODING_DIMENSION:
+        return None
+    return vector.astype(np.float32)
+
+
+def resolve_user_image_url(profile_image, claimed_filename=None):
+    """Return the display image URL for a registered user without filesystem probing."""
+    from utils.files.image_manifest import get_manifest
+    from utils.image_paths import normalize_profile_image_path
+
+    if _has_profile_image(profile_image):
+        if profile_image.startswith("/static/"):
+            return profile_image
+        if profile_image.startswith("userprofile_"):
+            return f"/static/faces/{profile_image}"
+        web_path = get_manifest().web_path(profile_image)
+        if web_path:
+            return web_path
+    if claimed_filename:
+        return get_manifest().web_path(claimed_filename) or f"/static/faces/{claimed_filename}"
+    return normalize_profile_image_path(profile_image)
+
+
+class RegisteredUserIndex:
+    """
+    Thread-safe FAISS index over registered users' face encodings.
+
+    Vectors are keyed by user id (``IndexIDMap``), so a profile-photo change
+    replaces a single entry through :meth:`refresh_user`.
+    """
+
+    def __init__(self, dimension=USER_ENCODING_DIMENSION, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.dimension = dimension
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._index = None
+        self._users = {}
+        self._built_at = None
+
+    @property
+    def is_loaded(self):
+        return self._index is not None
+
+    def __len__(self):
+        return len(self._users)
+
+    def _new_index(self):
+        return faiss.IndexIDMap(faiss.IndexFlatL2(self.dimension))
+
+    def _row_entry(self, row):
+        user_id, username, profile_image, blob, city, state, claimed_filename = tuple(row)
+        if not (_has_profile_image(profile_image) or claimed_filename):
+            return None
+        vector = _decode_user_encoding(blob)
+        if vector is None:
+            return None
+        return vector, {
+            "user_id": user_id,
+            "username": username,
+            "profile_image": profile_image,
+            "claimed_filename": claimed_filename,
+            "city": city,
+            "state": state,
+        }
+
+    def build(self, rows=None):
+        """
+        (Re)build the index from the users table in one query.
+
+        Args:
+            rows: Optional pre-fetched rows in ``_USER_ROWS_SQL`` column order
+
+        Returns:
+            int: Number of indexed users
+        """
+        if rows is None:
+            conn = get_db_connection()
+            try:
+                cursor = conn.cursor()
+                cursor.execute(_USER_ROWS_SQL)
+                rows = cursor.fetchall()
+            finally:
+                conn.close()
+
+        vectors, ids, users = [], [], {}
+        for row in rows:
+            entry = self._row_entry(row)
+            if entry is None:
+                continue
+            vector, meta = entry
+            vectors.append(vector)
+            ids.append(meta["user_id"])
+            users[meta["user_id"]] = meta
+
+        index = self._new_index()
+        if vectors:
+            index.add_with_ids(np.vstack(vectors), np.asarray(ids, dtype=np.int64))
+
+        with self._lock:
+            self._index = index
+            self._users = users
+            self._built_at = time.monotonic()
+        logger.info(f"Registered user index built with {len(users)} users")
+        return len(users)
+
+    def ensure_loaded(self):
+        """Build on first use and again once the TTL has passed (changes made on other workers)."""
+        if self._index is None:
+            with self._build_lock:
+                if self._index is None:
+                    self.build()
+        elif self.ttl_seconds and time.monotonic() - self._built_at > self.ttl_seconds:
+            # One rebuild at a time; other searches keep using the current index
+            if self._build_lock.acquire(blocking=False):
+                try:
+                    self.build()
+                except Exception as e:
+                    logger.error(f"Error rebuilding registered user index: {e}")
+                finally:
+                    self._build_lock.release()
+        return self
+
+    def refresh_user(self, user_id):
+        """Re-read one user after a profile-photo change and replace their vector."""
+        if self._index is None:
+            # Nothing cached yet; the next search builds from the table
+            return
+        conn = get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(_USER_ROWS_SQL + " AND u.id = ?", (user_id,))
+            row = cursor.fetchone()
+        finally:
+            conn.close()
+
+        entry = self._row_entry(row) if row else None
+        with self._lock:
+            index, users = self._copy_without(user_id)
+            if entry is not None:
+                vector, meta = entry
+                index.add_with_ids(vector.reshape(1, -1), np.asarray([user_id], dtype=np.int64))
+                users[user_id] = meta
+            self._index, self._users = index, users
+
+    def remove_user(self, user_id):
+        """Drop a deleted user from the index."""
+        if self._index is None:
+            return
+        with self._lock:
+            self._index, self._users = self._copy_without(user_id)
+
+    def _copy_without(self, user_id):
+        """
+        Copies of the index and user map without ``user_id`` (caller holds the lock).
+
+        Changes are made on copies and swapped in, so searches can run on the
+        objects they took under the lock without holding it.
+        """
+        index = faiss.clone_index(self._index)
+        index.remove_ids(np.asarray([user_id], dtype=np.int64))
+        users = dict(self._users)
+        users.pop(user_id, None)
+        return index, users
+
+    def search(self, encoding, top_k=50, exclude_user_id=None):
+        """
+        Find the registered users closest to ``encoding``.
+
+        Args:
+            encoding: 128-d face encoding of the searcher
+            top_k: Maximum number of users to return
+            exclude_user_id: User to leave out (normally the searcher)
+
+        Returns:
+            list: Dicts with the user metadata plus ``distance`` (L2),
+            nearest first
+        """
+        self.ensure_loaded()
+        query = np.asarray(encoding, dtype=np.float32).reshape(1, -1)
+        # Search a snapshot outside the lock so concurrent searches and rebuilds do not queue
+        with self._lock:
+            index, users = self._index, self._users
+        if index.ntotal == 0:
+            return []
+        k = min(top_k + (1 if exclude_user_id is not None else 0), index.ntotal)
+        squared, ids = run_blocking(index.search, query, k, kind=CPU)
+
+        results = []
+        for sq_distance, user_id in zip(squared[0], ids[0]):
+            if user_id < 0 or user_id == exclude_user_id or user_id not in users:
+                continue
+            # IndexFlatL2 returns squared distances
+            results.append(dict(users[int(user_id)], distance=float(np.sqrt(max(sq_distance, 0.0)))))
+        return results[:top_k]
+
+
+registered_user_index = RegisteredUserIndex()
+
+
+def get_registered_user_index():
+    """Return the shared registered user index, building it on first use."""
+    return registered_user_index.ensure_loaded()
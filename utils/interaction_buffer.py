@@ -0,0 +1,267 @@
+"""
+Interaction Write-behind Buffer
+===============================
+
+High-frequency interaction writes (face likes) used to open a connection
+and commit one row each, so bursts serialised on SQLite's write lock.
+Instead, :meth:`InteractionBuffer.toggle` records the user's latest choice
+in a per-process buffer, and a background flusher writes every pending
+choice in one transaction each ``INTERACTION_BUFFER_FLUSH_MS`` (sooner once
+``INTERACTION_BUFFER_MAX_EVENTS`` are pending).
+
+Pending entries are keyed by (kind, user_id, target_id) and hold the state
+last read from the database and the state the user wants, so repeated
+toggles inside one window collapse to a single write (or none). Until an
+entry is committed, readers on this worker see it through the overlay
+(:meth:`pending_state`, :meth:`pending_for_user`, :meth:`count_deltas`),
+which gives the acting user read-your-writes.
+
+Writes are idempotent ("make it liked"), and counters are bumped by the
+rows actually changed. A batch that fails to commit is put back and
+retried on the next flush. The buffer is flushed on interpreter exit and
+from gunicorn's ``worker_exit`` hook. With ``INTERACTION_BUFFER_ENABLED``
+off, callers write synchronously as before.
+"""
+
+import atexit
+import logging
+import threading
+from collections import defaultdict, namedtuple
+from datetime import datetime
+
+from utils.db import counters
+from utils.db.database import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_MS = 250
+DEFAULT_MAX_EVENTS = 200
+
+FACE_LIKE = "face_like"
+
+# stored: state in the database when the entry was created; state: the user's latest choice
+Pending = namedtuple("Pending", ["stored", "state"])
+
+MISSING = object()
+
+
+def write_face_likes(cursor, entries, now):
+    """Apply pending face likes; the like counters follow the rows really changed."""
+    for (_, user_id, face_id), pending in entries:
+        if pending.state:
+            cursor.execute(
+                "INSERT INTO face_likes (user_id, face_id, liked_at) "
+                "SELECT ?, ?, ? WHERE NOT EXISTS "
+                "(SELECT 1 FROM face_likes WHERE user_id = ? AND face_id = ?)",
+                (user_id, face_id, now, user_id, face_id),
+            )
+            counters.bump(cursor, counters.FACE_LIKES, face_id, cursor.rowcount)
+        else:
+            cursor.execute(
+                "DELETE FROM face_likes WHERE user_id = ? AND face_id = ?",
+                (user_id, face_id),
+            )
+            counters.bump(cursor, counters.FACE_LIKES, face_id, -cursor.rowcount)
+
+
+# kind: writer(cursor, [(key, Pending), ...], now)
+WRITERS = {
+    FACE_LIKE: write_face_likes,
+}
+
+
+class InteractionBuffer:
+    """
+    Per-process pending interactions with a background flusher.
+
+    Like the notification outbox, the flusher thread starts with the first
+    recorded interaction; under gevent it is a greenlet.
+    """
+
+    def __init__(self, flush_ms=DEFAULT_FLUSH_MS, max_events=DEFAULT_MAX_EVENTS, connect=get_db_connection):
+        self.flush_ms = flush_ms
+        self.max_events = max_events
+        self._connect = connect
+        self._pending = {}
+        # Drained but not yet committed; still part of the overlay
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._app = None
+
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._pending)
+
+    def start(self, app):
+        """Start the flusher thread for ``app`` (idempotent)."""
+        with self._lock:
+            if self.is_running:
+                return
+            self._app = app
+            self.flush_ms = app.config.get("INTERACTION_BUFFER_FLUSH_MS", self.flush_ms)
+            self.max_events = app.config.get("INTERACTION_BUFFER_MAX_EVENTS", self.max_events)
+            self._thread = threading.Thread(target=self._run, name="interaction-buffer", daemon=True)
+            self._thread.start()
+        logger.info("Interaction buffer flusher started")
+
+    # Recording
+
+    def _known_state(self, key):
+        entry = self._pending.get(key) or self._in_flight.get(key)
+        return MISSING if entry is None else entry.state
+
+    def toggle(self, kind, user_id, target_id, stored_state):
+        """
+        Flip the user's state for ``target_id`` and buffer the new state.
+
+        Args:
+            stored_state: Callable returning the committed state, only called
+                when nothing is pending for this key
+
+        Returns:
+            bool: The new state
+        """
+        key = (kind, user_id, target_id)
+        with self._lock:
+            buffered = self._known_state(key) is not MISSING
+        committed = None if buffered else bool(stored_state())
+        with self._lock:
+            entry = self._pending.get(key)
+            in_flight = self._in_flight.get(key)
+            if entry is not None:
+                stored, current = entry.stored, entry.state
+            elif in_flight is not None:
+                # Once the in-flight batch commits, the row is in its state
+                stored = current = in_flight.state
+            else:
+                # Nothing buffered (or it committed while the database was read)
+                stored = current = committed if committed is not None else bool(stored_state())
+            self._pending[key] = Pending(stored, not current)
+            full = len(self._pending) >= self.max_events
+        if full:
+            self._wakeup.set()
+        return not current
+
+    # Overlay
+
+    def pending_state(self, kind, user_id, target_id):
+        """The buffered state for one key, or ``MISSING`` if the database is current."""
+        with self._lock:
+            return self._known_state((kind, user_id, target_id))
+
+    def pending_for_user(self, kind, user_id):
+        """{target_id: state} buffered for one user."""
+        with self._lock:
+            entries = dict(self._in_flight)
+            entries.update(self._pending)
+        return {key[2]: entry.state for key, entry in entries.items() if key[0] == kind and key[1] == user_id}
+
+    def count_deltas(self, kind, target_ids=None):
+        """{target_id: change} that buffered entries will make to per-target counts."""
+        wanted = None if target_ids is None else set(target_ids)
+        deltas = defaultdict(int)
+        with self._lock:
+            for entries in (self._in_flight, self._pending):
+                for key, entry in entries.items():
+                    if key[0] == kind and (wanted is None or key[2] in wanted):
+                        deltas[key[2]] += int(entry.state) - int(entry.stored)
+        return {target_id: delta for target_id, delta in deltas.items() if delta}
+
+    # Flushing
+
+    def flush(self):
+        """
+        Write everything buffered so far in one transaction.
+
+        Returns:
+            int: Number of entries written; on failure they are re-queued
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                self._in_flight = batch
+            if not batch:
+                return 0
+            by_kind = defaultdict(list)
+            for key, entry in batch.items():
+                by_kind[key[0]].append((key, entry))
+
+            conn = None
+            try:
+                # A checkout timeout re-queues the batch like any other failure
+                conn = self._connect()
+                cursor = conn.cursor()
+                now = datetime.utcnow()
+                for kind, entries in by_kind.items():
+                    WRITERS[kind](cursor, entries, now)
+                conn.commit()
+                logger.debug(f"Interaction buffer flushed {len(batch)} entries")
+                return len(batch)
+            except Exception as e:
+                logger.error(f"Interaction buffer flush failed, re-queueing {len(batch)} entries: {e}")
+                if conn is not None:
+                    conn.rollback()
+                self._requeue(batch)
+                return 0
+            finally:
+                if conn is not None:
+                    conn.close()
+                with self._lock:
+                    self._in_flight = {}
+
+    def _requeue(self, batch):
+        with self._lock:
+            for key, entry in batch.items():
+                newer = self._pending.get(key)
+                # Newer toggles keep their state but start from the uncommitted row
+                self._pending[key] = entry if newer is None else Pending(entry.stored, newer.state)
+
+    def flush_on_exit(self, attempts=3):
+        """Flush until empty (or ``attempts`` failures) before the process goes away."""
+        for _ in range(attempts):
+            if not len(self):
+                return
+            if self._app is not None:
+                with self._app.app_context():
+                    self.flush()
+            else:
+                self.flush()
+        if len(self):
+            logger.error(f"Interaction buffer lost {len(self)} entries at exit")
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(timeout=self.flush_ms / 1000.0)
+            self._wakeup.clear()
+            try:
+                with self._app.app_context():
+                    self.flush()
+            except Exception as e:
+                # Keep the flusher alive whatever a single pass runs into
+                logger.error(f"Interaction buffer flusher error: {e}")
+
+
+interaction_buffer = InteractionBuffer()
+atexit.register(interaction_buffer.flush_on_exit)
+
+
+def buffering_enabled():
+    """True when interactions go through the buffer (in an app context)."""
+    from flask import current_app
+
+    try:
+        app = current_app._get_current_object()
+    except RuntimeError:
+        return False
+    if not app.config.get("INTERACTION_BUFFER_ENABLED", True):
+        return False
+    if not interaction_buffer.is_running:
+        interaction_buffer.start(app)
+    return True
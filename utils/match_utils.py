@@ -10,22 +10,22 @@ import random
 from flask import current_app
 
 from models.face import Face
-from utils.db.database import get_db_connection
+from utils.db.database import get_read_connection
+from utils.face.sampler import get_face_sampler
 from utils.face.metadata import extract_state_from_filename, get_metadata_for_face
 
 
 def get_random_faces_with_metadata(limit=20):
     """Fetch random faces from the DB, enrich with metadata, and return as a list of dicts."""
     faces = []
-    conn = get_db_connection()
+    conn = get_read_connection()
     if conn:
         try:
             cursor = conn.cursor()
-            cursor.execute(
-                "SELECT id, filename, yearbook_year, school_name, page_number FROM faces ORDER BY RANDOM() LIMIT ?",
-                (limit,),
+            rows = get_face_sampler().sample_rows(
+                cursor, limit, columns="id, filename, yearbook_year, school_name, page_number"
             )
-            for row in cursor.fetchall():
+            for row in rows:
                 year = row["yearbook_year"]
                 decade = f"{(year // 10)}0s" if year and isinstance(year, int) else None
                 state = extract_state_from_filename(row["filename"]) or "Unknown"
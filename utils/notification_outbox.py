@@ -0,0 +1,291 @@
+"""
+Notification Outbox
+===================
+
+Takes notification writes off the request path. Producers call
+:func:`enqueue_notification` (or :func:`enqueue_notifications` for many
+recipients), which only appends to an in-process buffer. A background
+worker in each process flushes that buffer every few seconds:
+
+- digest types (search appearances) are coalesced into one notification
+  per user and day, e.g. "You appeared in 12 searches today", whose count
+  is kept in ``notification_digests`` and bumped on later flushes
+- everything else is de-duplicated within the batch and bulk-inserted
+
+With ``NOTIFICATION_OUTBOX_ENABLED`` off, each event is flushed inline
+instead (useful for tests and scripts).
+"""
+
+import atexit
+import logging
+import threading
+from collections import Counter, namedtuple
+from datetime import datetime
+
+from flask import current_app
+
+from utils.db.database import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_SECONDS = 5
+DEFAULT_MAX_BATCH = 500
+
+TYPE_SEARCH_APPEARANCE = "search_appearance"
+
+# Coalesced notification types and the content rendered from the day's count
+DIGEST_TYPES = {
+    TYPE_SEARCH_APPEARANCE: lambda count: (
+        f"You appeared in {count} search{'es' if count != 1 else ''} today"
+    ),
+}
+
+NotificationEvent = namedtuple(
+    "NotificationEvent", ["user_id", "notification_type", "content", "sender_id"]
+)
+
+
+def ensure_outbox_tables(cursor):
+    """Create the ``notification_digests`` table if missing."""
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS notification_digests (
+            user_id INTEGER NOT NULL,
+            notification_type VARCHAR(50) NOT NULL,
+            day VARCHAR(10) NOT NULL,
+            notification_id INTEGER NOT NULL,
+            event_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, notification_type, day)
+        )
+        """
+    )
+
+
+def coalesce_events(events):
+    """
+    Split a batch into digest counts and de-duplicated plain events.
+
+    Returns:
+        tuple: ({(notification_type, user_id): count}, [NotificationEvent, ...])
+    """
+    digests = Counter()
+    plain = []
+    seen = set()
+    for event in events:
+        if event.notification_type in DIGEST_TYPES:
+            digests[(event.notification_type, event.user_id)] += 1
+        elif event not in seen:
+            seen.add(event)
+            plain.append(event)
+    return digests, plain
+
+
+def _placeholders(values):
+    return ", ".join("?" for _ in values)
+
+
+def write_digests(cursor, digests, now):
+    """Add digest counts to today's digest notifications, creating missing ones."""
+    day = now.date().isoformat()
+    by_type = {}
+    for (notification_type, user_id), count in digests.items():
+        by_type.setdefault(notification_type, {})[user_id] = count
+
+    written = 0
+    for notification_type, counts in by_type.items():
+        render = DIGEST_TYPES[notification_type]
+        user_ids = sorted(counts)
+        cursor.execute(
+            f"SELECT user_id, notification_id, event_count FROM notification_digests "
+            f"WHERE notification_type = ? AND day = ? AND user_id IN ({_placeholders(user_ids)})",
+            [notification_type, day] + user_ids,
+        )
+        existing = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+
+        if existing:
+            bumped = {user_id: total + counts[user_id] for user_id, (_, total) in existing.items()}
+            cursor.executemany(
+                "UPDATE notifications SET content = ?, is_read = ?, updated_at = ? WHERE id = ?",
+                [(render(bumped[user_id]), False, now, notification_id)
+                 for user_id, (notification_id, _) in existing.items()],
+            )
+            cursor.executemany(
+                "UPDATE notification_digests SET event_count = ? "
+                "WHERE user_id = ? AND notification_type = ? AND day = ?",
+                [(bumped[user_id], user_id, notification_type, day) for user_id in existing],
+            )
+
+        new_users = [user_id for user_id in user_ids if user_id not in existing]
+        if new_users:
+            cursor.executemany(
+                "INSERT INTO notifications (user_id, notification_type, content, is_read, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(user_id, notification_type, render(counts[user_id]), False, now, now) for user_id in new_users],
+            )
+            # created_at is this flush's timestamp, so it identifies the rows just inserted
+            cursor.execute(
+                f"SELECT user_id, MAX(id) FROM notifications WHERE notification_type = ? AND created_at = ? "
+                f"AND user_id IN ({_placeholders(new_users)}) GROUP BY user_id",
+                [notification_type, now] + new_users,
+            )
+            cursor.executemany(
+                "INSERT INTO notification_digests (user_id, notification_type, day, notification_id, event_count) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(row[0], notification_type, day, row[1], counts[row[0]]) for row in cursor.fetchall()],
+            )
+        written += len(user_ids)
+    return written
+
+
+def write_events(cursor, events, now):
+    """Bulk-insert plain notification events."""
+    if events:
+        cursor.executemany(
+            "INSERT INTO notifications (user_id, sender_id, notification_type, content, is_read, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(e.user_id, e.sender_id, e.notification_type, e.content, False, now, now) for e in events],
+        )
+    return len(events)
+
+
+def flush_events(conn, events, now=None):
+    """
+    Coalesce and write a batch of events in one transaction.
+
+    Returns:
+        int: Number of notification rows inserted or updated
+    """
+    if not events:
+        return 0
+    now = now or datetime.utcnow()
+    digests, plain = coalesce_events(events)
+    cursor = conn.cursor()
+    ensure_outbox_tables(cursor)
+    written = write_digests(cursor, digests, now) + write_events(cursor, plain, now)
+    conn.commit()
+    return written
+
+
+class NotificationOutbox:
+    """
+    Per-process buffer of pending notifications with a background flusher.
+
+    The flusher thread is started lazily by the first enqueue, so it also
+    runs when the startup tasks are skipped. Under gevent the thread is a
+    greenlet.
+    """
+
+    def __init__(self, flush_seconds=DEFAULT_FLUSH_SECONDS, max_batch=DEFAULT_MAX_BATCH):
+        self.flush_seconds = flush_seconds
+        self.max_batch = max_batch
+        self._events = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._app = None
+
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._events)
+
+    def start(self, app):
+        """Start the flusher thread for ``app`` (idempotent)."""
+        with self._lock:
+            if self.is_running:
+                return
+            self._app = app
+            self.flush_seconds = app.config.get("NOTIFICATION_OUTBOX_FLUSH_SECONDS", self.flush_seconds)
+            self.max_batch = app.config.get("NOTIFICATION_OUTBOX_MAX_BATCH", self.max_batch)
+            self._thread = threading.Thread(target=self._run, name="notification-outbox", daemon=True)
+            self._thread.start()
+        logger.info("Notification outbox flusher started")
+
+    def enqueue(self, events):
+        """Buffer events; wakes the flusher early once a full batch is pending."""
+        with self._lock:
+            self._events.extend(events)
+            full = len(self._events) >= self.max_batch
+        if full:
+            self._wakeup.set()
+
+    def drain(self):
+        with self._lock:
+            events, self._events = self._events, []
+        return events
+
+    def flush(self):
+        """Write everything buffered so far. Must run in an app context."""
+        events = self.drain()
+        if not events:
+            return 0
+        conn = None
+        try:
+            conn = get_db_connection()
+            written = flush_events(conn, events)
+            logger.debug(f"Notification outbox flushed {len(events)} events into {written} rows")
+            return written
+        except Exception as e:
+            # Notifications are best effort; a failed batch is dropped, not retried forever
+            logger.error(f"Notification outbox flush failed, dropping {len(events)} events: {e}")
+            if conn is not None:
+                conn.rollback()
+            return 0
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def flush_on_exit(self):
+        if self._app is not None and len(self):
+            with self._app.app_context():
+                self.flush()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(timeout=self.flush_seconds)
+            self._wakeup.clear()
+            try:
+                with self._app.app_context():
+                    self.flush()
+            except Exception as e:
+                # Keep the flusher alive whatever a single pass runs into
+                logger.error(f"Notification outbox flusher error: {e}")
+
+
+notification_outbox = NotificationOutbox()
+atexit.register(notification_outbox.flush_on_exit)
+
+
+def enqueue_notifications(user_ids, notification_type, content=None, sender_id=None):
+    """
+    Queue one notification per recipient. Must run in an app context.
+
+    Recipients equal to ``sender_id`` are skipped. Digest types ignore
+    ``content`` and are rendered from the day's count instead.
+    """
+    events = [
+        NotificationEvent(user_id, notification_type, content, sender_id)
+        for user_id in dict.fromkeys(user_ids)
+        if user_id and user_id != sender_id
+    ]
+    if not events:
+        return
+    app = current_app._get_current_object()
+    if not app.config.get("NOTIFICATION_OUTBOX_ENABLED", True):
+        conn = get_db_connection()
+        try:
+            flush_events(conn, events)
+        finally:
+            conn.close()
+        return
+    if not notification_outbox.is_running:
+        notification_outbox.start(app)
+    notification_outbox.enqueue(events)
+
+
+def enqueue_notification(user_id, notification_type, content=None, sender_id=None):
+    """Queue a single notification, see :func:`enqueue_notifications`."""
+    enqueue_notifications([user_id], notification_type, content=content, sender_id=sender_id)
@@ -0,0 +1,150 @@
+"""
+Search Result Cache
+===================
+
+Caches ranked face-search results so repeated searches by the same viewer
+skip the encoding and the FAISS search.
+
+Two entries are kept in the app cache (Redis or local, see ``CACHE_TYPE``):
+
+- the profile photo encoding, keyed by backend + photo path + mtime/size,
+  so a new or re-uploaded photo misses automatically
+- the ranked hit list (filename, similarity, distance), keyed by
+  (encoding hash, index version, filters, depth), so an index rebuild
+  misses automatically
+
+Enriched matches (like counts, claimed users, image paths) are not cached:
+they change without the ranking changing, and each page is enriched with a
+few batched queries.
+
+Paginated searches hand out a signed, opaque cursor naming the ranked key
+and the next offset; later pages only enrich their own slice.
+"""
+
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+from flask import current_app
+from itsdangerous import BadSignature, URLSafeSerializer
+
+from extensions import cache
+
+logger = logging.getLogger(__name__)
+
+ENCODING_PREFIX = "search:encoding:"
+RESULTS_PREFIX = "search:results:"
+RANKED_SUFFIX = ":ranked"
+CURSOR_SALT = "search-cursor"
+
+def _timeout():
+    return current_app.config.get("SEARCH_CACHE_TIMEOUT", 300)
+
+
+def _enabled():
+    try:
+        return bool(current_app.config.get("SEARCH_CACHE_ENABLED", True))
+    except RuntimeError:
+        # Not in Flask context
+        return False
+
+
+def _cache_get(key):
+    try:
+        return cache.get(key)
+    except Exception as e:
+        # Cache not initialised or backend unavailable: behave as a miss
+        logger.debug(f"Search cache get failed for {key}: {e}")
+        return None
+
+
+def _cache_set(key, value):
+    try:
+        cache.set(key, value, timeout=_timeout())
+    except Exception as e:
+        logger.debug(f"Search cache set failed for {key}: {e}")
+
+
+def photo_fingerprint(path):
+    """Return a (path, mtime_ns, size) fingerprint, or None if the file is missing."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return os.path.abspath(path), stat.st_mtime_ns, stat.st_size
+
+
+def encoding_key(backend, fingerprint):
+    digest = hashlib.sha1(repr(fingerprint).encode("utf-8")).hexdigest()
+    return f"{ENCODING_PREFIX}{backend}:{digest}"
+
+
+def encoding_hash(encoding):
+    """Stable hash of an encoding vector."""
+    return hashlib.sha1(np.asarray(encoding, dtype=np.float32).tobytes()).hexdigest()
+
+
+def results_key(encoding, index_version, top_k, filters=None):
+    """Cache key for a ranked result list."""
+    filters_part = json.dumps(filters or {}, sort_keys=True, default=str)
+    raw = f"{encoding_hash(encoding)}|{index_version}|{filters_part}|{top_k}"
+    return RESULTS_PREFIX + hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def get_cached_encoding(backend, fingerprint):
+    """Return the cached encoding for a photo fingerprint, or None."""
+    if not _enabled() or fingerprint is None:
+        return None
+    cached = _cache_get(encoding_key(backend, fingerprint))
+    if cached is None:
+        return None
+    return np.frombuffer(cached, dtype=np.float64)
+
+
+def store_encoding(backend, fingerprint, encoding):
+    if _enabled() and fingerprint is not None and encoding is not None:
+        _cache_set(encoding_key(backend, fingerprint), np.asarray(encoding, dtype=np.float64).tobytes())
+
+
+def get_ranked(key):
+    """Return the cached ranked hit list for ``key``, or None."""
+    if not _enabled() or not key:
+        return None
+    return _cache_get(key + RANKED_SUFFIX)
+
+
+def store_ranked(key, raw_matches):
+    if _enabled() and key:
+        _cache_set(key + RANKED_SUFFIX, list(raw_matches))
+
+
+def _cursor_serializer():
+    return URLSafeSerializer(current_app.secret_key or "", salt=CURSOR_SALT)
+
+
+def encode_cursor(key, offset, current_user_id=None):
+    """Return an opaque cursor pointing at ``offset`` in the ranked list ``key``."""
+    return _cursor_serializer().dumps({"k": key, "o": int(offset), "u": current_user_id})
+
+
+def decode_cursor(cursor, current_user_id=None):
+    """
+    Return (ranked key, offset) for a cursor, or None if it is invalid.
+
+    Cursors are signed with the app secret and bound to the viewer that
+    received them, so they cannot be forged or replayed by another user.
+    """
+    try:
+        payload = _cursor_serializer().loads(cursor)
+    except (BadSignature, TypeError, ValueError):
+        return None
+    if not isinstance(payload, dict) or payload.get("u") != current_user_id:
+        return None
+    key, offset = payload.get("k"), payload.get("o")
+    if not isinstance(key, str) or not key.startswith(RESULTS_PREFIX):
+        return None
+    if not isinstance(offset, int) or offset < 0:
+        return None
+    return key, offset
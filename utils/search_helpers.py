@@ -1,12 +1,19 @@
+import json
 import os
 
+import numpy as np
 from flask import current_app, url_for
 
 from models.face import Face
 from models.user import User
 from extensions import db
 from models.user_match import UserMatch
+from utils.db.database import get_db_connection, get_read_connection
+from utils.face.encoders import get_backend
 from utils.face.recognition import extract_face_encoding
+from utils.files.image_manifest import get_manifest
+from utils import search_cache
+from utils.blocking import CPU, run_blocking
 from utils.image_paths import normalize_profile_image_path
 
 
@@ -31,13 +38,10 @@ def resolve_profile_image_path(user):
     return None
 
 
-def perform_faiss_search(encoding, faiss_index_manager, top_k=20):
-    """Perform a FAISS search and format the results, only including actual matches."""
-    # faiss_index_manager.search returns distances, indices, and filenames_from_manager
-    # filenames_from_manager will be padded with None up to top_k if fewer actual matches exist.
-    # distances and indices will also correspond to these top_k potential slots.
-    distances_from_manager, _, filenames_from_manager = faiss_index_manager.search(encoding, top_k=top_k)
-    
+def _format_faiss_hits(distances_from_manager, filenames_from_manager, threshold):
+    """Turn one query's (distances, filenames) into match dicts, skipping None padding."""
+    from utils.face.recognition import calculate_similarity
+
     matches = []
     actual_match_id_counter = 0 # To assign a simple sequential ID to actual matches found
     
@@ -53,8 +57,7 @@ def perform_faiss_search(encoding, faiss_index_manager, top_k=20):
             # Calculate similarity from distance using the proper formula
             # The FAISS distance is an L2 distance, lower = more similar
             # For face recognition, typically a distance of 0.6 or lower indicates a match
-            from utils.face.recognition import calculate_similarity
-            similarity_score = calculate_similarity(distance) / 100  # Convert to 0-1 scale
+            similarity_score = calculate_similarity(distance, threshold) / 100  # Convert to 0-1 scale
             
             matches.append(
                 {
@@ -72,6 +75,23 @@ def perform_faiss_search(encoding, faiss_index_manager, top_k=20):
     return matches
 
 
+def perform_faiss_search(encoding, faiss_index_manager, top_k=20, threshold=0.6):
+    """Perform a FAISS search and format the results, only including actual matches."""
+    # faiss_index_manager.search returns distances, indices, and filenames_from_manager
+    # filenames_from_manager will be padded with None up to top_k if fewer actual matches exist.
+    # distances and indices will also correspond to these top_k potential slots.
+    distances_from_manager, _, filenames_from_manager = faiss_index_manager.search(encoding, top_k=top_k)
+    return _format_faiss_hits(distances_from_manager, filenames_from_manager, threshold)
+
+
+def perform_faiss_batch_search(encodings, faiss_index_manager, top_k=20, threshold=0.6):
+    """Search several encodings with one index call; returns one match list per encoding."""
+    return [
+        _format_faiss_hits(distances, filenames, threshold)
+        for distances, _, filenames in faiss_index_manager.search_batch(encodings, top_k=top_k)
+    ]
+
+
 def apply_privacy_filters(users, current_user_id):
     """Filter users based on privacy settings."""
     filtered_users = []
@@ -90,188 +110,511 @@ def perform_text_search(model, fields, query, limit=20):
     return db.session.query(model).filter(db.or_(*filters)).limit(limit).all()
 
 
-def get_enriched_faiss_matches(
-    user_profile_image_fs_path,
-    faiss_index_manager,
-    current_user_id,
-    liked_face_ids_for_current_user,
-    top_k=50,
-):
-    """Perform FAISS search and enrich results with Face object data, likes, and claimed profile info."""
-    if not user_profile_image_fs_path or not os.path.exists(user_profile_image_fs_path):
-        current_app.logger.warning(
-            "[FAISS_HELPER] User profile image path is invalid or not found."
-        )
-        return [], "Profile photo file not found. Please re-upload your profile photo."
+FACE_CARD_COLUMNS = (
+    "id, filename, school_name, yearbook_year, page_number, state, decade, "
+    "claimed_by_user_id, metadata"
+)
 
-    encoding = extract_face_encoding(user_profile_image_fs_path)
-    if encoding is None:
-        current_app.logger.warning(
-            "[FAISS_HELPER] Face encoding extraction failed for user's profile image."
+
+def _resolve_match_image(filename):
+    """Return the web path of a matched face image from the manifest, or None if missing."""
+    return get_manifest().web_path(filename, current_app.config.get("B2_DOWNLOAD_URL"))
+
+
+def _parse_metadata(raw):
+    if isinstance(raw, dict):
+        return raw
+    if isinstance(raw, str) and raw:
+        try:
+            return json.loads(raw)
+        except ValueError:
+            current_app.logger.warning("[SEARCH_HELPER] Could not parse face metadata")
+    return {}
+
+
+def fetch_faces_by_filenames(filenames):
+    """Fetch face rows for many filenames in one query. Returns {filename: row dict}."""
+    filenames = list(dict.fromkeys(f for f in filenames if f))
+    if not filenames:
+        return {}
+    conn = get_read_connection()
+    try:
+        cursor = conn.cursor()
+        placeholders = ",".join("?" * len(filenames))
+        cursor.execute(
+            f"SELECT {FACE_CARD_COLUMNS} FROM faces WHERE filename IN ({placeholders})",
+            filenames,
         )
-        return (
-            [],
-            "Could not detect a face in your profile photo. Please upload a clear face photo.",
+        return {row["filename"]: dict(row) for row in cursor.fetchall()}
+    except Exception as e:
+        current_app.logger.error(f"[SEARCH_HELPER] Error fetching faces: {e}")
+        return {}
+    finally:
+        conn.close()
+
+
+def fetch_users_by_ids(user_ids):
+    """Fetch minimal user cards for many ids in one query. Returns {user_id: dict}."""
+    user_ids = list({user_id for user_id in user_ids if user_id})
+    if not user_ids:
+        return {}
+    conn = get_read_connection()
+    try:
+        cursor = conn.cursor()
+        placeholders = ",".join("?" * len(user_ids))
+        cursor.execute(
+            f"SELECT id, username, profile_image FROM users WHERE id IN ({placeholders})",
+            user_ids,
         )
+        users = {}
+        for row in cursor.fetchall():
+            users[row["id"]] = {
+                "id": row["id"],
+                "username": row["username"],
+                "profile_image_url": normalize_profile_image_path(row["profile_image"]),
+            }
+        return users
+    except Exception as e:
+        current_app.logger.error(f"[SEARCH_HELPER] Error fetching claimed users: {e}")
+        return {}
+    finally:
+        conn.close()
 
-    # Perform initial FAISS search (this function is defined above)
-    raw_matches = perform_faiss_search(encoding, faiss_index_manager, top_k=top_k)
 
-    enriched_matches = []
-    valid_image_found_count = 0
+def enrich_faiss_matches(raw_matches, current_user_id, liked_face_ids):
+    """
+    Hydrate raw FAISS hits into match cards with a constant number of queries.
+
+    One query each loads the face rows, the like counts (GROUP BY) and the
+    users who claimed those faces, regardless of how many hits there are.
 
+    Returns:
+        tuple: (enriched matches, number of hits whose image exists)
+    """
+    hits = []
     for match_data in raw_matches:
-        # Validate image path for the matched face
         filename = match_data.get("filename", "")
         if not filename:
             current_app.logger.debug("[FAISS_HELPER] Match data has no filename, skipping.")
             continue
-
-        # Try multiple possible locations for the image
-        image_exists = False
-        web_image_path = None
-        
-        # 1. Check extracted_faces folder first (for non-user profile images)
-        if not filename.startswith("userprofile_"):
-            potential_image_static_path = os.path.join("extracted_faces", filename)
-            potential_image_static_path = potential_image_static_path.replace("\\", "/")
-            full_image_fs_path = os.path.join(current_app.static_folder, potential_image_static_path)
-            
-            if os.path.exists(full_image_fs_path):
-                image_exists = True
-                web_image_path = f"/static/{potential_image_static_path}"
-                current_app.logger.debug(f"[FAISS_HELPER] Found image in extracted_faces: {web_image_path}")
-        
-        # 2. If not found and it's a user profile, check faces folder
-        if not image_exists and filename.startswith("userprofile_"):
-            potential_image_static_path = os.path.join("faces", filename)
-            potential_image_static_path = potential_image_static_path.replace("\\", "/")
-            full_image_fs_path = os.path.join(current_app.static_folder, potential_image_static_path)
-            
-            if os.path.exists(full_image_fs_path):
-                image_exists = True
-                web_image_path = f"/static/{potential_image_static_path}"
-                current_app.logger.debug(f"[FAISS_HELPER] Found image in faces: {web_image_path}")
-                
-        # 3. If still not found, try standard faces folder for any image
-        if not image_exists:
-            potential_image_static_path = os.path.join("faces", filename)
-            potential_image_static_path = potential_image_static_path.replace("\\", "/")
-            full_image_fs_path = os.path.join(current_app.static_folder, potential_image_static_path)
-            
-            if os.path.exists(full_image_fs_path):
-                image_exists = True
-                web_image_path = f"/static/{potential_image_static_path}"
-                current_app.logger.debug(f"[FAISS_HELPER] Found image in faces: {web_image_path}")
-
-        if not image_exists:
+        web_image_path = _resolve_match_image(filename)
+        if not web_image_path:
             current_app.logger.warning(
                 f"[FAISS_HELPER] Matched image file not found, skipping: {filename}"
             )
             continue
-        else:
-            valid_image_found_count += 1
+        hits.append((match_data, filename, web_image_path))
+
+    faces = fetch_faces_by_filenames(filename for _, filename, _ in hits)
+    like_counts = UserMatch.count_likes_for_faces(face["id"] for face in faces.values())
+    claimed_users = fetch_users_by_ids(
+        face["claimed_by_user_id"] for face in faces.values()
+    )
+    liked_face_ids = liked_face_ids or set()
 
-        # Initialize a basic face_dict with information we already have from the match
+    enriched_matches = []
+    for match_data, filename, web_image_path in hits:
         face_dict = {
             "id": match_data.get("id", 0),
             "filename": filename,
-            "similarity": match_data.get("similarity"),
+            "similarity": match_data.get("similarity") or 0.0,
             "distance": match_data.get("distance"),
             "like_count": 0,
             "user_has_liked": False,
-            "image": web_image_path,  # Add the image path directly
+            "image": web_image_path,
             "safe_image_path": web_image_path,  # Keep this for backward compatibility
+            "profile_url": "#",
+            "comparison_url": "#",
         }
-        
-        # Try to get additional metadata from the Face object if it exists
-        face_obj = Face.get_by_filename(filename)
-        if face_obj:
-            # Update with Face object data but don't overwrite what we already set
-            face_obj_dict = face_obj.to_dict(include_private=True)
-            for key, value in face_obj_dict.items():
-                if key not in ["similarity", "distance", "safe_image_path", "image"] and value is not None:
-                    face_dict[key] = value
-                    
-            # Explicitly ensure state and decade info is included
-            if not face_dict.get('decade') and hasattr(face_obj, 'metadata') and face_obj.metadata:
-                if isinstance(face_obj.metadata, dict) and 'decade' in face_obj.metadata:
-                    face_dict['decade'] = face_obj.metadata.get('decade')
-                elif isinstance(face_obj.metadata, str):
-                    try:
-                        import json
-                        metadata_dict = json.loads(face_obj.metadata)
-                        if 'decade' in metadata_dict:
-                            face_dict['decade'] = metadata_dict.get('decade')
-                    except:
-                        current_app.logger.warning(f"[SEARCH_HELPER] Could not parse metadata for {filename}")
-            
-            # Same for state info
-            if not face_dict.get('state') and hasattr(face_obj, 'metadata') and face_obj.metadata:
-                if isinstance(face_obj.metadata, dict) and 'state' in face_obj.metadata:
-                    face_dict['state'] = face_obj.metadata.get('state')
-                elif isinstance(face_obj.metadata, str):
-                    try:
-                        import json
-                        metadata_dict = json.loads(face_obj.metadata)
-                        if 'state' in metadata_dict:
-                            face_dict['state'] = metadata_dict.get('state')
-                    except:
-                        current_app.logger.warning(f"[SEARCH_HELPER] Could not parse metadata for {filename}")
-            
-            face_id = getattr(face_obj, "id", None)
-            if face_id:
-                face_dict["id"] = face_id  # Use the actual DB ID if available
-                face_dict["like_count"] = UserMatch.count_likes(face_id)
-                if current_user_id:
-                    face_dict["user_has_liked"] = face_id in liked_face_ids_for_current_user
-            else:
-                face_dict["like_count"] = 0
-                face_dict["user_has_liked"] = False
-
-            if face_dict.get("is_registered") and face_dict.get("username"):
-                try:
-                    face_dict["profile_url"] = url_for(
-                        "profile.view_user_profile", username=face_dict["username"]
-                    )
-                except Exception as e:
-                    current_app.logger.error(f"Error generating profile_url for {face_dict.get('username')}: {e}")
-                    face_dict["profile_url"] = "#"
-            else:
-                face_dict["profile_url"] = "#"
-
-            face_id_for_comparison = face_dict.get("id")
-            if face_id_for_comparison:
-                try:
-                    face_dict["comparison_url"] = url_for(
-                        "face.direct_face_view", face_id=face_id_for_comparison
-                    )
-                except Exception as e:
-                    current_app.logger.error(f"Error generating comparison_url for face_id {face_id_for_comparison}: {e}")
-                    face_dict["comparison_url"] = "#"
-            else:
-                face_dict["comparison_url"] = "#"
-        
-        else: # face_obj is None (Face object not found in DB)
+
+        face_row = faces.get(filename)
+        if face_row is None:
             current_app.logger.warning(
                 f"[FAISS_HELPER] Face object not found in DB for filename: {filename}"
             )
-            # Add basic metadata to face_dict if not already set
-            if "decade" not in face_dict:
-                face_dict["decade"] = "Unknown"
-            if "state" not in face_dict:
-                face_dict["state"] = "Unknown"
-            if "face_id" not in face_dict:
-                face_dict["face_id"] = match_data.get("id", 0)  # Use this as a fallback ID
+            face_dict.update(
+                decade="Unknown", state="Unknown", face_id=match_data.get("id", 0)
+            )
+            enriched_matches.append(face_dict)
+            continue
+
+        metadata = _parse_metadata(face_row.pop("metadata", None))
+        for key, value in face_row.items():
+            if value is not None:
+                face_dict[key] = value
+        for key in ("decade", "state"):
+            if not face_dict.get(key) and metadata.get(key):
+                face_dict[key] = metadata[key]
+
+        face_id = face_row["id"]
+        face_dict["like_count"] = like_counts.get(face_id, 0)
+        face_dict["user_has_liked"] = bool(current_user_id) and face_id in liked_face_ids
 
-        if face_dict.get("similarity") is None:
-            face_dict["similarity"] = 0.0
+        claimed_user = claimed_users.get(face_row.get("claimed_by_user_id"))
+        if claimed_user:
+            face_dict["is_registered"] = True
+            face_dict["username"] = claimed_user["username"]
+            face_dict["claimed_user"] = claimed_user
+            try:
+                face_dict["profile_url"] = url_for(
+                    "profile.view_user_profile", username=claimed_user["username"]
+                )
+            except Exception as e:
+                current_app.logger.error(f"Error generating profile_url for {claimed_user['username']}: {e}")
+
+        try:
+            face_dict["comparison_url"] = url_for("face.direct_face_view", face_id=face_id)
+            face_dict["similar_url"] = url_for("search.api_similar_faces", face_id=face_id)
+        except Exception as e:
+            current_app.logger.error(f"Error generating comparison_url for face_id {face_id}: {e}")
 
         enriched_matches.append(face_dict)
 
-    if not enriched_matches and valid_image_found_count > 0:
-        return [], "Found potential matches, but could not retrieve full details."
-    elif not enriched_matches:
-        return [], "No visually similar faces found with valid details."
+    return enriched_matches, len(hits)
+
+
+def get_ranked_faiss_matches(
+    user_profile_image_fs_path,
+    faiss_index_manager,
+    depth=None,
+    backend=None,
+    filters=None,
+):
+    """Return the ranked FAISS hits for a profile photo, served from the search cache when possible.
+
+    ``backend`` names the embedding backend (see utils.face.encoders); its own
+    FAISS index is searched instead of ``faiss_index_manager`` when they differ.
+    The ranked list (filename, similarity, distance) is cached per
+    (encoding, index version, filters, depth); ``filters`` is part of that key.
+
+    Returns:
+        tuple: (ranked_key or None when uncached, raw matches, error message)
+    """
+    depth = depth or current_app.config.get("SEARCH_RANKED_DEPTH", 500)
+    fingerprint = search_cache.photo_fingerprint(user_profile_image_fs_path) if user_profile_image_fs_path else None
+    if fingerprint is None:
+        current_app.logger.warning(
+            "[FAISS_HELPER] User profile image path is invalid or not found."
+        )
+        return None, [], "Profile photo file not found. Please re-upload your profile photo."
+
+    encoder = get_backend(backend)
+    if getattr(faiss_index_manager, "backend", encoder.name) != encoder.name:
+        from utils.index.faiss_manager import get_index_manager
+
+        faiss_index_manager = get_index_manager(encoder.name)
+
+    encoding = search_cache.get_cached_encoding(encoder.name, fingerprint)
+    if encoding is None:
+        encoding = run_blocking(encoder.encode_file, user_profile_image_fs_path, kind=CPU)
+        if encoding is None:
+            current_app.logger.warning(
+                f"[FAISS_HELPER] Face encoding extraction failed for user's profile image ({encoder.name})."
+            )
+            return (
+                None,
+                [],
+                "Could not detect a face in your profile photo. Please upload a clear face photo.",
+            )
+        search_cache.store_encoding(encoder.name, fingerprint, encoding)
+
+    faiss_index_manager.load_index()
+    index_version = getattr(faiss_index_manager, "version", None)
+    ranked_key = None
+    if index_version:
+        ranked_key = search_cache.results_key(encoding, index_version, depth, filters)
+        cached = search_cache.get_ranked(ranked_key)
+        if cached is not None:
+            return ranked_key, cached, None
+
+    raw_matches = perform_faiss_search(
+        encoding, faiss_index_manager, top_k=depth, threshold=encoder.match_threshold
+    )
+    if ranked_key:
+        search_cache.store_ranked(ranked_key, raw_matches)
+    return ranked_key, raw_matches, None
+
+
+def get_enriched_faiss_page(
+    user_profile_image_fs_path,
+    faiss_index_manager,
+    current_user_id,
+    liked_face_ids_for_current_user,
+    page_size=50,
+    cursor=None,
+    backend=None,
+    filters=None,
+):
+    """Return one page of enriched FAISS matches plus an opaque cursor for the next page.
+
+    The first page ranks the photo once (see get_ranked_faiss_matches); later
+    pages read the cached ranked list through the cursor, so each costs only
+    the (uncached) enrichment of its slice. If the ranked list has expired, the search
+    is re-run and continues at the cursor's offset.
+
+    Returns:
+        tuple: (matches, next_cursor or None, error message or None)
+    """
+    offset = 0
+    ranked_key, raw_matches = None, None
+    if cursor:
+        decoded = search_cache.decode_cursor(cursor, current_user_id)
+        if decoded is None:
+            return [], None, "Invalid or expired cursor."
+        ranked_key, offset = decoded
+        raw_matches = search_cache.get_ranked(ranked_key)
+
+    if raw_matches is None:
+        ranked_key, raw_matches, error = get_ranked_faiss_matches(
+            user_profile_image_fs_path,
+            faiss_index_manager,
+            depth=max(page_size, current_app.config.get("SEARCH_RANKED_DEPTH", 500)),
+            backend=backend,
+            filters=filters,
+        )
+        if error:
+            return [], None, error
+
+    end = offset + page_size
+    next_cursor = None
+    if ranked_key and end < len(raw_matches):
+        next_cursor = search_cache.encode_cursor(ranked_key, end, current_user_id)
+
+    # Only the ranking is cached; like counts, claimed users and image paths
+    # change independently of it, so every page is enriched fresh
+    enriched_matches, valid_image_found_count = enrich_faiss_matches(
+        raw_matches[offset:end], current_user_id, liked_face_ids_for_current_user
+    )
+
+    if not enriched_matches and offset == 0:
+        if valid_image_found_count > 0:
+            return [], None, "Found potential matches, but could not retrieve full details."
+        return [], None, "No visually similar faces found with valid details."
+
+    return enriched_matches, next_cursor, None
+
+
+def get_enriched_faiss_matches(
+    user_profile_image_fs_path,
+    faiss_index_manager,
+    current_user_id,
+    liked_face_ids_for_current_user,
+    top_k=50,
+    backend=None,
+    filters=None,
+):
+    """Perform FAISS search and enrich results with Face object data, likes, and claimed profile info.
+
+    Returns the first ``top_k`` matches; see get_enriched_faiss_page for
+    cursor-based pagination over the same cached ranking.
+    """
+    enriched_matches, _, error = get_enriched_faiss_page(
+        user_profile_image_fs_path,
+        faiss_index_manager,
+        current_user_id,
+        liked_face_ids_for_current_user,
+        page_size=top_k,
+        backend=backend,
+        filters=filters,
+    )
+    return enriched_matches, error
+
+
+def get_enriched_group_matches(
+    image_fs_path,
+    faiss_index_manager,
+    current_user_id,
+    liked_face_ids_for_current_user,
+    top_k=10,
+    backend=None,
+    max_faces=None,
+):
+    """
+    Find lookalikes for every face in a group or yearbook-page photo.
+
+    All faces are detected and encoded in one pass, searched with a single
+    multi-vector FAISS call and enriched together, so the cost does not grow
+    with one request per face.
+
+    Returns:
+        tuple: (groups, error message). Each group is
+        ``{"face_index", "box": {top, right, bottom, left}, "matches"}``,
+        largest face first.
+    """
+    encoder = get_backend(backend)
+    if getattr(faiss_index_manager, "backend", encoder.name) != encoder.name:
+        from utils.index.faiss_manager import get_index_manager
+
+        faiss_index_manager = get_index_manager(encoder.name)
+
+    # Only the largest faces are encoded, so a crowd photo cannot pin a CPU worker
+    max_faces = max_faces or current_app.config.get("GROUP_MATCH_MAX_FACES", 20)
+    faces = run_blocking(encoder.encode_faces_file, image_fs_path, max_faces=max_faces, kind=CPU)
+    if not faces:
+        return [], "No faces detected in the photo."
+
+    raw_groups = perform_faiss_batch_search(
+        [vector for _, vector in faces], faiss_index_manager, top_k=top_k, threshold=encoder.match_threshold
+    )
+    if not raw_groups:
+        return [], "Face search is unavailable right now."
+
+    # Faces in one photo often share lookalikes; enrich each filename once
+    unique = {}
+    for raw in raw_groups:
+        for match in raw:
+            unique.setdefault(match["filename"], match)
+    enriched, _ = enrich_faiss_matches(list(unique.values()), current_user_id, liked_face_ids_for_current_user)
+    cards = {card["filename"]: card for card in enriched if "face_id" not in card}
+
+    groups = []
+    for face_index, ((top, right, bottom, left), _), raw in zip(range(len(faces)), faces, raw_groups):
+        groups.append({
+            "face_index": face_index,
+            "box": {"top": int(top), "right": int(right), "bottom": int(bottom), "left": int(left)},
+            "matches": [
+                dict(cards[match["filename"]], similarity=match["similarity"], distance=match["distance"])
+                for match in raw
+                if match["filename"] in cards
+            ],
+        })
+    return groups, None
+
+
+# Face columns a "more like this" search can be narrowed by
+SIMILAR_FILTER_COLUMNS = ("decade", "state", "school_name", "yearbook_year")
+
+
+def load_face_vector(face_id, faiss_index_manager, backend_name):
+    """
+    Return (filename, vector) for a stored face without decoding any image.
+
+    The vector is reconstructed from the FAISS index when it can be, otherwise
+    read from ``faces.encoding`` (dlib) or ``face_embeddings`` (other backends).
+    Either part is None when unavailable.
+    """
+    from utils.face.embedding_store import LEGACY_BACKEND, decode_legacy_encoding
+
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT filename FROM faces WHERE id = ?", (face_id,))
+        row = cursor.fetchone()
+        if not row or not row["filename"]:
+            return None, None
+        filename = row["filename"]
+
+        vector = faiss_index_manager.reconstruct_by_filename(filename)
+        if vector is not None:
+            return filename, vector
+
+        if backend_name == LEGACY_BACKEND:
+            cursor.execute("SELECT encoding FROM faces WHERE id = ?", (face_id,))
+            stored = cursor.fetchone()
+            vector = decode_legacy_encoding(stored["encoding"]) if stored else None
+        else:
+            cursor.execute(
+                "SELECT embedding FROM face_embeddings WHERE filename = ? AND backend = ?",
+                (filename, backend_name),
+            )
+            stored = cursor.fetchone()
+            vector = np.frombuffer(stored["embedding"], dtype=np.float32) if stored else None
+        return filename, vector
+    except Exception as e:
+        current_app.logger.error(f"[SEARCH_HELPER] Error loading stored vector for face {face_id}: {e}")
+        return None, None
+    finally:
+        conn.close()
+
+
+def filter_face_filenames(filenames, filters):
+    """
+    Keep the filenames whose face row matches every ``filters`` column.
+
+    Only filenames are read, so a deep ranked list can be narrowed before
+    anything is enriched.
+
+    Returns:
+        set: Matching filenames
+    """
+    filenames = list(dict.fromkeys(f for f in filenames if f))
+    if not filenames:
+        return set()
+    columns = [key for key in SIMILAR_FILTER_COLUMNS if key in filters]
+    conn = get_read_connection()
+    try:
+        cursor = conn.cursor()
+        placeholders = ",".join("?" * len(filenames))
+        conditions = "".join(f" AND CAST({column} AS TEXT) = ?" for column in columns)
+        cursor.execute(
+            f"SELECT filename FROM faces WHERE filename IN ({placeholders}){conditions}",
+            filenames + [filters[column] for column in columns],
+        )
+        return {row["filename"] for row in cursor.fetchall()}
+    except Exception as e:
+        current_app.logger.error(f"[SEARCH_HELPER] Error filtering faces: {e}")
+        return set()
+    finally:
+        conn.close()
+
+
+def search_by_face_id(
+    face_id,
+    faiss_index_manager,
+    current_user_id=None,
+    liked_face_ids_for_current_user=None,
+    top_k=20,
+    filters=None,
+    backend=None,
+):
+    """Find lookalikes of an already indexed face ("more like this").
+
+    The query vector comes from the index or embedding store (see
+    load_face_vector), so no image is loaded, detected or encoded. The face
+    itself is left out of its results. ``filters`` may narrow the matches by
+    any of SIMILAR_FILTER_COLUMNS; the index is over-read to make up for
+    filtered-out hits, which are dropped with one filename-only query before
+    the top ``top_k`` are enriched. Ranked lists are cached like photo
+    searches, before filtering, so the cache key does not include filters.
+
+    Returns:
+        tuple: (matches, error message)
+    """
+    encoder = get_backend(backend)
+    if getattr(faiss_index_manager, "backend", encoder.name) != encoder.name:
+        from utils.index.faiss_manager import get_index_manager
+
+        faiss_index_manager = get_index_manager(encoder.name)
+
+    filters = {
+        key: str(value) for key, value in (filters or {}).items()
+        if key in SIMILAR_FILTER_COLUMNS and value not in (None, "")
+    }
+    filename, vector = load_face_vector(face_id, faiss_index_manager, encoder.name)
+    if filename is None:
+        return [], "Face not found."
+    if vector is None:
+        return [], "No stored face vector for this face."
+
+    depth = top_k + 1
+    if filters:
+        depth = max(depth, current_app.config.get("SEARCH_RANKED_DEPTH", 500))
+
+    index_version = getattr(faiss_index_manager, "version", None)
+    ranked_key = search_cache.results_key(vector, index_version, depth) if index_version else None
+    raw_matches = search_cache.get_ranked(ranked_key) if ranked_key else None
+    if raw_matches is None:
+        raw_matches = perform_faiss_search(
+            vector, faiss_index_manager, top_k=depth, threshold=encoder.match_threshold
+        )
+        if ranked_key:
+            search_cache.store_ranked(ranked_key, raw_matches)
 
-    return enriched_matches, None  # Results, No error message
+    raw_matches = [match for match in raw_matches if match["filename"] != filename]
+    if filters:
+        kept = filter_face_filenames([match["filename"] for match in raw_matches], filters)
+        raw_matches = [match for match in raw_matches if match["filename"] in kept]
+    enriched_matches, _ = enrich_faiss_matches(
+        raw_matches[:top_k], current_user_id, liked_face_ids_for_current_user
+    )
+    return enriched_matches, None
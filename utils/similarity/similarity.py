@@ -2,6 +2,7 @@ from flask import current_app
 
 from utils.db.database import get_db_connection
 from utils.face.recognition import extract_face_encoding, find_similar_faces
+from utils.face.sampler import get_face_sampler
 
 
 def get_similar_faces(encoding, top_k=100):
@@ -70,18 +71,20 @@ def query_faces_directly(image_path, top_k=10):
             popular_rows = cursor.fetchall()
             # Get some random faces from different states (40% of results)
             diverse_limit = top_k - len(popular_rows)
-            cursor.execute(
-                """
-                SELECT f.id, f.filename, f.school_name, f.yearbook_year, f.page_number, f.state, COUNT(um.id) as match_count
-                FROM faces f
-                LEFT JOIN user_matches um ON f.filename = um.match_filename
-                GROUP BY f.filename
-                ORDER BY RANDOM()
-                LIMIT ?
-            """,
-                (diverse_limit,),
-            )
-            diverse_rows = cursor.fetchall()
+            diverse_ids = get_face_sampler().sample_stratified(diverse_limit, by="state")
+            diverse_rows = []
+            if diverse_ids:
+                cursor.execute(
+                    f"""
+                    SELECT f.id, f.filename, f.school_name, f.yearbook_year, f.page_number, f.state, COUNT(um.id) as match_count
+                    FROM faces f
+                    LEFT JOIN user_matches um ON f.filename = um.match_filename
+                    WHERE f.id IN ({",".join("?" * len(diverse_ids))})
+                    GROUP BY f.filename
+                """,
+                    diverse_ids,
+                )
+                diverse_rows = cursor.fetchall()
             # Combine the results
             all_rows = popular_rows + diverse_rows
             for row in all_rows:
@@ -12,6 +12,8 @@ from utils.db.database import setup_users_db, init_app
 from utils.face.recognition import rebuild_faiss_index
 from utils.index.faiss_manager import faiss_index_manager
 from utils.db.migrations import run_migrations
+from utils.files.image_manifest import build_manifest
+from utils.face.top_matches import top_match_refresher
 from utils.model_loader import ensure_model_files
 
 logger = logging.getLogger(__name__)
@@ -22,6 +24,8 @@ def run_startup_tasks(app):
     - Sets up user and face databases
     - Applies necessary database migrations
     - Checks and (re)builds FAISS index if needed
+    - Builds the in-memory image location manifest
+    - Starts the background refresher for materialised top matches
     - Creates default images if missing
     - Ensures all required model files are present
     """
@@ -72,6 +76,19 @@ def run_startup_tasks(app):
     else:
         logger.info("FAISS index will be loaded on demand")
 
+    # --- Image Manifest ---
+    try:
+        build_manifest(app)
+    except Exception as e:
+        logger.error(f"Failed to build image manifest: {e}")
+
+    # --- Materialised Top Matches ---
+    if app.config.get("USER_TOP_MATCHES_REFRESHER", False):
+        try:
+            top_match_refresher.start(app)
+        except Exception as e:
+            logger.error(f"Failed to start top match refresher: {e}")
+
     # --- Model Files ---
     try:
         if ensure_model_files():